@@ -29,6 +29,8 @@ from wsgicors import CORS
 import paasta_tools.api
 from paasta_tools import marathon_tools
 from paasta_tools.api import settings
+from paasta_tools.api.cluster_state import ClusterStateCache
+from paasta_tools.config_hash_cache import enable_config_hash_cache
 from paasta_tools.utils import load_system_paasta_config
 from paasta_tools.utils import ZookeeperPool
 
@@ -53,6 +55,13 @@ def parse_paasta_api_args():
         dest="soa_dir",
         help="define a different soa config directory",
     )
+    parser.add_argument(
+        '--cluster-state-refresh-interval',
+        dest="cluster_state_refresh_interval",
+        type=int, default=10,
+        help="seconds between two background refreshes of the marathon and mesos state "
+             "served from memory (0 disables the background refresh)",
+    )
     args = parser.parse_args()
     return args
 
@@ -64,7 +73,11 @@ def make_app(global_config=None):
     config = Configurator(settings={
         'service_name': 'paasta-api',
         'pyramid_swagger.schema_directory': os.path.join(paasta_api_path, 'api_docs'),
-        'pyramid_swagger.skip_validation': ['/(static)\\b', '/(status)\\b', '/(swagger.json)\\b'],
+        'pyramid_swagger.skip_validation': [
+            '/(static)\\b', '/(status)\\b', '/(swagger.json)\\b',
+            # Served pre-serialized and possibly gzipped
+            '/v1/(marathon_dashboard)\\b',
+        ],
         'pyramid_swagger.swagger_versions': ['2.0'],
     })
 
@@ -75,6 +88,7 @@ def make_app(global_config=None):
     config.add_route('service.instance.tasks', '/v1/services/{service}/{instance}/tasks')
     config.add_route('service.instance.tasks.task', '/v1/services/{service}/{instance}/tasks/{task_id}')
     config.add_route('service.list', '/v1/services/{service}')
+    config.add_route('service.deploy_status', '/v1/services/{service}/deploy_status')
     config.add_route('service.autoscaler.get', '/v1/services/{service}/{instance}/autoscaler', request_method="GET")
     config.add_route('service.autoscaler.post', '/v1/services/{service}/{instance}/autoscaler', request_method="POST")
     config.add_route('service_autoscaler.pause.post', '/v1/service_autoscaler/pause', request_method="POST")
@@ -89,6 +103,7 @@ def make_app(global_config=None):
 def setup_paasta_api():
     # pyinotify is a better solution than turning off file caching completely
     service_configuration_lib.disable_yaml_cache()
+    enable_config_hash_cache()
 
     settings.system_paasta_config = load_system_paasta_config()
     settings.cluster = settings.system_paasta_config.get_cluster()
@@ -108,6 +123,14 @@ def setup_paasta_api():
     # concern here. Thus remove_expired_responses is not needed.
     requests_cache.install_cache("paasta-api", backend="memory", expire_after=5)
 
+    if settings.cluster_state_refresh_interval > 0:
+        settings.cluster_state = ClusterStateCache(
+            marathon_clients=settings.marathon_clients,
+            refresh_interval=settings.cluster_state_refresh_interval,
+            max_staleness=3 * settings.cluster_state_refresh_interval,
+        )
+        settings.cluster_state.start()
+
 
 def main(argv=None):
     monkey.patch_all()
@@ -119,6 +142,7 @@ def main(argv=None):
 
     if args.soa_dir:
         settings.soa_dir = args.soa_dir
+    settings.cluster_state_refresh_interval = args.cluster_state_refresh_interval
 
     server = WSGIServer(('', int(args.port)), make_app())
     log.info("paasta-api started on port %d with soa_dir %s" % (args.port, settings.soa_dir))
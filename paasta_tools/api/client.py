@@ -20,7 +20,9 @@ import logging
 import os
 from urllib.parse import urlparse
 
+import requests
 from bravado.client import SwaggerClient
+from bravado.requests_client import RequestsClient
 
 import paasta_tools.api
 from paasta_tools.utils import load_system_paasta_config
@@ -29,7 +31,14 @@ from paasta_tools.utils import load_system_paasta_config
 log = logging.getLogger(__name__)
 
 
-def get_paasta_api_client(cluster=None, system_paasta_config=None, http_res=False):
+def get_paasta_api_client(cluster=None, system_paasta_config=None, http_res=False, max_connections=None):
+    """Return a bravado client for the paasta-api of a cluster.
+
+    :param max_connections: size of the client's connection pool. Set this when
+                            the client is shared by that many threads, so that
+                            concurrent requests reuse connections instead of
+                            discarding them.
+    """
     if not system_paasta_config:
         system_paasta_config = load_system_paasta_config()
 
@@ -60,9 +69,16 @@ def get_paasta_api_client(cluster=None, system_paasta_config=None, http_res=Fals
     # replace localhost in swagger.json with actual api server
     spec_dict['host'] = api_server
 
+    http_client = None
+    if max_connections:
+        http_client = RequestsClient()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_connections)
+        http_client.session.mount('http://', adapter)
+        http_client.session.mount('https://', adapter)
+
     # sometimes we want the status code
     if http_res:
         config = {'also_return_response': True}
-        return SwaggerClient.from_spec(spec_dict=spec_dict, config=config)
+        return SwaggerClient.from_spec(spec_dict=spec_dict, config=config, http_client=http_client)
     else:
-        return SwaggerClient.from_spec(spec_dict=spec_dict)
+        return SwaggerClient.from_spec(spec_dict=spec_dict, http_client=http_client)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# Copyright 2015-2018 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Marathon and Mesos state of the cluster, refreshed in the background so that
+the paasta-api views can answer from memory instead of querying Marathon and
+Mesos on every request.
+"""
+import itertools
+import logging
+import time
+from collections import defaultdict
+from collections import namedtuple
+
+import gevent
+
+from paasta_tools import marathon_tools
+from paasta_tools.mesos_tools import get_mesos_master
+from paasta_tools.metrics.metrics_lib import get_metrics_interface
+
+
+log = logging.getLogger(__name__)
+
+# Response header telling clients how old the cluster state used was, in seconds
+STALENESS_HEADER = 'X-Paasta-Cluster-State-Age'
+
+MarathonState = namedtuple(
+    'MarathonState', ['apps_by_id', 'apps_by_job_id', 'tasks_by_id', 'queue_by_app_id', 'deployments'],
+)
+MesosState = namedtuple('MesosState', ['state', 'slaves_by_id', 'tasks_by_id', 'running_tasks_by_app_id'])
+
+
+def job_id_for_app_id(app_id):
+    """The service.instance job id of a marathon app id, or None if the app id
+    doesn't look like one of ours. Matches like marathon_tools.does_app_id_match."""
+    parts = app_id.lstrip('/').split(marathon_tools.MESOS_TASK_SPACER)
+    if len(parts) > 2:
+        return marathon_tools.MESOS_TASK_SPACER.join(parts[:2])
+    return None
+
+
+def build_marathon_state(client):
+    apps_by_id = {}
+    apps_by_job_id = defaultdict(list)
+    tasks_by_id = {}
+    for app in marathon_tools.get_all_marathon_apps(client, embed_tasks=True):
+        apps_by_id[app.id] = app
+        job_id = job_id_for_app_id(app.id)
+        if job_id is not None:
+            apps_by_job_id[job_id].append(app)
+        for task in app.tasks:
+            tasks_by_id[task.id] = task
+    queue_by_app_id = {item.app.id: item for item in client.list_queue(embed_last_unused_offers=True)}
+    return MarathonState(
+        apps_by_id=apps_by_id,
+        apps_by_job_id=dict(apps_by_job_id),
+        tasks_by_id=tasks_by_id,
+        queue_by_app_id=queue_by_app_id,
+        deployments=client.list_deployments(),
+    )
+
+
+def build_mesos_state(state):
+    """Indexes the tasks of the frameworks in a /master/state.json response.
+
+    Like mesos_tools.get_running_tasks_from_frameworks, orphan tasks are left
+    out. Running tasks are indexed by the marathon app id (without the leading
+    /) that prefixes their task id.
+    """
+    slaves_by_id = {slave['id']: slave for slave in state.get('slaves', [])}
+    tasks_by_id = {}
+    running_tasks_by_app_id = defaultdict(list)
+    frameworks = itertools.chain(state.get('frameworks', []), state.get('completed_frameworks', []))
+    for framework in frameworks:
+        for task in itertools.chain(framework.get('tasks', []), framework.get('completed_tasks', [])):
+            tasks_by_id[task['id']] = task
+            if task['state'] == 'TASK_RUNNING':
+                running_tasks_by_app_id[task['id'].rsplit(marathon_tools.MESOS_TASK_SPACER, 1)[0]].append(task)
+    return MesosState(
+        state=state,
+        slaves_by_id=slaves_by_id,
+        tasks_by_id=tasks_by_id,
+        running_tasks_by_app_id=dict(running_tasks_by_app_id),
+    )
+
+
+class ClusterStateCache(object):
+    """Keeps the state of every Marathon server and of the Mesos master in
+    memory, refreshed by a greenlet every refresh_interval seconds.
+
+    A refresh that fails leaves the previous state in place. Readers get None
+    for any state older than max_staleness seconds, and should then fall back
+    to querying Marathon or Mesos themselves.
+
+    :param marathon_clients: a MarathonClients
+    :param refresh_interval: seconds to wait between two refreshes
+    :param max_staleness: age in seconds after which a state is not served
+    """
+
+    def __init__(self, marathon_clients, refresh_interval=10, max_staleness=30, metrics=None):
+        self.marathon_clients = marathon_clients
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        if metrics is None:
+            metrics = get_metrics_interface('paasta.api.cluster_state')
+        self.refresh_timer = metrics.create_timer('refresh')
+        self.age_gauge = metrics.create_gauge('age')
+        self.failures_gauge = metrics.create_gauge('refresh_failures')
+        self.failures = 0
+        self._marathon_states = {}
+        self._mesos_state = None
+        self._greenlet = None
+
+    def start(self):
+        self._greenlet = gevent.spawn(self._run)
+
+    def stop(self):
+        if self._greenlet is not None:
+            self._greenlet.kill()
+            self._greenlet = None
+
+    def _run(self):
+        while True:
+            self.refresh()
+            gevent.sleep(self.refresh_interval)
+
+    def refresh(self):
+        """Refreshes every Marathon server and the Mesos master concurrently"""
+        self.refresh_timer.start()
+        greenlets = [
+            gevent.spawn(self._refresh_marathon, client)
+            for client in self.marathon_clients.get_all_clients()
+        ]
+        greenlets.append(gevent.spawn(self._refresh_mesos))
+        gevent.joinall(greenlets)
+        self.refresh_timer.stop()
+        self.failures_gauge.set(self.failures)
+        age = self.age()
+        if age is not None:
+            self.age_gauge.set(age)
+
+    def _refresh_marathon(self, client):
+        try:
+            self._marathon_states[client] = (build_marathon_state(client), time.time())
+        except Exception:
+            self.failures += 1
+            log.exception("Failed to refresh the state of marathon server %s" % client.servers)
+
+    def _refresh_mesos(self):
+        try:
+            self._mesos_state = (build_mesos_state(get_mesos_master().state), time.time())
+        except Exception:
+            self.failures += 1
+            log.exception("Failed to refresh the state of the mesos master")
+
+    def _fresh(self, state_and_updated_at):
+        if state_and_updated_at is None:
+            return None
+        state, updated_at = state_and_updated_at
+        if time.time() - updated_at > self.max_staleness:
+            return None
+        return state
+
+    def get_marathon_state(self, client):
+        """:returns: the MarathonState of client, or None if it is too old"""
+        return self._fresh(self._marathon_states.get(client))
+
+    def get_mesos_state(self):
+        """:returns: the MesosState of the cluster, or None if it is too old"""
+        return self._fresh(self._mesos_state)
+
+    def age(self):
+        """:returns: the age in seconds of the oldest state held, or None if
+        some state has never been fetched"""
+        updates = [updated_at for _, updated_at in self._marathon_states.values()]
+        if self._mesos_state is None or len(updates) < len(self.marathon_clients.get_all_clients()):
+            return None
+        updates.append(self._mesos_state[1])
+        return time.time() - min(updates)
+
+
+def set_staleness_header(response, cluster_state):
+    """Tells the client how old the cluster state behind a response may be"""
+    if cluster_state is not None:
+        age = cluster_state.age()
+        if age is not None:
+            response.headers[STALENESS_HEADER] = '%.1f' % age
@@ -19,3 +19,8 @@ from paasta_tools.utils import DEFAULT_SOA_DIR
 soa_dir = DEFAULT_SOA_DIR
 cluster = None
 marathon_clients = None
+# Seconds between two refreshes of the in-memory cluster state; 0 disables it
+cluster_state_refresh_interval = 0
+cluster_state = None
+# Incrementally refreshed MarathonDashboardView, created on the first request
+marathon_dashboard = None
@@ -17,13 +17,16 @@ PaaSTA service instance status/start/stop etc.
 """
 import traceback
 
+import gevent
 import marathon
+from gevent import pool
 from pyramid.response import Response
 from pyramid.view import view_config
 
 from paasta_tools import chronos_tools
 from paasta_tools import marathon_tools
 from paasta_tools.api import settings
+from paasta_tools.api.cluster_state import set_staleness_header
 from paasta_tools.api.views.exception import ApiFailure
 from paasta_tools.cli.cmds.status import get_actual_deployments
 from paasta_tools.mesos_tools import get_cached_list_of_running_tasks_from_frameworks
@@ -37,6 +40,10 @@ from paasta_tools.utils import NoDockerImageError
 from paasta_tools.utils import validate_service_instance
 
 
+# Maximum number of agents whose state is fetched at once for a verbose task listing
+SLAVE_STATE_POOL_SIZE = 20
+
+
 def chronos_instance_status(instance_status, service, instance, verbose):
     cstatus = {}
     chronos_config = chronos_tools.load_chronos_config()
@@ -99,7 +106,10 @@ def adhoc_instance_status(instance_status, service, instance, verbose):
     return cstatus
 
 
-def marathon_job_status(mstatus, client, job_config, verbose):
+def marathon_job_status(mstatus, client, job_config, verbose, marathon_state=None, mesos_state=None):
+    """Fills mstatus in. The apps, launch queue and tasks are looked up in
+    marathon_state and mesos_state when given, otherwise Marathon and Mesos
+    are queried."""
     try:
         app_id = job_config.format_marathon_app_dict()['id']
     except NoDockerImageError:
@@ -109,41 +119,74 @@ def marathon_job_status(mstatus, client, job_config, verbose):
 
     mstatus['app_id'] = app_id
     if verbose is True:
-        mstatus['slaves'] = list({task.slave['hostname'] for task in get_running_tasks_from_frameworks(app_id)})
+        if mesos_state is not None:
+            mstatus['slaves'] = list({
+                mesos_state.slaves_by_id[task['slave_id']]['hostname']
+                for task in mesos_state.running_tasks_by_app_id.get(app_id, [])
+                if task['slave_id'] in mesos_state.slaves_by_id
+            })
+        else:
+            mstatus['slaves'] = list({task.slave['hostname'] for task in get_running_tasks_from_frameworks(app_id)})
     mstatus['expected_instance_count'] = job_config.get_instances()
 
-    try:
-        app = client.get_app(app_id)
-    except marathon.exceptions.NotFoundError:
+    if marathon_state is not None:
+        app = marathon_state.apps_by_id.get('/%s' % app_id)
+    else:
+        try:
+            app = client.get_app(app_id)
+        except marathon.exceptions.NotFoundError:
+            app = None
+
+    if app is None:
         mstatus['deploy_status'] = marathon_tools.MarathonDeployStatus.tostring(
             marathon_tools.MarathonDeployStatus.NotRunning,
         )
         mstatus['running_instance_count'] = 0
     else:
-        deploy_status = marathon_tools.get_marathon_app_deploy_status(client, app)
+        if marathon_state is not None:
+            is_overdue, backoff_seconds = marathon_tools.get_app_queue_status_from_queue(
+                marathon_state.queue_by_app_id.get(app.id),
+            )
+            deploy_status = marathon_tools.get_marathon_app_deploy_status_from_queue_status(
+                app, is_overdue, backoff_seconds,
+            )
+        else:
+            deploy_status = marathon_tools.get_marathon_app_deploy_status(client, app)
         mstatus['deploy_status'] = marathon_tools.MarathonDeployStatus.tostring(deploy_status)
         # by comparing running count with expected count, callers can figure
         # out if the instance is in Healthy, Warning or Critical state.
         mstatus['running_instance_count'] = app.tasks_running
 
         if deploy_status == marathon_tools.MarathonDeployStatus.Delayed:
-            _, backoff_seconds = marathon_tools.get_app_queue_status(client, app_id)
+            if marathon_state is None:
+                _, backoff_seconds = marathon_tools.get_app_queue_status(client, app_id)
             mstatus['backoff_seconds'] = backoff_seconds
 
 
-def marathon_instance_status(instance_status, service, instance, verbose):
+def marathon_instance_status(instance_status, service, instance, verbose, response=None):
+    """:param response: when given, it gets the staleness header if the cached
+    cluster state was used"""
     mstatus = {}
     job_config = marathon_tools.load_marathon_service_config(
         service, instance, settings.cluster, soa_dir=settings.soa_dir,
     )
     client = settings.marathon_clients.get_current_client_for_service(job_config)
-    apps = marathon_tools.get_matching_appids(service, instance, client)
+    marathon_state = mesos_state = None
+    if settings.cluster_state is not None:
+        marathon_state = settings.cluster_state.get_marathon_state(client)
+        mesos_state = settings.cluster_state.get_mesos_state()
+    if marathon_state is not None:
+        apps = marathon_state.apps_by_job_id.get(marathon_tools.format_job_id(service, instance), [])
+    else:
+        apps = marathon_tools.get_matching_appids(service, instance, client)
 
     # bouncing status can be inferred from app_count, ref get_bouncing_status
     mstatus['app_count'] = len(apps)
     mstatus['desired_state'] = job_config.get_desired_state()
     mstatus['bounce_method'] = job_config.get_bounce_method()
-    marathon_job_status(mstatus, client, job_config, verbose)
+    marathon_job_status(mstatus, client, job_config, verbose, marathon_state=marathon_state, mesos_state=mesos_state)
+    if response is not None and marathon_state is not None and (mesos_state is not None or verbose is not True):
+        set_staleness_header(response, settings.cluster_state)
     return mstatus
 
 
@@ -174,7 +217,9 @@ def instance_status(request):
     try:
         instance_type = validate_service_instance(service, instance, settings.cluster, settings.soa_dir)
         if instance_type == 'marathon':
-            instance_status['marathon'] = marathon_instance_status(instance_status, service, instance, verbose)
+            instance_status['marathon'] = marathon_instance_status(
+                instance_status, service, instance, verbose, response=request.response,
+            )
         elif instance_type == 'chronos':
             instance_status['chronos'] = chronos_instance_status(instance_status, service, instance, verbose)
         elif instance_type == 'adhoc':
@@ -222,6 +267,7 @@ def instance_tasks(request):
         raise ApiFailure("Only marathon tasks supported", 400)
     tasks = get_tasks_from_app_id(mstatus['app_id'], slave_hostname=slave_hostname)
     if verbose:
+        load_slave_states(tasks)
         tasks = [add_executor_info(task) for task in tasks]
         tasks = [add_slave_info(task) for task in tasks]
     return [task._Task__items for task in tasks]
@@ -247,6 +293,19 @@ def instance_delay(request):
         return response
 
 
+def load_slave_states(tasks):
+    """Fetches the state of every agent the tasks run on, once per agent and
+    concurrently. Agents cache their state, so add_executor_info then finds
+    the executor of each task without another request."""
+    slaves = {}
+    for task in tasks:
+        if task['slave_id'] not in slaves:
+            slaves[task['slave_id']] = task.slave
+    slave_pool = pool.Pool(SLAVE_STATE_POOL_SIZE)
+    jobs = [slave_pool.spawn(getattr, slave, 'state') for slave in slaves.values()]
+    gevent.joinall(jobs, raise_error=True)
+
+
 def add_executor_info(task):
     task._Task__items['executor'] = task.executor.copy()
     task._Task__items['executor'].pop('tasks', None)
@@ -15,18 +15,39 @@
 """
 Marathon Dashboard
 """
+from pyramid.response import Response
 from pyramid.view import view_config
 
 from paasta_tools.api import settings
-from paasta_tools.marathon_dashboard import create_marathon_dashboard
+from paasta_tools.marathon_dashboard import MarathonDashboardView
 
 
-@view_config(route_name='marathon_dashboard', request_method='GET', renderer='json')
+def get_marathon_dashboard_view():
+    dashboard = settings.marathon_dashboard
+    if dashboard is None or (dashboard.cluster, dashboard.soa_dir) != (settings.cluster, settings.soa_dir):
+        dashboard = MarathonDashboardView(cluster=settings.cluster, soa_dir=settings.soa_dir)
+        settings.marathon_dashboard = dashboard
+    return dashboard
+
+
+@view_config(route_name='marathon_dashboard', request_method='GET')
 def marathon_dashboard(request):
-    print("marathon_dashboard view")
-    return create_marathon_dashboard(
-        cluster=settings.cluster,
-        soa_dir=settings.soa_dir,
+    dashboard = get_marathon_dashboard_view()
+    dashboard.refresh(
         marathon_clients=settings.marathon_clients,
         system_paasta_config=settings.system_paasta_config,
     )
+
+    response = Response(content_type='application/json')
+    response.etag = dashboard.etag
+    response.vary = 'Accept-Encoding'
+    if dashboard.etag in request.if_none_match:
+        response.status_int = 304
+        return response
+    # Without an Accept-Encoding header, WebOb takes any encoding as acceptable
+    if 'Accept-Encoding' in request.headers and request.accept_encoding.best_match(['gzip']) == 'gzip':
+        response.content_encoding = 'gzip'
+        response.body = dashboard.gzipped_body
+    else:
+        response.body = dashboard.body
+    return response
@@ -18,6 +18,8 @@ PaaSTA resource utilization, etc.
 from pyramid.response import Response
 from pyramid.view import view_config
 
+from paasta_tools.api import settings
+from paasta_tools.api.cluster_state import set_staleness_header
 from paasta_tools.mesos_tools import get_mesos_master
 from paasta_tools.metrics import metastatus_lib
 
@@ -34,8 +36,14 @@ def parse_filters(filters):
 
 @view_config(route_name='resources.utilization', request_method='GET', renderer='json')
 def resources_utilization(request):
-    master = get_mesos_master()
-    mesos_state = master.state
+    cached_mesos_state = None
+    if settings.cluster_state is not None:
+        cached_mesos_state = settings.cluster_state.get_mesos_state()
+    if cached_mesos_state is not None:
+        mesos_state = cached_mesos_state.state
+    else:
+        master = get_mesos_master()
+        mesos_state = master.state
 
     groupings = request.swagger_data.get('groupings', ['superregion'])
     # swagger actually makes the key None if it's not set
@@ -71,4 +79,7 @@ def resources_utilization(request):
 
         response_body.append(group)
 
-    return Response(json_body=response_body, status_code=200)
+    response = Response(json_body=response_body, status_code=200)
+    if cached_mesos_state is not None:
+        set_staleness_header(response, settings.cluster_state)
+    return response
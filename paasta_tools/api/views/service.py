@@ -15,10 +15,26 @@
 """
 PaaSTA service list (instances) etc.
 """
+import traceback
+from collections import defaultdict
+from collections import namedtuple
+
 from pyramid.view import view_config
 
+from paasta_tools import marathon_tools
 from paasta_tools.api import settings
+from paasta_tools.api.cluster_state import job_id_for_app_id
+from paasta_tools.api.cluster_state import set_staleness_header
+from paasta_tools.api.views.exception import ApiFailure
+from paasta_tools.cli.cmds.status import get_actual_deployments
+from paasta_tools.paasta_serviceinit import get_deployment_version
+from paasta_tools.utils import get_service_instance_list
 from paasta_tools.utils import list_all_instances_for_service
+from paasta_tools.utils import NoDockerImageError
+from paasta_tools.utils import time_cache
+
+
+MarathonSnapshot = namedtuple('MarathonSnapshot', ['apps_by_id', 'apps_by_job_id', 'queue_by_app_id'])
 
 
 @view_config(route_name='service.list', request_method='GET', renderer='json')
@@ -26,3 +42,90 @@ def list_instances(request):
     service = request.swagger_data.get('service')
     instances = list_all_instances_for_service(service, clusters=[settings.cluster])
     return {'instances': list(instances)}
+
+
+@time_cache(ttl=5)
+def get_marathon_snapshot(client):
+    """Fetch the apps and launch queue of a Marathon server, indexed for deploy
+    status lookups. The snapshot is shared by every request for a few seconds,
+    so a burst of deploy_status polls costs one listing per Marathon server."""
+    apps_by_id = {}
+    apps_by_job_id = defaultdict(list)
+    for app in marathon_tools.get_all_marathon_apps(client):
+        apps_by_id[app.id] = app
+        job_id = job_id_for_app_id(app.id)
+        if job_id is not None:
+            apps_by_job_id[job_id].append(app)
+    queue_by_app_id = {item.app.id: item for item in client.list_queue()}
+    return MarathonSnapshot(apps_by_id, apps_by_job_id, queue_by_app_id)
+
+
+def marathon_instance_deploy_status(service, instance, git_sha):
+    """:returns: the deploy status of the instance, and whether it was read
+    from the cached cluster state"""
+    job_config = marathon_tools.load_marathon_service_config(
+        service, instance, settings.cluster, soa_dir=settings.soa_dir,
+    )
+    client = settings.marathon_clients.get_current_client_for_service(job_config)
+    snapshot = None
+    if settings.cluster_state is not None:
+        snapshot = settings.cluster_state.get_marathon_state(client)
+    from_cluster_state = snapshot is not None
+    if snapshot is None:
+        snapshot = get_marathon_snapshot(client)
+
+    status = {
+        'instance': instance,
+        'git_sha': git_sha,
+        'app_count': len(snapshot.apps_by_job_id.get(marathon_tools.format_job_id(service, instance), [])),
+        'desired_state': job_config.get_desired_state(),
+        'expected_instance_count': job_config.get_instances(),
+    }
+    try:
+        app_id = job_config.format_marathon_app_dict()['id']
+    except NoDockerImageError:
+        status['error_message'] = "Docker image is not in deployments.json."
+        return status, from_cluster_state
+
+    app = snapshot.apps_by_id.get('/%s' % app_id)
+    if app is None:
+        deploy_status = marathon_tools.MarathonDeployStatus.NotRunning
+        status['running_instance_count'] = 0
+    else:
+        is_overdue, backoff_seconds = marathon_tools.get_app_queue_status_from_queue(
+            snapshot.queue_by_app_id.get(app.id),
+        )
+        deploy_status = marathon_tools.get_marathon_app_deploy_status_from_queue_status(
+            app, is_overdue, backoff_seconds,
+        )
+        status['running_instance_count'] = app.tasks_running
+    status['deploy_status'] = marathon_tools.MarathonDeployStatus.tostring(deploy_status)
+    return status, from_cluster_state
+
+
+@view_config(route_name='service.deploy_status', request_method='GET', renderer='json')
+def service_deploy_status(request):
+    """Compact deploy progress of every marathon instance of a service, in one
+    request. Instances without a deployment yet are left out, like the 404 of
+    the instance status endpoint."""
+    service = request.swagger_data.get('service')
+
+    try:
+        actual_deployments = get_actual_deployments(service, settings.soa_dir)
+        instances = []
+        all_from_cluster_state = True
+        for _, instance in get_service_instance_list(
+            service, cluster=settings.cluster, instance_type='marathon', soa_dir=settings.soa_dir,
+        ):
+            git_sha = get_deployment_version(actual_deployments, settings.cluster, instance)
+            if git_sha:
+                status, from_cluster_state = marathon_instance_deploy_status(service, instance, git_sha)
+                instances.append(status)
+                all_from_cluster_state = all_from_cluster_state and from_cluster_state
+    except Exception:
+        error_message = traceback.format_exc()
+        raise ApiFailure(error_message, 500)
+
+    if instances and all_from_cluster_state:
+        set_staleness_header(request.response, settings.cluster_state)
+    return {'service': service, 'instances': instances}
@@ -13,17 +13,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import asyncio
+import functools
 import logging
 import math
 import os
 import time
 from collections import defaultdict
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from datetime import timedelta
 from math import ceil
 from math import floor
 from typing import Any
+from typing import Callable
+from typing import cast
 from typing import Dict
 from typing import Iterable
 from typing import List
@@ -39,7 +43,10 @@ from requests.exceptions import HTTPError
 
 from paasta_tools.autoscaling import cluster_boost
 from paasta_tools.autoscaling import ec2_fitness
+from paasta_tools.autoscaling.rate_limiter import TokenBucket
 from paasta_tools.mesos_maintenance import drain
+from paasta_tools.mesos_maintenance import get_maintenance_state
+from paasta_tools.mesos_maintenance import MaintenanceState
 from paasta_tools.mesos_maintenance import undrain
 from paasta_tools.mesos_tools import get_mesos_master
 from paasta_tools.mesos_tools import get_mesos_task_count_by_slave
@@ -48,10 +55,8 @@ from paasta_tools.mesos_tools import SlaveTaskCount
 from paasta_tools.metrics.metastatus_lib import get_resource_utilization_by_grouping
 from paasta_tools.metrics.metastatus_lib import ResourceInfo
 from paasta_tools.metrics.metrics_lib import get_metrics_interface
-from paasta_tools.paasta_maintenance import is_safe_to_kill
 from paasta_tools.utils import load_system_paasta_config
 from paasta_tools.utils import SystemPaastaConfig
-from paasta_tools.utils import Timeout
 from paasta_tools.utils import TimeoutError
 
 
@@ -94,14 +99,37 @@ MesosState = NewType('MesosState', Dict)
 CLUSTER_METRICS_PROVIDER_KEY = 'cluster_metrics_provider'
 DEFAULT_TARGET_UTILIZATION = 0.8  # decimal fraction
 DEFAULT_DRAIN_TIMEOUT = 600  # seconds
+MAINTENANCE_POLL_INTERVAL = 5  # seconds
 
 AWS_SPOT_MODIFY_TIMEOUT = 30
+# The EC2 API lets an account make 20 non mutating calls per second on
+# average, in bursts of up to 100 calls
+AWS_API_CALLS_PER_SECOND = 20
+AWS_API_BURST = 100
+# How many chunks of instances to describe at once
+AWS_DESCRIBE_CONCURRENCY = 4
 MISSING_SLAVE_PANIC_THRESHOLD = .3
 MAX_CLUSTER_DELTA = .2
 
 log = logging.getLogger(__name__)
 log.addHandler(logging.NullHandler())
 
+# Every AWS API call of the autoscaler takes a token from this bucket,
+# whichever scaler or thread it is made from
+AWS_API_RATE_LIMITER = TokenBucket(rate=AWS_API_CALLS_PER_SECOND, capacity=AWS_API_BURST)
+
+
+def aws_api_call(method: Callable, **kwargs: Any) -> Any:
+    """Calls a boto3 client method once the AWS API rate limit allows it"""
+    AWS_API_RATE_LIMITER.acquire()
+    return method(**kwargs)
+
+
+async def run_in_executor(fn: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Runs a blocking call, like an AWS or Mesos API call, in the default
+    executor so that the other scalers keep running meanwhile"""
+    return await asyncio.get_event_loop().run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
 
 class Timer(object):
     def __init__(self, timeout: int) -> None:
@@ -118,6 +146,89 @@ class Timer(object):
         return self.last_start + self.timeout - datetime.now()
 
 
+class MaintenancePoller(object):
+    """Polls the maintenance state of the cluster once every interval on behalf
+    of all the wait_and_terminate coroutines, which then check whether their
+    host is safe to kill from memory. A coroutine waiting on a host is woken
+    up as soon as a refresh finds that the host changed state.
+
+    The poller only polls while some hosts are watched. A refresh that fails
+    leaves the previous state in place.
+    """
+
+    def __init__(self, interval: float=MAINTENANCE_POLL_INTERVAL) -> None:
+        self.interval = interval
+        self.state: Optional[MaintenanceState] = None
+        self.watchers: Dict[str, int] = defaultdict(int)
+        self.safe_to_kill: Dict[str, bool] = {}
+        self.changed: Dict[str, asyncio.Event] = {}
+        self.refreshed: Optional[asyncio.Event] = None
+        self.polling: Optional[asyncio.Future] = None
+
+    def watch(self, hostname: str) -> None:
+        self.watchers[hostname] += 1
+        if hostname not in self.changed:
+            self.changed[hostname] = asyncio.Event()
+        if self.polling is None:
+            self.refreshed = asyncio.Event()
+            self.polling = asyncio.ensure_future(self.poll())
+
+    def unwatch(self, hostname: str) -> None:
+        self.watchers[hostname] -= 1
+        if self.watchers[hostname] <= 0:
+            del self.watchers[hostname]
+            self.changed.pop(hostname, None)
+            self.safe_to_kill.pop(hostname, None)
+        if not self.watchers and self.polling is not None:
+            self.polling.cancel()
+            self.polling = None
+            self.state = None
+
+    async def poll(self) -> None:
+        while self.watchers:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self) -> None:
+        hostnames = set(self.watchers)
+        try:
+            self.state = await run_in_executor(get_maintenance_state, hostnames)
+        except Exception:
+            log.exception("Failed to refresh the maintenance state of %d hosts" % len(hostnames))
+        else:
+            for hostname in hostnames & set(self.watchers):
+                safe_to_kill = self.is_safe_to_kill(hostname)
+                if safe_to_kill != self.safe_to_kill.get(hostname):
+                    self.safe_to_kill[hostname] = safe_to_kill
+                    self.changed[hostname].set()
+        if self.refreshed is not None:
+            self.refreshed.set()
+
+    async def wait_for_state(self) -> None:
+        """Waits for the first refresh since hosts started being watched"""
+        if self.refreshed is not None:
+            await self.refreshed.wait()
+
+    async def wait_for_change(self, hostname: str, timeout: float) -> None:
+        """Waits until a refresh finds that hostname changed state, or for
+        timeout seconds"""
+        changed = self.changed.get(hostname)
+        if changed is None:
+            await asyncio.sleep(timeout)
+            return
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        changed.clear()
+
+    def is_safe_to_kill(self, hostname: str) -> bool:
+        """Like paasta_maintenance.is_safe_to_kill, from the last state polled"""
+        if self.state is None:
+            return False
+        return self.state.is_host_drained(hostname) or self.state.is_host_past_maintenance_start(hostname)
+
+
 class ClusterAutoscaler(object):
 
     def __init__(
@@ -142,6 +253,12 @@ class ClusterAutoscaler(object):
         self.instances: List[Dict] = []
         self.sfr: Optional[Dict[str, Any]] = None
         self.enable_metrics = enable_metrics
+        self.maintenance_poller = MaintenancePoller()
+        self._capacity_lock: Optional[asyncio.Lock] = None
+        # Filled by filter_aws_slaves, and kept for the life of the scaler,
+        # which is a single autoscaler run
+        self.instance_descriptions_by_ip: Dict[str, List[Dict[str, Any]]] = {}
+        self.instance_statuses_by_id: Dict[str, List[Dict[str, Any]]] = {}
 
         self.setup_metrics()
 
@@ -216,7 +333,11 @@ class ClusterAutoscaler(object):
             instance_filters = []
         ec2_client = boto3.client('ec2', region_name=region)
         try:
-            instance_descriptions = ec2_client.describe_instances(InstanceIds=instance_ids, Filters=instance_filters)
+            instance_descriptions = aws_api_call(
+                ec2_client.describe_instances,
+                InstanceIds=instance_ids,
+                Filters=instance_filters,
+            )
         except ClientError as e:
             if e.response['Error']['Code'] == 'InvalidInstanceID.NotFound':
                 self.log.warn('Cannot find one or more instance from IDs {}'.format(instance_ids))
@@ -246,7 +367,8 @@ class ClusterAutoscaler(object):
             instance_filters = []
         ec2_client = boto3.client('ec2', region_name=region)
         try:
-            instance_descriptions = ec2_client.describe_instance_status(
+            instance_descriptions = aws_api_call(
+                ec2_client.describe_instance_status,
                 InstanceIds=instance_ids,
                 Filters=instance_filters,
             )
@@ -355,7 +477,7 @@ class ClusterAutoscaler(object):
         if not should_drain:
             self.log.info("Not draining, waiting %s longer before killing" % timer.left())
             return False
-        if is_safe_to_kill(hostname):
+        if self.maintenance_poller.is_safe_to_kill(hostname):
             self.log.info("Slave %s is ready to kill, with %s left on timer" % (hostname, timer.left()))
             timer.start()
             return True
@@ -386,7 +508,12 @@ class ClusterAutoscaler(object):
             slave.hostname,
             slave.ip,
         ))
+        maintenance_poller = self.maintenance_poller
+        watch = should_drain and not dry_run
+        if watch:
+            maintenance_poller.watch(slave.hostname)
         try:
+            await maintenance_poller.wait_for_state()
             # This loop should always finish because the maintenance window should trigger is_ready_to_kill
             # being true. Just in case though we set a timeout (from timer) and terminate anyway
             while True:
@@ -404,7 +531,9 @@ class ClusterAutoscaler(object):
                         slave.ip,
                     ))
                     try:
-                        ec2_client.terminate_instances(InstanceIds=[instance_id], DryRun=dry_run)
+                        await run_in_executor(
+                            aws_api_call, ec2_client.terminate_instances, InstanceIds=[instance_id], DryRun=dry_run,
+                        )
                     except ClientError as e:
                         if e.response['Error'].get('Code') == 'DryRunOperation':
                             pass
@@ -413,20 +542,25 @@ class ClusterAutoscaler(object):
                     break
                 else:
                     self.log.info("Instance {}: NOT ready to kill".format(instance_id))
-                self.log.debug("Waiting 5 seconds and then checking again")
-                await asyncio.sleep(5)
+                self.log.debug("Waiting for the maintenance state of {} to change".format(slave.hostname))
+                await maintenance_poller.wait_for_change(slave.hostname, timeout=maintenance_poller.interval)
         except TimeoutError:
             self.log.error("Timed out after {} waiting to drain {}, now terminating anyway".format(
                 timer.timeout,
                 slave.pid,
             ))
             try:
-                ec2_client.terminate_instances(InstanceIds=[instance_id], DryRun=dry_run)
+                await run_in_executor(
+                    aws_api_call, ec2_client.terminate_instances, InstanceIds=[instance_id], DryRun=dry_run,
+                )
             except ClientError as e:
                 if e.response['Error'].get('Code') == 'DryRunOperation':
                     pass
                 else:
                     raise
+        finally:
+            if watch:
+                maintenance_poller.unwatch(slave.hostname)
 
     async def scale_resource(
         self,
@@ -449,12 +583,12 @@ class ClusterAutoscaler(object):
             return
         elif delta > 0:
             self.log.info("Increasing resource capacity to: {}".format(target_capacity))
-            self.set_capacity(target_capacity)
+            await run_in_executor(self.set_capacity, target_capacity)
             return
         elif delta < 0:
-            mesos_state = get_mesos_master().state_summary()
-            slaves_list = get_mesos_task_count_by_slave(mesos_state, pool=self.resource['pool'])
-            filtered_slaves = self.filter_aws_slaves(slaves_list)
+            mesos_state = await run_in_executor(get_mesos_master().state_summary)
+            slaves_list = await run_in_executor(get_mesos_task_count_by_slave, mesos_state, pool=self.resource['pool'])
+            filtered_slaves = await run_in_executor(self.filter_aws_slaves, slaves_list)
             killable_capacity = round(sum([slave.instance_weight for slave in filtered_slaves]), 2)
             amount_to_decrease = round(delta * -1, 2)
             if amount_to_decrease > killable_capacity:
@@ -504,21 +638,20 @@ class ClusterAutoscaler(object):
         if should_drain:
             try:
                 drain_host_string = "{}|{}".format(slave_to_kill.hostname, slave_to_kill.ip)
-                drain([drain_host_string], start, duration)
+                await run_in_executor(drain, [drain_host_string], start, duration)
             except HTTPError as e:
                 self.log.error("Failed to start drain "
                                "on {}: {}\n Trying next host".format(slave_to_kill.hostname, e))
                 raise
-        self.log.info("Decreasing resource from {} to: {}".format(self.capacity, self.capacity + capacity_diff))
         # Instance weights can be floats but the target has to be an integer
         # because this is all AWS allows on the API call to set target capacity
         try:
-            self.set_capacity(self.capacity + capacity_diff)
+            await self.change_capacity(capacity_diff)
         except FailSetResourceCapacity:
             self.log.error("Couldn't update resource capacity, stopping autoscaler")
             self.log.info("Undraining {}".format(slave_to_kill.pid))
             if should_drain:
-                undrain([drain_host_string])
+                await run_in_executor(undrain, [drain_host_string])
             raise
         self.log.info("Waiting for instance to drain before we terminate")
         try:
@@ -532,14 +665,30 @@ class ClusterAutoscaler(object):
             )
         except ClientError as e:
             self.log.error("Failure when terminating: {}: {}".format(slave_to_kill.pid, e))
-            self.log.error("Setting resource capacity back to {}".format(self.capacity - capacity_diff))
-            self.set_capacity(self.capacity - capacity_diff)
+            await self.change_capacity(-capacity_diff)
             self.log.info("Undraining {}".format(slave_to_kill.pid))
             if should_drain:
-                undrain([drain_host_string])
+                await run_in_executor(undrain, [drain_host_string])
+
+    async def change_capacity(self, capacity_diff: float) -> None:
+        """Changes the capacity by capacity_diff. Changes are made one at a time
+        so that each is applied to the capacity the previous one set."""
+        async with self.capacity_lock:
+            self.log.info("Changing resource capacity from {} to: {}".format(
+                self.capacity,
+                self.capacity + capacity_diff,
+            ))
+            await run_in_executor(self.set_capacity, self.capacity + capacity_diff)
+
+    @property
+    def capacity_lock(self) -> asyncio.Lock:
+        # Created on first use, in the event loop the scaler runs in
+        if self._capacity_lock is None:
+            self._capacity_lock = asyncio.Lock()
+        return self._capacity_lock
 
     def filter_aws_slaves(self, slaves_list: Iterable[Dict[str, SlaveTaskCount]]) -> List['PaastaAwsSlave']:
-        ips = self.get_instance_ips(self.instances, region=self.resource['region'])
+        ips = set(self.get_instance_ips(self.instances, region=self.resource['region']))
         self.log.debug("IPs in AWS resources: {}".format(ips))
         slaves = [
             slave for slave in slaves_list
@@ -547,44 +696,55 @@ class ClusterAutoscaler(object):
         ]
         slave_ips = [slave_pid_to_ip(slave['task_counts'].slave['pid']) for slave in slaves]
         instance_type_weights = self.get_instance_type_weights()
-        instance_statuses = self.instance_status_for_instance_ids(
+        instance_statuses_by_id = self.index_instance_statuses(
             instance_ids=[instance['InstanceId'] for instance in self.instances],
         )
-        instance_descriptions = self.instance_descriptions_for_ips(slave_ips)
+        instance_descriptions_by_ip = self.index_instance_descriptions(slave_ips)
 
         paasta_aws_slaves = []
-        for slave in slaves:
-            slave_ip = slave_pid_to_ip(slave['task_counts'].slave['pid'])
-            matching_descriptions = self.filter_instance_description_for_ip(slave_ip, instance_descriptions)
-            if matching_descriptions:
-                assert len(matching_descriptions) == 1, (
-                    "There should be only one instance with the same IP."
-                    "Found instances %s with the same ip %d"
-                    % (
-                        ",".join(
-                            [x['InstanceId'] for x in matching_descriptions],
-                        ),
-                        slave_ip,
-                    )
+        for slave, slave_ip in zip(slaves, slave_ips):
+            matching_descriptions = instance_descriptions_by_ip.get(slave_ip, [])
+            if not matching_descriptions:
+                self.log.warning(
+                    "No instance found with the ip {} of slave {}, skipping it".format(
+                        slave_ip, slave['task_counts'].slave['hostname'],
+                    ),
                 )
-                description = matching_descriptions[0]
-                matching_status = self.filter_instance_status_for_instance_id(
-                    instance_id=description['InstanceId'],
-                    instance_statuses=instance_statuses,
+                continue
+            assert len(matching_descriptions) == 1, (
+                "There should be only one instance with the same IP."
+                "Found instances %s with the same ip %s"
+                % (
+                    ",".join(
+                        [x['InstanceId'] for x in matching_descriptions],
+                    ),
+                    slave_ip,
                 )
-                assert len(matching_status) == 1, "There should be only one InstanceStatus per instance"
-            else:
-                description = None
+            )
+            description = matching_descriptions[0]
+            matching_status = instance_statuses_by_id.get(description['InstanceId'], [])
+            assert len(matching_status) == 1, "There should be only one InstanceStatus per instance"
+            status = matching_status[0]
 
             paasta_aws_slaves.append(PaastaAwsSlave(
                 slave=slave,
-                instance_status=matching_status[0],
+                instance_status=status,
                 instance_description=description,
                 instance_type_weights=instance_type_weights,
             ))
 
         return paasta_aws_slaves
 
+    def describe_in_chunks(self, describe: Callable[[List], Any], items: List, chunk_size: int) -> List[Any]:
+        """Calls describe on each chunk of chunk_size items, with up to
+        AWS_DESCRIBE_CONCURRENCY calls in flight at once. Returns the results
+        in the order of the chunks."""
+        chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+        if len(chunks) <= 1:
+            return [describe(chunk) for chunk in chunks]
+        with ThreadPoolExecutor(max_workers=min(len(chunks), AWS_DESCRIBE_CONCURRENCY)) as executor:
+            return list(executor.map(describe, chunks))
+
     def instance_status_for_instance_ids(
         self,
         instance_ids: List[str],
@@ -593,57 +753,69 @@ class ClusterAutoscaler(object):
         Return a list of instance statuses. Batch the API calls into
         groups of 99, since AWS limit it.
         """
-        partitions = [
-            instance_ids[partition: partition + 99]
-            for partition in
-            range(0, len(instance_ids), 99)
-        ]
         accumulated: Dict[str, List[Dict[str, Union[str, Dict, List]]]] = {
             'InstanceStatuses': [],
         }
-        for subgroup in partitions:
-            res = self.describe_instance_status(
+        results = self.describe_in_chunks(
+            lambda subgroup: self.describe_instance_status(
                 instance_ids=subgroup,
                 region=self.resource['region'],
-            )
+            ),
+            instance_ids,
+            99,
+        )
+        for res in results:
             accumulated['InstanceStatuses'] += res['InstanceStatuses']
 
         return accumulated
 
     def instance_descriptions_for_ips(self, ips: List[str]) -> List[Dict[str, Any]]:
         all_instances: List[Dict] = []
-        for start, stop in zip(range(0, len(ips), 199), range(199, len(ips) + 199, 199)):
-            all_instances += self.describe_instances(
+        results = self.describe_in_chunks(
+            lambda chunk: self.describe_instances(
                 instance_ids=[],
                 region=self.resource['region'],
                 instance_filters=[
                     {
                         'Name': 'private-ip-address',
-                        'Values': ips[start:stop],
+                        'Values': chunk,
                     },
                 ],
-            )
+            ),
+            ips,
+            199,
+        )
+        for instances in results:
+            all_instances += instances
         return all_instances
 
-    def filter_instance_description_for_ip(
-        self,
-        ip: str,
-        instance_descriptions: List[Dict[str, Any]],
-    ) -> List[Dict[str, Any]]:
-        return [
-            i for i in instance_descriptions
-            if ip == i['PrivateIpAddress']
-        ]
-
-    def filter_instance_status_for_instance_id(
-        self,
-        instance_id: str,
-        instance_statuses: Dict[str, List[Dict[str, Union[str, Dict, List]]]],
-    ) -> List[Dict[str, Union[str, Dict, List]]]:
-        return [
-            status for status in instance_statuses['InstanceStatuses']
-            if status['InstanceId'] == instance_id
+    def index_instance_statuses(self, instance_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Returns the statuses of instance_ids by instance id. Statuses are
+        only fetched for the instances the scaler hasn't fetched them for yet."""
+        missing = [
+            instance_id for instance_id in instance_ids
+            if instance_id not in self.instance_statuses_by_id
         ]
+        if missing:
+            for instance_id in missing:
+                self.instance_statuses_by_id[instance_id] = []
+            for status in self.instance_status_for_instance_ids(instance_ids=missing)['InstanceStatuses']:
+                self.instance_statuses_by_id.setdefault(cast(str, status['InstanceId']), []).append(status)
+        return self.instance_statuses_by_id
+
+    def index_instance_descriptions(self, ips: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Returns the descriptions of the instances with the given private
+        IPs by IP. Descriptions are only fetched for the IPs the scaler hasn't
+        fetched them for yet."""
+        missing = [ip for ip in ips if ip not in self.instance_descriptions_by_ip]
+        if missing:
+            for ip in missing:
+                self.instance_descriptions_by_ip[ip] = []
+            for description in self.instance_descriptions_for_ips(missing):
+                self.instance_descriptions_by_ip.setdefault(
+                    description['PrivateIpAddress'], [],
+                ).append(description)
+        return self.instance_descriptions_by_ip
 
     async def downscale_aws_resource(
         self,
@@ -734,7 +906,7 @@ class SpotAutoscaler(ClusterAutoscaler):
     ) -> Dict[str, Any]:
         ec2_client = boto3.client('ec2', region_name=region)
         try:
-            sfrs = ec2_client.describe_spot_fleet_requests(SpotFleetRequestIds=[spotfleet_request_id])
+            sfrs = aws_api_call(ec2_client.describe_spot_fleet_requests, SpotFleetRequestIds=[spotfleet_request_id])
         except ClientError as e:
             if e.response['Error']['Code'] == 'InvalidSpotFleetRequestId.NotFound':
                 self.log.warn('Cannot find SFR {}'.format(spotfleet_request_id))
@@ -750,7 +922,8 @@ class SpotAutoscaler(ClusterAutoscaler):
         region: Optional[str]=None,
     ) -> List[Dict[str, str]]:
         ec2_client = boto3.client('ec2', region_name=region)
-        spot_fleet_instances = ec2_client.describe_spot_fleet_instances(
+        spot_fleet_instances = aws_api_call(
+            ec2_client.describe_spot_fleet_instances,
             SpotFleetRequestId=spotfleet_request_id,
         )['ActiveInstances']
         return spot_fleet_instances
@@ -846,29 +1019,34 @@ class SpotAutoscaler(ClusterAutoscaler):
         a SFR"""
         rounded_capacity = int(floor(capacity))
         ec2_client = boto3.client('ec2', region_name=self.resource['region'])
-        with Timeout(seconds=AWS_SPOT_MODIFY_TIMEOUT):
-            try:
-                state = None
-                while True:
-                    state = self.get_sfr(self.resource['id'], region=self.resource['region'])['SpotFleetRequestState']
-                    if state == 'active':
-                        break
-                    if state == 'cancelled_running':
-                        self.log.info(
-                            "Not updating target capacity because this is a cancelled SFR, "
-                            "we are just draining and killing the instances",
-                        )
-                        return None
-                    self.log.debug("SFR {} in state {}, waiting for state: active".format(self.resource['id'], state))
-                    self.log.debug("Sleep 5 seconds")
-                    time.sleep(5)
-            except TimeoutError:
-                self.log.error("Spot fleet {} not in active state so we can't modify it.".format(self.resource['id']))
-                raise FailSetResourceCapacity
+        # This runs in an executor thread, where the alarm signal of
+        # utils.Timeout can't be used
+        deadline = time.time() + AWS_SPOT_MODIFY_TIMEOUT
+        try:
+            state = None
+            while True:
+                state = self.get_sfr(self.resource['id'], region=self.resource['region'])['SpotFleetRequestState']
+                if state == 'active':
+                    break
+                if state == 'cancelled_running':
+                    self.log.info(
+                        "Not updating target capacity because this is a cancelled SFR, "
+                        "we are just draining and killing the instances",
+                    )
+                    return None
+                if time.time() > deadline:
+                    raise TimeoutError
+                self.log.debug("SFR {} in state {}, waiting for state: active".format(self.resource['id'], state))
+                self.log.debug("Sleep 5 seconds")
+                time.sleep(5)
+        except TimeoutError:
+            self.log.error("Spot fleet {} not in active state so we can't modify it.".format(self.resource['id']))
+            raise FailSetResourceCapacity
         if self.dry_run:
             return True
         try:
-            ret = ec2_client.modify_spot_fleet_request(
+            ret = aws_api_call(
+                ec2_client.modify_spot_fleet_request,
                 SpotFleetRequestId=self.resource['id'], TargetCapacity=rounded_capacity,
                 ExcessCapacityTerminationPolicy='noTermination',
             )
@@ -905,7 +1083,7 @@ class AsgAutoscaler(ClusterAutoscaler):
 
     def get_asg(self, asg_name: str, region: Optional[str]=None) -> Optional[Dict[str, Any]]:
         asg_client = boto3.client('autoscaling', region_name=region)
-        asgs = asg_client.describe_auto_scaling_groups(AutoScalingGroupNames=[asg_name])
+        asgs = aws_api_call(asg_client.describe_auto_scaling_groups, AutoScalingGroupNames=[asg_name])
         try:
             return asgs['AutoScalingGroups'][0]
         except IndexError:
@@ -987,7 +1165,8 @@ class AsgAutoscaler(ClusterAutoscaler):
             return True
         asg_client = boto3.client('autoscaling', region_name=self.resource['region'])
         try:
-            ret = asg_client.update_auto_scaling_group(
+            ret = aws_api_call(
+                asg_client.update_auto_scaling_group,
                 AutoScalingGroupName=self.resource['id'],
                 DesiredCapacity=capacity,
             )
@@ -1100,8 +1279,6 @@ def autoscale_local_cluster(
     dry_run: bool=False,
     log_level: str=None,
 ) -> None:
-    log.debug("Sleep 20s to throttle AWS API calls")
-    time.sleep(20)
     if dry_run:
         log.info("Running in dry_run mode, no changes should be made")
     system_config = load_system_paasta_config()
@@ -1133,8 +1310,6 @@ def autoscale_local_cluster(
         except KeyError:
             log.warning("Couldn't find a metric provider for resource of type: {}".format(resource['type']))
             continue
-        log.debug("Sleep 3s to throttle AWS API calls")
-        time.sleep(3)
     filtered_autoscaling_scalers = filter_scalers(autoscaling_scalers, utilization_errors)
     sorted_autoscaling_scalers = sort_scalers(filtered_autoscaling_scalers)
     event_loop = asyncio.get_event_loop()
@@ -1177,10 +1352,11 @@ async def run_parallel_scalers(
     mesos_state: MesosState,
 ):
     scaling_tasks = []
+    # A single poller checks on the hosts being drained by every scaler
+    maintenance_poller = MaintenancePoller()
     for scaler in sorted_autoscaling_scalers:
+        scaler.maintenance_poller = maintenance_poller
         scaling_tasks.append(asyncio.ensure_future(autoscale_cluster_resource(scaler, mesos_state)))
-        log.debug("Sleep 3s to throttle AWS API calls")
-        await asyncio.sleep(3)
     for task in scaling_tasks:
         if task.cancelled() or task.done():
             continue
@@ -1198,7 +1374,7 @@ def get_scaler(scaler_type: str) -> type:
 async def autoscale_cluster_resource(scaler: ClusterAutoscaler, mesos_state: MesosState) -> None:
     log.info("Autoscaling {} in pool, {}".format(scaler.resource['id'], scaler.resource['pool']))
     try:
-        current, target = scaler.metrics_provider(mesos_state)
+        current, target = await run_in_executor(scaler.metrics_provider, mesos_state)
         log.info("Target capacity: {}, Capacity current: {}".format(target, current))
         await scaler.scale_resource(current, target)
     except ClusterAutoscalingError as e:
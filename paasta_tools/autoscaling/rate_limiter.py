@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# Copyright 2015-2018 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import time
+from typing import Callable
+
+
+class TokenBucket(object):
+    """Rate limits calls made from any number of threads to rate per second on
+    average, letting bursts of up to capacity calls through at once.
+
+    A call that finds the bucket empty reserves the next token anyway and
+    sleeps until it is due, so callers are served in the order they came.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float]=time.monotonic,
+        sleep: Callable[[float], None]=time.sleep,
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = capacity
+        self.updated_at = clock()
+        self.lock = threading.Lock()
+
+    def reserve(self, tokens: float=1) -> float:
+        """Takes tokens from the bucket, and returns how many seconds the
+        caller has to wait before using them"""
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= tokens
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+    def acquire(self, tokens: float=1) -> None:
+        """Blocks the calling thread until tokens are available"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            self.sleep(wait)
@@ -9,6 +9,7 @@ a CRITICAL event to sensu.
 import argparse
 import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from datetime import timedelta
 
@@ -27,6 +28,9 @@ from paasta_tools.chronos_tools import load_chronos_job_config
 
 log = logging.getLogger(__name__)
 
+# Maximum number of concurrent job_stat requests made to Chronos
+JOB_STAT_MAX_WORKERS = 10
+
 
 def parse_args():
     parser = argparse.ArgumentParser(description=(
@@ -137,27 +141,27 @@ def sensu_event_for_last_run_state(state):
         raise ValueError('Expected valid LastRunState. Found %s' % state)
 
 
-def build_service_job_mapping(client, configured_jobs):
+def build_service_job_mapping(client, configured_jobs, job_index=None):
     """
     :param client: A Chronos client used for getting the list of running jobs
     :param configured_jobs: A list of jobs configured in Paasta, i.e. jobs we
         expect to be able to find
+    :param job_index: an optional ChronosJobIndex to use instead of listing
+        the jobs in Chronos again
     :returns: A dict of {(service, instance): last_chronos_job}
         where last_chronos_job is the latest job matching (service, instance)
         or None if there is no such job
     """
+    if job_index is None:
+        job_index = chronos_tools.ChronosJobIndex.from_client(client)
     service_job_mapping = {}
-    all_chronos_jobs = client.list()
     for job in configured_jobs:
-        # find all the jobs belonging to each service
-        matching_jobs = chronos_tools.filter_chronos_jobs(
-            jobs=all_chronos_jobs,
+        matching_jobs = job_index.lookup(
             service=job[0],
             instance=job[1],
             include_disabled=True,
             include_temporary=True,
         )
-        matching_jobs = chronos_tools.sort_jobs(matching_jobs)
         # Only consider the most recent one
         service_job_mapping[job] = matching_jobs[0] if len(matching_jobs) > 0 else None
     return service_job_mapping
@@ -202,28 +206,67 @@ def message_for_status(status, chronos_job_config):
         raise ValueError('unknown sensu status: %s' % status)
 
 
-def job_is_stuck(last_run_iso_time, interval_in_seconds, client, job_name):
+def job_might_be_stuck(last_run_iso_time, interval_in_seconds):
+    """Whether the job has missed its next run, in which case its runtime
+    stats are needed to tell whether it is stuck
+
+    :param last_run_iso_time: ISO date and time of the last job run as a string
+    :param interval_in_seconds: the job interval in seconds
+    :returns: True or False
+    """
+    if last_run_iso_time is None or interval_in_seconds is None:
+        return False
+    dt_next_run = isodate.parse_datetime(last_run_iso_time) + timedelta(seconds=interval_in_seconds)
+    return dt_next_run < datetime.now(pytz.utc)
+
+
+def job_is_stuck(last_run_iso_time, interval_in_seconds, client, job_name, job_stat=None):
     """Considers that the job is stuck when it hasn't run on time
 
     :param last_run_iso_time: ISO date and time of the last job run as a string
     :param interval_in_seconds: the job interval in seconds
     :param client: configured Chronos client
     :param job_name: Chronos job name
+    :param job_stat: the result of client.job_stat(job_name), if already fetched
     :returns: True or False
     """
-    if last_run_iso_time is None or interval_in_seconds is None:
+    if not job_might_be_stuck(last_run_iso_time, interval_in_seconds):
         return False
     dt_next_run = isodate.parse_datetime(last_run_iso_time) + timedelta(seconds=interval_in_seconds)
-    dt_now_utc = datetime.now(pytz.utc)
-    if dt_next_run >= dt_now_utc:
-        return False
+    if job_stat is None:
+        job_stat = client.job_stat(job_name)
     try:
-        expected_runtime = min(int(client.job_stat(job_name)['histogram']['99thPercentile']), interval_in_seconds)
+        expected_runtime = min(int(job_stat['histogram']['99thPercentile']), interval_in_seconds)
     except KeyError:
         log.debug("Can't get 99thPercentile for %s. "
                   "Assuming a runtime of %d seconds." % (job_name, interval_in_seconds))
         expected_runtime = interval_in_seconds
-    return (dt_next_run + timedelta(seconds=expected_runtime) < dt_now_utc)
+    return (dt_next_run + timedelta(seconds=expected_runtime) < datetime.now(pytz.utc))
+
+
+def get_job_stats_for_late_jobs(client, jobs_and_configs, max_workers=JOB_STAT_MAX_WORKERS):
+    """Fetches the runtime stats of the jobs that might be stuck, concurrently.
+
+    Jobs that ran on time, or that are disabled, never need their stats, so
+    they are skipped.
+
+    :param client: configured Chronos client
+    :param jobs_and_configs: a list of (chronos_job, chronos_job_config) tuples
+    :returns: A dict of {job_name: job_stat}
+    """
+    job_names = []
+    for chronos_job, chronos_job_config in jobs_and_configs:
+        if not chronos_job:
+            continue
+        if chronos_job.get('disabled') and not chronos_tools.is_temporary_job(chronos_job):
+            continue
+        last_run_time, _ = chronos_tools.get_status_last_run(chronos_job)
+        if job_might_be_stuck(last_run_time, chronos_job_config.get_schedule_interval_in_seconds()):
+            job_names.append(chronos_job['name'])
+    if not job_names:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(job_names))) as executor:
+        return dict(zip(job_names, executor.map(client.job_stat, job_names)))
 
 
 def message_for_stuck_job(
@@ -257,10 +300,12 @@ def message_for_stuck_job(
     }
 
 
-def sensu_message_status_for_jobs(chronos_job_config, chronos_job, client):
+def sensu_message_status_for_jobs(chronos_job_config, chronos_job, client, job_stats=None):
     """
     :param chronos_job_config: an instance of ChronosJobConfig
     :param client: configured Chronos client
+    :param job_stats: an optional dict of {job_name: job_stat}, as returned by
+        get_job_stats_for_late_jobs()
     """
     if not chronos_job:
         if chronos_job_config.get_disabled():
@@ -280,7 +325,8 @@ def sensu_message_status_for_jobs(chronos_job_config, chronos_job, client):
         else:
             last_run_time, state = chronos_tools.get_status_last_run(chronos_job)
             interval_in_seconds = chronos_job_config.get_schedule_interval_in_seconds()
-            if job_is_stuck(last_run_time, interval_in_seconds, client, chronos_job['name']):
+            job_stat = job_stats.get(chronos_job['name']) if job_stats else None
+            if job_is_stuck(last_run_time, interval_in_seconds, client, chronos_job['name'], job_stat=job_stat):
                 sensu_status = pysensu_yelp.Status.CRITICAL
                 output = message_for_stuck_job(
                     service=chronos_job_config.service,
@@ -308,8 +354,10 @@ def main():
     configured_jobs = chronos_tools.get_chronos_jobs_for_cluster(cluster, soa_dir=soa_dir)
 
     try:
-        service_job_mapping = build_service_job_mapping(client, configured_jobs)
+        job_index = chronos_tools.ChronosJobIndex.from_client(client)
+        service_job_mapping = build_service_job_mapping(client, configured_jobs, job_index=job_index)
 
+        jobs_and_configs = []
         for service_instance, chronos_job in service_job_mapping.items():
             service, instance = service_instance[0], service_instance[1]
             try:
@@ -322,10 +370,16 @@ def main():
             except utils.NoDeploymentsAvailable:
                 log.info("Skipping %s because no deployments are available" % service)
                 continue
+            jobs_and_configs.append((chronos_job, chronos_job_config))
+
+        job_stats = get_job_stats_for_late_jobs(client, jobs_and_configs)
+
+        for chronos_job, chronos_job_config in jobs_and_configs:
             sensu_output, sensu_status = sensu_message_status_for_jobs(
                 chronos_job_config=chronos_job_config,
                 chronos_job=chronos_job,
                 client=client,
+                job_stats=job_stats,
             )
             if sensu_status is not None:
                 send_event(chronos_job_config, sensu_status, sensu_output)
@@ -328,7 +328,21 @@ def status_chronos_jobs(client, jobs, job_config, verbose):
         return "\n".join(output)
 
 
-def perform_command(command, service, instance, cluster, verbose, soa_dir, client=None):
+def lookup_jobs_for_command(client, service, instance, job_index=None, **kwargs):
+    """Looks up the jobs of a service instance in job_index, a ChronosJobIndex
+    shared by the commands of a run, or in Chronos if there isn't one.
+    """
+    if job_index is not None:
+        return job_index.lookup(service, instance, **kwargs)
+    return chronos_tools.lookup_chronos_jobs(
+        service=service,
+        instance=instance,
+        client=client,
+        **kwargs
+    )
+
+
+def perform_command(command, service, instance, cluster, verbose, soa_dir, client=None, job_index=None):
     """Performs a start/stop/restart/status on an instance
     :param command: String of start, stop, restart, status or scale
     :param service: service name
@@ -336,6 +350,7 @@ def perform_command(command, service, instance, cluster, verbose, soa_dir, clien
     :param cluster: cluster name
     :param verbose: int verbosity level
     :param client: ChronosClient or CachingChronosClient
+    :param job_index: an optional ChronosJobIndex to look the jobs up in
     :returns: A unix-style return code
     """
     if client is None:
@@ -363,19 +378,21 @@ def perform_command(command, service, instance, cluster, verbose, soa_dir, clien
             emergency=True,
         )
     elif command == "stop":
-        matching_jobs = chronos_tools.lookup_chronos_jobs(
+        matching_jobs = lookup_jobs_for_command(
+            client=client,
             service=service,
             instance=instance,
-            client=client,
+            job_index=job_index,
             include_disabled=True,
             include_temporary=True,
         )
         stop_chronos_job(service, instance, client, cluster, matching_jobs, emergency=True)
     elif command == "restart":
-        matching_jobs = chronos_tools.lookup_chronos_jobs(
+        matching_jobs = lookup_jobs_for_command(
+            client=client,
             service=service,
             instance=instance,
-            client=client,
+            job_index=job_index,
             include_disabled=True,
         )
         restart_chronos_job(
@@ -391,10 +408,11 @@ def perform_command(command, service, instance, cluster, verbose, soa_dir, clien
         )
     elif command == "status":
         # Verbose mode shows previous versions.
-        matching_jobs = chronos_tools.lookup_chronos_jobs(
+        matching_jobs = lookup_jobs_for_command(
+            client=client,
             service=service,
             instance=instance,
-            client=client,
+            job_index=job_index,
             include_disabled=True,
         )
         sorted_matching_jobs = chronos_tools.sort_jobs(matching_jobs)
@@ -839,6 +839,52 @@ def lookup_chronos_jobs(client, service=None, instance=None, include_disabled=Fa
     )
 
 
+class ChronosJobIndex(object):
+    """A snapshot of the jobs in Chronos, indexed by (service, instance).
+
+    ``lookup_chronos_jobs()`` lists and scans every job in Chronos on each
+    call. Tools that look at many instances in one run should build an index
+    once and share it instead.
+
+    :param jobs: a list of jobs, as returned by ``client.list()``
+    """
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+        jobs_by_service_instance = defaultdict(list)
+        for job in jobs:
+            try:
+                service_instance = decompose_job_id(job['name'])
+            except InvalidJobNameError:
+                continue
+            jobs_by_service_instance[service_instance].append(job)
+        self._jobs_by_service_instance = {
+            service_instance: sort_jobs(matching_jobs)
+            for service_instance, matching_jobs in jobs_by_service_instance.items()
+        }
+
+    @classmethod
+    def from_client(cls, client):
+        return cls(client.list())
+
+    def lookup(self, service, instance, include_disabled=False, include_temporary=False):
+        """Equivalent to ``sort_jobs(lookup_chronos_jobs(...))``: the matching
+        jobs, with the job with the most recent result first.
+        """
+        return [
+            job for job in self._jobs_by_service_instance.get((service, instance), [])
+            if (include_disabled or not job['disabled']) and
+            (include_temporary or not is_temporary_job(job))
+        ]
+
+    def get_temporary_jobs(self, service, instance):
+        """Equivalent to ``get_temporary_jobs_for_service_instance()``"""
+        return [
+            job for job in self._jobs_by_service_instance.get((service, instance), [])
+            if is_temporary_job(job)
+        ]
+
+
 def filter_non_temporary_chronos_jobs(jobs):
     """
     Given a list of Chronos jobs, as pulled from the API, remove those
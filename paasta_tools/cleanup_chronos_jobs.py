@@ -87,8 +87,10 @@ def format_list_output(title, job_names):
     return '%s\n  %s' % (title, '\n  '.join(job_names))
 
 
-def deployed_job_names(client):
-    return [job['name'] for job in client.list()]
+def deployed_job_names(client, job_index=None):
+    if job_index is None:
+        job_index = chronos_tools.ChronosJobIndex.from_client(client)
+    return [job['name'] for job in job_index.jobs]
 
 
 def filter_paasta_jobs(jobs):
@@ -116,7 +118,7 @@ def filter_tmp_jobs(job_names):
     return [name for name in job_names if name.startswith(chronos_tools.TMP_JOB_IDENTIFIER)]
 
 
-def filter_expired_tmp_jobs(client, job_names, cluster, soa_dir):
+def filter_expired_tmp_jobs(client, job_names, cluster, soa_dir, job_index=None):
     """
     Given a list of temporary jobs, find those ready to be removed. Their
     suitablity for removal is defined by two things:
@@ -124,15 +126,21 @@ def filter_expired_tmp_jobs(client, job_names, cluster, soa_dir):
         - the job has completed (irrespective of whether it was a success or
           failure)
         - the job completed more than 24 hours ago
+
+    The temporary jobs of each service instance are looked up in job_index,
+    if given, rather than by listing the jobs in Chronos once per job name.
     """
     expired = []
     for job_name in job_names:
         service, instance = chronos_tools.decompose_job_id(job_name)
-        temporary_jobs = chronos_tools.get_temporary_jobs_for_service_instance(
-            client=client,
-            service=service,
-            instance=instance,
-        )
+        if job_index is not None:
+            temporary_jobs = job_index.get_temporary_jobs(service, instance)
+        else:
+            temporary_jobs = chronos_tools.get_temporary_jobs_for_service_instance(
+                client=client,
+                service=service,
+                instance=instance,
+            )
         for job in temporary_jobs:
             last_run_time, last_run_state = chronos_tools.get_status_last_run(job)
             try:
@@ -165,13 +173,16 @@ def main():
     system_paasta_config = utils.load_system_paasta_config()
     cluster = system_paasta_config.get_cluster()
 
-    running_jobs = set(deployed_job_names(client))
+    job_index = chronos_tools.ChronosJobIndex.from_client(client)
+    running_jobs = set(deployed_job_names(client, job_index=job_index))
 
     expected_service_jobs = {chronos_tools.compose_job_id(*job) for job in
                              chronos_tools.get_chronos_jobs_for_cluster(soa_dir=args.soa_dir)}
 
     all_tmp_jobs = set(filter_tmp_jobs(filter_paasta_jobs(running_jobs)))
-    expired_tmp_jobs = set(filter_expired_tmp_jobs(client, all_tmp_jobs, cluster=cluster, soa_dir=soa_dir))
+    expired_tmp_jobs = set(filter_expired_tmp_jobs(
+        client, all_tmp_jobs, cluster=cluster, soa_dir=soa_dir, job_index=job_index,
+    ))
     valid_tmp_jobs = all_tmp_jobs - expired_tmp_jobs
 
     to_delete = running_jobs - expected_service_jobs - valid_tmp_jobs
@@ -30,6 +30,8 @@ Command line options:
 - -t <KILL_THRESHOLD>, --kill-threshold: The decimal fraction of apps we think
     is sane to kill when this job runs
 - -f, --force: Force the killing of apps if we breach the threshold
+- --snapshot-ttl <SECONDS>: Reuse the marathon snapshot written by
+    list_marathon_service_instances less than SECONDS ago
 """
 import argparse
 import logging
@@ -40,6 +42,7 @@ import pysensu_yelp
 
 from paasta_tools import bounce_lib
 from paasta_tools import marathon_tools
+from paasta_tools.list_marathon_service_instances import load_or_build_marathon_snapshot
 from paasta_tools.monitoring_tools import send_event
 from paasta_tools.utils import _log
 from paasta_tools.utils import DEFAULT_SOA_DIR
@@ -78,6 +81,11 @@ def parse_args(argv):
         help="Force the cleanup if we are above the "
              "kill_threshold",
     )
+    parser.add_argument(
+        '--snapshot-ttl', dest='snapshot_ttl', type=int, default=0,
+        help="reuse a marathon snapshot written less than this many seconds ago, "
+             "or write a new one (0 disables snapshots)",
+    )
     return parser.parse_args(argv)
 
 
@@ -133,7 +141,7 @@ def delete_app(app_id, client, soa_dir):
         raise
 
 
-def cleanup_apps(soa_dir, kill_threshold=0.5, force=False):
+def cleanup_apps(soa_dir, kill_threshold=0.5, force=False, snapshot_ttl=0):
     """Clean up old or invalid jobs/apps from marathon. Retrieves
     both a list of apps currently in marathon and a list of valid
     app ids in order to determine what to kill.
@@ -141,14 +149,21 @@ def cleanup_apps(soa_dir, kill_threshold=0.5, force=False):
     :param soa_dir: The SOA config directory to read from
     :param kill_threshold: The decimal fraction of apps we think is
         sane to kill when this job runs.
-    :param force: Force the cleanup if we are above the kill_threshold"""
+    :param force: Force the cleanup if we are above the kill_threshold
+    :param snapshot_ttl: If positive, use the marathon snapshot written less
+        than this many seconds ago by another tool, if any"""
     log.info("Loading marathon configuration")
     system_paasta_config = load_system_paasta_config()
     log.info("Connecting to marathon")
     clients = marathon_tools.get_marathon_clients(marathon_tools.get_marathon_servers(system_paasta_config))
 
-    valid_services = get_services_for_cluster(instance_type='marathon', soa_dir=soa_dir)
-    all_apps_with_clients = marathon_tools.get_marathon_apps_with_clients(clients.get_all_clients())
+    if snapshot_ttl > 0:
+        snapshot = load_or_build_marathon_snapshot(clients, soa_dir, ttl=snapshot_ttl)
+        valid_services = snapshot.service_instances
+        all_apps_with_clients = snapshot.apps_with_clients
+    else:
+        valid_services = get_services_for_cluster(instance_type='marathon', soa_dir=soa_dir)
+        all_apps_with_clients = marathon_tools.get_marathon_apps_with_clients(clients.get_all_clients())
 
     app_ids_with_clients = []
     for (app, client) in all_apps_with_clients:
@@ -195,7 +210,7 @@ def main(argv=None):
     else:
         logging.basicConfig(level=logging.WARNING)
     try:
-        cleanup_apps(soa_dir, kill_threshold=kill_threshold, force=force)
+        cleanup_apps(soa_dir, kill_threshold=kill_threshold, force=force, snapshot_ttl=args.snapshot_ttl)
     except DontKillEverythingError:
         sys.exit(1)
 
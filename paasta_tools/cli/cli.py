@@ -15,16 +15,71 @@
 # PYTHON_ARGCOMPLETE_OK
 """A command line tool for viewing information from the PaaSTA stack."""
 import argparse
+import importlib
 import logging
+import os
 import sys
+from collections import OrderedDict
 
 import argcomplete
 import pkg_resources
 
-from paasta_tools.cli import cmds
-from paasta_tools.cli.utils import load_method
-from paasta_tools.cli.utils import modules_in_pkg as paasta_commands_dir
-from paasta_tools.utils import paasta_print
+
+# Static manifest of every paasta subcommand: the command name maps to the
+# module in paasta_tools.cli.cmds that implements it and the one-line help
+# shown by 'paasta --help'. The top-level parser is built from this table so
+# that only the module of the selected command (and its dependencies) ever
+# gets imported. tests/cli/test_cmds_help.py keeps it in sync with the modules.
+PAASTA_SUBCOMMANDS = OrderedDict([
+    ('autoscale', ('autoscale', "Manually scale a service up and down manually, bypassing the normal autoscaler")),
+    ('boost', ('boost', "Set, print the status, or clear a capacity boost for a given region in a PaaSTA cluster")),
+    ('check', ('check', (
+        "Determine whether service in pwd is 'paasta ready', checking for common "
+        "mistakes in the soa-configs directory and the local service directory. This "
+        "command is designed to be run from the 'root' of a service directory."
+    ))),
+    ('cook-image', ('cook_image', (
+        "'paasta cook-image' calls 'make cook-image' as part of the PaaSTA contract.\n\n"
+        "The PaaSTA contract specifies that a service MUST respond to 'cook-image' and "
+        "produce a docker image as a result. This command is often run as part of the "
+        "normal build pipeline ('paasta itest'), or via a 'paasta local-run --build'."
+    ))),
+    ('docker_exec', ('docker_exec', "Docker exec against a container running your service")),
+    ('docker_inspect', ('docker_inspect', "Docker inspect against a container running your service")),
+    ('docker_stop', ('docker_stop', "Docker stop a container running your service")),
+    ('emergency-restart', ('emergency_restart', "Restarts a PaaSTA service instance in an emergency")),
+    ('emergency-start', ('emergency_start', "Kicks off a chronos job run. Not implemented for Marathon instances.")),
+    ('emergency-stop', ('emergency_stop', "Stop a PaaSTA service instance in an emergency")),
+    ('fsm', ('fsm', "Generate boilerplate configs for a new PaaSTA Service")),
+    ('generate-pipeline', (
+        'generate_pipeline', "Configures a Yelp-specific Jenkins build pipeline to match the 'deploy.yaml'",
+    )),
+    ('get-latest-deployment', ('get_latest_deployment', "Gets the Git SHA for the latest deployment of a service")),
+    ('info', ('info', "Prints the general information about a service.")),
+    ('itest', ('itest', "Runs 'make itest' as part of the PaaSTA contract.")),
+    ('list', ('list', "Display a list of PaaSTA services")),
+    ('list-clusters', ('list_clusters', "Display a list of all PaaSTA clusters")),
+    ('local-run', ('local_run', "Run service's Docker image locally")),
+    ('logs', ('logs', "Streams logs relevant to a service across the PaaSTA components")),
+    ('mark-for-deployment', ('mark_for_deployment', "Mark a docker image for deployment in git")),
+    ('metastatus', ('metastatus', "Display the status for an entire PaaSTA cluster")),
+    ('pause_service_autoscaler', ('pause_service_autoscaler', "Pause the service autoscaler for an entire cluster")),
+    ('performance-check', ('performance_check', "Performs a performance check")),
+    ('push-to-registry', ('push_to_registry', "Uploads a docker image to a registry")),
+    ('remote-run', ('remote_run', "Schedule Mesos to run adhoc command in context of a service")),
+    ('rerun', ('rerun', "Re-run a scheduled PaaSTA job")),
+    ('rollback', ('rollback', "Rollback a docker image to a previous deploy")),
+    ('secret', ('secret', "Add/update PaaSTA service secrets")),
+    ('security-check', ('security_check', "Performs a security check")),
+    ('spark-run', ('spark_run', "Run Spark on the PaaSTA cluster")),
+    ('start', ('start_stop_restart', "Start or restarts a PaaSTA service in a graceful way.")),
+    ('restart', ('start_stop_restart', "Start or restarts a PaaSTA service in a graceful way.")),
+    ('stop', ('start_stop_restart', "Stops a PaaSTA service in a graceful way.")),
+    ('status', ('status', "Display the status of a PaaSTA service.")),
+    ('sysdig', ('sysdig', "Run sysdig on a remote host and filter to a service and instance")),
+    ('validate', ('validate', "Validate that all paasta config files in pwd are correct")),
+    ('wait-for-deployment', ('wait_for_deployment', "Wait a service to be deployed to deploy_group")),
+])
 
 
 class PrintsHelpOnErrorArgumentParser(argparse.ArgumentParser):
@@ -33,13 +88,14 @@ class PrintsHelpOnErrorArgumentParser(argparse.ArgumentParser):
     is way too terse"""
 
     def error(self, message):
+        from paasta_tools.utils import paasta_print
         paasta_print("Argument parse error: %s" % message)
         self.print_help()
         sys.exit(1)
 
 
 def add_subparser(command, subparsers):
-    """Given a command name, paasta_cmd, execute the add_subparser method
+    """Given a command module name, paasta_cmd, execute the add_subparser method
     implemented in paasta_cmd.py.
 
     Each paasta client command must implement a method called add_subparser.
@@ -49,12 +105,44 @@ def add_subparser(command, subparsers):
 
     :param command: a simple string - e.g. 'list'
     :param subparsers: an ArgumentParser object"""
-    module_name = 'paasta_tools.cli.cmds.%s' % command
-    add_subparser_fn = load_method(module_name, 'add_subparser')
-    add_subparser_fn(subparsers)
+    module = importlib.import_module('paasta_tools.cli.cmds.%s' % command)
+    module.add_subparser(subparsers)
+
 
+def get_command_from_argv(argv):
+    """Return the paasta subcommand selected by argv, or None if there isn't
+    one (e.g. 'paasta --help' or a partially typed command name).
 
-def get_argparser():
+    :param argv: the arguments after 'paasta'
+    """
+    for arg in argv:
+        if not arg.startswith('-'):
+            return arg if arg in PAASTA_SUBCOMMANDS else None
+    return None
+
+
+def get_argv_for_completion():
+    """When invoked by argcomplete, return the words typed so far after
+    'paasta'; otherwise return None."""
+    if '_ARGCOMPLETE' not in os.environ:
+        return None
+    comp_line = os.environ.get('COMP_LINE', '')
+    comp_point = int(os.environ.get('COMP_POINT', len(comp_line)))
+    # Only fully typed words can select a command; the word under the cursor
+    # is still being completed.
+    words = comp_line[:comp_point].split(' ')[1:-1]
+    return [word for word in words if word]
+
+
+def get_argparser(commands=None):
+    """Build the paasta argument parser.
+
+    :param commands: the subcommands whose modules should be imported to get
+                     their full parsers. Every other subcommand only gets a
+                     placeholder built from PAASTA_SUBCOMMANDS, which is enough
+                     for the top-level help and command name completion.
+                     Defaults to loading every subcommand.
+    """
     parser = PrintsHelpOnErrorArgumentParser(
         description=(
             "The PaaSTA command line tool. The 'paasta' command is the entry point "
@@ -87,8 +175,17 @@ def get_argparser():
     help_parser = subparsers.add_parser('help', add_help=False)
     help_parser.set_defaults(command=None)
 
-    for command in sorted(paasta_commands_dir(cmds)):
-        add_subparser(command, subparsers)
+    if commands is None:
+        commands = PAASTA_SUBCOMMANDS.keys()
+    modules_to_load = {PAASTA_SUBCOMMANDS[command][0] for command in commands}
+
+    loaded_modules = set()
+    for command, (module_name, help_text) in PAASTA_SUBCOMMANDS.items():
+        if module_name not in modules_to_load:
+            subparsers.add_parser(command, help=help_text, add_help=False)
+        elif module_name not in loaded_modules:
+            add_subparser(module_name, subparsers)
+            loaded_modules.add(module_name)
 
     return parser
 
@@ -99,7 +196,11 @@ def parse_args(argv):
     :return: an argparse.Namespace object mapping parameter names to the inputs
              from sys.argv
     """
-    parser = get_argparser()
+    if argv is None:
+        argv = sys.argv[1:]
+    completion_argv = get_argv_for_completion()
+    command = get_command_from_argv(completion_argv if completion_argv is not None else argv)
+    parser = get_argparser(commands=[command] if command else [])
     argcomplete.autocomplete(parser)
 
     return parser.parse_args(argv), parser
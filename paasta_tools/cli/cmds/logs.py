@@ -15,19 +15,22 @@
 """PaaSTA log reader for humans"""
 import argparse
 import datetime
+import heapq
 import logging
 import re
 import sys
 from collections import namedtuple
+from contextlib import closing
 from contextlib import contextmanager
+from contextlib import ExitStack
 from multiprocessing import Process
 from multiprocessing import Queue
 from queue import Empty
 from time import sleep
 from typing import Any
-from typing import Dict
 from typing import List
 from typing import Set
+from typing import Tuple
 
 import isodate
 import pytz
@@ -203,6 +206,54 @@ def check_timestamp_in_range(timestamp, start_time, end_time):
         return True
 
 
+TIMESTAMP_RE = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:[.,](\d+))?(?:(Z)|([+-])(\d{2}):?(\d{2}))?$',
+)
+
+
+def parse_timestamp(timestamp):
+    """Parses the ISO 8601 timestamp of a log line into a timezone aware
+    datetime, which is in UTC if the timestamp has no timezone.
+
+    The timestamps paasta writes are parsed with a regex, which is a lot faster
+    than isodate. isodate parses any other timestamp.
+    """
+    match = TIMESTAMP_RE.match(timestamp)
+    if match is None:
+        dt = isodate.parse_datetime(timestamp)
+        return dt if dt.tzinfo else pytz.utc.localize(dt)
+    year, month, day, hour, minute, second, fraction, utc, sign, tz_hours, tz_minutes = match.groups()
+    if sign is None:
+        tzinfo = pytz.utc
+    else:
+        offset = datetime.timedelta(hours=int(tz_hours), minutes=int(tz_minutes))
+        tzinfo = datetime.timezone(offset if sign == '+' else -offset)
+    return datetime.datetime(
+        int(year), int(month), int(day), int(hour), int(minute), int(second),
+        int((fraction or '')[:6].ljust(6, '0')), tzinfo=tzinfo,
+    )
+
+
+def parse_json_log_line(line):
+    """Parses a (JSON-formatted) log line, so that the filters and the sorting
+    of log lines don't parse it again.
+
+    :return: the parsed line and its timestamp (None if it has none), or None
+             if the line is not valid JSON
+    """
+    try:
+        parsed_line = json.loads(line)
+    except ValueError:
+        log.debug('Trouble parsing line as json. Skipping. Line: %r' % line)
+        return None
+
+    try:
+        timestamp = parse_timestamp(parsed_line.get('timestamp'))
+    except (TypeError, ValueError):
+        timestamp = None
+    return parsed_line, timestamp
+
+
 def paasta_log_line_passes_filter(
     line,
     levels,
@@ -212,18 +263,20 @@ def paasta_log_line_passes_filter(
     instances,
     start_time=None,
     end_time=None,
+    parsed=None,
 ):
     """Given a (JSON-formatted) log line, return True if the line should be
     displayed given the provided levels, components, and clusters; return False
     otherwise.
+
+    :param parsed: what parse_json_log_line returns for line, if it was already called
     """
-    try:
-        parsed_line = json.loads(line)
-    except ValueError:
-        log.debug('Trouble parsing line as json. Skipping. Line: %r' % line)
-        return False
+    if parsed is None:
+        parsed = parse_json_log_line(line)
+        if parsed is None:
+            return False
+    parsed_line, timestamp = parsed
 
-    timestamp = isodate.parse_datetime(parsed_line.get('timestamp'))
     if not check_timestamp_in_range(timestamp, start_time, end_time):
         return False
     return (
@@ -245,14 +298,14 @@ def paasta_app_output_passes_filter(
     instances,
     start_time=None,
     end_time=None,
+    parsed=None,
 ):
-    try:
-        parsed_line = json.loads(line)
-    except ValueError:
-        log.debug('Trouble parsing line as json. Skipping. Line: %r' % line)
-        return False
+    if parsed is None:
+        parsed = parse_json_log_line(line)
+        if parsed is None:
+            return False
+    parsed_line, timestamp = parsed
 
-    timestamp = isodate.parse_datetime(parsed_line.get('timestamp'))
     if not check_timestamp_in_range(timestamp, start_time, end_time):
         return False
     return (
@@ -328,17 +381,17 @@ def marathon_log_line_passes_filter(
     instances,
     start_time=None,
     end_time=None,
+    parsed=None,
 ):
     """Given a (JSON-formatted) log line where the message is a Marathon log line,
     return True if the line should be displayed given the provided service; return False
     otherwise."""
-    try:
-        parsed_line = json.loads(line)
-    except ValueError:
-        log.debug('Trouble parsing line as json. Skipping. Line: %r' % line)
-        return False
+    if parsed is None:
+        parsed = parse_json_log_line(line)
+        if parsed is None:
+            return False
+    parsed_line, timestamp = parsed
 
-    timestamp = isodate.parse_datetime(parsed_line.get('timestamp'))
     if not check_timestamp_in_range(timestamp, start_time, end_time):
         return False
     return format_job_id(service, '') in parsed_line.get('message', '')
@@ -353,17 +406,17 @@ def chronos_log_line_passes_filter(
     instances,
     start_time=None,
     end_time=None,
+    parsed=None,
 ):
     """Given a (JSON-formatted) log line where the message is a Marathon log line,
     return True if the line should be displayed given the provided service; return False
     otherwise."""
-    try:
-        parsed_line = json.loads(line)
-    except ValueError:
-        log.debug('Trouble parsing line as json. Skipping. Line: %r' % line)
-        return False
+    if parsed is None:
+        parsed = parse_json_log_line(line)
+        if parsed is None:
+            return False
+    parsed_line, timestamp = parsed
 
-    timestamp = isodate.parse_datetime(parsed_line.get('timestamp'))
     if not check_timestamp_in_range(timestamp, start_time, end_time):
         return False
     return chronos_tools.compose_job_id(service, '') in parsed_line.get('message', '')
@@ -442,6 +495,40 @@ def prettify_log_line(line, requested_levels):
 _log_reader_classes = {}
 
 
+MIN_TIMESTAMP = pytz.utc.localize(datetime.datetime.min)
+
+# How far out of order the lines of a single log stream can be, in lines
+LOG_REORDER_WINDOW = 1000
+
+
+def reorder_log_records(records, window=LOG_REORDER_WINDOW):
+    """Sorts (timestamp, line) records by timestamp, given that none of them is
+    more than window records away from where it sorts, while only holding
+    window records in memory. Records with the same timestamp keep their order.
+    """
+    heap: List[Tuple[datetime.datetime, int, Any]] = []
+    for index, (timestamp, line) in enumerate(records):
+        heapq.heappush(heap, (timestamp, index, line))
+        if len(heap) > window:
+            timestamp, _, line = heapq.heappop(heap)
+            yield timestamp, line
+    while heap:
+        timestamp, _, line = heapq.heappop(heap)
+        yield timestamp, line
+
+
+def merge_log_records(streams, window=LOG_REORDER_WINDOW):
+    """Lazily merges streams of (timestamp, line) records into a single one
+    sorted by timestamp, reading each stream only as far as needed. The lines
+    of a stream are written roughly in order, so each one is only reordered
+    within window records.
+    """
+    return heapq.merge(
+        *[reorder_log_records(stream, window) for stream in streams],
+        key=lambda record: record[0],
+    )
+
+
 def register_log_reader(name):
     """Returns a decorator that registers a log reader class at a given name
     so get_log_reader_classes can find it."""
@@ -700,8 +787,6 @@ class ScribeLogReader(LogReader):
                 break
 
     def print_logs_by_time(self, service, start_time, end_time, levels, components, clusters, instances, raw_mode):
-        aggregated_logs: List[Dict[str, Any]] = []
-
         if 'marathon' in components or 'chronos' in components:
             paasta_print(
                 PaastaColors.red(
@@ -712,96 +797,93 @@ class ScribeLogReader(LogReader):
                 file=sys.stderr,
             )
 
-        def callback(component, stream_info, scribe_env, cluster):
-            if stream_info.per_cluster:
-                stream_name = stream_info.stream_name_fn(service, cluster)
-            else:
-                stream_name = stream_info.stream_name_fn(service)
-
-            ctx = self.scribe_get_from_time(scribe_env, stream_name, start_time, end_time)
-            self.filter_and_aggregate_scribe_logs(
-                scribe_reader_ctx=ctx,
-                scribe_env=scribe_env,
-                stream_name=stream_name,
-                levels=levels,
-                service=service,
-                components=components,
+        with ExitStack() as stack:
+            streams = []
+
+            def callback(component, stream_info, scribe_env, cluster):
+                if stream_info.per_cluster:
+                    stream_name = stream_info.stream_name_fn(service, cluster)
+                else:
+                    stream_name = stream_info.stream_name_fn(service)
+
+                ctx = self.scribe_get_from_time(scribe_env, stream_name, start_time, end_time)
+                streams.append(stack.enter_context(closing(self.filter_scribe_logs(
+                    scribe_reader_ctx=ctx,
+                    scribe_env=scribe_env,
+                    stream_name=stream_name,
+                    levels=levels,
+                    service=service,
+                    components=components,
+                    clusters=clusters,
+                    instances=instances,
+                    filter_fn=stream_info.filter_fn,
+                    parser_fn=stream_info.parse_fn,
+                    start_time=start_time,
+                    end_time=end_time,
+                ))))
+
+            self.run_code_over_scribe_envs(
                 clusters=clusters,
-                instances=instances,
-                aggregated_logs=aggregated_logs,
-                filter_fn=stream_info.filter_fn,
-                parser_fn=stream_info.parse_fn,
-                start_time=start_time,
-                end_time=end_time,
+                components=components,
+                callback=callback,
             )
 
-        self.run_code_over_scribe_envs(
-            clusters=clusters,
-            components=components,
-            callback=callback,
-        )
-
-        aggregated_logs.sort(key=lambda log_line: log_line['sort_key'])
-        for line in aggregated_logs:
-            print_log(line['raw_line'], levels, raw_mode)
+            for timestamp, line in merge_log_records(streams):
+                print_log(line, levels, raw_mode)
 
     def print_last_n_logs(self, service, line_count, levels, components, clusters, instances, raw_mode):
-        aggregated_logs: List[Dict[str, Any]] = []
-
-        def callback(component, stream_info, scribe_env, cluster):
-            stream_info = self.get_stream_info(component)
+        with ExitStack() as stack:
+            streams = []
 
-            if stream_info.per_cluster:
-                stream_name = stream_info.stream_name_fn(service, cluster)
-            else:
-                stream_name = stream_info.stream_name_fn(service)
-
-            ctx = self.scribe_get_last_n_lines(scribe_env, stream_name, line_count)
-            self.filter_and_aggregate_scribe_logs(
-                scribe_reader_ctx=ctx,
-                scribe_env=scribe_env,
-                stream_name=stream_name,
-                levels=levels,
-                service=service,
-                components=components,
-                clusters=clusters,
-                instances=instances,
-                aggregated_logs=aggregated_logs,
-                filter_fn=stream_info.filter_fn,
-                parser_fn=stream_info.parse_fn,
-            )
+            def callback(component, stream_info, scribe_env, cluster):
+                stream_info = self.get_stream_info(component)
 
-        self.run_code_over_scribe_envs(clusters=clusters, components=components, callback=callback)
-        aggregated_logs.sort(key=lambda log_line: log_line['sort_key'])
-        for line in aggregated_logs:
-            print_log(line['raw_line'], levels, raw_mode)
+                if stream_info.per_cluster:
+                    stream_name = stream_info.stream_name_fn(service, cluster)
+                else:
+                    stream_name = stream_info.stream_name_fn(service)
+
+                ctx = self.scribe_get_last_n_lines(scribe_env, stream_name, line_count)
+                streams.append(stack.enter_context(closing(self.filter_scribe_logs(
+                    scribe_reader_ctx=ctx,
+                    scribe_env=scribe_env,
+                    stream_name=stream_name,
+                    levels=levels,
+                    service=service,
+                    components=components,
+                    clusters=clusters,
+                    instances=instances,
+                    filter_fn=stream_info.filter_fn,
+                    parser_fn=stream_info.parse_fn,
+                ))))
+
+            self.run_code_over_scribe_envs(clusters=clusters, components=components, callback=callback)
+            for timestamp, line in merge_log_records(streams):
+                print_log(line, levels, raw_mode)
 
-    def filter_and_aggregate_scribe_logs(
+    def filter_scribe_logs(
         self, scribe_reader_ctx, scribe_env, stream_name,
         levels, service, components, clusters, instances,
-        aggregated_logs, parser_fn=None, filter_fn=None,
+        parser_fn=None, filter_fn=None,
         start_time=None, end_time=None,
     ):
+        """Yields the (timestamp, line) of the lines of a scribe stream that
+        pass filter_fn, parsing each line only once. The stream is only read
+        as the records are consumed."""
         with scribe_reader_ctx as scribe_reader:
             try:
                 for line in scribe_reader:
                     if parser_fn:
                         line = parser_fn(line, clusters, service)
-                    if filter_fn:
-                        if filter_fn(
-                            line, levels, service, components, clusters,
-                            instances, start_time=start_time, end_time=end_time,
-                        ):
-                            try:
-                                parsed_line = json.loads(line)
-                                timestamp = isodate.parse_datetime(parsed_line.get('timestamp'))
-                                if not timestamp.tzinfo:
-                                    timestamp = pytz.utc.localize(timestamp)
-                            except ValueError:
-                                timestamp = pytz.utc.localize(datetime.datetime.min)
-
-                            line = {'raw_line': line, 'sort_key': timestamp}
-                            aggregated_logs.append(line)
+                    parsed = parse_json_log_line(line)
+                    if parsed is None:
+                        continue
+                    if filter_fn is None or filter_fn(
+                        line, levels, service, components, clusters,
+                        instances, start_time=start_time, end_time=end_time, parsed=parsed,
+                    ):
+                        timestamp = parsed[1]
+                        yield (MIN_TIMESTAMP if timestamp is None else timestamp), line
             except StreamTailerSetupError as e:
                 if 'No data in stream' in str(e):
                     log.warning("Scribe stream %s is empty on %s" % (stream_name, scribe_env))
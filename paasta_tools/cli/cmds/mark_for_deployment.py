@@ -326,7 +326,12 @@ class ClusterData:
 
 
 def instances_deployed(cluster_data, instances_out, green_light):
-    """Create a thread pool to run _run_instance_worker()
+    """Check which instances of cluster_data are deployed.
+
+    The deploy progress of all instances in the cluster is fetched with a
+    single deploy_status request. If the paasta-api of the cluster doesn't
+    support that yet, fall back to a thread pool running _run_instance_worker()
+    to query each instance separately.
 
     :param cluster_data: an instance of ClusterData.
     :param instances_out: a empty thread-safe queue. I will contain
@@ -334,6 +339,27 @@ def instances_deployed(cluster_data, instances_out, green_light):
     :type instances_out: Queue
     :param green_light: See the docstring for _query_clusters().
     """
+    deploy_statuses = get_cluster_deploy_statuses(cluster_data)
+    if deploy_statuses is not None:
+        while not cluster_data.instances_queue.empty() and green_light.is_set():
+            try:
+                instance_config = cluster_data.instances_queue.get(block=False)
+            except Empty:
+                return
+            instance = instance_config.get_instance()
+            status = deploy_statuses.get(instance)
+            if status is None:
+                log.debug("No status for {}.{}, in {}. Not deployed yet."
+                          .format(
+                              cluster_data.service, instance,
+                              cluster_data.cluster,
+                          ))
+                instances_out.put(instance_config)
+            elif not is_marathon_instance_deployed(cluster_data, instance_config, status.git_sha, status):
+                instances_out.put(instance_config)
+            cluster_data.instances_queue.task_done()
+        return
+
     num_threads = min(5, cluster_data.instances_queue.qsize())
 
     workers_launched = []
@@ -349,6 +375,114 @@ def instances_deployed(cluster_data, instances_out, green_light):
         worker.join()
 
 
+def get_cluster_deploy_statuses(cluster_data):
+    """Get the deploy progress of every marathon instance of the service in a
+    cluster with one paasta-api request.
+
+    :param cluster_data: an instance of ClusterData.
+    :returns: a dict of instance name to deploy status, or None if the
+              paasta-api can't answer that in one request.
+    """
+    api = client.get_paasta_api_client(cluster=cluster_data.cluster)
+    if not api:
+        return None
+    try:
+        result = api.service.deploy_status(service=cluster_data.service).result()
+    except HTTPError as e:
+        log.debug("Can't get the deploy status of {} in {} in one request, "
+                  "querying instances one by one: {} {}"
+                  .format(
+                      cluster_data.service, cluster_data.cluster,
+                      e.response.status_code, e.response.text,
+                  ))
+        return None
+    except ConnectionError as e:
+        log.warning("Error getting deploy status from PaaSTA API for {}:"
+                    "{}".format(cluster_data.cluster, e))
+        return None
+    return {status.instance: status for status in result.instances}
+
+
+def is_marathon_instance_deployed(cluster_data, instance_config, git_sha, marathon_status):
+    """Decide whether a marathon instance is done deploying cluster_data.git_sha,
+    printing what it is still waiting on otherwise.
+
+    :param cluster_data: an instance of ClusterData.
+    :param instance_config: the MarathonServiceConfig of the instance.
+    :param git_sha: the git sha the instance currently runs.
+    :param marathon_status: a marathon status, either from the status of the
+                            instance or from the deploy status of the service.
+    """
+    instance = instance_config.get_instance()
+    if marathon_status.error_message:
+        log.debug("{}.{} in {} has an error: {}. Not deployed yet."
+                  .format(
+                      cluster_data.service, instance,
+                      cluster_data.cluster, marathon_status.error_message,
+                  ))
+        return False
+    if (
+        marathon_status.expected_instance_count == 0 or
+        marathon_status.desired_state == 'stop'
+    ):
+        log.debug("{}.{} in {} is marked as stopped. Marked as deployed."
+                  .format(
+                      cluster_data.service, instance,
+                      cluster_data.cluster,
+                  ))
+        return True
+    if marathon_status.app_count != 1:
+        paasta_print("  {}.{} on {} is still bouncing, {} versions "
+                     "running"
+                     .format(
+                         cluster_data.service, instance,
+                         cluster_data.cluster,
+                         marathon_status.app_count,
+                     ))
+        return False
+    if not cluster_data.git_sha.startswith(git_sha):
+        paasta_print("  {}.{} on {} doesn't have the right sha yet: {}"
+                     .format(
+                         cluster_data.service, instance,
+                         cluster_data.cluster, git_sha,
+                     ))
+        return False
+    if marathon_status.deploy_status not in ['Running', 'Deploying', 'Waiting']:
+        paasta_print("  {}.{} on {} isn't running yet: {}"
+                     .format(
+                         cluster_data.service, instance,
+                         cluster_data.cluster,
+                         marathon_status.deploy_status,
+                     ))
+        return False
+
+    # The bounce margin factor defines what proportion of instances we need to be "safe",
+    # so consider it scaled up "enough" if we have that proportion of instances ready.
+    required_instance_count = int(math.ceil(
+        instance_config.get_bounce_margin_factor() * marathon_status.expected_instance_count,
+    ))
+    if required_instance_count > marathon_status.running_instance_count:
+        paasta_print("  {}.{} on {} isn't scaled up yet, "
+                     "has {} out of {} required instances (out of a total of {})"
+                     .format(
+                         cluster_data.service, instance,
+                         cluster_data.cluster,
+                         marathon_status.running_instance_count,
+                         required_instance_count,
+                         marathon_status.expected_instance_count,
+                     ))
+        return False
+    paasta_print("Complete: {}.{} on {} looks 100% deployed at {} "
+                 "instances on {}"
+                 .format(
+                     cluster_data.service, instance,
+                     cluster_data.cluster,
+                     marathon_status.running_instance_count,
+                     git_sha,
+                 ))
+    return True
+
+
 def _run_instance_worker(cluster_data, instances_out, green_light):
     """Get instances from the instances_in queue and check them one by one.
 
@@ -421,74 +555,11 @@ def _run_instance_worker(cluster_data, instances_out, green_light):
                           cluster_data.service, instance,
                           cluster_data.cluster,
                       ))
-        elif (
-            status.marathon.expected_instance_count == 0 or
-            status.marathon.desired_state == 'stop'
-        ):
-            log.debug("{}.{} in {} is marked as stopped. Marked as deployed."
-                      .format(
-                          cluster_data.service, status.instance,
-                          cluster_data.cluster,
-                      ))
+        elif is_marathon_instance_deployed(cluster_data, instance_config, status.git_sha, status.marathon):
+            cluster_data.instances_queue.task_done()
         else:
-            if status.marathon.app_count != 1:
-                paasta_print("  {}.{} on {} is still bouncing, {} versions "
-                             "running"
-                             .format(
-                                 cluster_data.service, status.instance,
-                                 cluster_data.cluster,
-                                 status.marathon.app_count,
-                             ))
-                cluster_data.instances_queue.task_done()
-                instances_out.put(instance_config)
-                continue
-            if not cluster_data.git_sha.startswith(status.git_sha):
-                paasta_print("  {}.{} on {} doesn't have the right sha yet: {}"
-                             .format(
-                                 cluster_data.service, instance,
-                                 cluster_data.cluster, status.git_sha,
-                             ))
-                cluster_data.instances_queue.task_done()
-                instances_out.put(instance_config)
-                continue
-            if status.marathon.deploy_status not in ['Running', 'Deploying', 'Waiting']:
-                paasta_print("  {}.{} on {} isn't running yet: {}"
-                             .format(
-                                 cluster_data.service, instance,
-                                 cluster_data.cluster,
-                                 status.marathon.deploy_status,
-                             ))
-                cluster_data.instances_queue.task_done()
-                instances_out.put(instance_config)
-                continue
-
-            # The bounce margin factor defines what proportion of instances we need to be "safe",
-            # so consider it scaled up "enough" if we have that proportion of instances ready.
-            required_instance_count = int(math.ceil(
-                instance_config.get_bounce_margin_factor() * status.marathon.expected_instance_count,
-            ))
-            if required_instance_count > status.marathon.running_instance_count:
-                paasta_print("  {}.{} on {} isn't scaled up yet, "
-                             "has {} out of {} required instances (out of a total of {})"
-                             .format(
-                                 cluster_data.service, instance,
-                                 cluster_data.cluster,
-                                 status.marathon.running_instance_count,
-                                 required_instance_count,
-                                 status.marathon.expected_instance_count,
-                             ))
-                cluster_data.instances_queue.task_done()
-                instances_out.put(instance_config)
-                continue
-            paasta_print("Complete: {}.{} on {} looks 100% deployed at {} "
-                         "instances on {}"
-                         .format(
-                             cluster_data.service, instance,
-                             cluster_data.cluster,
-                             status.marathon.running_instance_count,
-                             status.git_sha,
-                         ))
             cluster_data.instances_queue.task_done()
+            instances_out.put(instance_config)
 
 
 def _query_clusters(clusters_data, green_light):
@@ -157,28 +157,44 @@ def get_actual_deployments(service: str, soa_dir: str) -> Dict[str, str]:
     return actual_deployments
 
 
+# Upper bound on concurrent paasta-api status requests made by one
+# 'paasta status' invocation, across all clusters.
+STATUS_API_MAX_WORKERS = 32
+
+
 def paasta_status_on_api_endpoint(cluster, service, instance, system_paasta_config, verbose):
     client = get_paasta_api_client(cluster, system_paasta_config)
     if not client:
         paasta_print('Cannot get a paasta-api client')
         exit(1)
 
+    return_code, output = get_status_on_api_endpoint(client, service, instance, verbose)
+    paasta_print(*output, sep='\n')
+    return return_code
+
+
+def get_status_on_api_endpoint(client, service, instance, verbose):
+    """Query the paasta-api for the status of a single instance.
+
+    :returns: a tuple of (return_code, output lines)
+    """
+    output = []
     try:
         status = client.service.status_instance(service=service, instance=instance).result()
     except HTTPError as exc:
-        paasta_print(exc.response.text)
-        return exc.status_code
+        output.append(exc.response.text)
+        return exc.status_code, output
 
-    paasta_print('instance: %s' % PaastaColors.blue(instance))
-    paasta_print('Git sha:    %s (desired)' % status.git_sha)
+    output.append('instance: %s' % PaastaColors.blue(instance))
+    output.append('Git sha:    %s (desired)' % status.git_sha)
 
     marathon_status = status.marathon
     if marathon_status is None:
-        paasta_print("Not implemented: Looks like %s is not a Marathon instance" % instance)
-        return 0
+        output.append("Not implemented: Looks like %s is not a Marathon instance" % instance)
+        return 0, output
     elif marathon_status.error_message:
-        paasta_print(marathon_status.error_message)
-        return 1
+        output.append(marathon_status.error_message)
+        return 1, output
 
     bouncing_status = bouncing_status_human(
         marathon_status.app_count,
@@ -188,7 +204,7 @@ def paasta_status_on_api_endpoint(cluster, service, instance, system_paasta_conf
         marathon_status.desired_state,
         marathon_status.expected_instance_count,
     )
-    paasta_print("State:      %s - Desired state: %s" % (bouncing_status, desired_state))
+    output.append("State:      %s - Desired state: %s" % (bouncing_status, desired_state))
 
     status = MarathonDeployStatus.fromstring(marathon_status.deploy_status)
     if status != MarathonDeployStatus.NotRunning:
@@ -199,7 +215,7 @@ def paasta_status_on_api_endpoint(cluster, service, instance, system_paasta_conf
     else:
         deploy_status = 'NotRunning'
 
-    paasta_print(
+    output.append(
         status_marathon_job_human(
             service=service,
             instance=instance,
@@ -210,12 +226,40 @@ def paasta_status_on_api_endpoint(cluster, service, instance, system_paasta_conf
             normal_instance_count=marathon_status.expected_instance_count,
         ),
     )
-    return 0
+    return 0, output
+
+
+def report_status_on_api_endpoint(
+    cluster, service, instances, system_paasta_config, verbose=0, api_executor=None,
+):
+    """Query the paasta-api of a cluster for the status of several instances
+    at once. Requests share one client (and connection pool) and run on
+    api_executor, which bounds the total concurrency across clusters.
+
+    :returns: a tuple of (return_code, output lines), with the output in the
+              same order as instances
+    """
+    client = get_paasta_api_client(cluster, system_paasta_config, max_connections=STATUS_API_MAX_WORKERS)
+    if not client:
+        return 1, ['Cannot get a paasta-api client']
+
+    def get_status(instance):
+        return get_status_on_api_endpoint(client, service, instance, verbose)
+
+    if api_executor is None:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=STATUS_API_MAX_WORKERS) as executor:
+            results = list(executor.map(get_status, instances))
+    else:
+        results = list(api_executor.map(get_status, instances))
+
+    output = [line for _, instance_output in results for line in instance_output]
+    return_code = 1 if any(return_code != 0 for return_code, _ in results) else 0
+    return return_code, output
 
 
 def report_status_for_cluster(
     service, cluster, deploy_pipeline, actual_deployments, instance_whitelist,
-    system_paasta_config, verbose=0, use_api_endpoint=False,
+    system_paasta_config, verbose=0, use_api_endpoint=False, api_executor=None,
 ):
     """With a given service and cluster, prints the status of the instances
     in that cluster"""
@@ -244,18 +288,15 @@ def report_status_for_cluster(
     return_code = 0
     if len(deployed_instances) > 0:
         if use_api_endpoint:
-            return_codes = [
-                paasta_status_on_api_endpoint(
-                    cluster,
-                    service,
-                    deployed_instance,
-                    system_paasta_config,
-                    verbose=verbose,
-                )
-                for deployed_instance in deployed_instances
-            ]
-            if any(return_code != 200 for return_code in return_codes):
-                return_code = 1
+            return_code, status = report_status_on_api_endpoint(
+                cluster=cluster,
+                service=service,
+                instances=deployed_instances,
+                system_paasta_config=system_paasta_config,
+                verbose=verbose,
+                api_executor=api_executor,
+            )
+            output.extend('    %s' % line for status_output in status for line in status_output.split('\n'))
         else:
             return_code, status = execute_paasta_serviceinit_on_remote_master(
                 'status', cluster, service, ','.join(deployed_instances),
@@ -431,8 +472,8 @@ def paasta_status(args):
     return_codes = [0]
     tasks = []
     clusters_services_instances = apply_args_filters(args)
-    for cluster, service_instances in clusters_services_instances.items():
-        for service, instances in service_instances.items():
+    for cluster, service_instances in sorted(clusters_services_instances.items()):
+        for service, instances in sorted(service_instances.items()):
             actual_deployments = get_actual_deployments(service, soa_dir)
             if actual_deployments:
                 deploy_pipeline = list(get_planned_deployments(service, soa_dir))
@@ -452,9 +493,17 @@ def paasta_status(args):
                 paasta_print(missing_deployments_message(service))
                 return_codes.append(1)
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
-        tasks = [executor.submit(t[0], **t[1]) for t in tasks]
-        for future in concurrent.futures.as_completed(tasks):
+    # Clusters are reported concurrently, and with the api endpoint every
+    # instance status is fetched concurrently too, bounded by api_executor.
+    # Results are printed in a stable (cluster, service) order, each one as
+    # soon as it and everything before it has completed.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=STATUS_API_MAX_WORKERS) as api_executor, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
+        if use_api_endpoint:
+            for _, kwargs in tasks:
+                kwargs['api_executor'] = api_executor
+        futures = [executor.submit(t[0], **t[1]) for t in tasks]
+        for future in futures:
             return_code, output = future.result()
             paasta_print('\n'.join(output))
             return_codes.append(return_code)
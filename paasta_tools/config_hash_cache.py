@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# Copyright 2015-2018 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Cache of the config hashes of service instances, keyed by a fingerprint of
+everything the hash is computed from, for long running processes that format
+the same instances over and over (paasta-deployd, paasta-api).
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+from typing import Tuple
+
+from paasta_tools.utils import get_readable_files_in_glob
+from paasta_tools.utils import SystemPaastaConfig
+
+
+CacheKey = Tuple[str, str, str, str]
+
+
+def get_fingerprint(*inputs: Any) -> str:
+    """A digest of inputs, which are serialized to json with anything json can't
+    serialize (like the dates of yaml files) turned into strings"""
+    return hashlib.md5(json.dumps(inputs, sort_keys=True, default=str).encode('UTF-8')).hexdigest()
+
+
+def get_system_paasta_config_files(system_paasta_config: SystemPaastaConfig) -> Iterable[str]:
+    return get_readable_files_in_glob(glob="*.json", path=system_paasta_config.directory)
+
+
+def get_system_paasta_config_version(system_paasta_config: SystemPaastaConfig) -> str:
+    """Identifies the content of the system paasta config by the size and mtime
+    of the files it was loaded from, which is cheaper than serializing it. A
+    config that wasn't loaded from files is identified by its content."""
+    versions = []
+    for config_file in get_system_paasta_config_files(system_paasta_config):
+        try:
+            stat = os.stat(config_file)
+        except OSError:
+            continue
+        versions.append((config_file, stat.st_mtime_ns, stat.st_size))
+    if not versions:
+        return get_fingerprint(system_paasta_config.config_dict)
+    return get_fingerprint(versions)
+
+
+class ConfigHashCache(object):
+    """Safe to share between threads, like the workers of paasta-deployd"""
+
+    def __init__(self) -> None:
+        self._hashes: Dict[CacheKey, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def get_config_hash(
+        self,
+        key: CacheKey,
+        fingerprint: str,
+        compute: Callable[[], str],
+    ) -> str:
+        """Returns the config hash cached for key if it was computed from
+        inputs with the same fingerprint, or computes and caches it.
+
+        :param key: (service, instance, cluster, soa_dir) of the instance
+        :param fingerprint: fingerprint of every input of the config hash
+        :param compute: computes the config hash
+        """
+        cached = self._hashes.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        config_hash = compute()
+        with self._lock:
+            self._hashes[key] = (fingerprint, config_hash)
+        return config_hash
+
+
+_config_hash_cache: Optional[ConfigHashCache] = None
+
+
+def enable_config_hash_cache() -> ConfigHashCache:
+    global _config_hash_cache
+    if _config_hash_cache is None:
+        _config_hash_cache = ConfigHashCache()
+    return _config_hash_cache
+
+
+def disable_config_hash_cache() -> None:
+    global _config_hash_cache
+    _config_hash_cache = None
+
+
+def get_config_hash_cache() -> Optional[ConfigHashCache]:
+    """The process wide ConfigHashCache, or None if it isn't enabled"""
+    return _config_hash_cache
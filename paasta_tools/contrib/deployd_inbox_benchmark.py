@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Benchmark of the paasta-deployd inbox: enqueues a burst of service instances
+in the inbox queue, the way add_all_services does at startup, and measures how
+long they take to get bounced by the workers.
+
+Marathon is faked: the workers call a fake deploy_marathon_service that only
+records when each service instance was bounced, so this measures deployd
+itself. Keep in mind each worker sleeps 0.1s after every bounce, so the
+workers can't bounce more than 10 service instances per second each.
+"""
+import argparse
+import logging
+import threading
+import time
+
+from paasta_tools.deployd import workers
+from paasta_tools.deployd.common import PaastaQueue
+from paasta_tools.deployd.common import ServiceInstance
+from paasta_tools.deployd.master import DedupedPriorityQueue
+from paasta_tools.deployd.master import Inbox
+from paasta_tools.metrics.metrics_lib import NoMetrics
+from paasta_tools.utils import paasta_print
+from paasta_tools.utils import SystemPaastaConfig
+
+
+CLUSTER = 'benchmark'
+
+
+class FakeMarathon(object):
+    def __init__(self, expected_bounces, deploy_secs):
+        self.expected_bounces = expected_bounces
+        self.deploy_secs = deploy_secs
+        self.lock = threading.Lock()
+        self.bounced_at = {}
+        self.done = threading.Event()
+
+    def deploy_marathon_service(self, service, instance, clients, soa_dir, marathon_apps_with_clients):
+        if self.deploy_secs:
+            time.sleep(self.deploy_secs)
+        with self.lock:
+            self.bounced_at.setdefault((service, instance), time.time())
+            if len(self.bounced_at) >= self.expected_bounces:
+                self.done.set()
+        return 0, None
+
+
+class BenchmarkWorker(workers.PaastaDeployWorker):
+    def setup(self):
+        self.marathon_servers = []
+        self.marathon_clients = None
+
+
+def percentile(sorted_values, percent):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--instances', type=int, default=10000, help="Number of service instances to bounce")
+    parser.add_argument('--workers', type=int, default=100, help="Number of deployd workers")
+    parser.add_argument(
+        '--duplicates', type=int, default=1,
+        help="Number of times each service instance is enqueued, as when several watchers fire",
+    )
+    parser.add_argument(
+        '--spread-secs', type=float, default=0,
+        help="Spread the bounce_by of the service instances over this many seconds, like the startup rate limit",
+    )
+    parser.add_argument('--deploy-ms', type=float, default=0, help="Time the fake deploy takes, in milliseconds")
+    parser.add_argument('--timeout', type=float, default=600, help="Give up after this many seconds")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    fake_marathon = FakeMarathon(args.instances, args.deploy_ms / 1000)
+    workers.deploy_marathon_service = fake_marathon.deploy_marathon_service
+    config = SystemPaastaConfig({'cluster': CLUSTER}, '/dev/null')
+    metrics = NoMetrics('paasta.deployd.benchmark')
+
+    inbox_q = PaastaQueue("InboxQueue")
+    bounce_q = DedupedPriorityQueue("BounceQueue")
+    inbox = Inbox(inbox_q, bounce_q)
+    inbox.start()
+    for i in range(args.workers):
+        BenchmarkWorker(i, inbox_q, bounce_q, config, metrics, inbox=inbox).start()
+
+    start = time.time()
+    due_at = {}
+    for _ in range(args.duplicates):
+        for i in range(args.instances):
+            service, instance = 'service%d' % (i // 10), 'instance%d' % (i % 10)
+            bounce_by = start + args.spread_secs * i / args.instances
+            due_at.setdefault((service, instance), max(time.time(), bounce_by))
+            inbox_q.put(ServiceInstance(
+                service=service,
+                instance=instance,
+                cluster=CLUSTER,
+                watcher='benchmark',
+                bounce_by=bounce_by,
+                priority=0,
+            ))
+    enqueued = time.time()
+
+    if not fake_marathon.done.wait(args.timeout):
+        paasta_print("Timed out: only %d of %d service instances were bounced in %ds" % (
+            len(fake_marathon.bounced_at), args.instances, args.timeout,
+        ))
+        return 1
+    finished = time.time()
+
+    latencies = sorted(
+        fake_marathon.bounced_at[service_instance] - due_at[service_instance]
+        for service_instance in fake_marathon.bounced_at
+    )
+    stats = inbox.get_stats()
+    paasta_print("Enqueued %d service instances in %.2fs" % (args.instances * args.duplicates, enqueued - start))
+    paasta_print("Bounced %d service instances in %.2fs (%.0f/s)" % (
+        args.instances, finished - start, args.instances / (finished - start),
+    ))
+    paasta_print("Latency from due to bounced: p50 %.3fs, p90 %.3fs, p99 %.3fs, max %.3fs" % (
+        percentile(latencies, 50), percentile(latencies, 90), percentile(latencies, 99), latencies[-1],
+    ))
+    paasta_print("Events dropped: %d, coalesced: %d" % (stats.dropped, stats.coalesced))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
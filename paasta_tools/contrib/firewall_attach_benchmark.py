@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Benchmark of attaching new containers to their service chain under concurrent
+launches, through the firewall daemon and through the fallback of
+docker_wrapper that updates iptables itself.
+
+iptables is faked: building a service chain and inserting a dispatch rule only
+sleep for the given times, under a lock standing for the firewall flock. The
+daemon is run in this process, and each launch is a thread, so the time the
+fallback spends importing iptc and loading soa-configs and the system config
+in every docker_wrapper process is not counted here.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from paasta_tools import docker_wrapper
+from paasta_tools import firewall
+from paasta_tools import firewall_client
+from paasta_tools.firewall_update import AttachServer
+from paasta_tools.firewall_update import ServiceChainPreparer
+from paasta_tools.utils import paasta_print
+
+
+def fake_iptables(chain_secs, dispatch_secs):
+    lock = threading.Lock()
+
+    @contextmanager
+    def firewall_flock():
+        with lock:
+            yield
+
+    firewall.firewall_flock = firewall_flock
+    firewall.ensure_shared_chains = lambda: time.sleep(chain_secs)
+    firewall.ServiceGroup.update_rules = lambda self, soa_dir, synapse_service_dir: time.sleep(chain_secs)
+    firewall.dispatch_to_service_group = lambda service_group, mac: time.sleep(dispatch_secs)
+    firewall.active_service_groups = lambda: {}
+
+
+def percentile(sorted_values, percent):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))]
+
+
+def time_launches(attach, concurrency, launches, services):
+    latencies = []
+    lock = threading.Lock()
+
+    def launch(thread_index):
+        for i in range(launches):
+            service = 'service%d' % ((thread_index * launches + i) % services)
+            mac = '02:52:00:00:%02x:%02x' % (thread_index, i % 256)
+            start = time.time()
+            attach(service, 'main', mac)
+            with lock:
+                latencies.append(time.time() - start)
+
+    threads = [threading.Thread(target=launch, args=(i,)) for i in range(concurrency)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.time() - start, sorted(latencies)
+
+
+def print_latencies(name, elapsed, latencies):
+    paasta_print("%s: %d launches in %.2fs, latency p50 %.1fms p99 %.1fms max %.1fms" % (
+        name, len(latencies), elapsed,
+        percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000, latencies[-1] * 1000,
+    ))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--concurrency', type=int, default=20, help="Number of containers launched at once")
+    parser.add_argument('--launches', type=int, default=10, help="Number of launches of each concurrent launcher")
+    parser.add_argument('--services', type=int, default=5, help="Number of services the containers belong to")
+    parser.add_argument(
+        '--chain-ms', type=float, default=50,
+        help="Time building the shared chains or the chain of a service takes, in milliseconds",
+    )
+    parser.add_argument(
+        '--dispatch-ms', type=float, default=2,
+        help="Time inserting the dispatch rule of a container takes, in milliseconds",
+    )
+    parser.add_argument('--skip-fallback', action='store_true', help="Don't time the fallback of docker_wrapper")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    fake_iptables(args.chain_ms / 1000, args.dispatch_ms / 1000)
+
+    socket_path = os.path.join(tempfile.mkdtemp(), 'firewall.sock')
+    server = AttachServer(socket_path, ServiceChainPreparer('/nail/soa', '/nail/synapse', prepare_secs=60))
+    server.timeout = None
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    try:
+        elapsed, latencies = time_launches(
+            lambda service, instance, mac: firewall_client.attach_container(
+                service, instance, mac, socket_path=socket_path, timeout=600,
+            ),
+            args.concurrency, args.launches, args.services,
+        )
+        print_latencies("Through the firewall daemon", elapsed, latencies)
+    finally:
+        server.shutdown()
+        server.server_close()
+        os.unlink(socket_path)
+
+    if not args.skip_fallback:
+        elapsed, latencies = time_launches(
+            docker_wrapper.prepare_new_container, args.concurrency, args.launches, args.services,
+        )
+        print_latencies("With the docker_wrapper fallback", elapsed, latencies)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
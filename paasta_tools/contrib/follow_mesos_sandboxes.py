@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Follows the stdout and stderr of the running tasks of a service instance, from
+their Mesos sandboxes, like tail -f would. This works on clusters that don't
+ship the output of tasks anywhere, where paasta logs has nothing to show.
+
+Tasks started while following, like the ones replacing restarted tasks, are
+followed from their start.
+"""
+import argparse
+import logging
+
+from paasta_tools.marathon_tools import format_job_id
+from paasta_tools.mesos.follow import Follower
+from paasta_tools.mesos_tools import get_running_tasks_from_frameworks
+from paasta_tools.mesos_tools import STDSTREAMS
+from paasta_tools.utils import paasta_print
+from paasta_tools.utils import PaastaColors
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('-s', '--service', required=True, help="Service to follow the tasks of")
+    parser.add_argument('-i', '--instance', required=True, help="Instance to follow the tasks of")
+    parser.add_argument(
+        '-f', '--file', dest='files', action='append', default=None,
+        help="File of the sandboxes to follow, can be given more than once. Defaults to stdout and stderr",
+    )
+    parser.add_argument(
+        '--refresh-secs', type=float, default=10,
+        help="Look for new tasks every this many seconds",
+    )
+    parser.add_argument('-v', '--verbose', action='store_true')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    job_id = format_job_id(args.service, args.instance)
+
+    with Follower() as follower:
+        try:
+            for (task_id, path), line in follower.follow_tasks(
+                get_tasks=lambda: get_running_tasks_from_frameworks(job_id),
+                paths=args.files or STDSTREAMS,
+                refresh_interval=args.refresh_secs,
+            ):
+                paasta_print('%s %s' % (PaastaColors.blue('%s %s:' % (task_id, path)), line))
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Benchmark of mesos_tools.get_mesos_task_count_by_slave, which the autoscaler
+and the maintenance tools use to count the running tasks of every slave, on a
+synthetic Mesos state.
+
+The Mesos master is faked with a MesosMaster whose state and frameworks are
+already fetched, so this measures the counting itself. The same count is also
+run with the slaves and frameworks looked up by scanning every slave and
+framework of the state for each task, as the master used to do, for
+comparison.
+"""
+import argparse
+import time
+
+from paasta_tools import mesos_tools
+from paasta_tools.mesos import slave
+from paasta_tools.mesos.master import MesosMaster
+from paasta_tools.utils import paasta_print
+
+
+class ScanningMesosMaster(MesosMaster):
+    def slave(self, fltr):
+        return [slave.MesosSlave(self.config, x) for x in self.state['slaves'] if x['id'] == fltr][0]
+
+    def framework(self, fwid):
+        return [f for f in self.frameworks() if f.id == fwid][0]
+
+
+def build_state(num_tasks, num_slaves, num_frameworks):
+    slaves = [
+        {'id': 'slave%d' % i, 'hostname': 'host%d' % i, 'attributes': {'pool': 'default'}}
+        for i in range(num_slaves)
+    ]
+    frameworks = [
+        {
+            'id': 'framework%d' % i,
+            'name': mesos_tools.CHRONOS_FRAMEWORK_NAME if i == 0 else 'marathon%d' % i,
+            'tasks': [],
+            'completed_tasks': [],
+        }
+        for i in range(num_frameworks)
+    ]
+    for i in range(num_tasks):
+        frameworks[i % num_frameworks]['tasks'].append({
+            'id': 'service%d.main.git1.config1.uuid%d' % (i % 100, i),
+            'slave_id': slaves[i % num_slaves]['id'],
+            'framework_id': frameworks[i % num_frameworks]['id'],
+            'state': 'TASK_RUNNING',
+        })
+    state = {'slaves': slaves, 'frameworks': frameworks, 'completed_frameworks': [], 'orphan_tasks': []}
+    return state
+
+
+def fake_master(master_class, state):
+    master = master_class({})
+    now = time.time()
+    master._cache = {
+        'state': (state, now),
+        '_frameworks': ({'frameworks': state['frameworks'], 'completed_frameworks': []}, now),
+    }
+    return master
+
+
+def time_count(master, state, repeat):
+    mesos_tools.get_mesos_master = lambda **overrides: master
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        counts = mesos_tools.get_mesos_task_count_by_slave(state)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, counts
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--tasks', type=int, default=50000, help="Number of running tasks")
+    parser.add_argument('--slaves', type=int, default=2000, help="Number of slaves")
+    parser.add_argument('--frameworks', type=int, default=20, help="Number of frameworks")
+    parser.add_argument('--repeat', type=int, default=3, help="Keep the best time of this many runs")
+    parser.add_argument('--skip-scan', action='store_true', help="Don't time the count with scanning lookups")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    state = build_state(args.tasks, args.slaves, args.frameworks)
+
+    elapsed, counts = time_count(fake_master(MesosMaster, state), state, args.repeat)
+    paasta_print("Counted %d tasks on %d slaves in %.3fs with indexed lookups" % (
+        sum(c['task_counts'].count for c in counts), len(counts), elapsed,
+    ))
+    if not args.skip_scan:
+        scan_elapsed, scan_counts = time_count(fake_master(ScanningMesosMaster, state), state, 1)
+        assert scan_counts == counts
+        paasta_print("Counted them in %.3fs with scanning lookups (%.0fx slower)" % (
+            scan_elapsed, scan_elapsed / elapsed,
+        ))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+Benchmark of mesos_tools.get_task, which paasta-api uses to look a task up by
+id, on a synthetic Mesos state.
+
+The Mesos master is faked with a MesosMaster whose frameworks are already
+fetched, so this measures the lookups themselves. The lookups share the
+master of get_task_lookup_master, which builds its task index once per fetch
+of the frameworks. They are also timed with a new master per lookup, which
+builds a new index every time, and with a scan of every task per lookup, as
+get_task used to do, for comparison.
+"""
+import argparse
+import random
+import time
+
+from paasta_tools import mesos_tools
+from paasta_tools.mesos.master import MesosMaster
+from paasta_tools.utils import paasta_print
+
+
+def build_frameworks(num_tasks, num_frameworks):
+    frameworks = [
+        {'id': 'framework%d' % i, 'name': 'marathon%d' % i, 'tasks': [], 'completed_tasks': []}
+        for i in range(num_frameworks)
+    ]
+    for i in range(num_tasks):
+        frameworks[i % num_frameworks]['tasks'].append({
+            'id': 'service%d.main.git1.config1.uuid%d' % (i % 500, i),
+            'slave_id': 'slave%d' % (i % 2000),
+            'framework_id': frameworks[i % num_frameworks]['id'],
+            'state': 'TASK_RUNNING',
+        })
+    return {'frameworks': frameworks, 'completed_frameworks': []}
+
+
+def fake_master(frameworks):
+    master = MesosMaster({})
+    master._cache = {'_frameworks': (frameworks, time.time())}
+    return master
+
+
+def scan_get_task(task_id, app_id=''):
+    tasks = mesos_tools.filter_running_tasks(
+        x for x in mesos_tools.get_task_lookup_master()._task_list() if x['id'] == task_id and app_id in x['id']
+    )
+    if len(tasks) != 1:
+        raise mesos_tools.TaskNotFound(task_id)
+    return tasks[0]
+
+
+def time_lookups(get_master, get_task, task_ids):
+    mesos_tools.get_task_lookup_master = get_master
+    start = time.time()
+    for task_id in task_ids:
+        get_task(task_id, app_id=task_id.split('.')[0])
+    return (time.time() - start) / len(task_ids)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--tasks', type=int, default=50000, help="Number of running tasks")
+    parser.add_argument('--frameworks', type=int, default=20, help="Number of frameworks")
+    parser.add_argument(
+        '--lookups', type=int, default=100,
+        help="Number of lookups per fetch of the frameworks, which the master keeps for 15s",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    frameworks = build_frameworks(args.tasks, args.frameworks)
+    tasks = [x for f in frameworks['frameworks'] for x in f['tasks']]
+    task_ids = [x['id'] for x in random.sample(tasks, args.lookups)]
+
+    shared_master = fake_master(frameworks)
+    shared = time_lookups(lambda: shared_master, mesos_tools.get_task, task_ids)
+    paasta_print("%d lookups took %.2fms each with a shared master" % (args.lookups, shared * 1000))
+    fresh = time_lookups(lambda: fake_master(frameworks), mesos_tools.get_task, task_ids)
+    paasta_print("They took %.2fms each with a new master per lookup (%.1fx as long)" % (
+        fresh * 1000, fresh / shared,
+    ))
+    scan = time_lookups(lambda: fake_master(frameworks), scan_get_task, task_ids)
+    paasta_print("They took %.2fms each with a scan per lookup (%.1fx as long)" % (scan * 1000, scan / shared))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,15 +1,21 @@
 import logging
 import time
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from queue import PriorityQueue
 from queue import Queue
 from threading import Thread
 from typing import Any
+from typing import Callable
 from typing import Collection
+from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Set
 from typing import Tuple
 
+import service_configuration_lib
+
 from paasta_tools.marathon_tools import DEFAULT_SOA_DIR
 from paasta_tools.marathon_tools import get_all_marathon_apps
 from paasta_tools.marathon_tools import get_marathon_clients
@@ -17,11 +23,15 @@ from paasta_tools.marathon_tools import get_marathon_servers
 from paasta_tools.marathon_tools import load_marathon_service_config
 from paasta_tools.marathon_tools import load_marathon_service_config_no_cache
 from paasta_tools.marathon_tools import MarathonClients
+from paasta_tools.marathon_tools import MarathonServiceConfig
+from paasta_tools.secret_tools import is_secret_ref
 from paasta_tools.utils import InvalidJobNameError
 from paasta_tools.utils import load_system_paasta_config
 from paasta_tools.utils import NoConfigurationForServiceError
 from paasta_tools.utils import NoDeploymentsAvailable
 from paasta_tools.utils import NoDockerImageError
+from paasta_tools.utils import SystemPaastaConfig
+from paasta_tools.utils import SystemPaastaConfigDict
 
 BounceTimers = namedtuple('BounceTimers', ['processed_by_worker', 'setup_marathon', 'bounce_length'])
 BaseServiceInstance = namedtuple(
@@ -98,7 +108,7 @@ class PaastaQueue(Queue):
         return logging.getLogger(name)
 
     def put(self, item: Any, *args: Any, **kwargs: Any) -> None:
-        self.log.debug("Adding {} to {} queue".format(item, self.name))
+        self.log.debug("Adding %s to %s queue", item, self.name)
         super(PaastaQueue, self).put(item, *args, **kwargs)
 
 
@@ -116,7 +126,7 @@ class PaastaPriorityQueue(PriorityQueue):
 
     # ignored because https://github.com/python/mypy/issues/1237
     def put(self, priority: float, item: Any, *args: Any, **kwargs: Any) -> None:  # type: ignore
-        self.log.debug("Adding {} to {} queue with priority {}".format(item, self.name, priority))
+        self.log.debug("Adding %s to %s queue with priority %s", item, self.name, priority)
         # this counter is to preserve the FIFO nature of the queue, it increments on every put
         # and the python PriorityQueue sorts based on the first item in the tuple (priority)
         # and then the second item in the tuple (counter). This way all items with the same
@@ -128,6 +138,89 @@ class PaastaPriorityQueue(PriorityQueue):
         return super(PaastaPriorityQueue, self).get(*args, **kwargs)[2]
 
 
+class TimerWheel(object):
+    """Hashed timer wheel of keys to fire at a deadline.
+
+    Keys are hashed by their deadline into one of `slots` buckets of `tick`
+    seconds, so scheduling and cancelling are O(1) and popping the expired
+    keys only visits the buckets of the ticks that passed since the last pop
+    (and the keys in them that are due in a later turn of the wheel).
+    """
+
+    def __init__(self, tick: float=1.0, slots: int=512) -> None:
+        self.tick = tick
+        self.slots: List[Set[Any]] = [set() for _ in range(slots)]
+        self.deadlines: Dict[Any, Tuple[float, int]] = {}
+        self.current_tick: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.deadlines)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self.deadlines
+
+    def get_deadline(self, key: Any) -> Optional[float]:
+        if key not in self.deadlines:
+            return None
+        return self.deadlines[key][0]
+
+    def schedule(self, key: Any, deadline: float) -> None:
+        """Schedules key to fire at deadline, replacing its previous deadline"""
+        self.cancel(key)
+        deadline_tick = int(deadline // self.tick)
+        if self.current_tick is not None:
+            deadline_tick = max(deadline_tick, self.current_tick)
+        slot = deadline_tick % len(self.slots)
+        self.deadlines[key] = (deadline, slot)
+        self.slots[slot].add(key)
+
+    def cancel(self, key: Any) -> None:
+        if key in self.deadlines:
+            _, slot = self.deadlines.pop(key)
+            self.slots[slot].discard(key)
+
+    def next_deadline(self) -> Optional[float]:
+        """The earliest deadline, found by walking the slots from the current tick"""
+        if not self.deadlines:
+            return None
+        if self.current_tick is None:
+            return min(deadline for deadline, _ in self.deadlines.values())
+        for tick in range(self.current_tick, self.current_tick + len(self.slots)):
+            slot = self.slots[tick % len(self.slots)]
+            deadlines = [
+                self.deadlines[key][0] for key in slot
+                if self.deadlines[key][0] < (tick + 1) * self.tick
+            ]
+            if deadlines:
+                return min(deadlines)
+        # every key is due in a later turn of the wheel
+        return min(deadline for deadline, _ in self.deadlines.values())
+
+    def pop_expired(self, now: float) -> List[Any]:
+        """Removes and returns the keys whose deadline is at or before now,
+        earliest deadline first"""
+        now_tick = int(now // self.tick)
+        if (
+            self.current_tick is None or
+            now_tick < self.current_tick or
+            now_tick - self.current_tick >= len(self.slots)
+        ):
+            # first pop, the clock went backwards, or a whole turn passed
+            ticks = range(len(self.slots))
+        else:
+            ticks = range(self.current_tick, now_tick + 1)
+        expired = [
+            (self.deadlines[key][0], key)
+            for tick in ticks
+            for key in self.slots[tick % len(self.slots)]
+            if self.deadlines[key][0] <= now
+        ]
+        for _, key in expired:
+            self.cancel(key)
+        self.current_tick = now_tick
+        return [key for _, key in sorted(expired, key=lambda deadline_key: deadline_key[0])]
+
+
 def rate_limit_instances(
     instances: Collection[Tuple[str, str]],
     cluster: str,
@@ -162,18 +255,91 @@ def exponential_back_off(failures: int, factor: float, base: float, max_time: fl
     return seconds if seconds < max_time else max_time
 
 
+MarathonConfigFilter = Callable[[MarathonServiceConfig], bool]
+
+
+def affects_all_instances(config: MarathonServiceConfig) -> bool:
+    return True
+
+
+def uses_default_constraints(config: MarathonServiceConfig) -> bool:
+    return config.get_constraints() is None
+
+
+def uses_default_docker_registry(config: MarathonServiceConfig) -> bool:
+    service_configuration = service_configuration_lib.read_service_configuration(config.service, config.soa_dir)
+    return 'docker_registry' not in service_configuration
+
+
+def uses_secrets(config: MarathonServiceConfig) -> bool:
+    return any(is_secret_ref(value) for value in config.config_dict.get('env', {}).values())
+
+
+# The system paasta config keys format_marathon_app_dict reads, and which
+# instances each of them can give a new marathon app. Any other known key of
+# the system paasta config can't change a marathon app.
+SYSTEM_CONFIG_KEYS_AFFECTING_MARATHON_APPS: Dict[str, MarathonConfigFilter] = {
+    'cluster': affects_all_instances,
+    'volumes': affects_all_instances,
+    'dockercfg_location': affects_all_instances,
+    'use_mesos_healthchecks': affects_all_instances,
+    'docker_registry': uses_default_docker_registry,
+    'vault_environment': uses_secrets,
+    'deploy_blacklist': uses_default_constraints,
+    'deploy_whitelist': uses_default_constraints,
+    'expected_slave_attributes': uses_default_constraints,
+    'auto_hostname_unique_size': uses_default_constraints,
+}
+
+
+def get_changed_system_config_keys(old: SystemPaastaConfig, new: SystemPaastaConfig) -> Set[str]:
+    old_config = old.config_dict
+    new_config = new.config_dict
+    return {
+        key for key in set(old_config) | set(new_config)
+        if old_config.get(key) != new_config.get(key)
+    }
+
+
+def get_marathon_config_filter_for_keys(changed_keys: Collection[str]) -> Optional[MarathonConfigFilter]:
+    """Returns a filter of the marathon instances whose app may change when the
+    given system paasta config keys change, or None if no app can change.
+
+    Keys this version of paasta doesn't know about are assumed to affect every
+    instance.
+    """
+    filters = set()
+    for key in changed_keys:
+        if key in SYSTEM_CONFIG_KEYS_AFFECTING_MARATHON_APPS:
+            filters.add(SYSTEM_CONFIG_KEYS_AFFECTING_MARATHON_APPS[key])
+        elif key not in SystemPaastaConfigDict.__annotations__:
+            filters.add(affects_all_instances)
+    if not filters:
+        return None
+    if affects_all_instances in filters:
+        return affects_all_instances
+    return lambda config: any(config_filter(config) for config_filter in filters)
+
+
 def get_service_instances_needing_update(
     marathon_clients: MarathonClients,
     instances: Collection[Tuple[str, str]],
     cluster: str,
+    config_filter: Optional[MarathonConfigFilter]=None,
+    max_workers: int=1,
 ) -> List[Tuple[str, str]]:
+    """Returns the instances whose marathon app id or instance count doesn't
+    match any marathon app.
+
+    :param config_filter: if set, only the instances it returns True for are checked
+    :param max_workers: the number of threads formatting marathon apps
+    """
     marathon_apps = {}
     for marathon_client in marathon_clients.get_all_clients():
         marathon_apps.update({app.id: app for app in get_all_marathon_apps(marathon_client)})
 
-    marathon_app_ids = marathon_apps.keys()
-    service_instances = []
-    for service, instance in instances:
+    def needs_update(service_instance: Tuple[str, str]) -> bool:
+        service, instance = service_instance
         try:
             config = load_marathon_service_config_no_cache(
                 service=service,
@@ -181,16 +347,23 @@ def get_service_instances_needing_update(
                 cluster=cluster,
                 soa_dir=DEFAULT_SOA_DIR,
             )
+            if config_filter is not None and not config_filter(config):
+                return False
             config_app = config.format_marathon_app_dict()
             app_id = '/{}'.format(config_app['id'])
         except (NoDockerImageError, InvalidJobNameError, NoDeploymentsAvailable) as e:
             print("DEBUG: Skipping %s.%s because: '%s'" % (service, instance, str(e)))
-            continue
-        if app_id not in marathon_app_ids:
-            service_instances.append((service, instance))
-        elif marathon_apps[app_id].instances != config_app['instances']:
-            service_instances.append((service, instance))
-    return service_instances
+            return False
+        if app_id not in marathon_apps:
+            return True
+        return marathon_apps[app_id].instances != config_app['instances']
+
+    if max_workers > 1 and len(instances) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(instances))) as executor:
+            results = list(executor.map(needs_update, instances))
+    else:
+        results = [needs_update(service_instance) for service_instance in instances]
+    return [service_instance for service_instance, result in zip(instances, results) if result]
 
 
 def get_marathon_clients_from_config() -> MarathonClients:
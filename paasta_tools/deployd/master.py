@@ -4,11 +4,14 @@ import logging
 import logging.handlers
 import socket
 import sys
+import threading
 import time
+from collections import namedtuple
 from queue import Empty
 
 import service_configuration_lib
 
+from paasta_tools.config_hash_cache import enable_config_hash_cache
 from paasta_tools.deployd import watchers
 from paasta_tools.deployd.common import get_marathon_clients_from_config
 from paasta_tools.deployd.common import PaastaPriorityQueue
@@ -16,6 +19,7 @@ from paasta_tools.deployd.common import PaastaQueue
 from paasta_tools.deployd.common import PaastaThread
 from paasta_tools.deployd.common import rate_limit_instances
 from paasta_tools.deployd.common import ServiceInstance
+from paasta_tools.deployd.common import TimerWheel
 from paasta_tools.deployd.leader import PaastaLeaderElection
 from paasta_tools.deployd.metrics import QueueMetrics
 from paasta_tools.deployd.workers import PaastaDeployWorker
@@ -58,61 +62,154 @@ class DedupedPriorityQueue(PaastaPriorityQueue):
         return service_instance
 
 
+# The most service instances the inbox handles before checking for due bounces
+INBOX_BATCH_SIZE = 1000
+INBOX_MAX_WAIT_SECS = 1.0
+
+InboxStats = namedtuple(
+    'InboxStats', ['scheduled', 'queued', 'in_flight', 'coalesced', 'dropped', 'oldest_queued_age'],
+)
+
+
 class Inbox(PaastaThread):
+    """Turns the service instances watchers and workers put in the inbox queue
+    into bounces, keeping track of the state of each service instance:
+
+    - idle: nothing to do
+    - scheduled: waiting in to_bounce and the timer wheel for its bounce_by
+    - queued: due, waiting in the bounce queue for a worker
+    - in flight: being bounced by a worker
+
+    A service instance is in the bounce queue or in the hands of a worker at
+    most once. Events for a queued service instance are dropped, as the
+    worker hasn't read its config yet, and events for a service instance in
+    flight are coalesced into a single follow up, scheduled once the worker
+    is done with it.
+    """
+
     def __init__(self, inbox_q, bounce_q):
         super(Inbox, self).__init__()
         self.daemon = True
         self.name = "Inbox"
         self.inbox_q = inbox_q
         self.bounce_q = bounce_q
+        self.lock = threading.Lock()
         self.to_bounce = {}
+        self.timer_wheel = TimerWheel()
+        self.queued = {}
+        self.in_flight = {}
+        self.coalesced = 0
+        self.dropped = 0
 
     def run(self):
         while True:
             self.process_inbox()
 
     def process_inbox(self):
+        """Waits for service instances to arrive in the inbox queue, or for the
+        next scheduled bounce to be due, then handles every service instance in
+        the queue (up to INBOX_BATCH_SIZE) before moving the due ones to the
+        bounce queue."""
         try:
-            service_instance = self.inbox_q.get(block=False)
+            service_instances = [self.inbox_q.get(timeout=self.get_wait_timeout())]
         except Empty:
-            service_instance = None
-        if service_instance:
-            self.log.debug("Processing {}.{} to see if we need to add it "
-                           "to bounce queue".format(
-                               service_instance.service,
-                               service_instance.instance,
-                           ))
+            service_instances = []
+        while service_instances and len(service_instances) < INBOX_BATCH_SIZE:
+            try:
+                service_instances.append(self.inbox_q.get(block=False))
+            except Empty:
+                break
+        if service_instances:
+            self.log.debug("Processing %d service instances to see if we need to add them to bounce queue" % (
+                len(service_instances),
+            ))
+        for service_instance in service_instances:
             self.process_service_instance(service_instance)
-        if self.inbox_q.empty() and self.to_bounce:
+        if self.to_bounce:
             self.process_to_bounce()
-        time.sleep(0.1)
+
+    def get_wait_timeout(self):
+        """Seconds until the next scheduled bounce is due, at most
+        INBOX_MAX_WAIT_SECS so that bounces workers schedule when they are done
+        are picked up in time"""
+        with self.lock:
+            next_deadline = self.timer_wheel.next_deadline()
+        if next_deadline is None:
+            return INBOX_MAX_WAIT_SECS
+        return min(max(next_deadline - time.time(), 0), INBOX_MAX_WAIT_SECS)
 
     def process_service_instance(self, service_instance):
         service_instance_key = "{}.{}".format(service_instance.service, service_instance.instance)
-        if self.should_add_to_bounce(service_instance, service_instance_key):
-            self.log.info("Enqueuing {} to be bounced in the future".format(service_instance))
-            self.to_bounce[service_instance_key] = service_instance
+        with self.lock:
+            if service_instance_key in self.queued:
+                self.log.debug("%s already in bounce queue, dropping", service_instance)
+                self.dropped += 1
+            elif service_instance_key in self.in_flight:
+                follow_up = self.in_flight[service_instance_key]
+                if follow_up is None or service_instance.bounce_by < follow_up.bounce_by:
+                    self.in_flight[service_instance_key] = service_instance
+                self.log.debug("%s is being bounced, bouncing it again once done", service_instance)
+                self.coalesced += 1
+            elif self.should_add_to_bounce(service_instance, service_instance_key):
+                self.log.info("Enqueuing {} to be bounced in the future".format(service_instance))
+                self.schedule(service_instance_key, service_instance)
 
     def should_add_to_bounce(self, service_instance, service_instance_key):
         if service_instance_key in self.to_bounce:
             if service_instance.bounce_by > self.to_bounce[service_instance_key].bounce_by:
-                self.log.debug("{} already in bounce queue with higher priority".format(service_instance))
+                self.log.debug("%s already in bounce queue with higher priority", service_instance)
                 return False
         return True
 
+    def schedule(self, service_instance_key, service_instance):
+        self.to_bounce[service_instance_key] = service_instance
+        self.timer_wheel.schedule(service_instance_key, service_instance.bounce_by)
+
     def process_to_bounce(self):
-        bounced = []
-        self.log.debug("Processing %d bounce queue entries..." % len(self.to_bounce.keys()))
-        for service_instance_key in self.to_bounce.keys():
-            if self.to_bounce[service_instance_key].bounce_by < int(time.time()):
-                service_instance = self.to_bounce[service_instance_key]
-                bounced.append(service_instance_key)
+        now = time.time()
+        with self.lock:
+            due = self.timer_wheel.pop_expired(now)
+            self.log.debug("Moving %d of %d scheduled service instances to the bounce queue" % (
+                len(due), len(self.to_bounce),
+            ))
+            for service_instance_key in due:
+                service_instance = self.to_bounce.pop(service_instance_key)
+                self.queued[service_instance_key] = now
                 self.bounce_q.put(service_instance.priority, service_instance)
-        for service_instance_key in bounced:
-            self.to_bounce.pop(service_instance_key)
         # TODO: if the bounceq is empty we could probably start adding SIs from
         # self.to_bounce to make sure the workers always have something to do.
 
+    def start_bounce(self, service_instance):
+        """Called by a worker when it takes service_instance off the bounce queue"""
+        service_instance_key = "{}.{}".format(service_instance.service, service_instance.instance)
+        with self.lock:
+            self.queued.pop(service_instance_key, None)
+            self.in_flight[service_instance_key] = None
+
+    def finish_bounce(self, service_instance, bounce_again=None):
+        """Called by a worker once done with service_instance, with the service
+        instance to bounce again if it isn't in its steady state yet. This is
+        scheduled along with any event received during the bounce, whichever
+        is due first."""
+        service_instance_key = "{}.{}".format(service_instance.service, service_instance.instance)
+        with self.lock:
+            follow_up = self.in_flight.pop(service_instance_key, None)
+            candidates = [si for si in (bounce_again, follow_up) if si is not None]
+            if candidates:
+                self.schedule(service_instance_key, min(candidates, key=lambda si: si.bounce_by))
+
+    def get_stats(self):
+        with self.lock:
+            oldest_queued_age = time.time() - min(self.queued.values()) if self.queued else 0
+            return InboxStats(
+                scheduled=len(self.to_bounce),
+                queued=len(self.queued),
+                in_flight=len(self.in_flight),
+                coalesced=self.coalesced,
+                dropped=self.dropped,
+                oldest_queued_age=oldest_queued_age,
+            )
+
 
 class AddHostnameFilter(logging.Filter):
     def __init__(self):
@@ -129,6 +226,7 @@ class DeployDaemon(PaastaThread):
         self.started = False
         self.daemon = True
         service_configuration_lib.disable_yaml_cache()
+        enable_config_hash_cache()
         self.config = load_system_paasta_config()
         self.setup_logging()
         self.bounce_q = DedupedPriorityQueue("BounceQueue")
@@ -220,7 +318,9 @@ class DeployDaemon(PaastaThread):
         for i in range(number_of_dead_workers):
             self.log.error("Detected a dead worker, starting a replacement thread")
             worker_no = len(self.workers) + 1
-            worker = PaastaDeployWorker(worker_no, self.inbox_q, self.bounce_q, self.config, self.metrics)
+            worker = PaastaDeployWorker(
+                worker_no, self.inbox_q, self.bounce_q, self.config, self.metrics, inbox=self.inbox,
+            )
             worker.start()
             self.workers.append(worker)
 
@@ -230,7 +330,9 @@ class DeployDaemon(PaastaThread):
     def start_workers(self):
         self.workers = []
         for i in range(self.config.get_deployd_number_workers()):
-            worker = PaastaDeployWorker(i, self.inbox_q, self.bounce_q, self.config, self.metrics)
+            worker = PaastaDeployWorker(
+                i, self.inbox_q, self.bounce_q, self.config, self.metrics, inbox=self.inbox,
+            )
             worker.start()
             self.workers.append(worker)
 
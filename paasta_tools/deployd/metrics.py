@@ -8,16 +8,27 @@ class QueueMetrics(PaastaThread):
         super(QueueMetrics, self).__init__()
         self.daemon = True
         self.inbox_q = inbox.inbox_q
-        self.inbox = inbox.to_bounce
+        self.inbox = inbox
         self.bounce_q = bounce_q
         self.metrics = metrics_provider
         self.inbox_q_gauge = self.metrics.create_gauge("inbox_queue", paasta_cluster=cluster)
         self.inbox_gauge = self.metrics.create_gauge("inbox", paasta_cluster=cluster)
         self.bounce_q_gauge = self.metrics.create_gauge("bounce_queue", paasta_cluster=cluster)
+        self.in_flight_gauge = self.metrics.create_gauge("in_flight", paasta_cluster=cluster)
+        self.coalesced_gauge = self.metrics.create_gauge("coalesced_events", paasta_cluster=cluster)
+        self.dropped_gauge = self.metrics.create_gauge("dropped_events", paasta_cluster=cluster)
+        # how long the oldest service instance in the bounce queue has been
+        # waiting for a worker
+        self.bounce_q_latency_gauge = self.metrics.create_gauge("bounce_queue_latency", paasta_cluster=cluster)
 
     def run(self):
         while True:
+            stats = self.inbox.get_stats()
             self.inbox_q_gauge.set(self.inbox_q.qsize())
-            self.inbox_gauge.set(len(self.inbox.keys()))
+            self.inbox_gauge.set(stats.scheduled)
             self.bounce_q_gauge.set(self.bounce_q.qsize())
+            self.in_flight_gauge.set(stats.in_flight)
+            self.coalesced_gauge.set(stats.coalesced)
+            self.dropped_gauge.set(stats.dropped)
+            self.bounce_q_latency_gauge.set(stats.oldest_queued_age)
             time.sleep(20)
@@ -13,15 +13,17 @@ from kazoo.recipe.watchers import ChildrenWatch
 from kazoo.recipe.watchers import DataWatch
 from requests.exceptions import RequestException
 
+from paasta_tools.deployd.common import get_changed_system_config_keys
 from paasta_tools.deployd.common import get_marathon_clients_from_config
+from paasta_tools.deployd.common import get_marathon_config_filter_for_keys
 from paasta_tools.deployd.common import get_service_instances_needing_update
 from paasta_tools.deployd.common import PaastaThread
 from paasta_tools.deployd.common import rate_limit_instances
 from paasta_tools.deployd.common import ServiceInstance
 from paasta_tools.long_running_service_tools import AUTOSCALING_ZK_ROOT
 from paasta_tools.marathon_tools import DEFAULT_SOA_DIR
-from paasta_tools.marathon_tools import deformat_job_id
 from paasta_tools.marathon_tools import get_marathon_apps_with_clients
+from paasta_tools.marathon_tools import HostTaskIndex
 from paasta_tools.mesos_maintenance import get_draining_hosts
 from paasta_tools.utils import get_services_for_cluster
 from paasta_tools.utils import list_all_instances_for_service
@@ -159,6 +161,7 @@ class MaintenanceWatcher(PaastaWatcher):
         super(MaintenanceWatcher, self).__init__(inbox_q, cluster, config)
         self.draining: Set[str] = set()
         self.marathon_clients = get_marathon_clients_from_config()
+        self.host_task_index = HostTaskIndex()
 
     def get_new_draining_hosts(self):
         try:
@@ -191,31 +194,22 @@ class MaintenanceWatcher(PaastaWatcher):
             clients=self.marathon_clients.get_all_clients(),
             embed_tasks=True,
         )
-        at_risk_tasks = []
-        for app, client in marathon_apps_with_clients:
-            for task in app.tasks:
-                if task.host in draining_hosts:
-                    at_risk_tasks.append(task)
+        self.host_task_index.update(app for app, client in marathon_apps_with_clients)
+        at_risk_tasks = self.host_task_index.get_tasks_on_hosts(draining_hosts)
         self.log.info("At risk tasks: {}".format(at_risk_tasks))
-        service_instances: List[ServiceInstance] = []
-        for task in at_risk_tasks:
-            app_id = task.app_id.strip('/')
-            service, instance, _, __ = deformat_job_id(app_id)
-            # check we haven't already added this instance,
-            # no need to add the same instance to the bounce queue
-            # more than once
-            if not any([(service, instance) == (si.service, si.instance) for si in service_instances]):
-                # https://github.com/python/mypy/issues/2852
-                service_instances.append(ServiceInstance(  # type: ignore
-                    service=service,
-                    instance=instance,
-                    cluster=self.config.get_cluster(),
-                    bounce_by=int(time.time()),
-                    watcher=type(self).__name__,
-                    bounce_timers=None,
-                    failures=0,
-                ))
-        return service_instances
+        return [
+            # https://github.com/python/mypy/issues/2852
+            ServiceInstance(  # type: ignore
+                service=service,
+                instance=instance,
+                cluster=self.config.get_cluster(),
+                bounce_by=int(time.time()),
+                watcher=type(self).__name__,
+                bounce_timers=None,
+                failures=0,
+            )
+            for service, instance in sorted(at_risk_tasks)
+        ]
 
 
 class PublicConfigEventHandler(pyinotify.ProcessEvent):
@@ -249,20 +243,30 @@ class PublicConfigEventHandler(pyinotify.ProcessEvent):
             except ValueError:
                 self.log.error("Couldn't load public config, the JSON is invalid!")
                 return
+            changed_keys = get_changed_system_config_keys(self.public_config, new_config)
+            self.public_config = new_config
             service_instances: List[Tuple[str, str]] = []
-            if new_config != self.public_config:
-                self.log.info("Public config has changed, now checking if it affects any services config shas")
-                self.public_config = new_config
-                all_service_instances = get_services_for_cluster(
-                    cluster=self.public_config.get_cluster(),
-                    instance_type='marathon',
-                    soa_dir=DEFAULT_SOA_DIR,
-                )
-                service_instances = get_service_instances_needing_update(
-                    self.marathon_clients,
-                    all_service_instances,
-                    self.public_config.get_cluster(),
-                )
+            if changed_keys:
+                self.log.info("Public config keys {} have changed".format(', '.join(sorted(changed_keys))))
+                if changed_keys & {'marathon_servers', 'previous_marathon_servers'}:
+                    self.marathon_clients = get_marathon_clients_from_config()
+                config_filter = get_marathon_config_filter_for_keys(changed_keys)
+                if config_filter is None:
+                    self.log.info("None of the changed keys can affect service config shas")
+                else:
+                    self.log.info("Now checking if the changes affect any services config shas")
+                    all_service_instances = get_services_for_cluster(
+                        cluster=self.public_config.get_cluster(),
+                        instance_type='marathon',
+                        soa_dir=DEFAULT_SOA_DIR,
+                    )
+                    service_instances = get_service_instances_needing_update(
+                        self.marathon_clients,
+                        all_service_instances,
+                        self.public_config.get_cluster(),
+                        config_filter=config_filter,
+                        max_workers=self.public_config.get_deployd_number_workers(),
+                    )
             if service_instances:
                 self.log.info("Found config change affecting {} service instances, "
                               "now doing a staggered bounce".format(len(service_instances)))
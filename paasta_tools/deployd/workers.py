@@ -13,12 +13,16 @@ BounceResults = namedtuple('BounceResults', ['bounce_again_in_seconds', 'return_
 
 
 class PaastaDeployWorker(PaastaThread):
-    def __init__(self, worker_number, inbox_q, bounce_q, config, metrics_provider):
+    def __init__(self, worker_number, inbox_q, bounce_q, config, metrics_provider, inbox=None):
         super(PaastaDeployWorker, self).__init__()
         self.daemon = True
         self.name = "Worker{}".format(worker_number)
         self.inbox_q = inbox_q
         self.bounce_q = bounce_q
+        # when set, the Inbox tracking the state of each service instance is
+        # told when bounces start and finish instead of getting the service
+        # instances to bounce again through inbox_q
+        self.inbox = inbox
         self.metrics = metrics_provider
         self.config = config
         self.cluster = self.config.get_cluster()
@@ -64,6 +68,8 @@ class PaastaDeployWorker(PaastaThread):
         self.log.info("{} starting up".format(self.name))
         while True:
             service_instance = self.bounce_q.get()
+            if self.inbox is not None:
+                self.inbox.start_bounce(service_instance)
             try:
                 bounce_again_in_seconds, return_code, bounce_timers = self.process_service_instance(service_instance)
             except Exception as e:
@@ -80,8 +86,9 @@ class PaastaDeployWorker(PaastaThread):
                     base=2,
                     max_time=6000,
                 )
+            bounce_again = None
             if bounce_again_in_seconds:
-                service_instance = ServiceInstance(
+                bounce_again = ServiceInstance(
                     service=service_instance.service,
                     instance=service_instance.instance,
                     cluster=self.config.get_cluster(),
@@ -91,7 +98,10 @@ class PaastaDeployWorker(PaastaThread):
                     priority=service_instance.priority,
                     failures=failures,
                 )
-                self.inbox_q.put(service_instance)
+            if self.inbox is not None:
+                self.inbox.finish_bounce(service_instance, bounce_again)
+            elif bounce_again is not None:
+                self.inbox_q.put(bounce_again)
             time.sleep(0.1)
 
     def process_service_instance(self, service_instance):
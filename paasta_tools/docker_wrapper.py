@@ -20,14 +20,12 @@ import re
 import socket
 import sys
 
-from paasta_tools.firewall import DEFAULT_SYNAPSE_SERVICE_DIR
-from paasta_tools.firewall import firewall_flock
-from paasta_tools.firewall import prepare_new_container
-from paasta_tools.mac_address import reserve_unique_mac_address
-from paasta_tools.utils import DEFAULT_SOA_DIR
+from paasta_tools import firewall_client
+from paasta_tools.mac_address import DEFAULT_MAC_POOL_PATH
+from paasta_tools.mac_address import reserve_mac_address
 
 
-LOCK_DIRECTORY = '/var/lib/paasta/mac-address'
+MAC_POOL_PATH = DEFAULT_MAC_POOL_PATH
 ENV_MATCH_RE = re.compile('^(-\w*e\w*|--env(?P<file>-file)?)(=(?P<arg>\S.*))?$')
 MAX_HOSTNAME_LENGTH = 63
 
@@ -279,24 +277,41 @@ def append_cpuset_args(argv, env_args):
     return argv
 
 
+def prepare_new_container(service, instance, mac_address):
+    # Only imported when needed: loading iptc, soa-configs and the system config
+    # is what the firewall daemon saves us on every container launch
+    from paasta_tools.firewall import DEFAULT_SYNAPSE_SERVICE_DIR
+    from paasta_tools.firewall import firewall_flock
+    from paasta_tools.firewall import prepare_new_container
+    from paasta_tools.utils import DEFAULT_SOA_DIR
+
+    with firewall_flock():
+        prepare_new_container(
+            DEFAULT_SOA_DIR,
+            DEFAULT_SYNAPSE_SERVICE_DIR,
+            service,
+            instance,
+            mac_address,
+        )
+
+
 def add_firewall(argv, service, instance):
     output = ''
     try:
-        mac_address, lockfile = reserve_unique_mac_address(LOCK_DIRECTORY)
+        mac_address = reserve_mac_address(MAC_POOL_PATH)
     except Exception as e:
         output = 'Unable to add mac address: {}'.format(e)
     else:
         argv = add_argument(argv, '--mac-address={}'.format(mac_address))
         try:
-
-            with firewall_flock():
-                prepare_new_container(
-                    DEFAULT_SOA_DIR,
-                    DEFAULT_SYNAPSE_SERVICE_DIR,
-                    service,
-                    instance,
-                    mac_address,
-                )
+            try:
+                firewall_client.attach_container(service, instance, mac_address)
+            except (FileNotFoundError, ConnectionRefusedError, BlockingIOError):
+                # The firewall daemon is not running, or too busy to accept our
+                # request, update iptables ourselves. Not on a timeout: the
+                # daemon may still attach the container, and iptables would get
+                # its dispatch rule twice.
+                prepare_new_container(service, instance, mac_address)
         except Exception as e:
             output = 'Unable to add firewall rules: {}'.format(e)
 
@@ -543,6 +543,11 @@ def prepare_new_container(soa_dir, synapse_service_dir, service, instance, mac):
     ensure_shared_chains()  # probably already set, but just to be safe
     service_group = ServiceGroup(service, instance)
     service_group.update_rules(soa_dir, synapse_service_dir)
+    dispatch_to_service_group(service_group, mac)
+
+
+def dispatch_to_service_group(service_group, mac):
+    """Send the traffic of a MAC address through the (existing) chain of a service group"""
     iptables.insert_rule('PAASTA', dispatch_rule(service_group.chain_name, mac))
 
 
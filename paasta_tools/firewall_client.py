@@ -0,0 +1,59 @@
+"""
+Client of the firewall daemon (paasta_firewall_update daemon), which attaches
+new containers to their service chains over a Unix socket.
+
+This is on the container launch path of docker_wrapper, so it must only import
+from the standard library.
+"""
+import json
+import socket
+
+
+DEFAULT_FIREWALL_SOCKET_PATH = '/var/lib/paasta/firewall.sock'
+DEFAULT_FIREWALL_SOCKET_TIMEOUT_SECS = 5
+
+
+class FirewallDaemonError(Exception):
+    pass
+
+
+def encode_message(message):
+    """Messages are JSON objects, one per line"""
+    return json.dumps(message).encode('utf-8') + b'\n'
+
+
+def read_message(f):
+    line = f.readline()
+    if not line:
+        raise FirewallDaemonError('Connection closed before a message was received')
+    return json.loads(line.decode('utf-8'))
+
+
+def attach_container(
+    service,
+    instance,
+    mac,
+    socket_path=DEFAULT_FIREWALL_SOCKET_PATH,
+    timeout=DEFAULT_FIREWALL_SOCKET_TIMEOUT_SECS,
+):
+    """Asks the firewall daemon to send the traffic of the container with the
+    given MAC address through the chain of service.instance.
+
+    Raises FileNotFoundError or ConnectionRefusedError if the daemon is not
+    running, BlockingIOError if its queue of connections is full (the request
+    wasn't sent), socket.timeout if it didn't answer in time (it may still
+    attach the container), and FirewallDaemonError if it failed to update
+    iptables.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+        sock.sendall(encode_message({'service': service, 'instance': instance, 'mac': mac}))
+        with sock.makefile('rb') as f:
+            response = read_message(f)
+    finally:
+        sock.close()
+
+    if not response.get('ok'):
+        raise FirewallDaemonError(response.get('error', 'Unknown error'))
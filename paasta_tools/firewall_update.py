@@ -1,6 +1,7 @@
 import argparse
 import logging
 import os.path
+import socketserver
 import time
 from collections import defaultdict
 
@@ -9,6 +10,8 @@ from inotify.constants import IN_MODIFY
 from inotify.constants import IN_MOVED_TO
 
 from paasta_tools import firewall
+from paasta_tools import firewall_client
+from paasta_tools import mac_address
 from paasta_tools.cli.utils import get_instance_config
 from paasta_tools.utils import DEFAULT_SOA_DIR
 from paasta_tools.utils import load_system_paasta_config
@@ -17,6 +20,7 @@ from paasta_tools.utils import TimeoutError
 log = logging.getLogger(__name__)
 
 DEFAULT_UPDATE_SECS = 5
+DEFAULT_PREPARE_SECS = 60
 
 
 def parse_args(argv):
@@ -46,6 +50,22 @@ def parse_args(argv):
         default=DEFAULT_UPDATE_SECS, type=int,
         help="Poll for new containers every N secs (default %(default)s)",
     )
+    daemon_parser.add_argument(
+        '--socket-path', dest="socket_path",
+        default=firewall_client.DEFAULT_FIREWALL_SOCKET_PATH,
+        help=(
+            "Accept requests to attach new containers to their service chain on this "
+            "Unix socket, an empty string disables it (default %(default)s)"
+        ),
+    )
+    daemon_parser.add_argument(
+        '--prepare-secs', dest="prepare_secs",
+        default=DEFAULT_PREPARE_SECS, type=int,
+        help=(
+            "Rebuild the chains of the services running here every N secs, and reuse a "
+            "chain built less than N secs ago to attach a new container (default %(default)s)"
+        ),
+    )
 
     subparsers.add_parser(
         'cron', description=(
@@ -63,27 +83,130 @@ def setup_logging(verbose):
 
 
 def run_daemon(args):
-    # Main loop waiting on inotify file events
-    inotify = Inotify(block_duration_s=1)  # event_gen blocks for 1 second
+    # Main loop waiting on attach requests and on inotify file events
+    inotify = Inotify(block_duration_s=0)  # event_gen yields None as soon as there are no more events
     inotify.add_watch(args.synapse_service_dir.encode(), IN_MOVED_TO | IN_MODIFY)
+    inotify_events = inotify.event_gen()
     services_by_dependencies_time = 0
 
-    for event in inotify.event_gen():  # blocks for only up to 1 second at a time
+    preparer = ServiceChainPreparer(args.soa_dir, args.synapse_service_dir, args.prepare_secs)
+    server = AttachServer(args.socket_path, preparer) if args.socket_path else None
+
+    while True:
+        if server is not None:
+            server.handle_request()  # blocks for only up to 1 second
+        else:
+            time.sleep(1)
+
         if services_by_dependencies_time + args.update_secs < time.time():
             services_by_dependencies = smartstack_dependencies_of_running_firewalled_services(
                 soa_dir=args.soa_dir,
             )
             services_by_dependencies_time = time.time()
 
-        if event is None:
-            continue
+        if server is not None and preparer.prepared_time + args.prepare_secs < time.time():
+            preparer.prepare_running_service_groups()
+
+        for event in iter(lambda: next(inotify_events), None):
+            process_inotify_event(event, services_by_dependencies, args.soa_dir, args.synapse_service_dir)
+
+
+class ServiceChainPreparer(object):
+    """Keeps the chains of the services running here built, so that a new
+    container can be attached to the chain of its service by just adding its
+    dispatch rule. A chain is rebuilt when it is more than prepare_secs old.
+    """
+
+    def __init__(self, soa_dir, synapse_service_dir, prepare_secs):
+        self.soa_dir = soa_dir
+        self.synapse_service_dir = synapse_service_dir
+        self.prepare_secs = prepare_secs
+        self.prepared_time = 0
+        self.shared_chains_time = 0
+        self.service_group_times = {}
+
+    def _ensure_shared_chains(self):
+        if self.shared_chains_time + self.prepare_secs < time.time():
+            firewall.ensure_shared_chains()
+            self.shared_chains_time = time.time()
+
+    def _ensure_service_chain(self, service_group):
+        if self.service_group_times.get(service_group, 0) + self.prepare_secs < time.time():
+            service_group.update_rules(self.soa_dir, self.synapse_service_dir)
+            self.service_group_times[service_group] = time.time()
+
+    def prepare_running_service_groups(self):
+        self.prepared_time = time.time()
+        service_groups = firewall.active_service_groups()
+        self.service_group_times = {
+            service_group: prepared_at
+            for service_group, prepared_at in self.service_group_times.items()
+            if service_group in service_groups
+        }
+        try:
+            with firewall.firewall_flock():
+                self._ensure_shared_chains()
+                for service_group in service_groups:
+                    self._ensure_service_chain(service_group)
+        except TimeoutError as e:
+            log.error('Unable to prepare firewalls because time-out obtaining flock: {}'.format(e))
+
+    def attach(self, service, instance, mac):
+        service_group = firewall.ServiceGroup(service, instance)
+        with firewall.firewall_flock():
+            self._ensure_shared_chains()
+            self._ensure_service_chain(service_group)
+            firewall.dispatch_to_service_group(service_group, mac)
+        log.debug('Attached {} to {}'.format(mac, service_group.chain_name))
+
+
+class AttachRequestHandler(socketserver.StreamRequestHandler):
+    timeout = firewall_client.DEFAULT_FIREWALL_SOCKET_TIMEOUT_SECS
+
+    def handle(self):
+        try:
+            request = firewall_client.read_message(self.rfile)
+            self.server.preparer.attach(request['service'], request['instance'], request['mac'])
+            response = {'ok': True}
+        except Exception as e:
+            log.exception('Unable to attach a container')
+            response = {'ok': False, 'error': str(e)}
+        self.wfile.write(firewall_client.encode_message(response))
+
 
-        process_inotify_event(event, services_by_dependencies, args.soa_dir, args.synapse_service_dir)
+class AttachServer(socketserver.UnixStreamServer):
+    """Serves requests to attach new containers to their service chain, one at a
+    time from the main loop of the daemon."""
+    timeout = 1
+    # Containers launched at once wait in this queue rather than see their
+    # connection refused
+    request_queue_size = 128
+
+    def __init__(self, socket_path, preparer):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super(AttachServer, self).__init__(socket_path, AttachRequestHandler)
+        self.preparer = preparer
 
 
 def run_cron(args):
     with firewall.firewall_flock():
         firewall.general_update(args.soa_dir, args.synapse_service_dir)
+    garbage_collect_mac_addresses()
+
+
+def garbage_collect_mac_addresses(
+    pool_path=mac_address.DEFAULT_MAC_POOL_PATH,
+    legacy_lock_directory=mac_address.LEGACY_MAC_LOCK_DIRECTORY,
+):
+    """Releases the MAC addresses of the containers that are gone"""
+    mac_address.remove_legacy_mac_address_locks(legacy_lock_directory)
+    if not os.path.exists(pool_path):
+        return
+    mac_addresses_in_use = {mac for _, _, mac, _ in firewall.services_running_here()}
+    with mac_address.MacAddressPool(pool_path) as pool:
+        released = pool.garbage_collect(mac_addresses_in_use)
+    log.debug('Released MAC addresses {}'.format(released))
 
 
 def process_inotify_event(event, services_by_dependencies, soa_dir, synapse_service_dir):
@@ -26,11 +26,22 @@ Command line options:
 - -d <SOA_DIR>, --soa-dir <SOA_DIR>: Specify a SOA config dir to read from
 - -c <CLUSTER>, --cluster <CLUSTER>: Specify which cluster of services to read
 - -m, --minimal: Only show service instances that need bouncing
+- --snapshot-ttl <SECONDS>: Share a snapshot of the apps in Marathon and of
+    the desired configs with other tools (like cleanup_marathon_jobs) that run
+    within SECONDS of each other
 """
 import argparse
+import json
+import logging
+import os
 import sys
+import tempfile
+import time
+
+from marathon.models.app import MarathonApp
 
 from paasta_tools.marathon_tools import DEFAULT_SOA_DIR
+from paasta_tools.marathon_tools import get_marathon_apps_with_clients
 from paasta_tools.marathon_tools import get_marathon_clients
 from paasta_tools.marathon_tools import get_marathon_servers
 from paasta_tools.marathon_tools import get_num_at_risk_tasks
@@ -48,6 +59,11 @@ from paasta_tools.utils import paasta_print
 from paasta_tools.utils import use_requests_cache
 
 
+log = logging.getLogger(__name__)
+
+DEFAULT_MARATHON_SNAPSHOT_PATH = '/var/cache/paasta/marathon_snapshot.json'
+
+
 def parse_args():
     parser = argparse.ArgumentParser(
         description='Lists marathon instances for a service.',
@@ -66,6 +82,11 @@ def parse_args():
         '-m', '--minimal', dest='minimal', action='store_true',
         help="show only service instances that need bouncing",
     )
+    parser.add_argument(
+        '--snapshot-ttl', dest='snapshot_ttl', type=int, default=0,
+        help="reuse a marathon snapshot written less than this many seconds ago, "
+             "or write a new one (0 disables snapshots)",
+    )
     args = parser.parse_args()
     return args
 
@@ -107,22 +128,179 @@ def get_desired_marathon_configs(soa_dir):
     return formatted_marathon_configs, job_configs
 
 
+class MarathonSnapshot(object):
+    """The apps in Marathon and the desired configs of the marathon instances
+    in soa-configs, as seen at a point in time.
+
+    get_service_instances_that_need_bouncing() and cleanup_marathon_jobs both
+    need this, and are run back to back by cron, so the snapshot can be
+    written to disk by the first one and read by the others; see
+    load_or_build_marathon_snapshot().
+
+    :param created: the timestamp the snapshot was built at
+    :param cluster: the cluster the snapshot is for
+    :param soa_dir: the soa-configs directory the snapshot was built from
+    :param apps_with_clients: a list of (MarathonApp, MarathonClient) tuples
+    :param service_instances: all the marathon (service, instance) tuples
+        configured for the cluster, deployed or not
+    :param desired_configs: a dict of {app_id: formatted marathon app dict}
+    :param desired_clients: a dict of {app_id: MarathonClient}, the client
+        each desired app should be running on
+    """
+
+    def __init__(
+        self, created, cluster, soa_dir, apps_with_clients,
+        service_instances, desired_configs, desired_clients,
+    ):
+        self.created = created
+        self.cluster = cluster
+        self.soa_dir = soa_dir
+        self.apps_with_clients = apps_with_clients
+        self.service_instances = service_instances
+        self.desired_configs = desired_configs
+        self.desired_clients = desired_clients
+
+    def to_dict(self, marathon_clients):
+        all_clients = marathon_clients.get_all_clients()
+        return {
+            'created': self.created,
+            'cluster': self.cluster,
+            'soa_dir': self.soa_dir,
+            'servers': {
+                'current': [client.servers for client in marathon_clients.current],
+                'all': [client.servers for client in all_clients],
+            },
+            'apps': [
+                {'client': all_clients.index(client), 'app': json.loads(app.to_json(minimal=False))}
+                for app, client in self.apps_with_clients
+            ],
+            'service_instances': self.service_instances,
+            'desired_configs': self.desired_configs,
+            'desired_clients': {
+                app_id: marathon_clients.current.index(client)
+                for app_id, client in self.desired_clients.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, snapshot_dict, marathon_clients):
+        all_clients = marathon_clients.get_all_clients()
+        return cls(
+            created=snapshot_dict['created'],
+            cluster=snapshot_dict['cluster'],
+            soa_dir=snapshot_dict['soa_dir'],
+            apps_with_clients=[
+                (MarathonApp.from_json(app['app']), all_clients[app['client']])
+                for app in snapshot_dict['apps']
+            ],
+            service_instances=[tuple(si) for si in snapshot_dict['service_instances']],
+            desired_configs=snapshot_dict['desired_configs'],
+            desired_clients={
+                app_id: marathon_clients.current[index]
+                for app_id, index in snapshot_dict['desired_clients'].items()
+            },
+        )
+
+
+def build_marathon_snapshot(marathon_clients, soa_dir):
+    cluster = load_system_paasta_config().get_cluster()
+    desired_configs, desired_job_configs = get_desired_marathon_configs(soa_dir)
+    return MarathonSnapshot(
+        created=time.time(),
+        cluster=cluster,
+        soa_dir=soa_dir,
+        apps_with_clients=get_marathon_apps_with_clients(marathon_clients.get_all_clients()),
+        service_instances=get_services_for_cluster(cluster=cluster, instance_type='marathon', soa_dir=soa_dir),
+        desired_configs=desired_configs,
+        desired_clients={
+            app_id: marathon_clients.get_current_client_for_service(job_config)
+            for app_id, job_config in desired_job_configs.items()
+        },
+    )
+
+
+def read_marathon_snapshot(path, marathon_clients, soa_dir, ttl):
+    """Reads the snapshot at path, if it was built less than ttl seconds ago
+    from the same soa_dir, for the same cluster and marathon servers.
+
+    :returns: a MarathonSnapshot, or None if there is no usable snapshot
+    """
+    try:
+        with open(path) as f:
+            snapshot_dict = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if (
+        time.time() - snapshot_dict['created'] >= ttl or
+        snapshot_dict['cluster'] != load_system_paasta_config().get_cluster() or
+        snapshot_dict['soa_dir'] != soa_dir or
+        snapshot_dict['servers'] != {
+            'current': [client.servers for client in marathon_clients.current],
+            'all': [client.servers for client in marathon_clients.get_all_clients()],
+        }
+    ):
+        return None
+    return MarathonSnapshot.from_dict(snapshot_dict, marathon_clients)
+
+
+def write_marathon_snapshot(path, snapshot, marathon_clients):
+    """Atomically replaces the snapshot at path, so that concurrent readers
+    see either the old snapshot or the new one in full."""
+    dirname = os.path.dirname(path)
+    tmp_path = None
+    try:
+        os.makedirs(dirname, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=dirname, delete=False) as f:
+            tmp_path = f.name
+            json.dump(snapshot.to_dict(marathon_clients), f)
+        os.rename(tmp_path, path)
+        tmp_path = None
+    except (IOError, OSError) as e:
+        log.warning("Unable to write marathon snapshot to %s: %s" % (path, e))
+    finally:
+        # Don't leave a temporary file behind on every failed run
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+
+def load_or_build_marathon_snapshot(
+    marathon_clients, soa_dir, ttl, path=DEFAULT_MARATHON_SNAPSHOT_PATH,
+):
+    """Returns the snapshot written to path by another tool less than ttl
+    seconds ago, or builds and writes a new one."""
+    snapshot = read_marathon_snapshot(path, marathon_clients, soa_dir, ttl)
+    if snapshot is None:
+        snapshot = build_marathon_snapshot(marathon_clients, soa_dir)
+        write_marathon_snapshot(path, snapshot, marathon_clients)
+    return snapshot
+
+
 @use_requests_cache('list_marathon_services')
-def get_service_instances_that_need_bouncing(marathon_clients, soa_dir):
-    desired_marathon_configs_formatted, desired_job_configs = get_desired_marathon_configs(soa_dir)
-    desired_ids_and_clients = set()
-    for app_id, job_config in desired_job_configs.items():
-        desired_ids_and_clients.add((app_id, marathon_clients.get_current_client_for_service(job_config)))
-
-    current_apps_with_clients = {}
-    for client in marathon_clients.get_all_clients():
-        current_apps_with_clients.update({(app.id.lstrip('/'), client): app for app in client.list_apps()})
+def get_service_instances_that_need_bouncing(marathon_clients, soa_dir, snapshot=None):
+    if snapshot is not None:
+        desired_marathon_configs_formatted = snapshot.desired_configs
+        desired_ids_and_clients = set(snapshot.desired_clients.items())
+        current_apps_with_clients = {
+            (app.id.lstrip('/'), client): app for app, client in snapshot.apps_with_clients
+        }
+    else:
+        desired_marathon_configs_formatted, desired_job_configs = get_desired_marathon_configs(soa_dir)
+        desired_ids_and_clients = set()
+        for app_id, job_config in desired_job_configs.items():
+            desired_ids_and_clients.add((app_id, marathon_clients.get_current_client_for_service(job_config)))
+
+        current_apps_with_clients = {}
+        for client in marathon_clients.get_all_clients():
+            current_apps_with_clients.update({(app.id.lstrip('/'), client): app for app in client.list_apps()})
     actual_ids_and_clients = set(current_apps_with_clients.keys())
 
     undesired_apps_and_clients = actual_ids_and_clients.symmetric_difference(desired_ids_and_clients)
     apps_that_need_bouncing = {long_job_id_to_short_job_id(app_id) for app_id, client in undesired_apps_and_clients}
 
-    draining_hosts = get_draining_hosts()
+    draining_hosts = set(get_draining_hosts())
 
     for (app_id, client), app in current_apps_with_clients.items():
         short_app_id = long_job_id_to_short_job_id(app_id)
@@ -144,8 +322,11 @@ def main():
         system_paasta_config = load_system_paasta_config()
         marathon_servers = get_marathon_servers(system_paasta_config)
         marathon_clients = get_marathon_clients(marathon_servers)
+        snapshot = None
+        if args.snapshot_ttl > 0:
+            snapshot = load_or_build_marathon_snapshot(marathon_clients, soa_dir, ttl=args.snapshot_ttl)
         service_instances = get_service_instances_that_need_bouncing(
-            marathon_clients=marathon_clients, soa_dir=soa_dir,
+            marathon_clients=marathon_clients, soa_dir=soa_dir, snapshot=snapshot,
         )
     else:
         instances = get_services_for_cluster(
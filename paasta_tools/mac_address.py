@@ -1,49 +1,240 @@
 import errno
 import fcntl
-import os.path
-import random
+import mmap
+import os
+import struct
+import time
+from contextlib import contextmanager
 
 MAC_ADDRESS_PREFIX = ('02', '52')
+DEFAULT_MAC_POOL_PATH = '/var/lib/paasta/mac-address.pool'
+DEFAULT_MAC_POOL_SIZE = 1 << 16
+# MAC addresses are only garbage collected once they have been reserved for
+# this long, so that containers still pulling their image keep theirs
+DEFAULT_MAC_GC_GRACE_SECS = 60 * 60
+# Before the pool, each container held a flock on a file named after its MAC
+# address in this directory, for as long as its `docker run` process lived
+LEGACY_MAC_LOCK_DIRECTORY = '/var/lib/paasta/mac-address'
 
 
 class MacAddressException(Exception):
     pass
 
 
-def reserve_unique_mac_address(lock_directory):
-    """ Pick and reserve a unique mac address for a container
-    returns (mac_address, lockfile)
-    where the mac address is a string in the form of 00:00:00:00:00:00
-    and lockfile is a file object that holds an exclusve lock
-    """
-    for x in range(100):
-        random_hex = '{:08x}'.format(random.getrandbits(32))
-        mac_address = ':'.join(
-            MAC_ADDRESS_PREFIX + (
-                random_hex[0:2],
-                random_hex[2:4],
-                random_hex[4:6],
-                random_hex[6:8],
-            ),
-        )
-
-        lock_filepath = os.path.join(lock_directory, mac_address)
-        lock_file = obtain_lock(lock_filepath)
-        if lock_file is not None:
-            return (mac_address, lock_file)
-
-    raise MacAddressException('Unable to pick unique MAC address')
-
-
-def obtain_lock(lock_filepath):
-    """ Open and obtain a flock on the parameter. Returns a file if successful, None if not
+def mac_address_for_slot(slot):
+    return ':'.join(MAC_ADDRESS_PREFIX + (
+        '{:02x}'.format((slot >> 24) & 0xff),
+        '{:02x}'.format((slot >> 16) & 0xff),
+        '{:02x}'.format((slot >> 8) & 0xff),
+        '{:02x}'.format(slot & 0xff),
+    ))
+
+
+def slot_for_mac_address(mac_address):
+    parts = mac_address.lower().split(':')
+    if len(parts) != 6 or tuple(parts[:2]) != MAC_ADDRESS_PREFIX:
+        return None
+    return int(''.join(parts[2:]), 16)
+
+
+class MacAddressPool(object):
+    """ The MAC addresses of the containers of a host, reserved in a file
+    shared by every process launching containers.
+
+    The file is mmap'd and holds a header (magic, size, cursor), a bitmap of
+    the reserved slots, and the time each slot was reserved at. Slot N is the
+    MAC address 02:52 followed by the 32 bits of N.
+
+    A reservation takes the first free slot at or after the cursor, scanning
+    whole bytes of the bitmap at a time, and moves the cursor there. The cost
+    of a reservation thus depends on how full the pool is, not on how many
+    addresses were handed out before. Changes are made under a flock of the
+    pool file, held for a single scan of the mapped bitmap.
+
+    A new pool starts with the addresses still locked in the lock directory
+    of the containers started before the pool was, so it doesn't hand them
+    out again. They are garbage collected like the others once their
+    containers are gone.
     """
-    lock_file = open(lock_filepath, 'w')
+    HEADER = struct.Struct('=4sII')
+    MAGIC = b'MACP'
+    TIME = struct.Struct('=I')
+
+    def __init__(
+        self,
+        path=DEFAULT_MAC_POOL_PATH,
+        size=DEFAULT_MAC_POOL_SIZE,
+        legacy_lock_directory=LEGACY_MAC_LOCK_DIRECTORY,
+    ):
+        if size <= 0 or size % 8:
+            raise MacAddressException('The pool size must be a positive multiple of 8, not {}'.format(size))
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.map = None
+        try:
+            with self._flock():
+                created = os.fstat(self.fd).st_size == 0
+                if created:
+                    os.ftruncate(self.fd, self.HEADER.size + size // 8 + size * self.TIME.size)
+                    os.pwrite(self.fd, self.HEADER.pack(self.MAGIC, size, 0), 0)
+                magic, self.size, _ = self.HEADER.unpack(os.pread(self.fd, self.HEADER.size, 0))
+                if magic != self.MAGIC:
+                    raise MacAddressException('{} is not a MAC address pool'.format(path))
+                self.bitmap_offset = self.HEADER.size
+                self.times_offset = self.bitmap_offset + self.size // 8
+                self.map = mmap.mmap(self.fd, self.times_offset + self.size * self.TIME.size)
+                if created:
+                    for mac_address in locked_legacy_mac_addresses(legacy_lock_directory):
+                        slot = slot_for_mac_address(mac_address)
+                        if slot is not None and slot < self.size:
+                            self._set_reserved(slot, time.time())
+        except Exception:
+            if self.map is not None:
+                self.map.close()
+            os.close(self.fd)
+            raise
+
+    def close(self):
+        self.map.close()
+        os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @contextmanager
+    def _flock(self):
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def _get_cursor(self):
+        return self.HEADER.unpack_from(self.map, 0)[2]
+
+    def _set_cursor(self, cursor):
+        self.HEADER.pack_into(self.map, 0, self.MAGIC, self.size, cursor)
+
+    def _is_reserved(self, slot):
+        return bool(self.map[self.bitmap_offset + slot // 8] & (1 << (slot % 8)))
+
+    def _set_reserved(self, slot, reserved_at):
+        byte = self.bitmap_offset + slot // 8
+        if reserved_at:
+            self.map[byte] |= 1 << (slot % 8)
+        else:
+            self.map[byte] &= ~(1 << (slot % 8)) & 0xff
+        self.TIME.pack_into(self.map, self.times_offset + slot * self.TIME.size, int(reserved_at))
+
+    def _get_reserved_at(self, slot):
+        return self.TIME.unpack_from(self.map, self.times_offset + slot * self.TIME.size)[0]
+
+    def reserve(self):
+        """ Reserves a free MAC address, in the form of 00:00:00:00:00:00 """
+        with self._flock():
+            nbytes = self.size // 8
+            cursor = self._get_cursor()
+            for i in range(nbytes):
+                index = (cursor + i) % nbytes
+                byte = self.map[self.bitmap_offset + index]
+                if byte != 0xff:
+                    bit = (~byte & (byte + 1)).bit_length() - 1  # lowest clear bit
+                    slot = index * 8 + bit
+                    self._set_reserved(slot, time.time())
+                    self._set_cursor(index)
+                    return mac_address_for_slot(slot)
+        raise MacAddressException('Unable to pick unique MAC address')
+
+    def release(self, mac_address):
+        slot = slot_for_mac_address(mac_address)
+        if slot is not None and slot < self.size:
+            with self._flock():
+                self._set_reserved(slot, 0)
+
+    def reserved_mac_addresses(self):
+        return {
+            mac_address_for_slot(slot)
+            for slot in range(self.size)
+            if self._is_reserved(slot)
+        }
+
+    def garbage_collect(self, mac_addresses_in_use, grace_secs=DEFAULT_MAC_GC_GRACE_SECS):
+        """ Releases the MAC addresses reserved more than grace_secs ago that no
+        container uses anymore. Returns the released MAC addresses.
+        """
+        slots_in_use = {slot_for_mac_address(mac_address) for mac_address in mac_addresses_in_use}
+        released = []
+        reserved_before = time.time() - grace_secs
+        with self._flock():
+            for index in range(self.size // 8):
+                if not self.map[self.bitmap_offset + index]:
+                    continue
+                for slot in range(index * 8, index * 8 + 8):
+                    if (
+                        self._is_reserved(slot) and
+                        slot not in slots_in_use and
+                        self._get_reserved_at(slot) < reserved_before
+                    ):
+                        self._set_reserved(slot, 0)
+                        released.append(mac_address_for_slot(slot))
+        return released
+
+
+def _is_locked(lock_filepath):
+    """ Whether a process holds a flock on lock_filepath """
+    try:
+        fd = os.open(lock_filepath, os.O_RDONLY)
+    except FileNotFoundError:
+        return False
     try:
-        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
-        return lock_file
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
     except IOError as err:
         if err.errno != errno.EAGAIN:
             raise
-        lock_file.close()
-        return None
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+
+def locked_legacy_mac_addresses(lock_directory=LEGACY_MAC_LOCK_DIRECTORY):
+    """ The MAC addresses of the containers started before the pool, which
+    still hold their lock file in lock_directory
+    """
+    try:
+        names = os.listdir(lock_directory)
+    except FileNotFoundError:
+        return set()
+    return {name for name in names if _is_locked(os.path.join(lock_directory, name))}
+
+
+def remove_legacy_mac_address_locks(lock_directory=LEGACY_MAC_LOCK_DIRECTORY):
+    """ Removes the lock files no container holds anymore from lock_directory,
+    and lock_directory itself once it is empty. Nothing creates lock files
+    anymore, so the directory goes away with the last container started
+    before the pool.
+    """
+    try:
+        names = os.listdir(lock_directory)
+    except FileNotFoundError:
+        return
+    for name in names:
+        lock_filepath = os.path.join(lock_directory, name)
+        if not _is_locked(lock_filepath):
+            os.unlink(lock_filepath)
+    try:
+        os.rmdir(lock_directory)
+    except OSError as err:
+        if err.errno != errno.ENOTEMPTY:
+            raise
+
+
+def reserve_mac_address(pool_path=DEFAULT_MAC_POOL_PATH):
+    """ Pick and reserve a unique mac address for a container
+    returns the mac address as a string in the form of 00:00:00:00:00:00
+    """
+    with MacAddressPool(pool_path) as pool:
+        return pool.reserve()
@@ -13,20 +13,27 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import argparse
+import gzip
+import hashlib
 import json
 import logging
+import os
 from typing import Dict
 from typing import List
+from typing import Optional
+from typing import Tuple
 
 from mypy_extensions import TypedDict
 
 from paasta_tools.marathon_tools import get_marathon_clients
 from paasta_tools.marathon_tools import get_marathon_servers
-from paasta_tools.marathon_tools import load_marathon_service_config
+from paasta_tools.marathon_tools import load_marathon_service_config_no_cache
 from paasta_tools.marathon_tools import MarathonClient
 from paasta_tools.marathon_tools import MarathonClients
+from paasta_tools.marathon_tools import MarathonServers
 from paasta_tools.marathon_tools import MarathonServiceConfig
 from paasta_tools.utils import DEFAULT_SOA_DIR
+from paasta_tools.utils import get_service_instance_list_no_cache
 from paasta_tools.utils import get_services_for_cluster
 from paasta_tools.utils import load_system_paasta_config
 from paasta_tools.utils import SystemPaastaConfig
@@ -57,6 +64,55 @@ Marathon_Dashboard_Item = TypedDict('Marathon_Dashboard_Item', {'service': str,
 Marathon_Dashboard = Dict[str, List[Marathon_Dashboard_Item]]
 
 
+def get_shard_url(
+        client: MarathonClient,
+        cluster: str,
+        marathon_servers: MarathonServers,
+        dashboard_links: Dict,
+) -> str:
+    shard_url: str = client.servers[0]
+    if 'Marathon RO' in dashboard_links[cluster]:
+        marathon_links = dashboard_links[cluster]['Marathon RO']
+        if isinstance(marathon_links, list):
+            for shard_number, shard in enumerate(marathon_servers.current):
+                if shard.url[0] == shard_url:
+                    shard_url = marathon_links[shard_number]
+        elif isinstance(marathon_links, str):
+            shard_url = marathon_links.split(' ')[0]
+    return shard_url
+
+
+def create_marathon_dashboard_items(
+        instances: List[Tuple[str, str]],
+        cluster: str,
+        soa_dir: str,
+        marathon_clients: MarathonClients,
+        marathon_servers: MarathonServers,
+        system_paasta_config: SystemPaastaConfig,
+) -> List[Marathon_Dashboard_Item]:
+    items: List[Marathon_Dashboard_Item] = []
+    for service, instance in instances:
+        service_config: MarathonServiceConfig = load_marathon_service_config_no_cache(
+            service=service,
+            instance=instance,
+            cluster=cluster,
+            load_deployments=False,
+            soa_dir=soa_dir,
+        )
+        client: MarathonClient = marathon_clients.get_current_client_for_service(job_config=service_config)
+        items.append({
+            'service': service,
+            'instance': instance,
+            'shard_url': get_shard_url(
+                client=client,
+                cluster=cluster,
+                marathon_servers=marathon_servers,
+                dashboard_links=system_paasta_config.get_dashboard_links(),
+            ),
+        })
+    return items
+
+
 def create_marathon_dashboard(
         cluster: str,
         soa_dir: str=DEFAULT_SOA_DIR,
@@ -71,40 +127,143 @@ def create_marathon_dashboard(
         )
     except FileNotFoundError:
         instances = []
-    dashboard: Marathon_Dashboard = {cluster: []}
     if system_paasta_config is None:
         system_paasta_config = load_system_paasta_config()
     marathon_servers = get_marathon_servers(system_paasta_config=system_paasta_config)
     if marathon_clients is None:
         marathon_clients = get_marathon_clients(marathon_servers=marathon_servers, cached=False)
-    for service_instance in instances:
-        service: str = service_instance[0]
-        instance: str = service_instance[1]
-        service_config: MarathonServiceConfig = load_marathon_service_config(
-            service=service,
-            instance=instance,
+    dashboard: Marathon_Dashboard = {
+        cluster: create_marathon_dashboard_items(
+            instances=instances,
             cluster=cluster,
-            load_deployments=False,
             soa_dir=soa_dir,
+            marathon_clients=marathon_clients,
+            marathon_servers=marathon_servers,
+            system_paasta_config=system_paasta_config,
+        ),
+    }
+    return dashboard
+
+
+class MarathonDashboardView(object):
+    """The marathon dashboard of a cluster, kept up to date incrementally.
+
+    Each refresh only stats the soa-configs that the dashboard entries of a
+    service depend on (its directory, service.yaml and marathon-$cluster.yaml)
+    and recomputes the entries of the services whose files changed, or of every
+    service when the marathon servers or dashboard links changed. The dashboard
+    is kept serialized, gzipped and with an ETag, ready to be served.
+
+    Changed files are only seen with the yaml cache of service_configuration_lib
+    disabled, as it is in paasta-api.
+    """
+
+    def __init__(self, cluster: str, soa_dir: str=DEFAULT_SOA_DIR) -> None:
+        self.cluster = cluster
+        self.soa_dir = soa_dir
+        self.body = b''
+        self.gzipped_body = b''
+        self.etag = ''
+        self._system_fingerprint: Optional[str] = None
+        self._service_fingerprints: Dict[str, Tuple] = {}
+        self._service_items: Dict[str, List[Marathon_Dashboard_Item]] = {}
+        # Kept across refreshes, so that the body catches up with the services a
+        # failed refresh had already updated
+        self._dirty = True
+
+    def _get_service_fingerprint(self, service: str) -> Tuple:
+        service_dir = os.path.join(os.path.abspath(self.soa_dir), service)
+        fingerprint: List[Optional[Tuple[int, int]]] = []
+        for path in (
+            service_dir,
+            os.path.join(service_dir, 'service.yaml'),
+            os.path.join(service_dir, 'marathon-%s.yaml' % self.cluster),
+        ):
+            try:
+                stat = os.stat(path)
+                fingerprint.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                fingerprint.append(None)
+        return tuple(fingerprint)
+
+    def _get_service_items(
+        self,
+        service: str,
+        marathon_clients: MarathonClients,
+        marathon_servers: MarathonServers,
+        system_paasta_config: SystemPaastaConfig,
+    ) -> List[Marathon_Dashboard_Item]:
+        instances = get_service_instance_list_no_cache(
+            service=service,
+            cluster=self.cluster,
+            instance_type='marathon',
+            soa_dir=self.soa_dir,
         )
-        client: MarathonClient = marathon_clients.get_current_client_for_service(job_config=service_config)
-        dashboard_links: Dict = system_paasta_config.get_dashboard_links()
-        shard_url: str = client.servers[0]
-        if 'Marathon RO' in dashboard_links[cluster]:
-            marathon_links = dashboard_links[cluster]['Marathon RO']
-            if isinstance(marathon_links, list):
-                for shard_number, shard in enumerate(marathon_servers.current):
-                    if shard.url[0] == shard_url:
-                        shard_url = marathon_links[shard_number]
-            elif isinstance(marathon_links, str):
-                shard_url = marathon_links.split(' ')[0]
-        service_info: Marathon_Dashboard_Item = {
-            'service': service,
-            'instance': instance,
-            'shard_url': shard_url,
+        return create_marathon_dashboard_items(
+            instances=instances,
+            cluster=self.cluster,
+            soa_dir=self.soa_dir,
+            marathon_clients=marathon_clients,
+            marathon_servers=marathon_servers,
+            system_paasta_config=system_paasta_config,
+        )
+
+    def refresh(self, marathon_clients: MarathonClients, system_paasta_config: SystemPaastaConfig) -> bool:
+        """Brings the dashboard up to date.
+
+        :returns: True if the dashboard changed
+        """
+        try:
+            dashboard_links = system_paasta_config.get_dashboard_links()
+        except KeyError:
+            dashboard_links = None
+        system_fingerprint = json.dumps(
+            [
+                system_paasta_config.get_marathon_servers(),
+                system_paasta_config.get_previous_marathon_servers(),
+                dashboard_links,
+            ],
+            sort_keys=True,
+        )
+        if system_fingerprint != self._system_fingerprint:
+            self._service_fingerprints = {}
+            self._service_items = {}
+            self._system_fingerprint = system_fingerprint
+            self._dirty = True
+        marathon_servers = get_marathon_servers(system_paasta_config=system_paasta_config)
+
+        try:
+            services = set(os.listdir(os.path.abspath(self.soa_dir)))
+        except FileNotFoundError:
+            services = set()
+        for service in set(self._service_items) - services:
+            self._service_items.pop(service, None)
+            self._service_fingerprints.pop(service, None)
+            self._dirty = True
+        for service in sorted(services):
+            fingerprint = self._get_service_fingerprint(service)
+            if self._service_fingerprints.get(service) == fingerprint:
+                continue
+            items = self._get_service_items(service, marathon_clients, marathon_servers, system_paasta_config)
+            self._service_fingerprints[service] = fingerprint
+            if self._service_items.get(service) != items:
+                self._service_items[service] = items
+                self._dirty = True
+
+        if not self._dirty:
+            return False
+        dashboard: Marathon_Dashboard = {
+            self.cluster: [
+                item
+                for service in sorted(self._service_items)
+                for item in self._service_items[service]
+            ],
         }
-        dashboard[cluster].append(service_info)
-    return dashboard
+        self.body = json.dumps(dashboard).encode('utf-8')
+        self.gzipped_body = gzip.compress(self.body)
+        self.etag = hashlib.sha1(self.body).hexdigest()
+        self._dirty = False
+        return True
 
 
 def main(argv=None) -> None:
@@ -16,7 +16,6 @@ that interact with marathon. There's config parsers, url composers,
 and a number of other things used by other components in order to
 make the PaaSTA stack work.
 """
-import copy
 import datetime
 import json
 import logging
@@ -47,6 +46,10 @@ from marathon.models.app import MarathonTask
 from marathon.models.queue import MarathonQueueItem
 from mypy_extensions import TypedDict
 
+from paasta_tools.config_hash_cache import ConfigHashCache
+from paasta_tools.config_hash_cache import get_config_hash_cache
+from paasta_tools.config_hash_cache import get_fingerprint
+from paasta_tools.config_hash_cache import get_system_paasta_config_version
 from paasta_tools.long_running_service_tools import BounceMethodConfigDict
 from paasta_tools.long_running_service_tools import InvalidHealthcheckMode
 from paasta_tools.long_running_service_tools import load_service_namespace_config
@@ -714,15 +717,56 @@ class MarathonServiceConfig(LongRunningServiceConfig):
 
         code_sha = get_code_sha_from_dockerurl(docker_url)
 
-        config_hash = get_config_hash(
-            self.sanitize_for_config_hash(complete_config, system_paasta_config),
-            force_bounce=self.get_force_bounce(),
-        )
+        config_hash_cache = get_config_hash_cache()
+        if config_hash_cache is None:
+            config_hash = self.compute_config_hash(complete_config, system_paasta_config)
+        else:
+            config_hash = self.get_cached_config_hash(
+                config_hash_cache=config_hash_cache,
+                complete_config=complete_config,
+                system_paasta_config=system_paasta_config,
+                service_namespace_config=service_namespace_config,
+            )
         complete_config['id'] = format_job_id(self.service, self.instance, code_sha, config_hash)
 
         log.debug("Complete configuration for instance is: %s", complete_config)
         return complete_config
 
+    def compute_config_hash(
+        self,
+        complete_config: FormattedMarathonAppDict,
+        system_paasta_config: SystemPaastaConfig,
+    ) -> str:
+        return get_config_hash(
+            self.sanitize_for_config_hash(complete_config, system_paasta_config),
+            force_bounce=self.get_force_bounce(),
+        )
+
+    def get_cached_config_hash(
+        self,
+        config_hash_cache: ConfigHashCache,
+        complete_config: FormattedMarathonAppDict,
+        system_paasta_config: SystemPaastaConfig,
+        service_namespace_config: ServiceNamespaceConfig,
+    ) -> str:
+        """Looks the config hash up in config_hash_cache by a fingerprint of
+        what complete_config was formatted from, which is much smaller than
+        complete_config itself.
+        """
+        secret_hashes = self.get_secret_hashes(complete_config['env'], system_paasta_config.get_vault_environment())
+        fingerprint = get_fingerprint(
+            self.config_dict,
+            self.branch_dict,
+            service_namespace_config,
+            secret_hashes,
+            get_system_paasta_config_version(system_paasta_config),
+        )
+        return config_hash_cache.get_config_hash(
+            key=(self.service, self.instance, self.cluster, self.soa_dir),
+            fingerprint=fingerprint,
+            compute=lambda: self.compute_config_hash(complete_config, system_paasta_config),
+        )
+
     def sanitize_for_config_hash(
         self,
         config: FormattedMarathonAppDict,
@@ -738,8 +782,16 @@ class MarathonServiceConfig(LongRunningServiceConfig):
         :param config: complete_config hash to sanitize
         :returns: sanitized copy of complete_config hash
         """
-        ahash = {key: copy.deepcopy(value) for key, value in config.items() if key not in CONFIG_HASH_BLACKLIST}
-        ahash['container']['docker']['parameters'] = self.format_docker_parameters(with_labels=False)  # type: ignore
+        # Only the dicts on the way to the docker parameters are copied: the
+        # config itself is only serialized, so it doesn't need a deep copy
+        ahash: Dict[str, Any] = {key: value for key, value in config.items() if key not in CONFIG_HASH_BLACKLIST}
+        ahash['container'] = dict(
+            config['container'],
+            docker=dict(
+                config['container']['docker'],
+                parameters=self.format_docker_parameters(with_labels=False),
+            ),
+        )
         secret_hashes = self.get_secret_hashes(config['env'], system_paasta_config.get_vault_environment())
         if secret_hashes:
             ahash['paasta_secrets'] = secret_hashes
@@ -748,8 +800,8 @@ class MarathonServiceConfig(LongRunningServiceConfig):
     def get_secret_hashes(
         self,
         env: Dict[str, str],
-        vault_environment: str,
-    ) -> Dict[str, str]:
+        vault_environment: Optional[str],
+    ) -> Dict[str, Optional[str]]:
 
         secret_hashes = {}
         for _, env_var_val in env.items():
@@ -890,7 +942,14 @@ class MarathonDeployStatus:
 def get_marathon_app_deploy_status(client: MarathonClient, app: MarathonApp=None) -> int:
     # Check the launch queue to see if an app is blocked
     is_overdue, backoff_seconds = get_app_queue_status(client, app.id)
+    return get_marathon_app_deploy_status_from_queue_status(app, is_overdue, backoff_seconds)
 
+
+def get_marathon_app_deploy_status_from_queue_status(
+    app: MarathonApp,
+    is_overdue: Optional[bool],
+    backoff_seconds: Optional[float],
+) -> int:
     # Based on conditions at https://mesosphere.github.io/marathon/docs/marathon-ui.html
     if is_overdue:
         deploy_status = MarathonDeployStatus.Waiting
@@ -1509,15 +1568,74 @@ def get_num_at_risk_tasks(app: MarathonApp, draining_hosts: List[str]) -> int:
                            See paasta_tools.mesos_maintenance.get_draining_hosts
     :returns: An integer representing the number of tasks running on at-risk hosts
     """
-    hosts_tasks_running_on = [task.host for task in app.tasks]
-    num_at_risk_tasks = 0
-    for host in hosts_tasks_running_on:
-        if host in draining_hosts:
-            num_at_risk_tasks += 1
+    draining_host_set = set(draining_hosts)
+    num_at_risk_tasks = sum(1 for task in app.tasks if task.host in draining_host_set)
     log.debug("%s has %d tasks running on at-risk hosts." % (app.id, num_at_risk_tasks))
     return num_at_risk_tasks
 
 
+class HostTaskIndex(object):
+    """Reverse index of the marathon tasks running on each host, as
+    {hostname: {(service, instance): {task id}}}.
+
+    It is built from a snapshot of the marathon apps (with their tasks embedded)
+    and updated from the next snapshots, where only the tasks that started,
+    stopped or moved since touch the index. Looking up the service instances
+    running on a set of hosts then only visits the tasks of those hosts.
+    """
+
+    def __init__(self) -> None:
+        self.tasks_by_host: Dict[str, Dict[Tuple[str, str], Set[str]]] = {}
+        self.task_locations: Dict[str, Tuple[str, Tuple[str, str]]] = {}
+
+    def add_task(self, task_id: str, host: str, service_instance: Tuple[str, str]) -> None:
+        self.remove_task(task_id)
+        self.task_locations[task_id] = (host, service_instance)
+        self.tasks_by_host.setdefault(host, {}).setdefault(service_instance, set()).add(task_id)
+
+    def remove_task(self, task_id: str) -> None:
+        if task_id not in self.task_locations:
+            return
+        host, service_instance = self.task_locations.pop(task_id)
+        service_instances = self.tasks_by_host[host]
+        service_instances[service_instance].discard(task_id)
+        if not service_instances[service_instance]:
+            del service_instances[service_instance]
+            if not service_instances:
+                del self.tasks_by_host[host]
+
+    def update(self, apps: Iterable[MarathonApp]) -> None:
+        """Makes the index match the tasks of apps. Tasks of apps that aren't
+        paasta service instances are left out."""
+        service_instances_by_app_id: Dict[str, Optional[Tuple[str, str]]] = {}
+        current_locations: Dict[str, Tuple[str, Tuple[str, str]]] = {}
+        for app in apps:
+            for task in app.tasks:
+                if task.app_id not in service_instances_by_app_id:
+                    try:
+                        service, instance, _, __ = deformat_job_id(task.app_id.strip('/'))
+                        service_instances_by_app_id[task.app_id] = (service, instance)
+                    except InvalidJobNameError:
+                        service_instances_by_app_id[task.app_id] = None
+                service_instance = service_instances_by_app_id[task.app_id]
+                if service_instance is not None:
+                    current_locations[task.id] = (task.host, service_instance)
+
+        for task_id in set(self.task_locations) - set(current_locations):
+            self.remove_task(task_id)
+        for task_id, location in current_locations.items():
+            if self.task_locations.get(task_id) != location:
+                self.add_task(task_id, *location)
+
+    def get_tasks_on_hosts(self, hosts: Iterable[str]) -> Dict[Tuple[str, str], Set[str]]:
+        """Returns the ids of the tasks running on hosts, by (service, instance)"""
+        tasks: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        for host in hosts:
+            for service_instance, task_ids in self.tasks_by_host.get(host, {}).items():
+                tasks[service_instance] |= task_ids
+        return dict(tasks)
+
+
 def broadcast_log_all_services_running_here(line: str, component: str='monitoring') -> None:
     """Log a line of text to paasta logs of all services running on this host.
 
@@ -0,0 +1,263 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import collections
+import concurrent.futures
+import os
+import time
+from urllib.parse import urljoin
+
+import requests
+import requests.exceptions
+
+from . import exceptions
+from . import log
+from paasta_tools.utils import get_user_agent
+
+
+FollowedLine = collections.namedtuple('FollowedLine', ['prefix', 'line'])
+
+
+class FollowedFile(object):
+    """A file followed by a Follower, and how far it was read.
+
+    :param agent: the url of the agent the file is on, like http://host:5051
+    :param path: the path of the file on the agent
+    :param prefix: what the lines of the file are prefixed with
+    :param offset: the offset to read the file from, or None to only read what
+                   is written to the file from now on
+    """
+
+    def __init__(self, agent, path, prefix, offset=None):
+        self.agent = agent
+        self.path = path
+        self.prefix = prefix
+        self.offset = offset
+        self.partial_line = ""
+        self.interval = 0
+        self.due_at = 0
+
+    def feed(self, data):
+        """Returns the lines completed by data"""
+        lines = (self.partial_line + data).split("\n")
+        self.partial_line = lines.pop()
+        return [FollowedLine(self.prefix, line) for line in lines]
+
+    def flush(self):
+        """Returns the last line of the file if it isn't terminated"""
+        lines = [FollowedLine(self.prefix, self.partial_line)] if self.partial_line else []
+        self.partial_line = ""
+        return lines
+
+
+class Follower(object):
+    """Follows many files of Mesos agents at once, like tail -f does.
+
+    Each file is polled through the /files/read.json endpoint of its agent,
+    from the offset it was read up to. A file that didn't grow is polled less
+    and less often, from min_interval up to max_interval seconds between polls,
+    and a file that shrunk, as when it is truncated, is read again from its
+    start. The files of an agent are read one after the other over a single
+    connection, while the agents are polled concurrently.
+    """
+
+    def __init__(
+        self,
+        min_interval=0.5,
+        max_interval=8,
+        chunk_size=64 * 1024,
+        max_workers=20,
+        response_timeout=5,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.chunk_size = chunk_size
+        self.response_timeout = response_timeout
+        self.clock = clock
+        self.sleep = sleep
+        self.files = collections.OrderedDict()
+        self.sessions = {}
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        for session in self.sessions.values():
+            session.close()
+        self.sessions.clear()
+
+    def add(self, agent, path, prefix, from_start=False):
+        """Starts following a file, from its start or from its current end"""
+        if (agent, path) not in self.files:
+            self.files[(agent, path)] = FollowedFile(agent, path, prefix, offset=0 if from_start else None)
+
+    def remove(self, agent, path):
+        """Stops following a file, and returns the lines written to it since it
+        was last polled"""
+        followed_file = self.files.pop((agent, path), None)
+        if followed_file is None:
+            return []
+        session = self._get_session(agent)
+        if followed_file.offset is None:
+            lines = []
+        else:
+            lines = self._poll_file(session, followed_file)
+        if not self.files_of(agent):
+            self.sessions.pop(agent).close()
+        return lines + followed_file.flush()
+
+    def files_of(self, agent):
+        return [followed_file for followed_file in self.files.values() if followed_file.agent == agent]
+
+    def _get_session(self, agent):
+        if agent not in self.sessions:
+            session = requests.Session()
+            session.headers['User-Agent'] = get_user_agent()
+            self.sessions[agent] = session
+        return self.sessions[agent]
+
+    def _read(self, session, followed_file, offset, length):
+        response = session.get(
+            urljoin(followed_file.agent, "/files/read.json"),
+            params={"path": followed_file.path, "offset": offset, "length": length},
+            timeout=self.response_timeout,
+        )
+        if response.status_code == 404:
+            raise exceptions.FileDoesNotExist("No such file or directory.")
+        response.raise_for_status()
+        return response.json()
+
+    def _poll_file(self, session, followed_file):
+        lines = []
+        grew = False
+        try:
+            size = self._read(session, followed_file, -1, 0)["offset"]
+            if followed_file.offset is None:
+                followed_file.offset = size
+            elif size < followed_file.offset:
+                log.debug("{} was truncated, reading it again from the start".format(followed_file.path))
+                lines.extend(followed_file.flush())
+                followed_file.offset = 0
+            while followed_file.offset < size:
+                length = min(self.chunk_size, size - followed_file.offset)
+                data = self._read(session, followed_file, followed_file.offset, length)["data"]
+                if not data:
+                    break
+                # Offsets are in bytes
+                followed_file.offset += len(data.encode("utf-8"))
+                lines.extend(followed_file.feed(data))
+                grew = True
+        except (requests.exceptions.RequestException, exceptions.FileDoesNotExist, ValueError) as e:
+            log.debug("Couldn't read {} from {}: {}".format(followed_file.path, followed_file.agent, e))
+
+        if grew:
+            followed_file.interval = self.min_interval
+        else:
+            followed_file.interval = min(self.max_interval, max(self.min_interval, followed_file.interval * 2))
+        followed_file.due_at = self.clock() + followed_file.interval
+        return lines
+
+    def _poll_agent(self, session, followed_files):
+        lines = []
+        for followed_file in followed_files:
+            lines.extend(self._poll_file(session, followed_file))
+        return lines
+
+    def poll(self):
+        """Reads what was written to the files that are due for a poll, and
+        returns their new lines, grouped by agent"""
+        now = self.clock()
+        due_files_by_agent = collections.OrderedDict()
+        for followed_file in self.files.values():
+            if followed_file.due_at <= now:
+                due_files_by_agent.setdefault(followed_file.agent, []).append(followed_file)
+        futures = [
+            self.executor.submit(self._poll_agent, self._get_session(agent), followed_files)
+            for agent, followed_files in due_files_by_agent.items()
+        ]
+        lines = []
+        for future in futures:
+            lines.extend(future.result())
+        return lines
+
+    def next_poll_at(self):
+        return min((followed_file.due_at for followed_file in self.files.values()), default=None)
+
+    def follow(self):
+        """Yields the lines written to the followed files, forever"""
+        while True:
+            for line in self.poll():
+                yield line
+            self._sleep_until(self.next_poll_at())
+
+    def _sleep_until(self, wake_at):
+        if wake_at is None:
+            wake_at = self.clock() + self.min_interval
+        self.sleep(max(0, wake_at - self.clock()))
+
+    def follow_tasks(self, get_tasks, paths=('stdout', 'stderr'), refresh_interval=10):
+        """Yields the lines written to files of the sandboxes of tasks, forever,
+        prefixed by the (task id, path) of their file.
+
+        get_tasks is called every refresh_interval seconds for the tasks to follow.
+        The files of the tasks it first returns are followed from their current
+        end, the files of the tasks that show up later, like the ones replacing
+        restarted tasks, from their start. The files of the tasks that are gone
+        are read one last time, and then not followed anymore.
+        """
+        followed_tasks = {}
+        refresh_at = None
+        while True:
+            if refresh_at is None or self.clock() >= refresh_at:
+                tasks = {task['id']: task for task in get_tasks()}
+                for task_id in set(followed_tasks) - set(tasks):
+                    for agent, path in followed_tasks.pop(task_id):
+                        for line in self.remove(agent, path):
+                            yield line
+                new_tasks = [task for task_id, task in tasks.items() if task_id not in followed_tasks]
+                for task, sandbox in zip(new_tasks, self.executor.map(get_task_sandbox, new_tasks)):
+                    if sandbox is None:
+                        # We'll try again at the next refresh
+                        continue
+                    agent, directory = sandbox
+                    followed_tasks[task['id']] = [(agent, os.path.join(directory, path)) for path in paths]
+                    for path in paths:
+                        self.add(
+                            agent, os.path.join(directory, path), (task['id'], path),
+                            from_start=refresh_at is not None,
+                        )
+                refresh_at = self.clock() + refresh_interval
+
+            for line in self.poll():
+                yield line
+            next_poll_at = self.next_poll_at()
+            self._sleep_until(refresh_at if next_poll_at is None else min(next_poll_at, refresh_at))
+
+
+def get_task_sandbox(task):
+    """Returns the url of the agent of a task and the directory of its sandbox,
+    or None if the agent can't be found"""
+    try:
+        return task.slave.host, task.directory
+    except exceptions.SlaveDoesNotExist:
+        log.debug("The agent of {} doesn't exist anymore".format(task['id']))
+        return None
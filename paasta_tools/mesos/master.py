@@ -13,12 +13,14 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import bisect
 import fnmatch
 import itertools
 import json
 import logging
 import os
 import re
+from collections import defaultdict
 from urllib.parse import urljoin
 from urllib.parse import urlparse
 
@@ -51,11 +53,92 @@ MULTIPLE_SLAVES = "There are multiple slaves with that id. Please choose one: "
 
 logger = logging.getLogger(__name__)
 
+GLOB_CHARACTERS = re.compile(r'[*?[]')
+
+
+class TaskIndex(object):
+    """Indexes of a list of tasks from the master, to look tasks up by exact
+    id, by id prefix (like a marathon app id) or by slave without scanning
+    every task of every framework.
+
+    Each index is built on its first lookup. Lookups return the task dicts in
+    the order of the list given.
+    """
+
+    def __init__(self, tasks):
+        self._tasks = list(tasks)
+        self._position_by_id = None
+        self._duplicate_ids = None
+        self._positions_by_slave_id = None
+        self._sorted_ids = None
+        self._sorted_positions = None
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def _select(self, positions):
+        return [self._tasks[position] for position in sorted(positions)]
+
+    def _prefix_positions(self, prefix):
+        if self._sorted_ids is None:
+            ids = [x['id'] for x in self._tasks]
+            self._sorted_positions = sorted(range(len(ids)), key=ids.__getitem__)
+            self._sorted_ids = [ids[position] for position in self._sorted_positions]
+        start = bisect.bisect_left(self._sorted_ids, prefix)
+        end = start
+        while end < len(self._sorted_ids) and self._sorted_ids[end].startswith(prefix):
+            end += 1
+        return self._sorted_positions[start:end]
+
+    def get(self, task_id):
+        if self._position_by_id is None:
+            ids = [x['id'] for x in self._tasks]
+            self._position_by_id = {x: position for position, x in enumerate(ids)}
+            self._duplicate_ids = set()
+            if len(self._position_by_id) < len(ids):
+                seen = set()
+                for x in ids:
+                    if x in seen:
+                        self._duplicate_ids.add(x)
+                    seen.add(x)
+        if task_id in self._duplicate_ids:
+            return [x for x in self._tasks if x['id'] == task_id]
+        position = self._position_by_id.get(task_id)
+        return [] if position is None else [self._tasks[position]]
+
+    def with_prefix(self, prefix):
+        return self._select(self._prefix_positions(prefix))
+
+    def on_slave(self, slave_id):
+        if self._positions_by_slave_id is None:
+            self._positions_by_slave_id = defaultdict(list)
+            for position, x in enumerate(self._tasks):
+                self._positions_by_slave_id[x.get('slave_id')].append(position)
+        return self._select(self._positions_by_slave_id.get(slave_id, []))
+
+    def matching(self, fltr):
+        """The tasks whose id starts with fltr, or matches it as a glob pattern.
+
+        Both are looked up in the prefix index: glob patterns are only matched
+        against the ids sharing their literal prefix.
+        """
+        if not fltr:
+            return list(self._tasks)
+        positions = set(self._prefix_positions(fltr))
+        if GLOB_CHARACTERS.search(fltr):
+            literal_prefix = GLOB_CHARACTERS.split(fltr, 1)[0]
+            positions.update(
+                position for position in self._prefix_positions(literal_prefix)
+                if fnmatch.fnmatch(self._tasks[position]['id'], fltr)
+            )
+        return self._select(positions)
+
 
 class MesosMaster(object):
 
     def __init__(self, config):
         self.config = config
+        self._indexes = {}
 
     def __str__(self):
         return "<master: {}>".format(self.key())
@@ -188,11 +271,34 @@ class MesosMaster(object):
     def state_summary(self):
         return self.fetch("/master/state-summary").json()
 
-    @util.memoize
+    def _index_of_fetch(self, name, fetched_property, build):
+        """Returns build(), built once per fetch of fetched_property (a
+        CachedProperty of this class that build reads) and cached under name
+        until the property is fetched again"""
+        prop = getattr(type(self), fetched_property)
+        fetched_at = prop.fetched_at(self)
+        cached = self._indexes.get(name)
+        if cached is not None and fetched_at is not None and cached[0] == fetched_at:
+            return cached[1]
+        index = build()
+        fetched_at = prop.fetched_at(self)
+        if fetched_at is not None:
+            self._indexes[name] = (fetched_at, index)
+        return index
+
+    def slaves_by_id(self):
+        """The MesosSlaves of the cluster by id, built once per fetch of the state"""
+        def build():
+            slaves_by_id = defaultdict(list)
+            for x in self.state['slaves']:
+                slaves_by_id[x['id']].append(slave.MesosSlave(self.config, x))
+            return dict(slaves_by_id)
+        return self._index_of_fetch('slaves_by_id', 'state', build)
+
     def slave(self, fltr):
-        lst = self.slaves(fltr)
+        lst = self.slaves_by_id().get(fltr, [])
 
-        log.debug("master.slave({})".format(fltr))
+        log.debug("master.slave(%s)", fltr)
 
         if len(lst) == 0:
             raise exceptions.SlaveDoesNotExist(
@@ -203,7 +309,7 @@ class MesosMaster(object):
             raise exceptions.MultipleSlavesForIDError(
                 "Multiple slaves matching filter %s. %s" % (
                     fltr,
-                    ",".join([slave.id for slave in lst]),
+                    ",".join([x['hostname'] for x in lst]),
                 ),
             )
 
@@ -244,19 +350,40 @@ class MesosMaster(object):
     def orphan_tasks(self):
         return self.state["orphan_tasks"]
 
+    def task_index(self, active_only=False):
+        """A TaskIndex of the tasks of the frameworks, built once per fetch of
+        the frameworks"""
+        return self._index_of_fetch(
+            ('task_index', active_only),
+            '_frameworks',
+            lambda: TaskIndex(self._task_list(active_only)),
+        )
+
     # XXX - need to filter on task state as well as id
     def tasks(self, fltr="", active_only=False):
-        return [
-            task.Task(self, x)
-            for x in self._task_list(active_only)
-            if fltr in x['id'] or fnmatch.fnmatch(x['id'], fltr)
-        ]
+        return [task.Task(self, x) for x in self.task_index(active_only).matching(fltr)]
+
+    def tasks_with_id(self, task_id, active_only=False):
+        return [task.Task(self, x) for x in self.task_index(active_only).get(task_id)]
+
+    def tasks_with_prefix(self, prefix, active_only=False):
+        """The tasks whose id starts with prefix, like the tasks of a marathon app"""
+        return [task.Task(self, x) for x in self.task_index(active_only).with_prefix(prefix)]
+
+    def tasks_on_slave(self, slave_id, active_only=False):
+        return [task.Task(self, x) for x in self.task_index(active_only).on_slave(slave_id)]
+
+    def frameworks_by_id(self):
+        """The Frameworks, active and completed, by id, built once per fetch
+        of the frameworks"""
+        return self._index_of_fetch(
+            'frameworks_by_id',
+            '_frameworks',
+            lambda: {f.id: f for f in self.frameworks()},
+        )
 
     def framework(self, fwid):
-        return list(filter(
-            lambda x: x.id == fwid,
-            self.frameworks(),
-        ))[0]
+        return self.frameworks_by_id()[fwid]
 
     def _framework_list(self, active_only=False):
         keys = ["frameworks"]
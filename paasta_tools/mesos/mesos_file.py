@@ -22,6 +22,8 @@ from . import util
 class File(object):
 
     chunk_size = 1024
+    # How long lines are assumed to be when sizing the first chunk read by tail
+    tail_line_length = 128
 
     def __init__(self, host, task=None, path=None):
         self.host = host
@@ -154,6 +156,46 @@ class File(object):
 
         yield self._get_chunk(fsize - size, size % self.chunk_size)
 
+    def _get_range(self, start, end):
+        """Returns the data between start and end, in as many requests as it
+        takes: like _read, this doesn't expect a chunk to be read whole."""
+        blobs = []
+        while start < end:
+            data = self._get_chunk(start, end - start)
+            if data == "":
+                break
+            blobs.append(data)
+            start = self.tell()
+        return "".join(blobs)
+
+    def tail(self, nlines):
+        """Returns the last nlines lines of the file.
+
+        The file is read backwards, starting with a chunk big enough for nlines
+        lines of tail_line_length, and doubling the size of the chunks until
+        enough lines are read. This takes a couple of requests however many
+        lines are asked for, where reversed() takes one per chunk_size. The
+        agent caps how much it returns at once, so a chunk may take more than
+        one request.
+        """
+        if nlines <= 0:
+            return []
+        end = self.size
+        length = max(self.chunk_size, nlines * self.tail_line_length)
+        buf = ""
+        while True:
+            start = max(0, end - length)
+            buf = self._get_range(start, end) + buf
+            end = start
+            lines = buf.split("\n")
+            # Don't include the terminator.
+            if lines[-1] == "":
+                lines.pop()
+            # The first line is only known to be whole at the start of the file
+            if end == 0 or len(lines) > nlines:
+                return lines[-nlines:]
+            length *= 2
+
     def read(self, size=None):
         return ''.join(self._read(size))
 
@@ -18,7 +18,6 @@ import os
 import re
 
 from . import exceptions
-from . import framework
 from . import mesos_file
 from . import util
 
@@ -43,7 +42,7 @@ class Task(object):
 
     @property
     def framework(self):
-        return framework.Framework(self.master.framework(self["framework_id"]))
+        return self.master.framework(self["framework_id"])
 
     @util.CachedProperty()
     def directory(self):
@@ -45,6 +45,8 @@ class CachedProperty(object):
         return self
 
     def __get__(self, inst, owner):
+        if inst is None:
+            return self
         try:
             value, last_update = inst._cache[self.__name__]
             if self.ttl > 0 and time.time() - last_update > self.ttl:
@@ -58,6 +60,17 @@ class CachedProperty(object):
             cache[self.__name__] = (value, time.time())
         return value
 
+    def fetched_at(self, inst):
+        """When the value inst would get was fetched, or None if inst would
+        fetch it again"""
+        try:
+            last_update = inst._cache[self.__name__][1]
+        except (KeyError, AttributeError):
+            return None
+        if self.ttl > 0 and time.time() - last_update > self.ttl:
+            return None
+        return last_update
+
 
 def memoize(obj):
     cache = obj.cache = {}
@@ -29,6 +29,7 @@ from requests.exceptions import HTTPError
 from paasta_tools.mesos_tools import get_count_running_tasks_on_slave
 from paasta_tools.mesos_tools import get_mesos_leader
 from paasta_tools.mesos_tools import get_mesos_master
+from paasta_tools.mesos_tools import get_mesos_task_count_by_slave
 from paasta_tools.mesos_tools import MESOS_MASTER_PORT
 from paasta_tools.utils import to_bytes
 
@@ -173,6 +174,16 @@ def get_hosts_with_state(state):
         status = status['get_maintenance_status']['status']
     except HTTPError:
         raise HTTPError("Error getting maintenance status.")
+    return get_hosts_with_state_in_status(status, state)
+
+
+def get_hosts_with_state_in_status(status, state):
+    """Returns the hosts listed in a maintenance status as being in state
+
+    :param status: the 'status' of a GET_MAINTENANCE_STATUS response
+    :param state: State we are interested in ('down_machines' or 'draining_machines')
+    :returns: A list of hostnames in the specified state or an empty list if no machines
+    """
     if not status or state not in status:
         return []
     if 'id' in status[state][0]:
@@ -736,6 +747,64 @@ def is_host_past_maintenance_start(hostname):
     return hostname in get_hosts_past_maintenance_start()
 
 
+class MaintenanceState(namedtuple('MaintenanceState', ['draining_hosts', 'maintenance_starts', 'running_task_counts'])):
+    """A snapshot of the maintenance status and schedule of the cluster, which
+    answers the same questions as is_host_drained and
+    is_host_past_maintenance_start without calling the master.
+
+    :param draining_hosts: a set of the hostnames marked as draining
+    :param maintenance_starts: a dict of hostname to the start of its earliest
+                               maintenance window, in nanoseconds
+    :param running_task_counts: a dict of hostname to the number of tasks
+                                running on it, for the draining hosts asked about
+    """
+
+    def is_host_drained(self, hostname):
+        return hostname in self.draining_hosts and self.running_task_counts.get(hostname, 0) == 0
+
+    def is_host_past_maintenance_start(self, hostname):
+        start = self.maintenance_starts.get(hostname)
+        return start is not None and start < datetime_to_nanoseconds(now())
+
+
+def get_maintenance_starts(schedules):
+    """Returns the start of the earliest maintenance window of each host in a
+    maintenance schedule
+
+    :param schedules: the 'schedule' of a GET_MAINTENANCE_SCHEDULE response
+    :returns: a dict of hostname to nanoseconds
+    """
+    starts = {}
+    for window in schedules.get('windows', []):
+        start = window['unavailability']['start']['nanoseconds']
+        for host in window['machine_ids']:
+            starts[host['hostname']] = min(start, starts.get(host['hostname'], start))
+    return starts
+
+
+def get_maintenance_state(hostnames):
+    """Fetches the maintenance status and schedule once, and the tasks running
+    on the slaves only if some of hostnames are draining
+
+    :param hostnames: the hostnames the MaintenanceState will be asked about
+    :returns: a MaintenanceState
+    """
+    status = raw_status().json()['get_maintenance_status']['status']
+    draining_hosts = set(get_hosts_with_state_in_status(status, 'draining_machines'))
+    schedules = get_maintenance_schedule().json()['get_maintenance_schedule']['schedule']
+    running_task_counts = {}
+    if draining_hosts.intersection(hostnames):
+        mesos_state = get_mesos_master().state_summary()
+        for slave in get_mesos_task_count_by_slave(mesos_state):
+            task_counts = slave['task_counts']
+            running_task_counts[task_counts.slave['hostname']] = task_counts.count
+    return MaintenanceState(
+        draining_hosts=draining_hosts,
+        maintenance_starts=get_maintenance_starts(schedules),
+        running_task_counts=running_task_counts,
+    )
+
+
 def is_host_past_maintenance_end(hostname):
     """Checks if a host has reached the end of its maintenance window
     :param hostname: hostname to check
@@ -11,12 +11,14 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import concurrent.futures
 import datetime
 import itertools
 import json
 import logging
 import re
 import socket
+import time
 from collections import namedtuple
 from urllib.parse import urlparse
 
@@ -24,7 +26,6 @@ import humanize
 import requests
 from kazoo.client import KazooClient
 
-import paasta_tools.mesos.cluster as cluster
 import paasta_tools.mesos.exceptions as mesos_exceptions
 from paasta_tools.mesos.cfg import load_mesos_config
 from paasta_tools.mesos.exceptions import SlaveDoesNotExist
@@ -47,6 +48,12 @@ SlaveTaskCount = namedtuple('SlaveTaskCount', ['count', 'chronos_count', 'slave'
 
 DEFAULT_MESOS_CLI_CONFIG_LOCATION = "/nail/etc/mesos-cli.json"
 
+STDSTREAMS = ('stdout', 'stderr')
+# Number of sandbox files read at once by a SandboxTailReader
+SANDBOX_TAIL_MAX_WORKERS = 20
+# Seconds a SandboxTailReader waits for all the tails it has to read
+SANDBOX_TAIL_TIMEOUT = 30
+
 log = logging.getLogger(__name__)
 log.addHandler(logging.NullHandler())
 
@@ -71,6 +78,22 @@ def get_mesos_master(**overrides):
     return MesosMaster(config)
 
 
+_task_lookup_master = None
+
+
+def get_task_lookup_master():
+    """The MesosMaster the task lookups of this process share, so that its
+    TaskIndex is built once per fetch of the frameworks, which it keeps for
+    up to 15 seconds, rather than once per lookup. It is replaced when the
+    mesos config changes.
+    """
+    global _task_lookup_master
+    config = get_mesos_config()
+    if _task_lookup_master is None or _task_lookup_master.config != config:
+        _task_lookup_master = MesosMaster(config)
+    return _task_lookup_master
+
+
 MY_HOSTNAME = socket.getfqdn()
 MESOS_MASTER_PORT = 5050
 MESOS_SLAVE_PORT = '5051'
@@ -132,7 +155,7 @@ def get_current_tasks(job_id):
     :param job_id: the job id of the tasks.
     :return tasks: a list of mesos.cli.Task.
     """
-    mesos_master = get_mesos_master()
+    mesos_master = get_task_lookup_master()
     framework_tasks = mesos_master.tasks(fltr=job_id, active_only=False)
     return framework_tasks
 
@@ -327,42 +350,95 @@ def format_non_running_mesos_task_row(task, get_short_task_id):
     )
 
 
-@timeout()
-def format_stdstreams_tail_for_task(task, get_short_task_id, nlines=10):
+def get_sandbox_file_tail(task, path, nlines):
+    """Returns the path and the last nlines lines of a file in the sandbox of a
+    task, or None if the sandbox has no such file"""
+    fobj = task.file(path)
+    if not fobj.exists():
+        return None
+    return fobj.path, fobj.tail(nlines)
+
+
+class SandboxTailReader(object):
+    """Reads the tails of the stdout and stderr of many tasks concurrently, on a
+    pool of threads shared by all the tasks.
+
+    The tails of a task are read as soon as it is submitted, and get_tails only
+    waits for the ones that are not read yet, up to timeout seconds after the
+    reader was created.
+    """
+
+    def __init__(self, nlines, max_workers=SANDBOX_TAIL_MAX_WORKERS, timeout=SANDBOX_TAIL_TIMEOUT):
+        self.nlines = nlines
+        self.deadline = time.time() + timeout
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        # Keyed by the id of the task objects, as the tasks are dicts
+        self._tails = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Gives up on the tails that are not read yet"""
+        for _, futures in self._tails.values():
+            for future in futures:
+                future.cancel()
+        self.executor.shutdown(wait=False)
+
+    def submit(self, tasks):
+        for task in tasks:
+            if id(task) not in self._tails:
+                self._tails[id(task)] = (task, [
+                    self.executor.submit(get_sandbox_file_tail, task, path, self.nlines)
+                    for path in STDSTREAMS
+                ])
+
+    def get_tails(self, task):
+        """Returns the (path, lines) tails of the sandbox files of a task, reading
+        them if the task wasn't submitted.
+
+        :raises TimeoutError: if the tails are not read before the deadline
+        """
+        self.submit([task])
+        tails = []
+        for future in self._tails[id(task)][1]:
+            try:
+                tail = future.result(timeout=max(0, self.deadline - time.time()))
+            except concurrent.futures.TimeoutError:
+                raise TimeoutError("Timed out reading the sandbox of %s" % task['id'])
+            if tail is not None:
+                tails.append(tail)
+        return tails
+
+
+def format_stdstreams_tail_for_task(task, get_short_task_id, nlines=10, tail_reader=None):
     """Returns the formatted "tail" of stdout/stderr, for a given a task.
 
     :param get_short_task_id: A function which given a
                               task_id returns a short task_id suitable for
                               printing.
+    :param tail_reader: A SandboxTailReader the tails of the task are read with,
+                        in which case nlines is the one of the reader.
     """
+    if tail_reader is None:
+        with SandboxTailReader(nlines=nlines) as tail_reader:
+            return format_stdstreams_tail_for_task(task, get_short_task_id, tail_reader=tail_reader)
+
     error_message = PaastaColors.red("      couldn't read stdout/stderr for %s (%s)")
     output = []
-    mesos_cli_config = get_mesos_config()
     try:
-        fobjs = list(cluster.get_files_for_tasks(
-            task_list=[task],
-            file_list=['stdout', 'stderr'],
-            max_workers=mesos_cli_config["max_workers"],
-        ))
-        fobjs.sort(key=lambda fobj: fobj.path, reverse=True)
-        if not fobjs:
+        tails = tail_reader.get_tails(task)
+        tails.sort(key=lambda tail: tail[0], reverse=True)
+        if not tails:
             output.append(PaastaColors.blue("      no stdout/stderrr for %s" % get_short_task_id(task['id'])))
             return output
-        for fobj in fobjs:
-            output.append(PaastaColors.blue("      %s tail for %s" % (fobj.path, get_short_task_id(task['id']))))
-            # read nlines, starting from EOF
-            # mesos.cli is smart and can efficiently read a file backwards
-            reversed_file = reversed(fobj)
-            tail = []
-            for _ in range(nlines):
-                line = next(reversed_file, None)
-                if line is None:
-                    break
-                tail.append(line)
-            # reverse the tail, so that EOF is at the bottom again
-            if tail:
-                output.extend(tail[::-1])
-            output.append(PaastaColors.blue("      %s EOF" % fobj.path))
+        for path, lines in tails:
+            output.append(PaastaColors.blue("      %s tail for %s" % (path, get_short_task_id(task['id']))))
+            output.extend(lines)
+            output.append(PaastaColors.blue("      %s EOF" % path))
     except (
         mesos_exceptions.MasterNotAvailableException,
         mesos_exceptions.SlaveDoesNotExist,
@@ -389,7 +465,9 @@ def zip_tasks_verbose_output(table, stdstreams):
     return output
 
 
-def format_task_list(tasks, list_title, table_header, get_short_task_id, format_task_row, grey, tail_lines):
+def format_task_list(
+    tasks, list_title, table_header, get_short_task_id, format_task_row, grey, tail_lines, tail_reader=None,
+):
     """Formats a list of tasks, returns a list of output lines
     :param tasks: List of tasks as returned by get_*_tasks_from_all_frameworks.
     :param list_title: 'Running Tasks:' or 'Non-Running Tasks'.
@@ -398,6 +476,7 @@ def format_task_list(tasks, list_title, table_header, get_short_task_id, format_
     :param format_task_row: Formatting function, works on a task and a get_short_task_id function.
     :param tail_lines (int): number of lines of stdout/stderr to tail, as obtained from the Mesos sandbox.
     :param grey: If True, the list will be made less visually prominent.
+    :param tail_reader: The SandboxTailReader to read stdout/stderr with, if tail_lines is not 0.
     :return output: Formatted output (list of output lines).
     """
     if not grey:
@@ -406,6 +485,15 @@ def format_task_list(tasks, list_title, table_header, get_short_task_id, format_
     else:
         def colorize(x):
             return(PaastaColors.grey(x))
+    if tail_lines != 0 and tail_reader is None:
+        with SandboxTailReader(nlines=tail_lines) as tail_reader:
+            return format_task_list(
+                tasks, list_title, table_header, get_short_task_id, format_task_row, grey, tail_lines, tail_reader,
+            )
+    if tail_lines != 0:
+        # Read the tails while formatting the table, which also talks to the slaves
+        tail_reader.submit(tasks)
+
     output = []
     output.append(colorize("  %s" % list_title))
     table_rows = [
@@ -419,7 +507,9 @@ def format_task_list(tasks, list_title, table_header, get_short_task_id, format_
     else:
         stdstreams = []
         for task in tasks:
-            stdstreams.append(format_stdstreams_tail_for_task(task, get_short_task_id, nlines=tail_lines))
+            stdstreams.append(format_stdstreams_tail_for_task(
+                task, get_short_task_id, nlines=tail_lines, tail_reader=tail_reader,
+            ))
         output.append(tasks_table[0])  # header
         output.extend(zip_tasks_verbose_output(tasks_table[1:], stdstreams))
 
@@ -438,45 +528,57 @@ def status_mesos_tasks_verbose(job_id, get_short_task_id, tail_lines=0):
     """
     output = []
     running_and_active_tasks = select_tasks_by_id(get_cached_list_of_running_tasks_from_frameworks(), job_id)
-    list_title = "Running Tasks:"
-    table_header = [
-        "Mesos Task ID",
-        "Host deployed to",
-        "Ram",
-        "CPU",
-        "Deployed at what localtime",
-    ]
-    output.extend(format_task_list(
-        tasks=running_and_active_tasks,
-        list_title=list_title,
-        table_header=table_header,
-        get_short_task_id=get_short_task_id,
-        format_task_row=format_running_mesos_task_row,
-        grey=False,
-        tail_lines=tail_lines,
-    ))
-
     non_running_tasks = select_tasks_by_id(get_cached_list_of_not_running_tasks_from_frameworks(), job_id)
     # Order the tasks by timestamp
     non_running_tasks.sort(key=lambda task: get_first_status_timestamp(task))
     non_running_tasks_ordered = list(reversed(non_running_tasks[-10:]))
 
-    list_title = "Non-Running Tasks"
-    table_header = [
-        "Mesos Task ID",
-        "Host deployed to",
-        "Deployed at what localtime",
-        "Status",
-    ]
-    output.extend(format_task_list(
-        tasks=non_running_tasks_ordered,
-        list_title=list_title,
-        table_header=table_header,
-        get_short_task_id=get_short_task_id,
-        format_task_row=format_non_running_mesos_task_row,
-        grey=True,
-        tail_lines=tail_lines,
-    ))
+    # The stdout/stderr of all the tasks are read at once, on one pool
+    tail_reader = SandboxTailReader(nlines=tail_lines) if tail_lines != 0 else None
+    try:
+        if tail_reader is not None:
+            tail_reader.submit(running_and_active_tasks)
+            tail_reader.submit(non_running_tasks_ordered)
+
+        list_title = "Running Tasks:"
+        table_header = [
+            "Mesos Task ID",
+            "Host deployed to",
+            "Ram",
+            "CPU",
+            "Deployed at what localtime",
+        ]
+        output.extend(format_task_list(
+            tasks=running_and_active_tasks,
+            list_title=list_title,
+            table_header=table_header,
+            get_short_task_id=get_short_task_id,
+            format_task_row=format_running_mesos_task_row,
+            grey=False,
+            tail_lines=tail_lines,
+            tail_reader=tail_reader,
+        ))
+
+        list_title = "Non-Running Tasks"
+        table_header = [
+            "Mesos Task ID",
+            "Host deployed to",
+            "Deployed at what localtime",
+            "Status",
+        ]
+        output.extend(format_task_list(
+            tasks=non_running_tasks_ordered,
+            list_title=list_title,
+            table_header=table_header,
+            get_short_task_id=get_short_task_id,
+            format_task_row=format_non_running_mesos_task_row,
+            grey=True,
+            tail_lines=tail_lines,
+            tail_reader=tail_reader,
+        ))
+    finally:
+        if tail_reader is not None:
+            tail_reader.close()
 
     return "\n".join(output)
 
@@ -707,16 +809,18 @@ def get_mesos_task_count_by_slave(mesos_state, slaves_list=None, pool=None):
     slaves = {
         slave['id']: {'count': 0, 'slave': slave, 'chronos_count': 0} for slave in mesos_state.get('slaves', [])
     }
+    # The slave and framework of a task are looked up in indexes the master
+    # builds once per state fetch, so this is a single pass over the tasks
     for task in all_mesos_tasks:
         try:
-            if task.slave['id'] not in slaves:
-                log.debug("Slave {} not found for task".format(task.slave['id']))
+            slave_id = task.slave['id']
+            slave_counts = slaves.get(slave_id)
+            if slave_counts is None:
+                log.debug("Slave %s not found for task", slave_id)
                 continue
-            else:
-                slaves[task.slave['id']]['count'] += 1
-                log.debug("Task framework: {}".format(task.framework.name))
-                if task.framework.name == CHRONOS_FRAMEWORK_NAME:
-                    slaves[task.slave['id']]['chronos_count'] += 1
+            slave_counts['count'] += 1
+            if task.framework.name == CHRONOS_FRAMEWORK_NAME:
+                slave_counts['chronos_count'] += 1
         except SlaveDoesNotExist:
             log.debug("Tried to get mesos slaves for task {}, but none existed.".format(task['id']))
             continue
@@ -781,15 +885,30 @@ def terminate_framework(framework_id):
 
 
 def get_tasks_from_app_id(app_id, slave_hostname=None):
-    tasks = get_running_tasks_from_frameworks(app_id)
+    """The running tasks of a marathon app, whose ids all start with the app id.
+
+    :param app_id: the marathon app id, without the leading /
+    :param slave_hostname: only return the tasks running on the slaves whose
+        hostname starts with slave_hostname
+    """
+    mesos_master = get_task_lookup_master()
     if slave_hostname:
-        tasks = [task for task in tasks if filter_task_by_hostname(task, slave_hostname)]
-    return tasks
+        tasks = []
+        for slave_id in get_slave_ids_by_hostname_prefix(mesos_master, slave_hostname):
+            tasks.extend(task for task in mesos_master.tasks_on_slave(slave_id) if task['id'].startswith(app_id))
+    else:
+        tasks = mesos_master.tasks_with_prefix(app_id)
+    return filter_running_tasks(tasks)
+
+
+def get_slave_ids_by_hostname_prefix(mesos_master, hostname):
+    return [slave['id'] for slave in mesos_master.state['slaves'] if slave['hostname'].startswith(hostname)]
 
 
 def get_task(task_id, app_id=''):
-    tasks = get_running_tasks_from_frameworks(app_id)
-    tasks = [task for task in tasks if filter_task_by_task_id(task, task_id)]
+    mesos_master = get_task_lookup_master()
+    tasks = filter_running_tasks(mesos_master.tasks_with_id(task_id))
+    tasks = [task for task in tasks if app_id in task['id']]
     if len(tasks) < 1:
         raise TaskNotFound("Couldn't find task for given id: {}".format(task_id))
     if len(tasks) > 1:
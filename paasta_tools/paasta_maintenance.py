@@ -27,9 +27,11 @@ from paasta_tools.marathon_tools import marathon_services_running_here
 from paasta_tools.marathon_tools import read_registration_for_service_instance
 from paasta_tools.smartstack_tools import backend_is_up
 from paasta_tools.smartstack_tools import get_backends
+from paasta_tools.smartstack_tools import get_replication_for_backends
 from paasta_tools.smartstack_tools import get_replication_for_services
 from paasta_tools.smartstack_tools import ip_port_hostname_from_svname
 from paasta_tools.smartstack_tools import load_smartstack_info_for_service
+from paasta_tools.smartstack_tools import load_smartstack_info_for_services
 from paasta_tools.utils import paasta_print
 
 log = logging.getLogger(__name__)
@@ -113,8 +115,9 @@ def is_safe_to_drain(hostname):
     return not are_local_tasks_in_danger()
 
 
-def is_healthy_in_haproxy(local_port, backends):
-    local_ip = gethostbyname(gethostname())
+def is_healthy_in_haproxy(local_port, backends, local_ip=None):
+    if local_ip is None:
+        local_ip = gethostbyname(gethostname())
     for backend in backends:
         ip, port, _ = ip_port_hostname_from_svname(backend['svname'])
         if ip == local_ip and port == local_port:
@@ -128,32 +131,46 @@ def is_healthy_in_haproxy(local_port, backends):
     return False
 
 
-def synapse_replication_is_low(service, instance, system_paasta_config, local_backends):
-    crit_threshold = 80
+def get_registered_namespace(service, instance):
+    """Returns the (service, namespace) that service.instance registers in"""
     reg_svc, reg_namespace, _, __ = utils.decompose_job_id(
         read_registration_for_service_instance(
             service=service, instance=instance,
         ),
     )
+    return reg_svc, reg_namespace
+
+
+def synapse_replication_is_low(
+    service, instance, system_paasta_config, local_backends,
+    smartstack_replication_info=None, local_replication=None,
+):
+    """The smartstack replication of every location and the local replication
+    are fetched unless they are passed in, as smartstack_replication_info (as
+    returned by load_smartstack_info_for_service) and local_replication (as
+    returned by get_replication_for_backends)"""
+    crit_threshold = 80
     # We only actually care about the replication of where we're registering
-    service, namespace = reg_svc, reg_namespace
+    service, namespace = get_registered_namespace(service, instance)
 
-    smartstack_replication_info = load_smartstack_info_for_service(
-        service=service,
-        namespace=namespace,
-        blacklist=[],
-        system_paasta_config=system_paasta_config,
-    )
+    if smartstack_replication_info is None:
+        smartstack_replication_info = load_smartstack_info_for_service(
+            service=service,
+            namespace=namespace,
+            blacklist=[],
+            system_paasta_config=system_paasta_config,
+        )
     expected_count = get_expected_instance_count_for_namespace(service=service, namespace=namespace)
     expected_count_per_location = int(expected_count / len(smartstack_replication_info))
 
     synapse_name = utils.compose_job_id(service, namespace)
-    local_replication = get_replication_for_services(
-        synapse_host=system_paasta_config.get_default_synapse_host(),
-        synapse_port=system_paasta_config.get_synapse_port(),
-        synapse_haproxy_url_format=system_paasta_config.get_synapse_haproxy_url_format(),
-        services=[synapse_name],
-    )
+    if local_replication is None:
+        local_replication = get_replication_for_services(
+            synapse_host=system_paasta_config.get_default_synapse_host(),
+            synapse_port=system_paasta_config.get_synapse_port(),
+            synapse_haproxy_url_format=system_paasta_config.get_synapse_haproxy_url_format(),
+            services=[synapse_name],
+        )
     num_available = local_replication.get(synapse_name, 0)
     under_replicated, ratio = utils.is_under_replicated(
         num_available, expected_count_per_location, crit_threshold,
@@ -174,10 +191,34 @@ def are_local_tasks_in_danger():
             synapse_port=system_paasta_config.get_synapse_port(),
             synapse_haproxy_url_format=system_paasta_config.get_synapse_haproxy_url_format(),
         )
+        local_ip = gethostbyname(gethostname())
+        healthy_services = []
         for service, instance, port in local_services:
             log.info("Inspecting %s.%s on %s" % (service, instance, port))
-            if is_healthy_in_haproxy(port, local_backends) and \
-               synapse_replication_is_low(service, instance, system_paasta_config, local_backends=local_backends):
+            if is_healthy_in_haproxy(port, local_backends, local_ip=local_ip):
+                healthy_services.append((service, instance, port))
+        if not healthy_services:
+            return False
+
+        # Fetch the replication of every location once for all the services
+        # we have to check, rather than once per service
+        registered_namespaces = {
+            (service, instance): get_registered_namespace(service, instance)
+            for service, instance, _ in healthy_services
+        }
+        smartstack_replication_infos = load_smartstack_info_for_services(
+            service_namespaces=set(registered_namespaces.values()),
+            blacklist=[],
+            system_paasta_config=system_paasta_config,
+        )
+        local_replication = get_replication_for_backends(local_backends)
+        for service, instance, port in healthy_services:
+            if synapse_replication_is_low(
+                service, instance, system_paasta_config,
+                local_backends=local_backends,
+                smartstack_replication_info=smartstack_replication_infos[registered_namespaces[(service, instance)]],
+                local_replication=local_replication,
+            ):
                 log.warning("%s.%s on port %s is healthy but the service is in danger!" % (
                     service, instance, port,
                 ))
@@ -99,11 +99,13 @@ class PaastaClients():
     _cached: bool
     _marathon: Optional[marathon_tools.MarathonClients]
     _chronos: Optional[ChronosClient]
+    _chronos_job_index: Optional[chronos_tools.ChronosJobIndex]
 
     def __init__(self, cached: bool=False) -> None:
         self._cached = cached
         self._marathon = None
         self._chronos = None
+        self._chronos_job_index = None
 
     def marathon(self) -> marathon_tools.MarathonClients:
         if self._marathon is None:
@@ -118,6 +120,13 @@ class PaastaClients():
             self._chronos = chronos_tools.get_chronos_client(chronos_config, cached=self._cached)
         return self._chronos
 
+    def chronos_job_index(self) -> chronos_tools.ChronosJobIndex:
+        """Each instance only looks up its own jobs, once, so the instances
+        of a run can share a single listing of the jobs in Chronos."""
+        if self._chronos_job_index is None:
+            self._chronos_job_index = chronos_tools.ChronosJobIndex.from_client(self.chronos())
+        return self._chronos_job_index
+
 
 def main() -> None:
     args = parse_args()
@@ -210,6 +219,7 @@ def main() -> None:
                         verbose=args.verbose,
                         soa_dir=args.soa_dir,
                         client=clients.chronos(),
+                        job_index=clients.chronos_job_index(),
                     )
                 elif instance_type == 'paasta_native':
                     return_code = paasta_native_serviceinit.perform_command(
@@ -17,22 +17,65 @@ from typing import Any
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Tuple
 
 from paasta_tools.secret_providers import SecretProvider
 
-SECRET_REGEX = "^SECRET\([A-Za-z0-9_-]*\)$"
+SECRET_REGEX = re.compile(r"^SECRET\([A-Za-z0-9_-]*\)$")
+
+# (soa_dir, service) -> ((mtime, size) of the secret files by file name, parsed secret files by secret name)
+_secret_files_cache: Dict[Tuple[str, str], Tuple[Dict[str, Tuple[int, int]], Dict[str, Any]]] = {}
 
 
 def is_secret_ref(env_var_val: str) -> bool:
-    pattern = re.compile(SECRET_REGEX)
-    return pattern.match(env_var_val) is not None
+    return SECRET_REGEX.match(env_var_val) is not None
+
+
+def get_secret_files(service: str, soa_dir: str) -> Dict[str, Any]:
+    """Returns the parsed json secret files of a service, by secret name, or
+    None for the files that aren't valid json.
+
+    A file is only read again once its mtime or size changes, be it replaced
+    or edited in place.
+    """
+    secrets_dir = os.path.join(soa_dir, service, "secrets")
+    try:
+        filenames = [filename for filename in os.listdir(secrets_dir) if os.path.splitext(filename)[1] == '.json']
+    except OSError:
+        return {}
+    file_stats: Dict[str, Tuple[int, int]] = {}
+    for filename in filenames:
+        try:
+            stat = os.stat(os.path.join(secrets_dir, filename))
+        except OSError:
+            continue
+        file_stats[filename] = (stat.st_mtime_ns, stat.st_size)
+    cached_stats, cached_files = _secret_files_cache.get((soa_dir, service), ({}, {}))
+    if file_stats == cached_stats:
+        return cached_files
+
+    secret_files: Dict[str, Any] = {}
+    for filename, file_stat in file_stats.items():
+        secret_name = os.path.splitext(filename)[0]
+        if cached_stats.get(filename) == file_stat and secret_name in cached_files:
+            secret_files[secret_name] = cached_files[secret_name]
+            continue
+        try:
+            with open(os.path.join(secrets_dir, filename), 'r') as json_secret_file:
+                secret_files[secret_name] = json.load(json_secret_file)
+        except IOError:
+            continue
+        except json.decoder.JSONDecodeError:
+            secret_files[secret_name] = None
+    _secret_files_cache[(soa_dir, service)] = (file_stats, secret_files)
+    return secret_files
 
 
 def get_hmac_for_secret(
     env_var_val: str,
     service: str,
     soa_dir: str,
-    vault_environment: str,
+    vault_environment: Optional[str],
 ) -> Optional[str]:
     secret_name = get_secret_name_from_ref(env_var_val)
     secret_path = os.path.join(
@@ -40,21 +83,20 @@ def get_hmac_for_secret(
         service,
         "secrets", "{}.json".format(secret_name),
     )
-    try:
-        with open(secret_path, 'r') as json_secret_file:
-            secret_file = json.load(json_secret_file)
-            try:
-                return secret_file['environments'][vault_environment]['signature']
-            except KeyError:
-                print("Failed to get secret signature at environments:{}:signature in json"
-                      " file".format(vault_environment))
-                return None
-    except IOError as e:
+    secret_files = get_secret_files(service, soa_dir)
+    if secret_name not in secret_files:
         print("Failed to open json secret at {}".format(secret_path))
         return None
-    except json.decoder.JSONDecodeError as e:
+    secret_file = secret_files[secret_name]
+    if secret_file is None:
         print("Failed to deserialise json secret at {}".format(secret_path))
         return None
+    try:
+        return secret_file['environments'][vault_environment]['signature']
+    except KeyError:
+        print("Failed to get secret signature at environments:{}:signature in json"
+              " file".format(vault_environment))
+        return None
 
 
 def get_secret_name_from_ref(env_var_val: str) -> str:
@@ -470,6 +470,7 @@ def get_tasks_by_state(
     old_app_draining_tasks = {}
     old_app_at_risk_tasks = {}
 
+    draining_hosts = set(draining_hosts)
     for app, client in other_apps_with_clients:
 
         tasks_by_state = get_tasks_by_state_for_app(
@@ -14,6 +14,7 @@
 import collections
 import csv
 import socket
+from concurrent.futures import ThreadPoolExecutor
 from typing import DefaultDict
 from typing import Dict
 from typing import Iterable
@@ -25,11 +26,15 @@ from mypy_extensions import TypedDict
 
 from paasta_tools import marathon_tools
 from paasta_tools import mesos_tools
+from paasta_tools.mesos.exceptions import NoSlavesAvailableError
 from paasta_tools.utils import compose_job_id
 from paasta_tools.utils import DEFAULT_SOA_DIR
 from paasta_tools.utils import get_user_agent
 
 
+# Number of locations queried at once for their haproxy replication
+SMARTSTACK_REPLICATION_MAX_WORKERS = 10
+
 HaproxyBackend = TypedDict(
     'HaproxyBackend',
     {
@@ -171,7 +176,7 @@ def get_smartstack_replication_for_attribute(attribute, service, namespace, blac
         whitelist=None,
     )
     if not filtered_slaves:
-        raise mesos_tools.NoSlavesAvailableError
+        raise NoSlavesAvailableError
 
     attribute_slave_dict = mesos_tools.get_mesos_slaves_grouped_by_attribute(
         slaves=filtered_slaves,
@@ -194,6 +199,73 @@ def get_smartstack_replication_for_attribute(attribute, service, namespace, blac
     return replication_info
 
 
+def load_smartstack_info_for_services(
+    service_namespaces: Iterable[Tuple[str, str]],
+    blacklist,
+    system_paasta_config,
+    soa_dir=DEFAULT_SOA_DIR,
+) -> Dict[Tuple[str, str], Dict[str, Dict[str, int]]]:
+    """Like load_smartstack_info_for_service, for many service namespaces at once.
+
+    The replication of every service is read from a single haproxy snapshot per
+    location, and the locations are queried concurrently.
+
+    :param service_namespaces: A list of tuples of (service, namespace)
+    :param blacklist: A list of blacklisted location tuples in the form of (location, value)
+    :param system_paasta_config: A SystemPaastaConfig object representing the system configuration.
+    :returns: a dictionary of the form {(service, namespace): <what load_smartstack_info_for_service returns>}
+    """
+    discover_location_types = {
+        (service, namespace): marathon_tools.load_service_namespace_config(
+            service=service, namespace=namespace, soa_dir=soa_dir,
+        ).get_discover()
+        for service, namespace in service_namespaces
+    }
+    if not discover_location_types:
+        return {}
+
+    filtered_slaves = mesos_tools.get_all_slaves_for_blacklist_whitelist(
+        blacklist=blacklist,
+        whitelist=None,
+    )
+    if not filtered_slaves:
+        raise NoSlavesAvailableError
+
+    synapse_hosts: Dict[str, Dict[str, str]] = {}
+    for attribute in set(discover_location_types.values()):
+        attribute_slave_dict = mesos_tools.get_mesos_slaves_grouped_by_attribute(
+            slaves=filtered_slaves,
+            attribute=attribute,
+        )
+        # arbitrarily choose the first host with a given attribute to query for replication stats
+        synapse_hosts[attribute] = {value: hosts[0]['hostname'] for value, hosts in attribute_slave_dict.items()}
+
+    hostnames = sorted({hostname for hosts in synapse_hosts.values() for hostname in hosts.values()})
+    with ThreadPoolExecutor(max_workers=SMARTSTACK_REPLICATION_MAX_WORKERS) as executor:
+        replication_by_host = dict(zip(hostnames, executor.map(
+            lambda hostname: get_replication_for_all_services(
+                synapse_host=hostname,
+                synapse_port=system_paasta_config.get_synapse_port(),
+                synapse_haproxy_url_format=system_paasta_config.get_synapse_haproxy_url_format(),
+            ),
+            hostnames,
+        )))
+
+    smartstack_info = {}
+    for (service, namespace), attribute in discover_location_types.items():
+        full_name = compose_job_id(service, namespace)
+        smartstack_info[(service, namespace)] = {
+            value: {full_name: replication_by_host[hostname].get(full_name, 0)}
+            for value, hostname in synapse_hosts[attribute].items()
+        }
+    return smartstack_info
+
+
+def get_replication_for_backends(backends: Iterable[HaproxyBackend]) -> Dict[str, int]:
+    """Counts the backends that are up for each service in backends"""
+    return collections.Counter([b['pxname'] for b in backends if backend_is_up(b)])
+
+
 def get_replication_for_all_services(
         synapse_host: str,
         synapse_port: int,
@@ -213,7 +285,7 @@ def get_replication_for_all_services(
         synapse_port=synapse_port,
         synapse_haproxy_url_format=synapse_haproxy_url_format,
     )
-    return collections.Counter([b['pxname'] for b in backends if backend_is_up(b)])
+    return get_replication_for_backends(backends)
 
 
 def get_replication_for_services(
@@ -0,0 +1,179 @@
+# Copyright 2015-2018 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import gevent
+import mock
+from pyramid import testing
+from pyramid.response import Response
+
+from paasta_tools.api import cluster_state
+from paasta_tools.marathon_tools import MarathonClients
+from paasta_tools.metrics.metrics_lib import NoMetrics
+
+
+def mock_marathon_client(apps=(), queue=()):
+    client = mock.Mock(servers=['http://marathon'])
+    client.list_apps.return_value = list(apps)
+    client.list_queue.return_value = list(queue)
+    client.list_deployments.return_value = []
+    return client
+
+
+def mock_marathon_app(app_id, task_ids=()):
+    return mock.Mock(id=app_id, tasks=[mock.Mock(id=task_id) for task_id in task_ids])
+
+
+def fake_mesos_state():
+    return {
+        'slaves': [
+            {'id': 'slave1', 'hostname': 'host1'},
+            {'id': 'slave2', 'hostname': 'host2'},
+        ],
+        'frameworks': [
+            {
+                'tasks': [
+                    {'id': 'fake--service.main.git1.config1.uuid1', 'state': 'TASK_RUNNING', 'slave_id': 'slave1'},
+                    {'id': 'fake--service.main.git1.config1.uuid2', 'state': 'TASK_RUNNING', 'slave_id': 'slave2'},
+                    {'id': 'fake--service.main.git1.config1.uuid3', 'state': 'TASK_STAGING', 'slave_id': 'slave2'},
+                ],
+                'completed_tasks': [
+                    {'id': 'fake--service.main.git0.config1.uuid0', 'state': 'TASK_KILLED', 'slave_id': 'slave1'},
+                ],
+            },
+        ],
+        'completed_frameworks': [
+            {
+                'tasks': [],
+                'completed_tasks': [
+                    {'id': 'other.main.git1.config1.uuid4', 'state': 'TASK_FINISHED', 'slave_id': 'slave1'},
+                ],
+            },
+        ],
+    }
+
+
+def test_job_id_for_app_id():
+    assert cluster_state.job_id_for_app_id('/fake--service.main.git1.config1') == 'fake--service.main'
+    assert cluster_state.job_id_for_app_id('/unrelated') is None
+
+
+def test_build_marathon_state():
+    main_app = mock_marathon_app('/fake--service.main.git1.config1', task_ids=['task1', 'task2'])
+    old_app = mock_marathon_app('/fake--service.main.git0.config1', task_ids=['task0'])
+    unrelated_app = mock_marathon_app('/unrelated')
+    queue_item = mock.Mock(app=mock.Mock(id='/fake--service.main.git1.config1'))
+    client = mock_marathon_client(apps=[main_app, old_app, unrelated_app], queue=[queue_item])
+
+    state = cluster_state.build_marathon_state(client)
+
+    client.list_apps.assert_called_once_with(embed_tasks=True)
+    client.list_queue.assert_called_once_with(embed_last_unused_offers=True)
+    assert state.apps_by_id == {app.id: app for app in (main_app, old_app, unrelated_app)}
+    assert state.apps_by_job_id == {'fake--service.main': [main_app, old_app]}
+    assert sorted(state.tasks_by_id) == ['task0', 'task1', 'task2']
+    assert state.queue_by_app_id == {'/fake--service.main.git1.config1': queue_item}
+    assert state.deployments == []
+
+
+def test_build_mesos_state():
+    state = cluster_state.build_mesos_state(fake_mesos_state())
+
+    assert sorted(state.slaves_by_id) == ['slave1', 'slave2']
+    assert len(state.tasks_by_id) == 5
+    assert {
+        app_id: sorted(task['id'] for task in tasks)
+        for app_id, tasks in state.running_tasks_by_app_id.items()
+    } == {
+        'fake--service.main.git1.config1': [
+            'fake--service.main.git1.config1.uuid1',
+            'fake--service.main.git1.config1.uuid2',
+        ],
+    }
+
+
+def make_cache(clients, **kwargs):
+    return cluster_state.ClusterStateCache(
+        MarathonClients(current=clients, previous=[]),
+        metrics=NoMetrics('paasta.api.cluster_state'),
+        **kwargs
+    )
+
+
+@mock.patch('paasta_tools.api.cluster_state.get_mesos_master', autospec=True)
+def test_cluster_state_cache_refresh(mock_get_mesos_master):
+    mock_get_mesos_master.return_value.state = fake_mesos_state()
+    client1 = mock_marathon_client(apps=[mock_marathon_app('/fake--service.main.git1.config1')])
+    client2 = mock_marathon_client(apps=[mock_marathon_app('/other--service.main.git1.config1')])
+    client2.servers = ['http://other-marathon']
+    cache = make_cache([client1, client2])
+
+    assert cache.get_marathon_state(client1) is None
+    assert cache.get_mesos_state() is None
+    assert cache.age() is None
+
+    cache.refresh()
+
+    assert list(cache.get_marathon_state(client1).apps_by_job_id) == ['fake--service.main']
+    assert list(cache.get_marathon_state(client2).apps_by_job_id) == ['other--service.main']
+    assert sorted(cache.get_mesos_state().slaves_by_id) == ['slave1', 'slave2']
+    assert 0 <= cache.age() < 5
+
+
+@mock.patch('paasta_tools.api.cluster_state.time.time', autospec=True)
+@mock.patch('paasta_tools.api.cluster_state.get_mesos_master', autospec=True)
+def test_cluster_state_cache_keeps_state_on_failure_until_stale(mock_get_mesos_master, mock_time):
+    mock_time.return_value = 1000
+    mock_get_mesos_master.return_value.state = fake_mesos_state()
+    client = mock_marathon_client()
+    cache = make_cache([client], max_staleness=30)
+    cache.refresh()
+    marathon_state = cache.get_marathon_state(client)
+
+    mock_time.return_value = 1020
+    client.list_apps.side_effect = Exception('marathon is down')
+    cache.refresh()
+    assert cache.failures == 1
+    assert cache.get_marathon_state(client) is marathon_state
+    assert cache.age() == 20
+
+    mock_time.return_value = 1040
+    assert cache.get_marathon_state(client) is None
+    assert cache.get_mesos_state() is not None
+
+
+@mock.patch('paasta_tools.api.cluster_state.get_mesos_master', autospec=True)
+def test_cluster_state_cache_refreshes_in_the_background(mock_get_mesos_master):
+    mock_get_mesos_master.return_value.state = fake_mesos_state()
+    client = mock_marathon_client()
+    cache = make_cache([client], refresh_interval=0.01)
+
+    cache.start()
+    try:
+        gevent.sleep(0.1)
+    finally:
+        cache.stop()
+
+    assert client.list_apps.call_count > 1
+    assert cache.get_marathon_state(client) is not None
+
+
+def test_set_staleness_header():
+    cache = mock.Mock()
+    cache.age.return_value = 1.25
+    response = Response()
+    cluster_state.set_staleness_header(response, cache)
+    assert response.headers[cluster_state.STALENESS_HEADER] == '1.2'
+
+    response = testing.DummyRequest().response
+    cluster_state.set_staleness_header(response, None)
+    assert cluster_state.STALENESS_HEADER not in response.headers
@@ -17,10 +17,12 @@ from pyramid import testing
 from pytest import raises
 
 from paasta_tools import marathon_tools
+from paasta_tools.api import cluster_state
 from paasta_tools.api import settings
 from paasta_tools.api.views import instance
 from paasta_tools.api.views.exception import ApiFailure
 from paasta_tools.chronos_tools import ChronosJobConfig
+from paasta_tools.mesos import slave
 
 
 @mock.patch('paasta_tools.api.views.instance.marathon_job_status', autospec=True)
@@ -181,11 +183,18 @@ def test_marathon_job_status_verbose(
     assert mstatus == expected
 
 
+@mock.patch('paasta_tools.api.views.instance.load_slave_states', autospec=True)
 @mock.patch('paasta_tools.api.views.instance.add_executor_info', autospec=True)
 @mock.patch('paasta_tools.api.views.instance.add_slave_info', autospec=True)
 @mock.patch('paasta_tools.api.views.instance.instance_status', autospec=True)
 @mock.patch('paasta_tools.api.views.instance.get_tasks_from_app_id', autospec=True)
-def test_instance_tasks(mock_get_tasks_from_app_id, mock_instance_status, mock_add_slave_info, mock_add_executor_info):
+def test_instance_tasks(
+    mock_get_tasks_from_app_id,
+    mock_instance_status,
+    mock_add_slave_info,
+    mock_add_executor_info,
+    mock_load_slave_states,
+):
     mock_request = mock.Mock(swagger_data={'task_id': '123', 'slave_hostname': 'host1'})
     mock_instance_status.return_value = {'marathon': {'app_id': 'app1'}}
 
@@ -195,9 +204,11 @@ def test_instance_tasks(mock_get_tasks_from_app_id, mock_instance_status, mock_a
     ret = instance.instance_tasks(mock_request)
     assert not mock_add_slave_info.called
     assert not mock_add_executor_info.called
+    assert not mock_load_slave_states.called
 
     mock_request = mock.Mock(swagger_data={'task_id': '123', 'slave_hostname': 'host1', 'verbose': True})
     ret = instance.instance_tasks(mock_request)
+    mock_load_slave_states.assert_called_once_with([mock_task_1, mock_task_2])
     mock_add_executor_info.assert_has_calls([mock.call(mock_task_1), mock.call(mock_task_2)])
     mock_add_slave_info.assert_has_calls([
         mock.call(mock_add_executor_info.return_value),
@@ -274,6 +285,45 @@ def test_instance_delay(mock_load_config, mock_get_app_queue):
     assert response['baz'] == 1
 
 
+def test_load_slave_states():
+    fetched = []
+
+    def fake_fetch(self, url, **kwargs):
+        fetched.append((self['id'], url))
+        return mock.Mock(json=mock.Mock(return_value={
+            'frameworks': [{
+                'executors': [{
+                    'id': 'executor-%s' % self['id'],
+                    'tasks': [{'id': 'task-%s' % self['id']}],
+                    'completed_tasks': [],
+                    'queued_tasks': [],
+                }],
+                'completed_executors': [],
+            }],
+            'completed_frameworks': [],
+        }))
+
+    config = {'scheme': 'http', 'response_timeout': 5}
+    slaves = {
+        slave_id: slave.MesosSlave(config, {'id': slave_id, 'hostname': slave_id, 'pid': 'slave(1)@1.2.3.4:5051'})
+        for slave_id in ('slave1', 'slave2')
+    }
+    tasks = [
+        mock.Mock(slave=slaves[slave_id], __getitem__=lambda self, key, slave_id=slave_id: {
+            'slave_id': slave_id, 'id': 'task-%s' % slave_id,
+        }[key])
+        for slave_id in ('slave1', 'slave2', 'slave1', 'slave1')
+    ]
+    with mock.patch.object(slave.MesosSlave, 'fetch', autospec=True, side_effect=fake_fetch):
+        instance.load_slave_states(tasks)
+        assert sorted(fetched) == [('slave1', '/slave(1)/state.json'), ('slave2', '/slave(1)/state.json')]
+
+        # The executors are then found without fetching the agents again
+        assert slaves['slave1'].task_executor('task-slave1')['id'] == 'executor-slave1'
+        assert slaves['slave2'].task_executor('task-slave2')['id'] == 'executor-slave2'
+        assert len(fetched) == 2
+
+
 def test_add_executor_info():
     mock_mesos_task = mock.Mock()
     mock_executor = {
@@ -311,3 +361,97 @@ def test_add_slave_info():
         'slave': {'some': 'thing'},
     }
     assert instance.add_slave_info(mock_task)._Task__items == expected
+
+
+@mock.patch('paasta_tools.api.views.instance.get_running_tasks_from_frameworks', autospec=True)
+@mock.patch('paasta_tools.api.views.instance.marathon_tools.get_matching_appids', autospec=True)
+@mock.patch('paasta_tools.api.views.instance.marathon_tools.load_marathon_service_config', autospec=True)
+def test_marathon_instance_status_from_cluster_state(
+    mock_load_marathon_service_config,
+    mock_get_matching_appids,
+    mock_get_running_tasks_from_frameworks,
+):
+    app_id = 'fake--service.fake--instance.gitabc.config123'
+    job_config = mock.create_autospec(marathon_tools.MarathonServiceConfig)
+    job_config.format_marathon_app_dict.return_value = {'id': app_id}
+    job_config.get_instances.return_value = 2
+    job_config.get_desired_state.return_value = 'start'
+    job_config.get_bounce_method.return_value = 'crossover'
+    mock_load_marathon_service_config.return_value = job_config
+
+    app = mock.Mock(id='/' + app_id, instances=2, tasks_running=1, deployments=[])
+    old_app = mock.Mock(id='/fake--service.fake--instance.gitold.config123')
+    client = mock.create_autospec(marathon.MarathonClient)
+    marathon_state = cluster_state.MarathonState(
+        apps_by_id={app.id: app, old_app.id: old_app},
+        apps_by_job_id={'fake--service.fake--instance': [app, old_app]},
+        tasks_by_id={},
+        queue_by_app_id={app.id: mock.Mock(delay=mock.Mock(overdue=False, time_left_seconds=12))},
+        deployments=[],
+    )
+    mesos_state = cluster_state.MesosState(
+        state={},
+        slaves_by_id={'slave1': {'hostname': 'host1'}},
+        tasks_by_id={},
+        running_tasks_by_app_id={app_id: [{'slave_id': 'slave1'}, {'slave_id': 'gone'}]},
+    )
+    settings.marathon_clients = mock.Mock()
+    settings.marathon_clients.get_current_client_for_service.return_value = client
+    mock_cluster_state = mock.Mock()
+    mock_cluster_state.get_marathon_state.return_value = marathon_state
+    mock_cluster_state.get_mesos_state.return_value = mesos_state
+    mock_cluster_state.age.return_value = 1.5
+    settings.cluster_state = mock_cluster_state
+    response = testing.DummyRequest().response
+    try:
+        mstatus = instance.marathon_instance_status(
+            {}, 'fake_service', 'fake_instance', verbose=True, response=response,
+        )
+    finally:
+        settings.cluster_state = None
+
+    assert mstatus == {
+        'app_count': 2,
+        'desired_state': 'start',
+        'bounce_method': 'crossover',
+        'app_id': app_id,
+        'slaves': ['host1'],
+        'expected_instance_count': 2,
+        'deploy_status': 'Delayed',
+        'running_instance_count': 1,
+        'backoff_seconds': 12,
+    }
+    mock_cluster_state.get_marathon_state.assert_called_once_with(client)
+    assert response.headers[cluster_state.STALENESS_HEADER] == '1.5'
+    assert mock_get_matching_appids.call_count == 0
+    assert mock_get_running_tasks_from_frameworks.call_count == 0
+    assert client.get_app.call_count == 0
+    assert client.list_queue.call_count == 0
+
+
+@mock.patch('paasta_tools.api.views.instance.marathon_job_status', autospec=True)
+@mock.patch('paasta_tools.api.views.instance.marathon_tools.get_matching_appids', autospec=True)
+@mock.patch('paasta_tools.api.views.instance.marathon_tools.load_marathon_service_config', autospec=True)
+def test_marathon_instance_status_no_staleness_header_without_cluster_state(
+    mock_load_marathon_service_config,
+    mock_get_matching_appids,
+    mock_marathon_job_status,
+):
+    settings.marathon_clients = mock.Mock()
+    mock_cluster_state = mock.Mock()
+    mock_cluster_state.get_marathon_state.return_value = mock.Mock(apps_by_job_id={})
+    mock_cluster_state.age.return_value = 45.0
+    settings.cluster_state = mock_cluster_state
+    try:
+        # The marathon state is fresh enough, but the mesos one isn't
+        mock_cluster_state.get_mesos_state.return_value = None
+        response = testing.DummyRequest().response
+        instance.marathon_instance_status({}, 'fake_service', 'fake_instance', verbose=True, response=response)
+        assert cluster_state.STALENESS_HEADER not in response.headers
+
+        mock_cluster_state.get_marathon_state.return_value = None
+        response = testing.DummyRequest().response
+        instance.marathon_instance_status({}, 'fake_service', 'fake_instance', verbose=False, response=response)
+        assert cluster_state.STALENESS_HEADER not in response.headers
+    finally:
+        settings.cluster_state = None
@@ -11,7 +11,11 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from pyramid import testing
+import gzip
+import json
+
+import mock
+from pyramid.request import Request
 
 from paasta_tools import marathon_tools
 from paasta_tools.api import settings
@@ -61,9 +65,55 @@ def test_list_instances():
         marathon_servers=marathon_servers,
         cached=False,
     )
-    request = testing.DummyRequest()
+    request = Request.blank('/v1/marathon_dashboard')
 
     settings.system_paasta_config = system_paasta_config
+    settings.soa_dir = '/fake/soa/dir'
+    settings.marathon_dashboard = None
     response = marathon_dashboard(request)
     expected_output = {settings.cluster: []}
-    assert response == expected_output
+    assert json.loads(response.body.decode('utf-8')) == expected_output
+    assert response.etag
+
+
+def test_marathon_dashboard_etag_and_gzip():
+    settings.cluster = 'fake_cluster'
+    settings.soa_dir = '/fake/soa/dir'
+    settings.marathon_clients = mock.Mock()
+    settings.system_paasta_config = SystemPaastaConfig(config={}, directory='unused')
+    settings.marathon_dashboard = None
+    with mock.patch(
+        'paasta_tools.api.views.marathon_dashboard.MarathonDashboardView', autospec=True,
+    ) as mock_view_class:
+        dashboard = mock_view_class.return_value
+        dashboard.cluster = settings.cluster
+        dashboard.soa_dir = settings.soa_dir
+        dashboard.body = b'{"fake_cluster": []}'
+        dashboard.gzipped_body = gzip.compress(dashboard.body)
+        dashboard.etag = 'fake_etag'
+
+        request = Request.blank('/v1/marathon_dashboard', headers={'Accept-Encoding': 'gzip'})
+        response = marathon_dashboard(request)
+        assert response.status_int == 200
+        assert response.content_encoding == 'gzip'
+        assert gzip.decompress(response.body) == dashboard.body
+
+        request = Request.blank('/v1/marathon_dashboard', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+        response = marathon_dashboard(request)
+        assert response.content_encoding is None
+        assert response.body == dashboard.body
+
+        request = Request.blank('/v1/marathon_dashboard', headers={'If-None-Match': '"fake_etag"'})
+        response = marathon_dashboard(request)
+        assert response.status_int == 304
+
+        request = Request.blank('/v1/marathon_dashboard', headers={'If-None-Match': '"other_etag"'})
+        response = marathon_dashboard(request)
+        assert response.status_int == 200
+        assert response.content_encoding is None
+        assert response.body == dashboard.body
+
+        # The view is built once and refreshed on every request
+        assert mock_view_class.call_count == 1
+        assert dashboard.refresh.call_count == 4
+    settings.marathon_dashboard = None
@@ -16,6 +16,7 @@ import json
 import mock
 from pyramid import testing
 
+from paasta_tools.api import settings
 from paasta_tools.api.views.resources import parse_filters
 from paasta_tools.api.views.resources import resources_utilization
 from paasta_tools.metrics import metastatus_lib
@@ -178,3 +179,28 @@ def test_resources_utilization_with_filter(mock_get_mesos_master):
 
     assert(resp.status_int == 200)
     assert(len(body) == 0)
+
+
+@mock.patch('paasta_tools.api.views.resources.metastatus_lib.get_resource_utilization_by_grouping', autospec=True)
+@mock.patch('paasta_tools.api.views.resources.get_mesos_master', autospec=True)
+def test_resources_utilization_from_cluster_state(
+    mock_get_mesos_master,
+    mock_get_resource_utilization_by_grouping,
+):
+    request = testing.DummyRequest()
+    request.swagger_data = {'groupings': None, 'filter': None}
+    mock_cluster_state = mock.Mock()
+    mock_cluster_state.age.return_value = 3.0
+    mock_get_resource_utilization_by_grouping.return_value = {}
+
+    settings.cluster_state = mock_cluster_state
+    try:
+        resp = resources_utilization(request)
+    finally:
+        settings.cluster_state = None
+
+    assert resp.status_int == 200
+    assert resp.headers['X-Paasta-Cluster-State-Age'] == '3.0'
+    assert mock_get_mesos_master.call_count == 0
+    assert mock_get_resource_utilization_by_grouping.call_args[1]['mesos_state'] == \
+        mock_cluster_state.get_mesos_state.return_value.state
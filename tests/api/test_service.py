@@ -13,7 +13,12 @@
 # limitations under the License.
 import mock
 from pyramid import testing
+from pytest import raises
 
+from paasta_tools.api import settings
+from paasta_tools.api.cluster_state import STALENESS_HEADER
+from paasta_tools.api.views import service
+from paasta_tools.api.views.exception import ApiFailure
 from paasta_tools.api.views.service import list_instances
 
 
@@ -29,3 +34,107 @@ def test_list_instances(
 
     response = list_instances(request)
     assert response['instances'] == fake_instances
+
+
+def mock_marathon_app(app_id, tasks_running=2, instances=2, deployments=()):
+    return mock.Mock(id=app_id, tasks_running=tasks_running, instances=instances, deployments=list(deployments))
+
+
+@mock.patch('paasta_tools.api.views.service.marathon_tools.load_marathon_service_config', autospec=True)
+@mock.patch('paasta_tools.api.views.service.get_service_instance_list', autospec=True)
+@mock.patch('paasta_tools.api.views.service.get_actual_deployments', autospec=True)
+def test_service_deploy_status(
+    mock_get_actual_deployments,
+    mock_get_service_instance_list,
+    mock_load_marathon_service_config,
+):
+    settings.cluster = 'fake_cluster'
+    settings.soa_dir = '/fake/soa'
+    mock_get_actual_deployments.return_value = {
+        'fake_cluster.main': 'abcdef0123456789',
+        'fake_cluster.canary': 'abcdef0123456789',
+        'fake_cluster.delayed': 'abcdef0123456789',
+        'other_cluster.undeployed': 'abcdef0123456789',
+    }
+    mock_get_service_instance_list.return_value = [
+        ('fake_service', 'main'),
+        ('fake_service', 'canary'),
+        ('fake_service', 'delayed'),
+        ('fake_service', 'undeployed'),
+    ]
+
+    def fake_load_marathon_service_config(service, instance, cluster, soa_dir):
+        job_config = mock.Mock(instance=instance)
+        job_config.get_desired_state.return_value = 'start'
+        job_config.get_instances.return_value = 2
+        job_config.format_marathon_app_dict.return_value = {'id': 'fake--service.%s.gitabcdef01.config1' % instance}
+        return job_config
+    mock_load_marathon_service_config.side_effect = fake_load_marathon_service_config
+
+    mock_client = mock.Mock()
+    mock_client.list_apps.return_value = [
+        mock_marathon_app('/fake--service.main.gitabcdef01.config1'),
+        mock_marathon_app('/fake--service.main.gitold.config1', tasks_running=1),
+        mock_marathon_app('/fake--service.delayed.gitabcdef01.config1', tasks_running=0),
+        mock_marathon_app('/fake--service.mainly.gitabcdef01.config1'),
+        mock_marathon_app('/unrelated'),
+    ]
+    mock_client.list_queue.return_value = [
+        mock.Mock(
+            app=mock.Mock(id='/fake--service.delayed.gitabcdef01.config1'),
+            delay=mock.Mock(overdue=False, time_left_seconds=30),
+        ),
+    ]
+    settings.marathon_clients = mock.Mock()
+    settings.marathon_clients.get_current_client_for_service.return_value = mock_client
+
+    request = testing.DummyRequest()
+    request.swagger_data = {'service': 'fake_service'}
+    response = service.service_deploy_status(request)
+
+    assert response == {
+        'service': 'fake_service',
+        'instances': [
+            {
+                'instance': 'main', 'git_sha': 'abcdef01', 'app_count': 2,
+                'desired_state': 'start', 'expected_instance_count': 2,
+                'deploy_status': 'Running', 'running_instance_count': 2,
+            },
+            {
+                'instance': 'canary', 'git_sha': 'abcdef01', 'app_count': 0,
+                'desired_state': 'start', 'expected_instance_count': 2,
+                'deploy_status': 'NotRunning', 'running_instance_count': 0,
+            },
+            {
+                'instance': 'delayed', 'git_sha': 'abcdef01', 'app_count': 1,
+                'desired_state': 'start', 'expected_instance_count': 2,
+                'deploy_status': 'Delayed', 'running_instance_count': 0,
+            },
+        ],
+    }
+    # All instances were answered from one snapshot of Marathon
+    assert mock_client.list_apps.call_count == 1
+    assert mock_client.list_queue.call_count == 1
+
+    # The cluster state is too old to be used, so its age isn't reported
+    mock_cluster_state = mock.Mock()
+    mock_cluster_state.get_marathon_state.return_value = None
+    mock_cluster_state.age.return_value = 45.0
+    settings.cluster_state = mock_cluster_state
+    try:
+        request = testing.DummyRequest()
+        request.swagger_data = {'service': 'fake_service'}
+        assert service.service_deploy_status(request) == response
+    finally:
+        settings.cluster_state = None
+    assert STALENESS_HEADER not in request.response.headers
+
+
+@mock.patch('paasta_tools.api.views.service.get_actual_deployments', autospec=True)
+def test_service_deploy_status_failure(mock_get_actual_deployments):
+    mock_get_actual_deployments.side_effect = Exception('boom')
+    request = testing.DummyRequest()
+    request.swagger_data = {'service': 'fake_service'}
+    with raises(ApiFailure) as excinfo:
+        service.service_deploy_status(request)
+    assert excinfo.value.err == 500
@@ -12,6 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import asyncio
+import itertools
+import threading
+import time
 import unittest
 import warnings
 from math import floor
@@ -22,6 +25,7 @@ from pytest import raises
 from requests.exceptions import HTTPError
 
 from paasta_tools.autoscaling import autoscaling_cluster_lib
+from paasta_tools.mesos_maintenance import MaintenanceState
 from paasta_tools.mesos_tools import SlaveTaskCount
 from paasta_tools.metrics.metastatus_lib import ResourceInfo
 from paasta_tools.utils import TimeoutError
@@ -770,7 +774,7 @@ class TestSpotAutoscaler(unittest.TestCase):
         ) as mock_sleep, mock.patch(
             'paasta_tools.autoscaling.autoscaling_cluster_lib.SpotAutoscaler.get_sfr', autospec=True,
         ) as mock_get_sfr, mock.patch(
-            'paasta_tools.autoscaling.autoscaling_cluster_lib.AWS_SPOT_MODIFY_TIMEOUT', autospec=True,
+            'paasta_tools.autoscaling.autoscaling_cluster_lib.AWS_SPOT_MODIFY_TIMEOUT', 0, autospec=None,
         ):
             mock_sleep.side_effect = TimeoutError()
             mock_get_sfr.return_value = {'SpotFleetRequestState': 'modifying'}
@@ -1283,18 +1287,52 @@ class TestClusterAutoscaler(unittest.TestCase):
             ))
             assert mock_gracefully_terminate_slave.call_count == 3
 
-    def test_filter_instance_description_for_ip(self):
-        fake_description = [{'PrivateIpAddress': '10.1.1.1'}, {'PrivateIpAddress': '10.1.1.2'}]
-        actual = self.autoscaler.filter_instance_description_for_ip('10.1.1.1', fake_description)
-        assert actual == [fake_description[0]]
+    def test_index_instance_descriptions(self):
+        with mock.patch(
+            'paasta_tools.autoscaling.autoscaling_cluster_lib.ClusterAutoscaler.instance_descriptions_for_ips',
+            autospec=True,
+        ) as mock_instance_descriptions_for_ips:
+            mock_instance_descriptions_for_ips.return_value = [
+                {'InstanceId': 'i-1', 'PrivateIpAddress': '10.1.1.1'},
+                {'InstanceId': 'i-2', 'PrivateIpAddress': '10.1.1.2'},
+            ]
+            ret = self.autoscaler.index_instance_descriptions(['10.1.1.1', '10.1.1.2', '10.1.1.3'])
+            assert ret == {
+                '10.1.1.1': [{'InstanceId': 'i-1', 'PrivateIpAddress': '10.1.1.1'}],
+                '10.1.1.2': [{'InstanceId': 'i-2', 'PrivateIpAddress': '10.1.1.2'}],
+                '10.1.1.3': [],
+            }
 
-    def test_filter_instance_status_for_instance_id(self):
-        fake_status = {'InstanceStatuses': [{'InstanceId': 'foo'}, {'InstanceId': 'bar'}]}
-        actual = self.autoscaler.filter_instance_status_for_instance_id(
-            instance_id='foo',
-            instance_statuses=fake_status,
-        )
-        assert actual == [fake_status['InstanceStatuses'][0]]
+            # Only the IPs not described yet are fetched
+            mock_instance_descriptions_for_ips.return_value = []
+            self.autoscaler.index_instance_descriptions(['10.1.1.1', '10.1.1.4'])
+            mock_instance_descriptions_for_ips.assert_called_with(self.autoscaler, ['10.1.1.4'])
+            self.autoscaler.index_instance_descriptions(['10.1.1.2', '10.1.1.3'])
+            assert mock_instance_descriptions_for_ips.call_count == 2
+
+    def test_index_instance_statuses(self):
+        with mock.patch(
+            'paasta_tools.autoscaling.autoscaling_cluster_lib.ClusterAutoscaler.instance_status_for_instance_ids',
+            autospec=True,
+        ) as mock_instance_status_for_instance_ids:
+            mock_instance_status_for_instance_ids.return_value = {
+                'InstanceStatuses': [{'InstanceId': 'foo'}, {'InstanceId': 'bar'}],
+            }
+            ret = self.autoscaler.index_instance_statuses(['foo', 'bar'])
+            assert ret == {'foo': [{'InstanceId': 'foo'}], 'bar': [{'InstanceId': 'bar'}]}
+            self.autoscaler.index_instance_statuses(['bar', 'foo'])
+            assert mock_instance_status_for_instance_ids.call_count == 1
+
+    def test_describe_in_chunks_is_concurrent(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def describe(chunk):
+            # Only returns once 3 chunks are being described at once
+            barrier.wait()
+            return sum(chunk)
+
+        ret = self.autoscaler.describe_in_chunks(describe, list(range(9)), 3)
+        assert ret == [3, 12, 21]
 
     def test_instance_status_for_instance_ids_batches_calls(self):
         instance_ids = [{'foo': i} for i in range(0, 100)]
@@ -1407,17 +1445,16 @@ class TestClusterAutoscaler(unittest.TestCase):
         with mock.patch(
             'boto3.client', autospec=True,
         ) as mock_ec2_client, mock.patch(
-            'paasta_tools.autoscaling.autoscaling_cluster_lib.asyncio.sleep', autospec=True,
-        ) as mock_sleep, mock.patch(
-            'paasta_tools.autoscaling.autoscaling_cluster_lib.is_safe_to_kill', autospec=True,
-        ) as mock_is_safe_to_kill:
+            'paasta_tools.autoscaling.autoscaling_cluster_lib.get_maintenance_state', autospec=True,
+        ) as mock_get_maintenance_state:
             mock_terminate_instances = mock.Mock()
             mock_ec2_client.return_value = mock.Mock(terminate_instances=mock_terminate_instances)
             mock_timer = mock.Mock()
             mock_timer.ready = lambda: False
-            mock_sleep.side_effect = just_sleep
+            self.autoscaler.maintenance_poller = autoscaling_cluster_lib.MaintenancePoller(interval=0)
 
-            mock_is_safe_to_kill.return_value = True
+            drained = MaintenanceState(draining_hosts={'hostblah'}, maintenance_starts={}, running_task_counts={})
+            mock_get_maintenance_state.return_value = drained
             mock_slave_to_kill = mock.Mock(
                 hostname='hostblah',
                 instance_id='i-blah123',
@@ -1429,14 +1466,68 @@ class TestClusterAutoscaler(unittest.TestCase):
                 region='westeros-1', should_drain=True,
             ))
             mock_terminate_instances.assert_called_with(InstanceIds=['i-blah123'], DryRun=False)
-            mock_is_safe_to_kill.assert_called_with('hostblah')
+            mock_get_maintenance_state.assert_called_with({'hostblah'})
 
-            mock_is_safe_to_kill.side_effect = [False, False, True]
+            mock_terminate_instances.reset_mock()
+            mock_get_maintenance_state.reset_mock()
+            draining = drained._replace(running_task_counts={'hostblah': 2})
+            mock_get_maintenance_state.side_effect = itertools.chain([draining, draining], itertools.repeat(drained))
             _run(self.autoscaler.wait_and_terminate(
                 slave=mock_slave_to_kill, drain_timeout=600, dry_run=False, timer=mock_timer,
                 region='westeros-1', should_drain=True,
             ))
-            assert mock_is_safe_to_kill.call_count == 4
+            assert mock_get_maintenance_state.call_count >= 3
+            mock_terminate_instances.assert_called_with(InstanceIds=['i-blah123'], DryRun=False)
+            assert not self.autoscaler.maintenance_poller.watchers
+            assert self.autoscaler.maintenance_poller.polling is None
+
+    def test_wait_and_terminate_shares_maintenance_state(self):
+        with mock.patch(
+            'boto3.client', autospec=True,
+        ) as mock_ec2_client, mock.patch(
+            'paasta_tools.autoscaling.autoscaling_cluster_lib.get_maintenance_state', autospec=True,
+        ) as mock_get_maintenance_state:
+            mock_terminate_instances = mock.Mock()
+            mock_ec2_client.return_value = mock.Mock(terminate_instances=mock_terminate_instances)
+            mock_timer = mock.Mock()
+            mock_timer.ready = lambda: False
+            poller = autoscaling_cluster_lib.MaintenancePoller(interval=60)
+            self.autoscaler.maintenance_poller = poller
+            mock_get_maintenance_state.return_value = MaintenanceState(
+                draining_hosts={'host1', 'host2'},
+                maintenance_starts={},
+                running_task_counts={'host1': 1, 'host2': 1},
+            )
+            slaves = [
+                mock.Mock(hostname='host%d' % i, instance_id='i-%d' % i, pid='pid%d' % i, ip='10.1.1.%d' % i)
+                for i in (1, 2)
+            ]
+
+            async def drain_hosts():
+                waits = [
+                    asyncio.ensure_future(self.autoscaler.wait_and_terminate(
+                        slave=slave, drain_timeout=600, dry_run=False, timer=mock_timer,
+                        region='westeros-1', should_drain=True,
+                    ))
+                    for slave in slaves
+                ]
+                await asyncio.sleep(0)
+                await poller.wait_for_state()
+                assert mock_get_maintenance_state.call_count == 1
+                assert not mock_terminate_instances.called
+
+                # The hosts drain: the next refresh wakes their coroutines up
+                # without waiting for the poll interval
+                mock_get_maintenance_state.return_value = mock_get_maintenance_state.return_value._replace(
+                    running_task_counts={},
+                )
+                await poller.refresh()
+                await asyncio.wait_for(asyncio.gather(*waits), timeout=5)
+
+            _run(drain_hosts())
+            assert mock_get_maintenance_state.call_count == 2
+            assert sorted(c[1]['InstanceIds'][0] for c in mock_terminate_instances.call_args_list) == ['i-1', 'i-2']
+            assert poller.polling is None
 
     def test_get_instance_ips(self):
         with mock.patch(
@@ -1457,6 +1548,28 @@ class TestClusterAutoscaler(unittest.TestCase):
             'slave(3)@10.3.3.3:5051': '10.3.3.3',
         }[pid]
 
+    def test_change_capacity(self):
+        set_capacities = []
+
+        def set_capacity(capacity):
+            # Leave other coroutines time to run while AWS is called
+            time.sleep(0.01)
+            set_capacities.append(capacity)
+            self.autoscaler.capacity = capacity
+
+        async def change_capacity_concurrently():
+            await asyncio.gather(
+                self.autoscaler.change_capacity(-1),
+                self.autoscaler.change_capacity(-2),
+            )
+
+        with mock.patch.object(self.autoscaler, 'set_capacity', autospec=True, side_effect=set_capacity):
+            self.autoscaler.capacity = 10
+            _run(change_capacity_concurrently())
+        assert self.autoscaler.capacity == 7
+        # Whichever change goes first, the second applies on top of it
+        assert set_capacities in ([9, 7], [8, 7])
+
     def test_filter_aws_slaves(self):
         with mock.patch(
             'paasta_tools.autoscaling.autoscaling_cluster_lib.ClusterAutoscaler.get_instance_ips',
@@ -1572,6 +1685,49 @@ class TestClusterAutoscaler(unittest.TestCase):
             mock_paasta_aws_slave.assert_has_calls([mock_aws_slave_call_1, mock_aws_slave_call_2])
             assert len(ret) == 2
 
+    def test_filter_aws_slaves_without_description(self):
+        with mock.patch(
+            'paasta_tools.autoscaling.autoscaling_cluster_lib.ClusterAutoscaler.get_instance_ips',
+            autospec=True,
+        ) as mock_get_instance_ips, mock.patch(
+            'paasta_tools.autoscaling.autoscaling_cluster_lib.ClusterAutoscaler.describe_instances',
+            autospec=True,
+        ) as mock_describe_instances, mock.patch(
+            'paasta_tools.autoscaling.autoscaling_cluster_lib.ClusterAutoscaler.get_instance_type_weights',
+            autospec=True,
+        ), mock.patch(
+            'paasta_tools.autoscaling.autoscaling_cluster_lib.PaastaAwsSlave', autospec=True,
+        ) as mock_paasta_aws_slave, mock.patch(
+            'paasta_tools.autoscaling.autoscaling_cluster_lib.ClusterAutoscaler.describe_instance_status',
+            autospec=True,
+        ) as mock_describe_instance_status:
+            # The instance of 10.3.3.3 is gone by the time it is described
+            mock_get_instance_ips.return_value = ['10.1.1.1', '10.3.3.3']
+            mock_instances = [{'InstanceId': 'i-1', 'InstanceType': 'c4.blah', 'PrivateIpAddress': '10.1.1.1'}]
+            self.autoscaler.instances = mock_instances
+            mock_describe_instances.return_value = mock_instances
+            mock_describe_instance_status.return_value = {'InstanceStatuses': [{'InstanceId': 'i-1'}]}
+            mock_slave_1 = {
+                'task_counts': SlaveTaskCount(
+                    slave={'pid': 'slave(1)@10.1.1.1:5051', 'id': '123', 'hostname': 'host123'},
+                    count=0,
+                    chronos_count=0,
+                ),
+            }
+            mock_slave_3 = {
+                'task_counts': SlaveTaskCount(
+                    slave={'pid': 'slave(3)@10.3.3.3:5051', 'id': '789', 'hostname': 'host789'},
+                    count=0,
+                    chronos_count=0,
+                ),
+            }
+
+            ret = self.autoscaler.filter_aws_slaves([mock_slave_1, mock_slave_3])
+
+            assert ret == [mock_paasta_aws_slave.return_value]
+            assert mock_paasta_aws_slave.call_count == 1
+            assert mock_paasta_aws_slave.call_args[1]['slave'] == mock_slave_1
+
     def test_get_aws_slaves(self):
         with mock.patch(
             'paasta_tools.autoscaling.autoscaling_cluster_lib.ClusterAutoscaler.get_instance_ips',
@@ -1726,3 +1882,14 @@ class TestPaastaAwsSlave(unittest.TestCase):
     def test_instance_weight(self):
         assert self.mock_slave.instance_weight == 2
         assert self.mock_asg_slave.instance_weight == 1
+
+
+def test_aws_api_call():
+    with mock.patch(
+        'paasta_tools.autoscaling.autoscaling_cluster_lib.AWS_API_RATE_LIMITER', autospec=True,
+    ) as mock_rate_limiter:
+        mock_method = mock.Mock()
+        ret = autoscaling_cluster_lib.aws_api_call(mock_method, InstanceIds=['i-blah'])
+        assert ret == mock_method.return_value
+        mock_method.assert_called_once_with(InstanceIds=['i-blah'])
+        mock_rate_limiter.acquire.assert_called_once_with()
@@ -0,0 +1,71 @@
+import threading
+
+from paasta_tools.autoscaling.rate_limiter import TokenBucket
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_lets_bursts_through():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+    bucket.acquire()
+    assert clock.sleeps == [0.5]
+
+
+def test_token_bucket_refills_at_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+    for _ in range(3):
+        bucket.acquire()
+    clock.now += 1
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0.5
+
+    # The bucket never holds more than its capacity
+    clock.now += 100
+    for _ in range(3):
+        assert bucket.reserve() == 0
+    assert bucket.reserve() == 0.5
+
+
+def test_token_bucket_queues_callers():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=1, clock=clock, sleep=clock.sleep)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert [round(wait, 6) for wait in waits] == [0, 0.1, 0.2, 0.3]
+
+
+def test_token_bucket_is_shared_between_threads():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=50, clock=clock, sleep=clock.sleep)
+    waits = []
+    lock = threading.Lock()
+
+    def reserve():
+        for _ in range(10):
+            wait = bucket.reserve()
+            with lock:
+                waits.append(wait)
+
+    threads = [threading.Thread(target=reserve) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(round(w) for w in waits) == [0] * 50 + list(range(1, 51))
@@ -0,0 +1,92 @@
+# Copyright 2015-2018 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""A fake paasta-api serving /v1/services/{service}/{instance}/status.
+
+Usage: fake_paasta_api_server.py '{"instance": delay_seconds, ...}'
+
+Prints the port it listens on, then serves until killed. The instance
+'broken' answers with a 500. /stats reports the maximum number of requests
+that were in flight at the same time.
+"""
+import http.server
+import json
+import socketserver
+import sys
+import threading
+import time
+
+
+class FakePaastaApiHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == '/stats':
+            self.send_json({'max_in_flight': self.server.max_in_flight})
+            return
+
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        try:
+            _, _, _, service, instance, _ = self.path.split('/')
+            time.sleep(self.server.delays.get(instance, 0.05))
+            if instance == 'broken':
+                self.send_response(500)
+                self.end_headers()
+                self.wfile.write(b'Instance failure')
+                return
+            self.send_json({
+                'service': service,
+                'instance': instance,
+                'git_sha': 'abc123',
+                'marathon': {
+                    'desired_state': 'start',
+                    'app_count': 1,
+                    'app_id': '%s.%s.gitabc123.config123' % (service, instance),
+                    'bounce_method': 'crossover',
+                    'deploy_status': 'Running',
+                    'running_instance_count': 1,
+                    'expected_instance_count': 1,
+                },
+            })
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def send_json(self, obj):
+        body = json.dumps(obj).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakePaastaApiServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, delays):
+        super().__init__(('127.0.0.1', 0), FakePaastaApiHandler)
+        self.delays = delays
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+
+if __name__ == '__main__':
+    server = FakePaastaApiServer(json.loads(sys.argv[1]))
+    print(server.server_address[1], flush=True)
+    server.serve_forever()
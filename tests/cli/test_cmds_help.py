@@ -12,11 +12,24 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import argparse
+import json
+import os
+import subprocess
+import sys
 
+import mock
 import pytest
 
+from paasta_tools.cli import cmds
+from paasta_tools.cli.cli import add_subparser
 from paasta_tools.cli.cli import get_argparser
+from paasta_tools.cli.cli import get_argv_for_completion
+from paasta_tools.cli.cli import get_command_from_argv
 from paasta_tools.cli.cli import main
+from paasta_tools.cli.cli import PAASTA_SUBCOMMANDS
+from paasta_tools.cli.cli import parse_args
+from paasta_tools.cli.cmds.list_clusters import paasta_list_clusters
+from paasta_tools.cli.utils import modules_in_pkg
 
 
 def each_command():
@@ -47,3 +60,88 @@ def test_invalid_arguments_returns_non_zero():
     with pytest.raises(SystemExit) as excinfo:
         main(('get-latest-deployment', '--herp'))
     assert excinfo.value.code == 1
+
+
+def test_subcommand_manifest_matches_modules():
+    # PAASTA_SUBCOMMANDS must list every command module, and the names and
+    # help it advertises must match what the modules actually register
+    assert {module for module, _ in PAASTA_SUBCOMMANDS.values()} == set(modules_in_pkg(cmds))
+    for module in set(modules_in_pkg(cmds)):
+        parser = argparse.ArgumentParser()
+        subparsers = parser.add_subparsers()
+        add_subparser(module, subparsers)
+        for choice_action in subparsers._choices_actions:
+            assert PAASTA_SUBCOMMANDS[choice_action.dest] == (module, choice_action.help)
+
+
+def test_parse_args_only_loads_selected_command():
+    with mock.patch(
+        'paasta_tools.cli.cli.add_subparser', autospec=True,
+        side_effect=add_subparser,
+    ) as mock_add_subparser:
+        args, _ = parse_args(['list-clusters'])
+    mock_add_subparser.assert_called_once_with('list_clusters', mock.ANY)
+    assert args.command is paasta_list_clusters
+
+
+def test_get_command_from_argv():
+    assert get_command_from_argv([]) is None
+    assert get_command_from_argv(['--help']) is None
+    assert get_command_from_argv(['help']) is None
+    assert get_command_from_argv(['stat']) is None
+    assert get_command_from_argv(['status', '-s', 'foo']) == 'status'
+    assert get_command_from_argv(['-v', 'restart']) == 'restart'
+
+
+def test_get_argv_for_completion():
+    with mock.patch.dict(os.environ, {}, clear=True):
+        assert get_argv_for_completion() is None
+    with mock.patch.dict(
+        os.environ, {'_ARGCOMPLETE': '1', 'COMP_LINE': 'paasta sta', 'COMP_POINT': '10'},
+    ):
+        assert get_argv_for_completion() == []
+    with mock.patch.dict(
+        os.environ, {'_ARGCOMPLETE': '1', 'COMP_LINE': 'paasta status  -s ', 'COMP_POINT': '18'},
+    ):
+        assert get_argv_for_completion() == ['status', '-s']
+
+
+def _modules_imported_by(argv):
+    # -X importtime is a no-op on interpreters that don't support it, so we
+    # guard on the set of imported modules, which is deterministic everywhere
+    script = (
+        'import json, sys\n'
+        'from paasta_tools.cli.cli import parse_args\n'
+        'try:\n'
+        '    parse_args({!r})\n'
+        'except SystemExit:\n'
+        '    pass\n'
+        'sys.stderr.write(json.dumps(sorted(sys.modules)))\n'
+    ).format(list(argv))
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True,
+        universal_newlines=True,
+    )
+    return set(json.loads(proc.stderr.splitlines()[-1]))
+
+
+HEAVY_MODULES = {'marathon', 'docker', 'boto3', 'kazoo', 'scribereader', 'paasta_tools.mesos_tools'}
+
+
+def test_help_startup_imports():
+    imported = _modules_imported_by(['--help'])
+    assert not imported & HEAVY_MODULES
+    assert not any(module.startswith('paasta_tools.cli.cmds.') for module in imported)
+
+
+def test_status_startup_imports():
+    imported = _modules_imported_by(['status', '--help'])
+    assert 'paasta_tools.cli.cmds.status' in imported
+    assert not imported & {
+        'paasta_tools.cli.cmds.%s' % module
+        for module, _ in PAASTA_SUBCOMMANDS.values()
+        if module != 'status'
+    }
+    assert 'scribereader' not in imported
+    assert 'boto3' not in imported
@@ -20,6 +20,7 @@ from queue import Empty
 import isodate
 import mock
 import pytest
+import pytz
 from pytest import raises
 
 from paasta_tools.cli.cli import parse_args
@@ -84,6 +85,35 @@ def test_check_timestamp_in_range_true():
     assert logs.check_timestamp_in_range(timestamp, start_time, end_time) is True
 
 
+@pytest.mark.parametrize('timestamp', [
+    '2016-06-08T06:31:52.706609',
+    '2016-06-08T06:31:52',
+    '2016-06-08T06:31:52.706609135Z',
+    '2016-06-08T06:31:52.7Z',
+    '2016-06-08 06:31:52,706',
+    '2016-06-08T06:31:52.706609+05:30',
+    '2016-06-08T06:31:52-0800',
+    '20160608T063152Z',
+])
+def test_parse_timestamp_matches_isodate(timestamp):
+    expected = isodate.parse_datetime(timestamp.replace(' ', 'T').replace(',', '.'))
+    if expected.tzinfo is None:
+        expected = pytz.utc.localize(expected)
+    actual = logs.parse_timestamp(timestamp)
+    assert actual == expected
+    assert actual.utcoffset() == expected.utcoffset()
+
+
+def test_parse_json_log_line():
+    assert logs.parse_json_log_line('{"timestamp": "2016-06-08T06:31:52Z", "level": "debug"}') == (
+        {'timestamp': '2016-06-08T06:31:52Z', 'level': 'debug'},
+        datetime.datetime(2016, 6, 8, 6, 31, 52, tzinfo=pytz.utc),
+    )
+    assert logs.parse_json_log_line('{"level": "debug"}') == ({'level': 'debug'}, None)
+    assert logs.parse_json_log_line('{"timestamp": "yesterday"}') == ({'timestamp': 'yesterday'}, None)
+    assert logs.parse_json_log_line('not json') is None
+
+
 def test_paasta_log_line_passes_filter_true():
     service = 'fake_service'
     levels = ['fake_level1', 'fake_level2']
@@ -735,6 +765,87 @@ def test_scribereader_print_logs_by_time():
         assert mock_scribereader.get_stream_reader.call_count == 14 * 2
 
 
+def fake_stream_line(timestamp, component='stdout', message='testing'):
+    return json.dumps({
+        'cluster': 'fake_cluster1', 'component': component, 'instance': 'main',
+        'level': 'debug', 'message': message, 'timestamp': timestamp,
+    }).encode('utf-8')
+
+
+def test_scribereader_print_logs_by_time_merges_streams_lazily():
+    start = datetime.datetime(2016, 6, 8, 0, 0, 1, tzinfo=pytz.utc)
+    streams = {
+        'stream_paasta_app_output_fake_service': [
+            fake_stream_line((start + datetime.timedelta(seconds=2 * i)).isoformat(), 'stdout', 'out %d' % i)
+            for i in range(3000)
+        ],
+        'stream_paasta_fake_service': [
+            fake_stream_line((start + datetime.timedelta(seconds=2 * i + 1)).isoformat(), 'build', 'build %d' % i)
+            for i in range(3000)
+        ],
+    }
+    lines_read = []
+
+    def read_stream(stream_name):
+        for line in streams[stream_name]:
+            lines_read.append(line)
+            yield line
+
+    def fake_get_from_time(self, scribe_env, stream_name, start_time, end_time):
+        return contextlib.closing(read_stream(stream_name))
+
+    printed = []
+
+    def fake_print_log(line, levels, raw_mode):
+        printed.append((json.loads(line)['message'], len(lines_read)))
+
+    with mock.patch(
+        'paasta_tools.cli.cmds.logs.scribereader', autospec=True,
+    ), mock.patch(
+        'paasta_tools.cli.cmds.logs.ScribeLogReader.determine_scribereader_envs', autospec=True,
+        return_value=['env1'],
+    ), mock.patch(
+        'paasta_tools.cli.cmds.logs.ScribeLogReader.scribe_get_from_time', autospec=True,
+        side_effect=fake_get_from_time,
+    ), mock.patch(
+        'paasta_tools.cli.cmds.logs.print_log', autospec=True, side_effect=fake_print_log,
+    ), mock.patch(
+        'paasta_tools.cli.cmds.logs.parse_json_log_line', autospec=True, side_effect=logs.parse_json_log_line,
+    ) as mock_parse_json_log_line:
+        logs.ScribeLogReader(cluster_map={}).print_logs_by_time(
+            'fake_service', start - datetime.timedelta(seconds=1), start + datetime.timedelta(days=1),
+            ['debug'], ['build', 'stdout'], ['fake_cluster1'],
+            ['main'], raw_mode=False,
+        )
+
+    messages = [message for message, _ in printed]
+    assert messages == [message for i in range(3000) for message in ('out %d' % i, 'build %d' % i)]
+    # Lines get printed long before the streams are read to their end
+    assert printed[0][1] < 3000
+    # and each line is only parsed once
+    assert mock_parse_json_log_line.call_count == 6000
+
+
+def test_reorder_log_records():
+    records = [(3, 'a'), (1, 'b'), (2, 'c'), (1, 'd'), (6, 'e'), (4, 'f'), (5, 'g')]
+    assert list(logs.reorder_log_records(records, window=2)) == [
+        (1, 'b'), (1, 'd'), (2, 'c'), (3, 'a'), (4, 'f'), (5, 'g'), (6, 'e'),
+    ]
+    # records further out of order than the window stay out of order
+    assert list(logs.reorder_log_records([(3, 'a'), (4, 'b'), (1, 'c')], window=1)) == [
+        (3, 'a'), (1, 'c'), (4, 'b'),
+    ]
+
+
+def test_merge_log_records():
+    streams = [
+        iter([(1, 'a1'), (3, 'a3'), (2, 'a2')]),
+        iter([]),
+        iter([(2, 'b2'), (4, 'b4')]),
+    ]
+    assert [line for _, line in logs.merge_log_records(streams, window=2)] == ['a1', 'a2', 'b2', 'a3', 'b4']
+
+
 def test_tail_paasta_logs_ctrl_c_in_queue_get():
     service = 'fake_service'
     levels = ['fake_level1', 'fake_level2']
@@ -11,13 +11,20 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import concurrent.futures
+import json
+import os
+import subprocess
+import sys
 from collections import namedtuple
+from urllib.request import urlopen
 
 from mock import call
 from mock import MagicMock
 from mock import Mock
 from mock import patch
 from mock import sentinel
+from pytest import fixture
 from pytest import mark
 from pytest import raises
 
@@ -32,6 +39,8 @@ from paasta_tools.cli.utils import NoSuchService
 from paasta_tools.cli.utils import PaastaCheckMessages
 from paasta_tools.cli.utils import PaastaColors
 
+FAKE_API_SERVER_SCRIPT = os.path.join(os.path.dirname(__file__), 'fake_paasta_api_server.py')
+
 
 def make_fake_instance_conf(cluster, service, instance, deploy_group=None, team=None):
     conf = MagicMock()
@@ -801,3 +810,134 @@ def test_status_with_owner(
 
     assert return_value == 0
     assert mock_report_status.call_count == 2
+
+
+@fixture
+def fake_api_server():
+    """Start tests/cli/fake_paasta_api_server.py in its own process (other
+    tests leave gevent's socket monkeypatching behind in this one)."""
+    servers = []
+
+    def start(delays=None):
+        server = FakePaastaApiServer(delays or {})
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+class FakePaastaApiServer(object):
+
+    def __init__(self, delays):
+        self.proc = subprocess.Popen(
+            [sys.executable, FAKE_API_SERVER_SCRIPT, json.dumps(delays)],
+            stdout=subprocess.PIPE, universal_newlines=True,
+        )
+        self.url = 'http://127.0.0.1:%s' % self.proc.stdout.readline().strip()
+
+    @property
+    def max_in_flight(self):
+        return json.loads(urlopen(self.url + '/stats').read().decode())['max_in_flight']
+
+    def system_paasta_config(self):
+        return utils.SystemPaastaConfig(
+            {'api_endpoints': {'cluster1': self.url, 'cluster2': self.url}},
+            '/fake_dir/',
+        )
+
+    def stop(self):
+        self.proc.terminate()
+        self.proc.wait()
+
+
+def test_report_status_on_api_endpoint_is_concurrent_and_ordered(fake_api_server):
+    instances = ['instance%d' % i for i in range(8)]
+    # Answer later instances first so results arrive out of order
+    server = fake_api_server({instance: 0.4 - 0.05 * i for i, instance in enumerate(instances)})
+
+    return_code, output = status.report_status_on_api_endpoint(
+        cluster='cluster1',
+        service='fake_service',
+        instances=instances,
+        system_paasta_config=server.system_paasta_config(),
+    )
+
+    assert return_code == 0
+    assert server.max_in_flight > 1
+    instance_lines = [line for line in output if line.startswith('instance: ')]
+    assert instance_lines == ['instance: %s' % PaastaColors.blue(instance) for instance in instances]
+
+
+def test_report_status_on_api_endpoint_bounded_by_executor(fake_api_server):
+    server = fake_api_server()
+    instances = ['instance%d' % i for i in range(6)]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as api_executor:
+        return_code, _ = status.report_status_on_api_endpoint(
+            cluster='cluster1',
+            service='fake_service',
+            instances=instances,
+            system_paasta_config=server.system_paasta_config(),
+            api_executor=api_executor,
+        )
+    assert return_code == 0
+    assert server.max_in_flight == 2
+
+
+def test_report_status_on_api_endpoint_failure(fake_api_server):
+    server = fake_api_server()
+    return_code, output = status.report_status_on_api_endpoint(
+        cluster='cluster1',
+        service='fake_service',
+        instances=['main', 'broken'],
+        system_paasta_config=server.system_paasta_config(),
+    )
+    assert return_code == 1
+    assert output[0] == 'instance: %s' % PaastaColors.blue('main')
+    assert output[-1] == 'Instance failure'
+
+
+def test_report_status_on_api_endpoint_no_client(fake_api_server):
+    server = fake_api_server()
+    return_code, output = status.report_status_on_api_endpoint(
+        cluster='unknown_cluster',
+        service='fake_service',
+        instances=['main'],
+        system_paasta_config=server.system_paasta_config(),
+    )
+    assert return_code == 1
+    assert output == ['Cannot get a paasta-api client']
+
+
+@patch('paasta_tools.cli.cmds.status.get_planned_deployments', autospec=True)
+@patch('paasta_tools.cli.cmds.status.get_actual_deployments', autospec=True)
+@patch('paasta_tools.cli.cmds.status.apply_args_filters', autospec=True)
+@patch('paasta_tools.cli.cmds.status.load_system_paasta_config', autospec=True)
+def test_paasta_status_with_api_endpoint_prints_in_stable_order(
+    mock_load_system_paasta_config,
+    mock_apply_args_filters,
+    mock_get_actual_deployments,
+    mock_get_planned_deployments,
+    fake_api_server,
+    capfd,
+):
+    # cluster1 answers last, but must still be printed first
+    server = fake_api_server({'main': 0.3, 'canary': 0.1})
+    mock_load_system_paasta_config.return_value = server.system_paasta_config()
+    mock_apply_args_filters.return_value = {
+        'cluster2': {'fake_service': {'main', 'canary'}},
+        'cluster1': {'fake_service': {'main'}},
+    }
+    mock_get_planned_deployments.return_value = ['cluster1.main', 'cluster2.canary', 'cluster2.main']
+    mock_get_actual_deployments.return_value = {
+        'cluster1.main': 'abc123', 'cluster2.canary': 'abc123', 'cluster2.main': 'abc123',
+    }
+    args = MagicMock(soa_dir='/fake/soa/dir', verbose=0)
+    with patch.dict(os.environ, {'USE_API_ENDPOINT': 'true'}):
+        assert paasta_status(args) == 0
+
+    output, _ = capfd.readouterr()
+    assert output.index('cluster: cluster1') < output.index('cluster: cluster2')
+    assert output.index('cluster: cluster2') < output.index('instance: %s' % PaastaColors.blue('canary'))
+    assert server.max_in_flight == 3
@@ -44,35 +44,35 @@ def mock_status_instance_side_effect(service, instance):  # pragma: no cover (ge
     if instance in ['instance1', 'instance6', 'notaninstance', 'api_error']:
         # valid completed instance
         mock_mstatus = Mock(
-            app_count=1, deploy_status='Running',
+            error_message=None, app_count=1, deploy_status='Running',
             expected_instance_count=2,
             running_instance_count=2,
         )
     if instance == 'instance2':
         # too many marathon apps
         mock_mstatus = Mock(
-            app_count=2, deploy_status='Running',
+            error_message=None, app_count=2, deploy_status='Running',
             expected_instance_count=2,
             running_instance_count=2,
         )
     if instance == 'instance3':
         # too many running instances
         mock_mstatus = Mock(
-            app_count=1, deploy_status='Running',
+            error_message=None, app_count=1, deploy_status='Running',
             expected_instance_count=2,
             running_instance_count=4,
         )
     if instance == 'instance4':
         # still Deploying
         mock_mstatus = Mock(
-            app_count=1, deploy_status='Deploying',
+            error_message=None, app_count=1, deploy_status='Deploying',
             expected_instance_count=2,
             running_instance_count=2,
         )
     if instance == 'instance4.1':
         # still Deploying
         mock_mstatus = Mock(
-            app_count=1, deploy_status='Waiting',
+            error_message=None, app_count=1, deploy_status='Waiting',
             expected_instance_count=2,
             running_instance_count=2,
         )
@@ -82,7 +82,7 @@ def mock_status_instance_side_effect(service, instance):  # pragma: no cover (ge
     if instance == 'instance7':
         # paasta stop'd
         mock_mstatus = Mock(
-            app_count=1, deploy_status='Stopped',
+            error_message=None, app_count=1, deploy_status='Stopped',
             expected_instance_count=0,
             running_instance_count=0,
             desired_state='stop',
@@ -90,7 +90,7 @@ def mock_status_instance_side_effect(service, instance):  # pragma: no cover (ge
     if instance == 'instance8':
         # paasta has autoscaled to 0
         mock_mstatus = Mock(
-            app_count=1, deploy_status='Stopped',
+            error_message=None, app_count=1, deploy_status='Stopped',
             expected_instance_count=0,
             running_instance_count=0,
         )
@@ -122,6 +122,9 @@ def mock_status_instance_side_effect(service, instance):  # pragma: no cover (ge
 def test_instances_deployed(mock_get_paasta_api_client, mock__log):
     mock_paasta_api_client = Mock()
     mock_get_paasta_api_client.return_value = mock_paasta_api_client
+    # An older paasta-api without the deploy_status endpoint
+    mock_paasta_api_client.service.deploy_status.return_value.result.side_effect = \
+        HTTPError(response=Mock(status_code=404))
     mock_paasta_api_client.service.status_instance.side_effect = \
         mock_status_instance_side_effect
 
@@ -213,6 +216,62 @@ def test_instances_deployed(mock_get_paasta_api_client, mock__log):
     assert instances_out.empty()
 
 
+def mock_deploy_status(instance, **kwargs):
+    defaults = dict(
+        instance=instance, git_sha='somesha', error_message=None,
+        app_count=1, deploy_status='Running', desired_state='start',
+        expected_instance_count=2, running_instance_count=2,
+    )
+    defaults.update(kwargs)
+    return Mock(**defaults)
+
+
+@patch('paasta_tools.cli.cmds.mark_for_deployment._log', autospec=True)
+@patch(
+    'paasta_tools.cli.cmds.mark_for_deployment.client.get_paasta_api_client',
+    autospec=True,
+)
+def test_instances_deployed_with_deploy_status(mock_get_paasta_api_client, mock__log):
+    mock_paasta_api_client = Mock()
+    mock_get_paasta_api_client.return_value = mock_paasta_api_client
+    mock_paasta_api_client.service.deploy_status.return_value.result.return_value = Mock(
+        instances=[
+            mock_deploy_status('instance1'),
+            mock_deploy_status('instance2', app_count=2),
+            mock_deploy_status('instance3', deploy_status='Delayed'),
+            mock_deploy_status('instance4', running_instance_count=1),
+            mock_deploy_status('instance5', git_sha='anothersha'),
+            mock_deploy_status('instance6', error_message='Docker image is not in deployments.json.'),
+            mock_deploy_status('instance7', desired_state='stop', deploy_status='Stopped', running_instance_count=0),
+        ],
+    )
+
+    e = Event()
+    e.set()
+    cluster_data = mark_for_deployment.ClusterData(
+        cluster='cluster',
+        service='service1',
+        git_sha='somesha',
+        instances_queue=Queue(),
+    )
+    for instance in [
+        'instance1', 'instance2', 'instance3', 'instance4', 'instance5',
+        'instance6', 'instance7', 'notdeployedyet',
+    ]:
+        cluster_data.instances_queue.put(mock_marathon_instance_config(instance))
+    instances_out = Queue()
+    mark_for_deployment.instances_deployed(cluster_data, instances_out, e)
+
+    assert cluster_data.instances_queue.empty()
+    not_deployed = []
+    while not instances_out.empty():
+        not_deployed.append(instances_out.get(block=False).get_instance())
+    assert not_deployed == ['instance2', 'instance3', 'instance4', 'instance5', 'instance6', 'notdeployedyet']
+    # One request for the whole cluster, none per instance
+    mock_paasta_api_client.service.deploy_status.assert_called_once_with(service='service1')
+    assert mock_paasta_api_client.service.status_instance.call_count == 0
+
+
 def instances_deployed_side_effect(cluster_data, instances_out, green_light):  # pragma: no cover (gevent)
     while not cluster_data.instances_queue.empty():
         instance_config = cluster_data.instances_queue.get()
@@ -1,3 +1,4 @@
+import mock
 import pytest
 
 from paasta_tools.utils import SystemPaastaConfig
@@ -18,3 +19,11 @@ def system_paasta_config():
         },
         '/fake_dir/',
     )
+
+
+@pytest.fixture(autouse=True)
+def no_monkey_patch_socket():
+    """Some code under test calls gevent's monkey.patch_socket(), which would
+    outlive the test and break the sockets other tests share between threads"""
+    with mock.patch('gevent.monkey.patch_socket', autospec=True):
+        yield
@@ -3,8 +3,11 @@ import unittest
 import mock
 
 from paasta_tools.deployd.common import BaseServiceInstance
+from paasta_tools.deployd.common import affects_all_instances
 from paasta_tools.deployd.common import exponential_back_off
+from paasta_tools.deployd.common import get_changed_system_config_keys
 from paasta_tools.deployd.common import get_marathon_clients_from_config
+from paasta_tools.deployd.common import get_marathon_config_filter_for_keys
 from paasta_tools.deployd.common import get_priority
 from paasta_tools.deployd.common import get_service_instances_needing_update
 from paasta_tools.deployd.common import PaastaPriorityQueue
@@ -12,11 +15,14 @@ from paasta_tools.deployd.common import PaastaQueue
 from paasta_tools.deployd.common import PaastaThread
 from paasta_tools.deployd.common import rate_limit_instances
 from paasta_tools.deployd.common import ServiceInstance
+from paasta_tools.deployd.common import TimerWheel
 from paasta_tools.marathon_tools import MarathonClients
+from paasta_tools.marathon_tools import MarathonServiceConfig
 from paasta_tools.utils import DEFAULT_SOA_DIR
 from paasta_tools.utils import InvalidJobNameError
 from paasta_tools.utils import NoDeploymentsAvailable
 from paasta_tools.utils import NoDockerImageError
+from paasta_tools.utils import SystemPaastaConfig
 
 
 class TestPaastaThread(unittest.TestCase):
@@ -201,6 +207,46 @@ def test_exponential_back_off():
     assert exponential_back_off(99, 60, 2, 6000) == 6000
 
 
+def test_timer_wheel():
+    wheel = TimerWheel(tick=1, slots=8)
+    assert wheel.next_deadline() is None
+    wheel.schedule('a', 3)
+    wheel.schedule('b', 1.5)
+    wheel.schedule('c', 12)
+    assert len(wheel) == 3
+    assert wheel.next_deadline() == 1.5
+    assert wheel.pop_expired(3) == ['b', 'a']
+    assert 'a' not in wheel
+    assert wheel.pop_expired(5) == []
+
+    # 'c' shares the slot of tick 4, but is due in the next turn of the wheel
+    wheel.schedule('d', 4)
+    assert wheel.next_deadline() == 4
+    assert wheel.pop_expired(6) == ['d']
+    assert wheel.next_deadline() == 12
+
+    # rescheduling replaces the deadline, and past deadlines fire on the next pop
+    wheel.schedule('c', 2)
+    assert wheel.get_deadline('c') == 2
+    assert wheel.pop_expired(6.5) == ['c']
+
+    wheel.schedule('e', 7)
+    wheel.cancel('e')
+    wheel.cancel('f')
+    assert len(wheel) == 0
+    assert wheel.pop_expired(100) == []
+
+
+def test_timer_wheel_clock_going_backwards():
+    wheel = TimerWheel(tick=1, slots=8)
+    wheel.pop_expired(100)
+    wheel.schedule('a', 50)
+    wheel.schedule('b', 105)
+    assert wheel.pop_expired(90) == ['a']
+    assert wheel.pop_expired(104) == []
+    assert wheel.pop_expired(105) == ['b']
+
+
 def test_get_service_instances_needing_update():
     with mock.patch(
         'paasta_tools.deployd.common.get_all_marathon_apps', autospec=True,
@@ -301,6 +347,76 @@ def test_get_service_instances_needing_update():
         assert ret == [('universe', 'c138')]
 
 
+def test_get_service_instances_needing_update_with_filter_and_workers():
+    with mock.patch(
+        'paasta_tools.deployd.common.get_all_marathon_apps', autospec=True,
+        return_value=[mock.Mock(id='/universe.c137.c1.g1', instances=2)],
+    ), mock.patch(
+        'paasta_tools.deployd.common.load_marathon_service_config_no_cache', autospec=True,
+    ) as mock_load_marathon_service_config:
+        configs = {
+            instance: mock.Mock(
+                instance=instance,
+                format_marathon_app_dict=mock.Mock(return_value={'id': 'universe.%s.c2.g2' % instance, 'instances': 2}),
+            )
+            for instance in ['c137', 'c138', 'c139']
+        }
+        configs['c137'].format_marathon_app_dict.return_value = {'id': 'universe.c137.c1.g1', 'instances': 2}
+        mock_load_marathon_service_config.side_effect = lambda service, instance, cluster, soa_dir: configs[instance]
+        fake_clients = MarathonClients(current=[mock.Mock(servers=['foo'])], previous=[])
+        service_instances = [('universe', 'c137'), ('universe', 'c138'), ('universe', 'c139')]
+
+        ret = get_service_instances_needing_update(
+            fake_clients, service_instances, 'westeros-prod', max_workers=3,
+        )
+        assert ret == [('universe', 'c138'), ('universe', 'c139')]
+
+        ret = get_service_instances_needing_update(
+            fake_clients, service_instances, 'westeros-prod',
+            config_filter=lambda config: config.instance != 'c139', max_workers=3,
+        )
+        assert ret == [('universe', 'c138')]
+        assert configs['c139'].format_marathon_app_dict.call_count == 1
+
+
+def test_get_changed_system_config_keys():
+    old = SystemPaastaConfig({'cluster': 'westeros-prod', 'volumes': [], 'zookeeper': 'zk'}, '/etc/paasta')
+    new = SystemPaastaConfig(
+        {'cluster': 'westeros-prod', 'volumes': [{'hostPath': '/a'}], 'sensu_port': 1}, '/etc/paasta',
+    )
+    assert get_changed_system_config_keys(old, new) == {'volumes', 'zookeeper', 'sensu_port'}
+    assert get_changed_system_config_keys(old, old) == set()
+
+
+def test_get_marathon_config_filter_for_keys():
+    assert get_marathon_config_filter_for_keys([]) is None
+    assert get_marathon_config_filter_for_keys(['deployd_number_workers', 'sensu_host']) is None
+    assert get_marathon_config_filter_for_keys(['volumes', 'deploy_blacklist']) is affects_all_instances
+    assert get_marathon_config_filter_for_keys(['some_new_key']) is affects_all_instances
+
+    constrained = MarathonServiceConfig(
+        service='universe', instance='c137', cluster='westeros-prod',
+        config_dict={'constraints': [['region', 'GROUP_BY', '2']]}, branch_dict=None,
+    )
+    unconstrained = MarathonServiceConfig(
+        service='universe', instance='c138', cluster='westeros-prod',
+        config_dict={}, branch_dict=None,
+    )
+    with_secrets = MarathonServiceConfig(
+        service='universe', instance='c139', cluster='westeros-prod',
+        config_dict={'constraints': [], 'env': {'PASSWORD': 'SECRET(password)'}}, branch_dict=None,
+    )
+    config_filter = get_marathon_config_filter_for_keys(['expected_slave_attributes', 'deployd_log_level'])
+    assert not config_filter(constrained)
+    assert config_filter(unconstrained)
+    assert not config_filter(with_secrets)
+
+    config_filter = get_marathon_config_filter_for_keys(['vault_environment', 'deploy_whitelist'])
+    assert not config_filter(constrained)
+    assert config_filter(unconstrained)
+    assert config_filter(with_secrets)
+
+
 def test_get_marathon_clients_from_config():
     with mock.patch(
         'paasta_tools.deployd.common.load_system_paasta_config', autospec=True,
@@ -6,6 +6,7 @@ import mock
 from pytest import raises
 
 from paasta_tools.deployd.common import BaseServiceInstance
+from paasta_tools.deployd.common import TimerWheel
 
 
 class FakePyinotify(object):  # pragma: no cover
@@ -32,6 +33,7 @@ class FakePyinotify(object):  # pragma: no cover
 sys.modules['pyinotify'] = FakePyinotify
 
 from paasta_tools.deployd.master import Inbox  # noqa
+from paasta_tools.deployd.master import InboxStats  # noqa
 from paasta_tools.deployd.master import DeployDaemon  # noqa
 from paasta_tools.deployd.master import DedupedPriorityQueue  # noqa
 from paasta_tools.deployd.master import main  # noqa
@@ -104,36 +106,59 @@ class TestInbox(unittest.TestCase):
 
     def test_process_inbox(self):
         self.mock_inbox_q.get.side_effect = Empty
-        self.mock_inbox_q.empty.return_value = True
         self.inbox.to_bounce = {}
         with mock.patch(
             'paasta_tools.deployd.master.Inbox.process_service_instance', autospec=True,
         ) as mock_process_service_instance, mock.patch(
             'paasta_tools.deployd.master.Inbox.process_to_bounce', autospec=True,
         ) as mock_process_to_bounce, mock.patch(
-            'time.sleep', autospec=True,
+            'paasta_tools.deployd.master.Inbox.get_wait_timeout', autospec=True, return_value=0.5,
         ):
             self.inbox.process_inbox()
-            self.mock_inbox_q.get.assert_called_with(block=False)
+            self.mock_inbox_q.get.assert_called_with(timeout=0.5)
             assert not mock_process_service_instance.called
             assert not mock_process_to_bounce.called
 
-            mock_si = mock.Mock()
-            self.mock_inbox_q.get.side_effect = None
-            self.mock_inbox_q.get.return_value = mock_si
-            self.mock_inbox_q.empty.return_value = False
+            # everything in the queue is handled in one go
+            mock_sis = [mock.Mock(), mock.Mock(), mock.Mock()]
+            self.mock_inbox_q.get.side_effect = mock_sis + [Empty]
             self.inbox.process_inbox()
-            mock_process_service_instance.assert_called_with(self.inbox, mock_si)
+            assert mock_process_service_instance.call_args_list == [
+                mock.call(self.inbox, mock_si) for mock_si in mock_sis
+            ]
+            self.mock_inbox_q.get.assert_called_with(block=False)
             assert not mock_process_to_bounce.called
 
-            self.inbox.to_bounce = {'service.instance': mock_si}
-            self.mock_inbox_q.empty.return_value = True
+            self.inbox.to_bounce = {'service.instance': mock_sis[0]}
+            self.mock_inbox_q.get.side_effect = Empty
             self.inbox.process_inbox()
-            mock_process_service_instance.assert_called_with(self.inbox, mock_si)
             assert mock_process_to_bounce.called
 
+    def test_process_inbox_batch_size(self):
+        self.mock_inbox_q.get.return_value = mock.Mock()
+        with mock.patch(
+            'paasta_tools.deployd.master.Inbox.process_service_instance', autospec=True,
+        ) as mock_process_service_instance, mock.patch(
+            'paasta_tools.deployd.master.INBOX_BATCH_SIZE', 10, autospec=None,
+        ):
+            self.inbox.process_inbox()
+            assert mock_process_service_instance.call_count == 10
+
+    def test_get_wait_timeout(self):
+        with mock.patch(
+            'time.time', autospec=True, return_value=100,
+        ):
+            assert self.inbox.get_wait_timeout() == 1
+            self.inbox.timer_wheel.schedule('universe.c137', 100.25)
+            assert self.inbox.get_wait_timeout() == 0.25
+            self.inbox.timer_wheel.schedule('universe.c138', 90)
+            assert self.inbox.get_wait_timeout() == 0
+            self.inbox.timer_wheel = TimerWheel()
+            self.inbox.timer_wheel.schedule('universe.c137', 200)
+            assert self.inbox.get_wait_timeout() == 1
+
     def test_process_service_instance(self):
-        mock_service_instance = mock.Mock(service='universe', instance='c137')
+        mock_service_instance = mock.Mock(service='universe', instance='c137', bounce_by=10)
         with mock.patch(
             'paasta_tools.deployd.master.Inbox.should_add_to_bounce', autospec=True,
         ) as mock_should_add_to_bounce:
@@ -144,6 +169,23 @@ class TestInbox(unittest.TestCase):
             mock_should_add_to_bounce.return_value = True
             self.inbox.process_service_instance(mock_service_instance)
             assert self.inbox.to_bounce == {'universe.c137': mock_service_instance}
+            assert self.inbox.timer_wheel.get_deadline('universe.c137') == 10
+
+    def test_process_service_instance_queued_or_in_flight(self):
+        self.inbox.queued = {'universe.c137': 5}
+        self.inbox.in_flight = {'universe.c138': None}
+        self.inbox.process_service_instance(mock.Mock(service='universe', instance='c137', bounce_by=10))
+        assert self.inbox.to_bounce == {}
+        assert self.inbox.dropped == 1
+
+        mock_later_si = mock.Mock(service='universe', instance='c138', bounce_by=20)
+        mock_earlier_si = mock.Mock(service='universe', instance='c138', bounce_by=10)
+        self.inbox.process_service_instance(mock_later_si)
+        self.inbox.process_service_instance(mock_earlier_si)
+        self.inbox.process_service_instance(mock_later_si)
+        assert self.inbox.to_bounce == {}
+        assert self.inbox.in_flight == {'universe.c138': mock_earlier_si}
+        assert self.inbox.coalesced == 3
 
     def test_should_add_to_bounce(self):
         mock_service_instance_1 = mock.Mock(bounce_by=10)
@@ -160,15 +202,49 @@ class TestInbox(unittest.TestCase):
             'time.time', autospec=True,
         ) as mock_time:
             mock_time.return_value = 50
-            mock_service_instance_1 = mock.Mock(bounce_by=10)
-            mock_service_instance_2 = mock.Mock(bounce_by=60)
-            self.inbox.to_bounce = {
-                'universe.c137': mock_service_instance_1,
-                'universe.c138': mock_service_instance_2,
-            }
+            mock_service_instance_1 = mock.Mock(service='universe', instance='c137', bounce_by=10)
+            mock_service_instance_2 = mock.Mock(service='universe', instance='c138', bounce_by=60)
+            self.inbox.process_service_instance(mock_service_instance_1)
+            self.inbox.process_service_instance(mock_service_instance_2)
             self.inbox.process_to_bounce()
             self.mock_bounce_q.put.assert_called_with(mock_service_instance_1.priority, mock_service_instance_1)
             assert self.mock_bounce_q.put.call_count == 1
+            assert self.inbox.to_bounce == {'universe.c138': mock_service_instance_2}
+            assert self.inbox.queued == {'universe.c137': 50}
+
+            mock_time.return_value = 60
+            self.inbox.process_to_bounce()
+            self.mock_bounce_q.put.assert_called_with(mock_service_instance_2.priority, mock_service_instance_2)
+            assert self.inbox.to_bounce == {}
+
+    def test_bounce_lifecycle(self):
+        with mock.patch(
+            'time.time', autospec=True, return_value=50,
+        ):
+            mock_si = mock.Mock(service='universe', instance='c137', bounce_by=10)
+            self.inbox.process_service_instance(mock_si)
+            self.inbox.process_to_bounce()
+            assert self.inbox.get_stats() == InboxStats(
+                scheduled=0, queued=1, in_flight=0, coalesced=0, dropped=0, oldest_queued_age=0,
+            )
+
+            self.inbox.start_bounce(mock_si)
+            assert self.inbox.queued == {}
+            assert self.inbox.in_flight == {'universe.c137': None}
+
+            self.inbox.finish_bounce(mock_si)
+            assert self.inbox.in_flight == {}
+            assert self.inbox.to_bounce == {}
+
+            # an event received during the bounce is scheduled once it's done,
+            # unless bouncing again is due earlier
+            mock_event = mock.Mock(service='universe', instance='c137', bounce_by=70)
+            mock_bounce_again = mock.Mock(service='universe', instance='c137', bounce_by=60)
+            self.inbox.start_bounce(mock_si)
+            self.inbox.process_service_instance(mock_event)
+            self.inbox.finish_bounce(mock_si, mock_bounce_again)
+            assert self.inbox.to_bounce == {'universe.c137': mock_bounce_again}
+            assert self.inbox.timer_wheel.get_deadline('universe.c137') == 60
 
     def tearDown(self):
         self.inbox.to_bounce = {}
@@ -184,6 +260,8 @@ class TestDeployDaemon(unittest.TestCase):
             'paasta_tools.deployd.master.Inbox', autospec=True,
         ) as self.mock_inbox, mock.patch(
             'paasta_tools.deployd.master.get_marathon_clients_from_config', autospec=True,
+        ), mock.patch(
+            'paasta_tools.deployd.master.enable_config_hash_cache', autospec=True,
         ), mock.patch(
             'paasta_tools.deployd.master.load_system_paasta_config', autospec=True,
         ) as mock_config_getter:
@@ -20,7 +20,7 @@ class TestQueueMetrics(unittest.TestCase):
         with mock.patch('time.sleep', autospec=True, side_effect=LoopBreak):
             with raises(LoopBreak):
                 self.metrics.run()
-            assert self.mock_gauge.set.call_count == 3
+            assert self.mock_gauge.set.call_count == 7
 
 
 class LoopBreak(Exception):
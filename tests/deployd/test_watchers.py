@@ -5,7 +5,9 @@ import mock
 from pytest import raises
 from requests.exceptions import RequestException
 
+from paasta_tools.deployd.common import affects_all_instances
 from paasta_tools.deployd.common import BaseServiceInstance
+from paasta_tools.utils import SystemPaastaConfig
 
 
 class FakePyinotify(object):  # pragma: no cover
@@ -437,6 +439,7 @@ class TestPublicConfigEventHandler(unittest.TestCase):
         assert self.mock_filewatcher.wm.add_watch.called
 
     def test_process_default(self):
+        self.handler.public_config = SystemPaastaConfig({'cluster': 'westeros-prod', 'volumes': []}, '/etc/paasta')
         with mock.patch(
             'paasta_tools.deployd.watchers.PublicConfigEventHandler.filter_event', autospec=True,
         ) as mock_filter_event, mock.patch(
@@ -450,10 +453,12 @@ class TestPublicConfigEventHandler(unittest.TestCase):
             autospec=True,
         ) as mock_get_service_instances_needing_update, mock.patch(
             'paasta_tools.deployd.watchers.rate_limit_instances', autospec=True,
-        ) as mock_rate_limit_instances:
+        ) as mock_rate_limit_instances, mock.patch(
+            'paasta_tools.deployd.watchers.get_marathon_clients_from_config', autospec=True,
+        ) as mock_get_marathon_clients_from_config:
             mock_event = mock.Mock()
             mock_filter_event.return_value = mock_event
-            mock_load_system_config.return_value = self.mock_config
+            mock_load_system_config.return_value = self.handler.public_config
             self.handler.process_default(mock_event)
             assert mock_load_system_config.called
             assert not mock_get_services_for_cluster.called
@@ -461,23 +466,46 @@ class TestPublicConfigEventHandler(unittest.TestCase):
             assert not mock_rate_limit_instances.called
             assert not self.mock_filewatcher.inbox_q.put.called
 
-            mock_load_system_config.return_value = mock.Mock(get_cluster=mock.Mock())
+            # keys that can't change a marathon app don't trigger a scan
+            mock_load_system_config.return_value = SystemPaastaConfig(
+                {'cluster': 'westeros-prod', 'volumes': [], 'deployd_log_level': 'DEBUG'}, '/etc/paasta',
+            )
+            self.handler.process_default(mock_event)
+            assert not mock_get_services_for_cluster.called
+            assert not mock_get_service_instances_needing_update.called
+            assert not mock_get_marathon_clients_from_config.called
+
+            mock_load_system_config.return_value = SystemPaastaConfig(
+                {'cluster': 'westeros-prod', 'volumes': [], 'marathon_servers': []}, '/etc/paasta',
+            )
+            self.handler.process_default(mock_event)
+            assert mock_get_marathon_clients_from_config.called
+            assert not mock_get_service_instances_needing_update.called
+
+            mock_load_system_config.return_value = SystemPaastaConfig(
+                {'cluster': 'westeros-prod', 'volumes': [{'hostPath': '/nail'}], 'deployd_number_workers': 3},
+                '/etc/paasta',
+            )
             mock_get_service_instances_needing_update.return_value = []
             self.handler.process_default(mock_event)
-            assert mock_load_system_config.called
             assert mock_get_services_for_cluster.called
-            assert mock_get_service_instances_needing_update.called
+            mock_get_service_instances_needing_update.assert_called_with(
+                mock_get_marathon_clients_from_config.return_value,
+                mock_get_services_for_cluster.return_value,
+                'westeros-prod',
+                config_filter=affects_all_instances,
+                max_workers=3,
+            )
             assert not mock_rate_limit_instances.called
             assert not self.mock_filewatcher.inbox_q.put.called
 
-            mock_load_system_config.return_value = mock.Mock(get_deployd_big_bounce_rate=mock.Mock())
+            mock_load_system_config.return_value = SystemPaastaConfig(
+                {'cluster': 'westeros-prod', 'volumes': [], 'deployd_big_bounce_rate': 1}, '/etc/paasta',
+            )
             mock_si = mock.Mock()
             mock_get_service_instances_needing_update.return_value = [mock_si]
             mock_rate_limit_instances.return_value = [mock_si]
             self.handler.process_default(mock_event)
-            assert mock_load_system_config.called
-            assert mock_get_services_for_cluster.called
-            assert mock_get_service_instances_needing_update.called
             assert mock_rate_limit_instances.called
             self.mock_filewatcher.inbox_q.put.assert_called_with(mock_si)
 
@@ -145,6 +145,55 @@ class TestPaastaDeployWorker(unittest.TestCase):
             mock_process_service_instance.assert_called_with(self.worker, mock_si)
             self.mock_inbox_q.put.assert_called_with(mock_queued_si)
 
+    def test_run_with_inbox(self):
+        mock_inbox = mock.Mock()
+        self.worker.inbox = mock_inbox
+        with mock.patch(
+            'time.time', autospec=True, return_value=1,
+        ), mock.patch(
+            'time.sleep', autospec=True, side_effect=LoopBreak,
+        ), mock.patch(
+            'paasta_tools.deployd.workers.PaastaDeployWorker.process_service_instance', autospec=True,
+        ) as mock_process_service_instance:
+            mock_timers = mock.Mock()
+            mock_process_service_instance.return_value = BounceResults(
+                bounce_again_in_seconds=None,
+                return_code=0,
+                bounce_timers=mock_timers,
+            )
+            mock_si = mock.Mock(
+                service='universe',
+                instance='c137',
+                failures=0,
+                priority=0,
+            )
+            self.mock_bounce_q.get.return_value = mock_si
+            with raises(LoopBreak):
+                self.worker.run()
+            mock_inbox.start_bounce.assert_called_with(mock_si)
+            mock_inbox.finish_bounce.assert_called_with(mock_si, None)
+
+            mock_process_service_instance.return_value = BounceResults(
+                bounce_again_in_seconds=60,
+                return_code=0,
+                bounce_timers=mock_timers,
+            )
+            with raises(LoopBreak):
+                self.worker.run()
+            mock_inbox.finish_bounce.assert_called_with(
+                mock_si,
+                BaseServiceInstance(
+                    service='universe',
+                    instance='c137',
+                    bounce_by=61,
+                    watcher='Worker1',
+                    bounce_timers=mock_timers,
+                    failures=0,
+                    priority=0,
+                ),
+            )
+            assert not self.mock_inbox_q.put.called
+
     def test_process_service_instance(self):
         mock_client = mock.Mock()
         mock_app = mock.Mock()
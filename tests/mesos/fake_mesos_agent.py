@@ -0,0 +1,81 @@
+# Copyright 2015-2018 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""A fake Mesos agent serving /files/read.json.
+
+Usage: fake_mesos_agent.py ROOT
+
+Prints the port it listens on, then serves until killed. The files it serves
+are the ones under ROOT. /stats reports the number of connections that were
+made to it.
+"""
+import http.server
+import json
+import os
+import socketserver
+import sys
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+
+class FakeMesosAgentHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/stats':
+            self.send_json({'connections': len(self.server.connections)})
+            return
+
+        self.server.connections.add(self.client_address)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        try:
+            with open(os.path.join(self.server.root, params['path'].lstrip('/')), 'rb') as f:
+                content = f.read()
+        except (KeyError, IOError):
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        offset, length = int(params['offset']), int(params['length'])
+        if offset == -1:
+            self.send_json({'offset': len(content), 'data': ''})
+        else:
+            self.send_json({'offset': offset, 'data': content[offset:offset + length].decode('utf-8')})
+
+    def send_json(self, obj):
+        body = json.dumps(obj).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeMesosAgent(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, root):
+        super().__init__(('127.0.0.1', 0), FakeMesosAgentHandler)
+        self.root = root
+        self.connections = set()
+
+
+if __name__ == '__main__':
+    server = FakeMesosAgent(sys.argv[1])
+    print(server.server_address[1], flush=True)
+    server.serve_forever()
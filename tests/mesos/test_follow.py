@@ -0,0 +1,192 @@
+import json
+import os
+import subprocess
+import sys
+from urllib.request import urlopen
+
+import mock
+from pytest import fixture
+
+from paasta_tools.mesos.follow import FollowedLine
+from paasta_tools.mesos.follow import Follower
+
+
+FAKE_AGENT_SCRIPT = os.path.join(os.path.dirname(__file__), 'fake_mesos_agent.py')
+
+
+class FakeAgent(object):
+    """Runs tests/mesos/fake_mesos_agent.py in its own process, so it doesn't
+    share the state of the test process"""
+
+    def __init__(self, root):
+        self.root = root
+        self.proc = subprocess.Popen(
+            [sys.executable, FAKE_AGENT_SCRIPT, str(root)],
+            stdout=subprocess.PIPE, universal_newlines=True,
+        )
+        self.url = 'http://127.0.0.1:%s' % self.proc.stdout.readline().strip()
+
+    def write(self, path, data, mode='w'):
+        full_path = os.path.join(str(self.root), path.lstrip('/'))
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, mode, encoding='utf-8') as f:
+            f.write(data)
+
+    def append(self, path, data):
+        self.write(path, data, mode='a')
+
+    @property
+    def connections(self):
+        return json.loads(urlopen(self.url + '/stats').read().decode())['connections']
+
+    def stop(self):
+        self.proc.terminate()
+        self.proc.wait()
+        self.proc.stdout.close()
+
+
+@fixture
+def agents(tmpdir):
+    agents = [FakeAgent(tmpdir.mkdir('agent1')), FakeAgent(tmpdir.mkdir('agent2'))]
+    yield agents
+    for agent in agents:
+        agent.stop()
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, secs):
+        self.now += secs
+
+
+@fixture
+def clock():
+    return FakeClock()
+
+
+@fixture
+def follower(clock):
+    with Follower(clock=clock, sleep=clock.sleep) as follower:
+        yield follower
+
+
+def poll_due(follower, clock):
+    clock.now = follower.next_poll_at()
+    return follower.poll()
+
+
+def test_follow_reads_what_is_written(agents, clock, follower):
+    agent = agents[0]
+    agent.write('/sandbox/stdout', 'written before\n')
+    follower.add(agent.url, '/sandbox/stdout', 'stdout')
+    assert follower.poll() == []
+
+    agent.append('/sandbox/stdout', 'line 1\nline 2\npartial')
+    assert poll_due(follower, clock) == [FollowedLine('stdout', 'line 1'), FollowedLine('stdout', 'line 2')]
+    assert poll_due(follower, clock) == []
+    agent.append('/sandbox/stdout', ' line 3 ☃\nline 4\n')
+    assert poll_due(follower, clock) == [
+        FollowedLine('stdout', 'partial line 3 ☃'),
+        FollowedLine('stdout', 'line 4'),
+    ]
+    agent.append('/sandbox/stdout', 'line 5\n')
+    assert poll_due(follower, clock) == [FollowedLine('stdout', 'line 5')]
+
+
+def test_follow_from_start_in_chunks(agents, clock):
+    agent = agents[0]
+    agent.write('/sandbox/stdout', ''.join('line %d\n' % i for i in range(1000)))
+    with Follower(clock=clock, sleep=clock.sleep, chunk_size=100) as follower:
+        follower.add(agent.url, '/sandbox/stdout', 'stdout', from_start=True)
+        assert follower.poll() == [FollowedLine('stdout', 'line %d' % i) for i in range(1000)]
+
+
+def test_follow_truncated_file(agents, clock, follower):
+    agent = agents[0]
+    agent.write('/sandbox/stdout', 'a long line that will be truncated\n')
+    follower.add(agent.url, '/sandbox/stdout', 'stdout', from_start=True)
+    agent.append('/sandbox/stdout', 'unterminated')
+    assert follower.poll() == [FollowedLine('stdout', 'a long line that will be truncated')]
+
+    agent.write('/sandbox/stdout', 'new\n')
+    assert poll_due(follower, clock) == [FollowedLine('stdout', 'unterminated'), FollowedLine('stdout', 'new')]
+
+
+def test_follow_backs_off_idle_files(agents, clock, follower):
+    agent = agents[0]
+    agent.write('/sandbox/stdout', '')
+    follower.add(agent.url, '/sandbox/stdout', 'stdout')
+    follower.add(agent.url, '/sandbox/missing', 'missing')
+    intervals = []
+    for _ in range(6):
+        start = clock.now
+        follower.poll()
+        intervals.append(follower.next_poll_at() - start)
+        clock.now = follower.next_poll_at()
+    assert intervals == [0.5, 1, 2, 4, 8, 8]
+
+    agent.write('/sandbox/stdout', 'line\n')
+    # the missing file isn't due anymore when the other one is
+    assert follower.poll() == [FollowedLine('stdout', 'line')]
+    assert follower.files[(agent.url, '/sandbox/stdout')].due_at == clock.now + 0.5
+    assert follower.files[(agent.url, '/sandbox/missing')].due_at == clock.now + 8
+
+
+def test_follow_many_files_of_many_agents(agents, clock, follower):
+    for i, agent in enumerate(agents):
+        for path in ('stdout', 'stderr'):
+            agent.write(path, '')
+            follower.add(agent.url, path, (i, path))
+    follower.poll()
+
+    for _ in range(3):
+        for i, agent in enumerate(agents):
+            for path in ('stdout', 'stderr'):
+                agent.append(path, '%d %s\n' % (i, path))
+        assert sorted(poll_due(follower, clock)) == [
+            FollowedLine((i, path), '%d %s' % (i, path)) for i in range(2) for path in ('stderr', 'stdout')
+        ]
+    # the files of an agent are read through a single connection
+    assert [agent.connections for agent in agents] == [1, 1]
+
+
+def fake_task(task_id, agent):
+    task = mock.MagicMock()
+    task.__getitem__.side_effect = {'id': task_id}.__getitem__
+    task.slave.host = agent.url
+    task.directory = '/sandboxes/%s' % task_id
+    return task
+
+
+def test_follow_tasks(agents, clock, follower):
+    agent = agents[0]
+    first_task = fake_task('task1', agent)
+    restarted_task = fake_task('task2', agent)
+    agent.write('/sandboxes/task1/stdout', 'old output\n')
+    agent.write('/sandboxes/task1/stderr', '')
+
+    def get_tasks():
+        if get_tasks.calls == 1:
+            agent.append('/sandboxes/task1/stderr', 'error\n')
+        elif get_tasks.calls == 2:
+            # task1 writes its last words and gets restarted as task2
+            agent.append('/sandboxes/task1/stdout', 'last words\n')
+            agent.write('/sandboxes/task2/stdout', 'hello\n')
+            agent.write('/sandboxes/task2/stderr', '')
+        get_tasks.calls += 1
+        return [first_task] if get_tasks.calls < 3 else [restarted_task]
+    get_tasks.calls = 0
+
+    lines = follower.follow_tasks(get_tasks, paths=['stdout', 'stderr'], refresh_interval=5)
+    assert [next(lines) for _ in range(3)] == [
+        FollowedLine(('task1', 'stderr'), 'error'),
+        FollowedLine(('task1', 'stdout'), 'last words'),
+        FollowedLine(('task2', 'stdout'), 'hello'),
+    ]
+    assert get_tasks.calls == 3
+    assert [path for _, path in follower.files] == ['/sandboxes/task2/stdout', '/sandboxes/task2/stderr']
@@ -1,7 +1,11 @@
+import fnmatch
+
 from mock import call
 from mock import Mock
 from mock import patch
+from pytest import raises
 
+from paasta_tools.mesos import exceptions
 from paasta_tools.mesos import framework
 from paasta_tools.mesos import master
 from paasta_tools.mesos import task
@@ -116,3 +120,138 @@ def test_orphan_tasks():
     mock_task_1 = Mock()
     mesos_master.state = {'orphan_tasks': [mock_task_1]}
     assert mesos_master.orphan_tasks() == [mock_task_1]
+
+
+def fake_index_tasks():
+    return [
+        {'id': 'service.main.git1.config1.uuid1', 'slave_id': 'slave1'},
+        {'id': 'service.main.git1.config1.uuid2', 'slave_id': 'slave2'},
+        {'id': 'service.canary.git1.config1.uuid3', 'slave_id': 'slave1'},
+        {'id': 'ct:1500000000000:0:service main:', 'slave_id': 'slave2'},
+        {'id': 'service.main.git0.config1.uuid0', 'slave_id': 'slave1'},
+    ]
+
+
+def test_task_index_get():
+    tasks = fake_index_tasks()
+    index = master.TaskIndex(tasks)
+    assert len(index) == 5
+    assert index.get('service.main.git1.config1.uuid2') == [tasks[1]]
+    assert index.get('service.main.git1.config1') == []
+
+
+def test_task_index_with_prefix():
+    tasks = fake_index_tasks()
+    index = master.TaskIndex(tasks)
+    assert index.with_prefix('service.main.git1.config1') == [tasks[0], tasks[1]]
+    assert index.with_prefix('service.main.') == [tasks[0], tasks[1], tasks[4]]
+    assert index.with_prefix('zzz') == []
+    assert index.with_prefix('') == tasks
+
+
+def test_task_index_on_slave():
+    tasks = fake_index_tasks()
+    index = master.TaskIndex(tasks)
+    assert index.on_slave('slave1') == [tasks[0], tasks[2], tasks[4]]
+    assert index.on_slave('slave3') == []
+
+
+def test_task_index_matching_is_like_a_scan():
+    tasks = fake_index_tasks()
+    index = master.TaskIndex(tasks)
+    for fltr in (
+        '', 'service', 'main', 'service main', 'uuid1', 'service.*.git1.*', '*uuid?', 'ct:*',
+        'service.[cm]*', 'nothing*', 'git1', 'service.main.git1.config1.uuid1',
+    ):
+        expected = [x for x in tasks if x['id'].startswith(fltr) or fnmatch.fnmatch(x['id'], fltr)]
+        assert index.matching(fltr) == expected, fltr
+
+
+@patch.object(master.MesosMaster, 'fetch', autospec=True)
+def test_task_index_is_built_once_per_fetch(mock_fetch):
+    mock_fetch.return_value = Mock(json=Mock(return_value={
+        'frameworks': [{'tasks': fake_index_tasks(), 'completed_tasks': []}],
+        'completed_frameworks': [],
+    }))
+    mesos_master = master.MesosMaster({})
+    with patch.object(master, 'TaskIndex', wraps=master.TaskIndex) as mock_task_index:
+        assert len(mesos_master.tasks('service.main')) == 3
+        assert [t['id'] for t in mesos_master.tasks_with_prefix('service.canary')] == [
+            'service.canary.git1.config1.uuid3',
+        ]
+        assert len(mesos_master.tasks_with_id('service.main.git1.config1.uuid1')) == 1
+        assert len(mesos_master.tasks_on_slave('slave2')) == 2
+        assert mock_task_index.call_count == 1
+
+        # The index is rebuilt along with the frameworks
+        mesos_master._cache['_frameworks'] = (mesos_master._cache['_frameworks'][0], 0)
+        mesos_master.tasks('service')
+        assert mock_task_index.call_count == 2
+
+
+def fake_state():
+    return {
+        'slaves': [
+            {'id': 'slave1', 'hostname': 'host1'},
+            {'id': 'slave2', 'hostname': 'host2'},
+            {'id': 'dupe', 'hostname': 'host3'},
+            {'id': 'dupe', 'hostname': 'host4'},
+        ],
+    }
+
+
+def fake_frameworks():
+    return {
+        'frameworks': [{
+            'id': 'fw1', 'name': 'marathon',
+            'tasks': [{'id': 'task1', 'slave_id': 'slave1', 'framework_id': 'fw1'}],
+            'completed_tasks': [],
+        }],
+        'completed_frameworks': [{'id': 'fw2', 'name': 'chronos', 'tasks': [], 'completed_tasks': []}],
+    }
+
+
+@patch.object(master.MesosMaster, 'fetch', autospec=True)
+def test_slave_is_looked_up_by_id(mock_fetch):
+    mock_fetch.return_value = Mock(json=Mock(return_value=fake_state()))
+    mesos_master = master.MesosMaster({})
+    assert mesos_master.slave('slave2')['hostname'] == 'host2'
+    with raises(exceptions.SlaveDoesNotExist):
+        mesos_master.slave('missing')
+    with raises(exceptions.MultipleSlavesForIDError):
+        mesos_master.slave('dupe')
+    assert mock_fetch.call_count == 1
+
+    with patch.object(master.slave, 'MesosSlave', wraps=master.slave.MesosSlave) as mock_mesos_slave:
+        mesos_master.slave('slave1')
+        mesos_master.slave('slave2')
+        assert mock_mesos_slave.call_count == 0
+
+        # The slaves are indexed again along with the state
+        mesos_master._cache['state'] = (mesos_master._cache['state'][0], 0)
+        mesos_master.slave('slave1')
+        assert mock_mesos_slave.call_count == 4
+
+
+@patch.object(master.MesosMaster, 'fetch', autospec=True)
+def test_framework_is_looked_up_by_id(mock_fetch):
+    mock_fetch.return_value = Mock(json=Mock(return_value=fake_frameworks()))
+    mesos_master = master.MesosMaster({})
+    assert mesos_master.framework('fw2').name == 'chronos'
+    with patch.object(master.framework, 'Framework', wraps=master.framework.Framework) as mock_framework:
+        assert mesos_master.framework('fw1').name == 'marathon'
+        assert mock_framework.call_count == 0
+
+
+@patch.object(master.MesosMaster, 'fetch', autospec=True)
+def test_task_slave_and_framework(mock_fetch):
+    def fetch(self, url, **kwargs):
+        if url == '/master/state.json':
+            return Mock(json=Mock(return_value=fake_state()))
+        return Mock(json=Mock(return_value=fake_frameworks()))
+    mock_fetch.side_effect = fetch
+    mesos_master = master.MesosMaster({})
+    mesos_task = mesos_master.tasks('task1')[0]
+    assert mesos_task.slave['hostname'] == 'host1'
+    assert mesos_task.framework.name == 'marathon'
+    assert isinstance(mesos_task.framework, framework.Framework)
@@ -0,0 +1,69 @@
+from mock import Mock
+from pytest import mark
+
+from paasta_tools.mesos.mesos_file import File
+
+
+def fake_file(content, max_length=None):
+    """A File of a fake slave serving content, which records the reads. Like
+    Mesos, the slave returns at most max_length bytes per read."""
+    def fetch(url, params):
+        offset, length = params['offset'], params['length']
+        reads.append((offset, length))
+        if offset == -1:
+            return Mock(status_code=200, json=lambda: {'offset': len(content)})
+        if max_length is not None:
+            length = min(length, max_length)
+        return Mock(status_code=200, json=lambda: {'offset': offset, 'data': content[offset:offset + length]})
+
+    reads = []
+    host = Mock()
+    host.fetch.side_effect = fetch
+    return File(host, path='/fake/stdout'), reads
+
+
+@mark.parametrize(
+    'content', [
+        '',
+        '\n',
+        'one line',
+        'one line\n',
+        ''.join('line %d\n' % i for i in range(1000)),
+        ''.join('%d %s\n' % (i, 'x' * (i * 7 % 3000)) for i in range(300)),
+        ''.join('line %d\n' % i for i in range(5)) + 'unterminated',
+    ],
+)
+@mark.parametrize('nlines', [1, 3, 10, 100])
+def test_tail_matches_reversed(content, nlines):
+    fobj, _ = fake_file(content)
+    expected = []
+    for line in reversed(fobj):
+        if len(expected) == nlines:
+            break
+        expected.append(line)
+    assert fobj.tail(nlines) == expected[::-1]
+
+
+def test_tail_adapts_chunks_to_lines():
+    fobj, reads = fake_file(''.join('line %d\n' % i for i in range(100000)))
+    assert fobj.tail(500) == ['line %d' % i for i in range(99500, 100000)]
+    # one read of the size and one of the tail, where reversed() would read
+    # every 1KB of it
+    assert len(reads) == 2
+
+    fobj, reads = fake_file(''.join('%d %s\n' % (i, 'x' * 1000) for i in range(1000)))
+    assert len(fobj.tail(10)) == 10
+    assert len(reads) <= 5
+
+
+def test_tail_short_reads():
+    lines = ['line%03d %s' % (i, 'x' * 20000) for i in range(20)]
+    fobj, _ = fake_file(''.join(line + '\n' for line in lines), max_length=64 * 1024)
+    assert fobj.tail(10) == lines[-10:]
+    assert fobj.tail(20) == lines
+
+
+def test_tail_zero_lines():
+    fobj, reads = fake_file('line\n')
+    assert fobj.tail(0) == []
+    assert reads == []
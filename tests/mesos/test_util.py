@@ -0,0 +1,40 @@
+import mock
+
+from paasta_tools.mesos import util
+
+
+class Fetcher(object):
+
+    @util.CachedProperty(ttl=10)
+    def value(self):
+        return object()
+
+
+class SlowFetcher(Fetcher):
+
+    @util.CachedProperty(ttl=0)
+    def value(self):
+        return object()
+
+
+def test_cached_property_fetched_at():
+    fetcher = Fetcher()
+    assert Fetcher.value.fetched_at(fetcher) is None
+    with mock.patch('time.time', autospec=True, return_value=100):
+        value = fetcher.value
+        assert fetcher.value is value
+    with mock.patch('time.time', autospec=True, return_value=110):
+        assert Fetcher.value.fetched_at(fetcher) == 100
+    with mock.patch('time.time', autospec=True, return_value=111):
+        assert Fetcher.value.fetched_at(fetcher) is None
+        assert fetcher.value is not value
+        assert Fetcher.value.fetched_at(fetcher) == 111
+
+
+def test_cached_property_fetched_at_of_overridden_property():
+    fetcher = SlowFetcher()
+    with mock.patch('time.time', autospec=True, return_value=100):
+        fetcher.value
+    with mock.patch('time.time', autospec=True, return_value=1000):
+        # Without a ttl, the value is kept for good
+        assert SlowFetcher.value.fetched_at(fetcher) == 100
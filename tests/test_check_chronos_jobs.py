@@ -194,19 +194,15 @@ def test_sensu_event_for_last_run_state_invalid():
         check_chronos_jobs.sensu_event_for_last_run_state(100)
 
 
-@patch('paasta_tools.check_chronos_jobs.chronos_tools.filter_chronos_jobs', autospec=True)
-def test_respect_latest_run_after_rerun(mock_filter_chronos_jobs):
+def test_respect_latest_run_after_rerun():
     fake_job = {
-        'name': 'service1 test-job',
+        'name': 'service1 chronos_job',
         'lastSuccess': '2016-07-26T22:00:00+00:00',
         'lastError': '2016-07-26T22:01:00+00:00',
     }
-    mock_filter_chronos_jobs.side_effect = [[
-        fake_job,
-    ]]
-
     fake_configured_jobs = [('service1', 'chronos_job')]
     fake_client = Mock()
+    fake_client.list.return_value = [fake_job]
 
     assert check_chronos_jobs.build_service_job_mapping(fake_client, fake_configured_jobs) == {
         ('service1', 'chronos_job'): fake_job,
@@ -215,75 +211,85 @@ def test_respect_latest_run_after_rerun(mock_filter_chronos_jobs):
 
     # simulate a re-run where we now pass
     reran_job = {
-        'name': 'service1 test-job',
+        'name': 'service1 chronos_job',
         'lastSuccess': '2016-07-26T22:12:00+00:00',
     }
     reran_job = chronos_rerun.set_tmp_naming_scheme(reran_job)
-    mock_filter_chronos_jobs.side_effect = [[
-        fake_job,
-        reran_job,
-    ]]
     fake_client = Mock()
+    fake_client.list.return_value = [fake_job, reran_job]
     assert check_chronos_jobs.build_service_job_mapping(fake_client, fake_configured_jobs) == {
         ('service1', 'chronos_job'): reran_job,
     }
     fake_client.list.assert_called_once_with()
 
 
-@patch('paasta_tools.check_chronos_jobs.chronos_tools.filter_chronos_jobs', autospec=True)
-@patch('paasta_tools.check_chronos_jobs.chronos_tools.filter_enabled_jobs', autospec=True)
-def test_build_service_job_mapping(mock_filter_enabled_jobs, mock_filter_chronos_jobs):
+def test_build_service_job_mapping():
     services = ['service1', 'service2', 'service3']
     latest_time = '2016-07-26T22:03:00+00:00'
-    fake_jobs = [
-        [
+    fake_jobs = []
+    for service in services:
+        fake_jobs.extend([
             {
-                'name': service + ' foo',
+                'name': service + ' main',
                 'lastSuccess': '2016-07-26T22:02:00+00:00',
             },
             {
-                'name': service + ' foo',
+                'name': service + ' main',
                 'lastError': latest_time,
             },
             {
-                'name': service + ' foo',
+                'name': service + ' main',
             },
-        ] for service in services
-    ]
-    fake_jobs.append([
+        ])
+    fake_jobs.extend([
         {
-            'name': 'tmp-2017-06-13T123738942755 service4 foo',
+            'name': 'tmp-2017-06-13T123738942755 service4 main',
             'lastError': latest_time,
         },
         {
-            'name': 'service4 foo',
+            'name': 'service4 main',
             'lastSuccess': '2016-07-26T22:02:00+00:00',
         },
         {
-            'name': 'service4 foo',
+            'name': 'service4 main',
+        },
+        {
+            'name': 'not a paasta job',
         },
     ])
-    mock_filter_chronos_jobs.side_effect = fake_jobs
-    mock_filter_enabled_jobs.side_effect = [[{}, {}, {}] for _ in range(0, 4)]
 
     fake_configured_jobs = [
         ('service1', 'main'),
         ('service2', 'main'),
         ('service3', 'main'),
         ('service4', 'main'),
+        ('service5', 'main'),
     ]
     fake_client = Mock()
+    fake_client.list.return_value = fake_jobs
 
     expected = {
-        ('service1', 'main'): {'name': 'service1 foo', 'lastError': latest_time},
-        ('service2', 'main'): {'name': 'service2 foo', 'lastError': latest_time},
-        ('service3', 'main'): {'name': 'service3 foo', 'lastError': latest_time},
-        ('service4', 'main'): {'name': 'tmp-2017-06-13T123738942755 service4 foo', 'lastError': latest_time},
+        ('service1', 'main'): {'name': 'service1 main', 'lastError': latest_time},
+        ('service2', 'main'): {'name': 'service2 main', 'lastError': latest_time},
+        ('service3', 'main'): {'name': 'service3 main', 'lastError': latest_time},
+        ('service4', 'main'): {'name': 'tmp-2017-06-13T123738942755 service4 main', 'lastError': latest_time},
+        ('service5', 'main'): None,
     }
     assert check_chronos_jobs.build_service_job_mapping(fake_client, fake_configured_jobs) == expected
     fake_client.list.assert_called_once_with()
 
 
+def test_build_service_job_mapping_uses_job_index():
+    fake_job = {'name': 'service1 main', 'lastSuccess': '2016-07-26T22:02:00+00:00'}
+    fake_client = Mock()
+    job_index = chronos_tools.ChronosJobIndex([fake_job])
+
+    assert check_chronos_jobs.build_service_job_mapping(
+        fake_client, [('service1', 'main')], job_index=job_index,
+    ) == {('service1', 'main'): fake_job}
+    assert fake_client.list.call_count == 0
+
+
 def test_message_for_status_fail(mock_chronos_job_config):
     actual = check_chronos_jobs.message_for_status(
         status=pysensu_yelp.Status.CRITICAL,
@@ -532,3 +538,66 @@ def test_message_for_stuck_job_timezone_is_none():
     ).format(fake_schedule) in output
     assert "paasta logs -s myservice -i myinstance -c mycluster" in output
     assert "and is configured to run every 24h." in output
+
+
+def test_job_is_stuck_uses_prefetched_job_stat(mock_chronos_client):
+    last_time_run = datetime.now(pytz.utc) - timedelta(hours=25)
+    interval = 60 * 60 * 24
+
+    assert check_chronos_jobs.job_is_stuck(
+        last_time_run.isoformat(),
+        interval,
+        mock_chronos_client,
+        'job_name',
+        job_stat={"histogram": {"99thPercentile": 60 * 30}},
+    )
+    mock_chronos_client.job_stat.assert_not_called()
+
+
+def test_get_job_stats_for_late_jobs_only_fetches_late_jobs(mock_chronos_client):
+    now = datetime.now(pytz.utc)
+    mock_config = Mock(get_schedule_interval_in_seconds=Mock(return_value=60 * 60 * 24))
+    late_job = {
+        'name': 'service late',
+        'disabled': False,
+        'lastSuccess': (now - timedelta(hours=25)).isoformat(),
+    }
+    late_tmp_job = {
+        'name': 'tmp-2017-06-13T123738942755 service late',
+        'disabled': True,
+        'lastSuccess': (now - timedelta(hours=26)).isoformat(),
+    }
+    on_time_job = {
+        'name': 'service ontime',
+        'disabled': False,
+        'lastSuccess': (now - timedelta(hours=1)).isoformat(),
+    }
+    disabled_job = {
+        'name': 'service disabled',
+        'disabled': True,
+        'lastSuccess': (now - timedelta(hours=25)).isoformat(),
+    }
+    mock_chronos_client.job_stat.side_effect = lambda name: {'histogram': {'99thPercentile': len(name)}}
+
+    actual = check_chronos_jobs.get_job_stats_for_late_jobs(
+        mock_chronos_client,
+        [
+            (late_job, mock_config),
+            (late_tmp_job, mock_config),
+            (on_time_job, mock_config),
+            (disabled_job, mock_config),
+            (None, mock_config),
+        ],
+    )
+    assert actual == {
+        'service late': {'histogram': {'99thPercentile': len('service late')}},
+        'tmp-2017-06-13T123738942755 service late': {
+            'histogram': {'99thPercentile': len('tmp-2017-06-13T123738942755 service late')},
+        },
+    }
+    assert mock_chronos_client.job_stat.call_count == 2
+
+
+def test_get_job_stats_for_late_jobs_with_no_late_jobs(mock_chronos_client):
+    assert check_chronos_jobs.get_job_stats_for_late_jobs(mock_chronos_client, []) == {}
+    mock_chronos_client.job_stat.assert_not_called()
@@ -544,3 +544,32 @@ def test_get_schedule_for_job_type_dependent():
 def test_get_schedule_for_job_type_invalid():
     with pytest.raises(ValueError):
         assert chronos_serviceinit._get_schedule_field_for_job_type(3)
+
+
+@mock.patch('paasta_tools.chronos_serviceinit.status_chronos_jobs', autospec=True)
+@mock.patch('paasta_tools.chronos_serviceinit.chronos_tools.create_complete_config', autospec=True)
+@mock.patch('paasta_tools.chronos_serviceinit.chronos_tools.load_chronos_job_config', autospec=True)
+def test_perform_command_status_uses_job_index(
+    mock_load_chronos_job_config,
+    mock_create_complete_config,
+    mock_status_chronos_jobs,
+):
+    fake_job = {'name': 'fake_service fake_instance', 'disabled': False}
+    mock_client = mock.Mock()
+    job_index = chronos_tools.ChronosJobIndex([fake_job, {'name': 'other_service fake_instance', 'disabled': False}])
+    mock_status_chronos_jobs.return_value = 'fake status'
+
+    assert chronos_serviceinit.perform_command(
+        command='status',
+        service='fake_service',
+        instance='fake_instance',
+        cluster='fake_cluster',
+        verbose=0,
+        soa_dir='/soa/dir',
+        client=mock_client,
+        job_index=job_index,
+    ) == 0
+    mock_status_chronos_jobs.assert_called_once_with(
+        mock_client, [fake_job], mock_load_chronos_job_config.return_value, 0,
+    )
+    assert mock_client.list.call_count == 0
@@ -1865,6 +1865,67 @@ class TestChronosTools:
         jobs = [early_job, late_job, unrun_job]
         assert chronos_tools.sort_jobs(jobs) == [late_job, early_job, unrun_job]
 
+    def test_chronos_job_index_lookup(self):
+        old_job = {
+            'name': 'fake_service fake_instance',
+            'disabled': True,
+            'lastSuccess': '2015-04-20T16:30:00.000Z',
+        }
+        new_job = {
+            'name': 'fake_service fake_instance',
+            'disabled': False,
+            'lastSuccess': '2015-04-20T16:40:00.000Z',
+        }
+        tmp_job = {
+            'name': '%s fake_service fake_instance' % chronos_tools.TMP_JOB_IDENTIFIER,
+            'disabled': True,
+            'lastError': '2015-04-20T16:50:00.000Z',
+        }
+        other_job = {'name': 'other_service fake_instance', 'disabled': False}
+        unknown_job = {'name': 'not_a_paasta_job', 'disabled': False}
+        fake_client = mock.Mock()
+        fake_client.list.return_value = [old_job, other_job, tmp_job, new_job, unknown_job]
+
+        job_index = chronos_tools.ChronosJobIndex.from_client(fake_client)
+
+        fake_client.list.assert_called_once_with()
+        assert job_index.jobs == fake_client.list.return_value
+        assert job_index.lookup('fake_service', 'fake_instance') == [new_job]
+        assert job_index.lookup('fake_service', 'fake_instance', include_disabled=True) == [new_job, old_job]
+        assert job_index.lookup(
+            'fake_service', 'fake_instance', include_disabled=True, include_temporary=True,
+        ) == [tmp_job, new_job, old_job]
+        assert job_index.lookup('other_service', 'fake_instance') == [other_job]
+        assert job_index.lookup('missing_service', 'fake_instance') == []
+        assert job_index.get_temporary_jobs('fake_service', 'fake_instance') == [tmp_job]
+        assert job_index.get_temporary_jobs('other_service', 'fake_instance') == []
+
+    def test_chronos_job_index_lookup_matches_lookup_chronos_jobs(self):
+        jobs = [
+            {'name': 'fake_service fake_instance', 'disabled': False, 'lastSuccess': '2015-04-20T16:30:00.000Z'},
+            {'name': 'fake_service fake_instance', 'disabled': True, 'lastError': '2015-04-20T16:40:00.000Z'},
+            {'name': 'tmp-2017 fake_service fake_instance', 'disabled': True, 'lastSuccess': ''},
+            {'name': 'fake_service other_instance', 'disabled': False},
+        ]
+        fake_client = mock.Mock()
+        fake_client.list.return_value = jobs
+        job_index = chronos_tools.ChronosJobIndex(jobs)
+        for include_disabled in (True, False):
+            for include_temporary in (True, False):
+                expected = chronos_tools.sort_jobs(chronos_tools.lookup_chronos_jobs(
+                    client=fake_client,
+                    service='fake_service',
+                    instance='fake_instance',
+                    include_disabled=include_disabled,
+                    include_temporary=include_temporary,
+                ))
+                assert job_index.lookup(
+                    'fake_service',
+                    'fake_instance',
+                    include_disabled=include_disabled,
+                    include_temporary=include_temporary,
+                ) == expected
+
     def test_disable_job(self):
         fake_client_class = mock.Mock(spec='chronos.ChronosClient')
         fake_client = fake_client_class(servers=[])
@@ -16,6 +16,7 @@ import datetime
 import dateutil
 import mock
 
+from paasta_tools import chronos_tools
 from paasta_tools import cleanup_chronos_jobs
 from paasta_tools.utils import NoConfigurationForServiceError
 from paasta_tools.utils import paasta_print
@@ -99,6 +100,36 @@ def test_filter_expired_tmp_jobs(mock_get_temporary_jobs, mock_load_chronos_job_
     assert actual == ['foo bar']
 
 
+def test_deployed_job_names_uses_job_index():
+    mock_client = mock.Mock()
+    job_index = chronos_tools.ChronosJobIndex([{'name': 'foo bar'}, {'name': 'baz'}])
+    assert cleanup_chronos_jobs.deployed_job_names(mock_client, job_index=job_index) == ['foo bar', 'baz']
+    assert mock_client.list.call_count == 0
+
+
+@mock.patch('paasta_tools.cleanup_chronos_jobs.chronos_tools.load_chronos_job_config', autospec=True)
+def test_filter_expired_tmp_jobs_uses_job_index(mock_load_chronos_job_config):
+    two_days_ago = datetime.datetime.now(dateutil.tz.tzutc()) - datetime.timedelta(days=2)
+    one_hour_ago = datetime.datetime.now(dateutil.tz.tzutc()) - datetime.timedelta(hours=1)
+    mock_load_chronos_job_config.return_value.get_schedule_interval_in_seconds.return_value = 86400
+    mock_client = mock.Mock()
+    job_index = chronos_tools.ChronosJobIndex([
+        {'name': 'foo bar', 'lastSuccess': two_days_ago.isoformat()},
+        {'name': 'tmp-2017-06-13T123738942755 foo bar', 'lastSuccess': two_days_ago.isoformat()},
+        {'name': 'tmp-2017-06-13T123738942755 baz qux', 'lastSuccess': one_hour_ago.isoformat()},
+    ])
+
+    actual = cleanup_chronos_jobs.filter_expired_tmp_jobs(
+        mock_client,
+        ['tmp-2017-06-13T123738942755 foo bar', 'tmp-2017-06-13T123738942755 baz qux'],
+        cluster='fake_cluster',
+        soa_dir='/soa/dir',
+        job_index=job_index,
+    )
+    assert actual == ['tmp-2017-06-13T123738942755 foo bar']
+    assert mock_client.list.call_count == 0
+
+
 def test_filter_paasta_jobs():
     expected = ['foo bar']
     assert cleanup_chronos_jobs.filter_paasta_jobs(iter(['foo bar', 'madeupchronosjob'])) == expected
@@ -44,7 +44,7 @@ class TestCleanupMarathonJobs:
         with mock.patch('paasta_tools.cleanup_marathon_jobs.cleanup_apps', autospec=True) as cleanup_patch:
             cleanup_marathon_jobs.main(('--soa-dir', soa_dir))
             cleanup_patch.assert_called_once_with(
-                soa_dir, kill_threshold=0.5, force=False,
+                soa_dir, kill_threshold=0.5, force=False, snapshot_ttl=0,
             )
 
     def test_cleanup_apps(self):
@@ -157,6 +157,39 @@ class TestCleanupMarathonJobs:
             cleanup_marathon_jobs.cleanup_apps(soa_dir)
             assert delete_patch.call_count == 0
 
+    def test_cleanup_apps_uses_snapshot(self):
+        soa_dir = 'not_really_a_dir'
+        fake_snapshot = mock.Mock(
+            service_instances=[('present', 'away')],
+            apps_with_clients=[
+                (mock.Mock(id='present.away.gone.wtf'), self.fake_marathon_client),
+                (mock.Mock(id='not-here.oh.no.weirdo'), self.fake_marathon_client),
+            ],
+        )
+        with mock.patch(
+            'paasta_tools.cleanup_marathon_jobs.get_services_for_cluster', autospec=True,
+        ) as get_services_for_cluster_patch, mock.patch(
+            'paasta_tools.cleanup_marathon_jobs.load_system_paasta_config',
+            autospec=True,
+            return_value=self.fake_system_config,
+        ), mock.patch(
+            'paasta_tools.marathon_tools.get_marathon_clients', autospec=True,
+            return_value=self.fake_marathon_clients,
+        ), mock.patch(
+            'paasta_tools.cleanup_marathon_jobs.load_or_build_marathon_snapshot', autospec=True,
+            return_value=fake_snapshot,
+        ) as snapshot_patch, mock.patch(
+            'paasta_tools.cleanup_marathon_jobs.delete_app', autospec=True,
+        ) as delete_patch:
+            cleanup_marathon_jobs.cleanup_apps(soa_dir, snapshot_ttl=30)
+            snapshot_patch.assert_called_once_with(self.fake_marathon_clients, soa_dir, ttl=30)
+            assert get_services_for_cluster_patch.call_count == 0
+            delete_patch.assert_called_once_with(
+                app_id='not-here.oh.no.weirdo',
+                client=self.fake_marathon_client,
+                soa_dir=soa_dir,
+            )
+
     def test_delete_app(self):
         app_id = 'example--service.main.git93340779.configddb38a65'
         client = self.fake_marathon_client
@@ -0,0 +1,67 @@
+# Copyright 2015-2018 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import mock
+
+from paasta_tools import config_hash_cache
+from paasta_tools.utils import SystemPaastaConfig
+
+
+def test_get_fingerprint():
+    assert config_hash_cache.get_fingerprint({'a': 1, 'b': 2}) == config_hash_cache.get_fingerprint({'b': 2, 'a': 1})
+    assert config_hash_cache.get_fingerprint({'a': 1}) != config_hash_cache.get_fingerprint({'a': 2})
+
+
+def test_get_system_paasta_config_version(tmpdir):
+    config_file = tmpdir.join('cluster.json')
+    config_file.write('{"cluster": "a"}')
+    system_paasta_config = SystemPaastaConfig({'cluster': 'a'}, str(tmpdir))
+    version = config_hash_cache.get_system_paasta_config_version(system_paasta_config)
+    assert config_hash_cache.get_system_paasta_config_version(system_paasta_config) == version
+
+    config_file.write('{"cluster": "bb"}')
+    assert config_hash_cache.get_system_paasta_config_version(system_paasta_config) != version
+
+
+def test_get_system_paasta_config_version_without_files(tmpdir):
+    version = config_hash_cache.get_system_paasta_config_version(SystemPaastaConfig({'cluster': 'a'}, str(tmpdir)))
+    assert config_hash_cache.get_system_paasta_config_version(
+        SystemPaastaConfig({'cluster': 'b'}, str(tmpdir)),
+    ) != version
+
+
+def test_config_hash_cache_get_config_hash():
+    cache = config_hash_cache.ConfigHashCache()
+    compute = mock.Mock(side_effect=['hash1', 'hash2', 'hash3'])
+    key = ('service', 'main', 'cluster', '/soa')
+
+    assert cache.get_config_hash(key, 'fingerprint1', compute) == 'hash1'
+    assert cache.get_config_hash(key, 'fingerprint1', compute) == 'hash1'
+    assert compute.call_count == 1
+
+    assert cache.get_config_hash(key, 'fingerprint2', compute) == 'hash2'
+    assert compute.call_count == 2
+
+    assert cache.get_config_hash(('service', 'canary', 'cluster', '/soa'), 'fingerprint2', compute) == 'hash3'
+    assert compute.call_count == 3
+
+
+def test_enable_disable_config_hash_cache():
+    try:
+        assert config_hash_cache.get_config_hash_cache() is None
+        cache = config_hash_cache.enable_config_hash_cache()
+        assert config_hash_cache.enable_config_hash_cache() is cache
+        assert config_hash_cache.get_config_hash_cache() is cache
+    finally:
+        config_hash_cache.disable_config_hash_cache()
+    assert config_hash_cache.get_config_hash_cache() is None
@@ -5,6 +5,9 @@ import mock
 import pytest
 
 from paasta_tools import docker_wrapper
+from paasta_tools import firewall
+from paasta_tools import firewall_client
+from paasta_tools.utils import DEFAULT_SOA_DIR
 
 
 class TestParseEnvArgs(object):
@@ -705,8 +708,8 @@ class TestMain(object):
     def mock_mac_address(self):
         with mock.patch.object(
                 docker_wrapper,
-                'reserve_unique_mac_address',
-                return_value=('00:00:00:00:00:00', None),
+                'reserve_mac_address',
+                return_value='00:00:00:00:00:00',
         ) as mock_mac_address:
             yield mock_mac_address
 
@@ -718,16 +721,60 @@ class TestMain(object):
             '--env=PAASTA_INSTANCE=myinstance',
         ]
 
-    @mock.patch.object(docker_wrapper, 'firewall_flock', autospec=True)
-    @mock.patch.object(docker_wrapper, 'prepare_new_container', autospec=True)
+    @pytest.yield_fixture
+    def mock_attach_container(self):
+        with mock.patch.object(
+            docker_wrapper.firewall_client,
+            'attach_container',
+            autospec=True,
+        ) as mock_attach_container:
+            yield mock_attach_container
+
     def test_mac_address(
+        self,
+        mock_attach_container,
+        mock_mac_address,
+        mock_execlp,
+        mock_firewall_env_args,
+    ):
+        argv = [
+            'docker',
+            'run',
+        ] + mock_firewall_env_args
+        docker_wrapper.main(argv)
+
+        assert mock_execlp.mock_calls == [mock.call(
+            'docker',
+            'docker',
+            'run',
+            '--mac-address=00:00:00:00:00:00',
+            *mock_firewall_env_args,
+        )]
+
+        assert mock_attach_container.mock_calls == [mock.call(
+            'myservice',
+            'myinstance',
+            '00:00:00:00:00:00',
+        )]
+
+    @pytest.mark.parametrize('error', [
+        FileNotFoundError(2, 'No such file or directory'),
+        ConnectionRefusedError(111, 'Connection refused'),
+        BlockingIOError(11, 'Resource temporarily unavailable'),
+    ])
+    @mock.patch.object(firewall, 'firewall_flock', autospec=True)
+    @mock.patch.object(firewall, 'prepare_new_container', autospec=True)
+    def test_mac_address_without_firewall_daemon(
         self,
         mock_prepare_new_container,
         mock_firewall_flock,
+        mock_attach_container,
         mock_mac_address,
         mock_execlp,
         mock_firewall_env_args,
+        error,
     ):
+        mock_attach_container.side_effect = error
         argv = [
             'docker',
             'run',
@@ -745,13 +792,47 @@ class TestMain(object):
         assert mock_firewall_flock.return_value.__enter__.called is True
 
         assert mock_prepare_new_container.mock_calls == [mock.call(
-            docker_wrapper.DEFAULT_SOA_DIR,
-            docker_wrapper.DEFAULT_SYNAPSE_SERVICE_DIR,
+            DEFAULT_SOA_DIR,
+            firewall.DEFAULT_SYNAPSE_SERVICE_DIR,
             'myservice',
             'myinstance',
             '00:00:00:00:00:00',
         )]
 
+    @pytest.mark.parametrize('error', [
+        firewall_client.FirewallDaemonError('Oh noes'),
+        # The daemon may still attach the container, it must not be attached twice
+        socket.timeout('Oh noes'),
+    ])
+    @mock.patch.object(firewall, 'prepare_new_container', autospec=True)
+    def test_firewall_daemon_error(
+        self,
+        mock_prepare_new_container,
+        capsys,
+        mock_attach_container,
+        mock_mac_address,
+        mock_execlp,
+        mock_firewall_env_args,
+        error,
+    ):
+        mock_attach_container.side_effect = error
+        argv = [
+            'docker',
+            'run',
+        ] + mock_firewall_env_args
+        docker_wrapper.main(argv)
+
+        assert mock_execlp.mock_calls == [mock.call(
+            'docker',
+            'docker',
+            'run',
+            '--mac-address=00:00:00:00:00:00',
+            *mock_firewall_env_args,
+        )]
+        assert mock_prepare_new_container.call_count == 0
+        _, err = capsys.readouterr()
+        assert err.startswith('Unable to add firewall rules: Oh noes')
+
     def test_mac_address_not_run(self, mock_mac_address, mock_execlp, mock_firewall_env_args):
         argv = [
             'docker',
@@ -786,7 +867,7 @@ class TestMain(object):
 
     def test_mac_address_no_lockdir(self, capsys, mock_execlp, tmpdir, mock_firewall_env_args):
         nonexistent = tmpdir.join('nonexistent')
-        with mock.patch.object(docker_wrapper, 'LOCK_DIRECTORY', str(nonexistent)):
+        with mock.patch.object(docker_wrapper, 'MAC_POOL_PATH', str(nonexistent.join('mac-address.pool'))):
             argv = [
                 'docker',
                 'run',
@@ -802,17 +883,19 @@ class TestMain(object):
             _, err = capsys.readouterr()
             assert err.startswith('Unable to add mac address: [Errno 2] No such file or directory')
 
-    @mock.patch.object(docker_wrapper, 'firewall_flock', autospec=True, side_effect=Exception("Oh noes"))
-    @mock.patch.object(docker_wrapper, 'prepare_new_container', autospec=True)
+    @mock.patch.object(firewall, 'firewall_flock', autospec=True, side_effect=Exception("Oh noes"))
+    @mock.patch.object(firewall, 'prepare_new_container', autospec=True)
     def test_prepare_new_container_error(
         self,
         mock_prepare_new_container,
         mock_firewall_flock,
         capsys,
+        mock_attach_container,
         mock_mac_address,
         mock_execlp,
         mock_firewall_env_args,
     ):
+        mock_attach_container.side_effect = ConnectionRefusedError(111, 'Connection refused')
         argv = [
             'docker',
             'run',
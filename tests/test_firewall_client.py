@@ -0,0 +1,67 @@
+import socket
+import threading
+
+import pytest
+
+from paasta_tools import firewall_client
+
+
+@pytest.fixture
+def fake_daemon(tmpdir):
+    """A daemon answering a single request with the given response"""
+    socket_path = str(tmpdir.join('firewall.sock'))
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(1)
+    requests = []
+
+    def serve(response):
+        def run():
+            conn, _ = server.accept()
+            with conn, conn.makefile('rwb') as f:
+                requests.append(firewall_client.read_message(f))
+                f.write(firewall_client.encode_message(response))
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    yield socket_path, serve, requests
+    server.close()
+
+
+def test_attach_container(fake_daemon):
+    socket_path, serve, requests = fake_daemon
+    thread = serve({'ok': True})
+    firewall_client.attach_container('myservice', 'myinstance', '02:52:00:00:00:01', socket_path=socket_path)
+    thread.join()
+    assert requests == [{'service': 'myservice', 'instance': 'myinstance', 'mac': '02:52:00:00:00:01'}]
+
+
+def test_attach_container_error(fake_daemon):
+    socket_path, serve, requests = fake_daemon
+    thread = serve({'ok': False, 'error': 'Oh noes'})
+    with pytest.raises(firewall_client.FirewallDaemonError, match='Oh noes'):
+        firewall_client.attach_container('myservice', 'myinstance', '02:52:00:00:00:01', socket_path=socket_path)
+    thread.join()
+
+
+def test_attach_container_no_daemon(tmpdir):
+    with pytest.raises(OSError):
+        firewall_client.attach_container(
+            'myservice', 'myinstance', '02:52:00:00:00:01',
+            socket_path=str(tmpdir.join('firewall.sock')),
+        )
+
+
+def test_attach_container_daemon_too_slow(tmpdir):
+    socket_path = str(tmpdir.join('firewall.sock'))
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(1)
+    try:
+        with pytest.raises(socket.timeout):
+            firewall_client.attach_container(
+                'myservice', 'myinstance', '02:52:00:00:00:01', socket_path=socket_path, timeout=0.1,
+            )
+    finally:
+        server.close()
@@ -12,13 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import subprocess
+import threading
+import time
 
 import mock
 import pytest
 import yaml
 
 from paasta_tools import firewall
+from paasta_tools import firewall_client
 from paasta_tools import firewall_update
+from paasta_tools import mac_address
 from paasta_tools.utils import TimeoutError
 
 
@@ -29,11 +33,15 @@ def test_parse_args_daemon():
         '--synapse-service-dir', 'myservicedir',
         'daemon',
         '-u', '123',
+        '--socket-path', 'mysocket',
+        '--prepare-secs', '30',
     ])
     assert args.mode == 'daemon'
     assert args.synapse_service_dir == 'myservicedir'
     assert args.soa_dir == 'mysoadir'
     assert args.update_secs == 123
+    assert args.socket_path == 'mysocket'
+    assert args.prepare_secs == 30
     assert args.verbose
 
 
@@ -43,6 +51,8 @@ def test_parse_args_default_daemon():
     assert args.synapse_service_dir == firewall.DEFAULT_SYNAPSE_SERVICE_DIR
     assert args.soa_dir == firewall_update.DEFAULT_SOA_DIR
     assert args.update_secs == firewall_update.DEFAULT_UPDATE_SECS
+    assert args.socket_path == firewall_client.DEFAULT_FIREWALL_SOCKET_PATH
+    assert args.prepare_secs == firewall_update.DEFAULT_PREPARE_SECS
     assert not args.verbose
 
 
@@ -120,9 +130,10 @@ def test_smartstack_dependencies_of_running_firewalled_services(_, __, tmpdir):
     }
 
 
+@mock.patch.object(firewall_update.ServiceChainPreparer, 'prepare_running_service_groups', autospec=True)
 @mock.patch.object(firewall_update, 'smartstack_dependencies_of_running_firewalled_services', autospec=True)
 @mock.patch.object(firewall_update, 'process_inotify_event', side_effect=StopIteration, autospec=True)
-def test_run_daemon(process_inotify_mock, smartstack_deps_mock, mock_daemon_args):
+def test_run_daemon(process_inotify_mock, smartstack_deps_mock, prepare_mock, mock_daemon_args):
     class kill_after_too_long(object):
         def __init__(self):
             self.count = 0
@@ -139,14 +150,130 @@ def test_run_daemon(process_inotify_mock, smartstack_deps_mock, mock_daemon_args
     assert smartstack_deps_mock.call_count > 0
     assert process_inotify_mock.call_args[0][0][3] == b'mydep.depinstance.json'
     assert process_inotify_mock.call_args[0][1] == {}
+    assert prepare_mock.call_count > 0
+
+
+def test_service_chain_preparer_attach():
+    preparer = firewall_update.ServiceChainPreparer('soa_dir', 'synapse_dir', prepare_secs=60)
+    with mock.patch.object(
+        firewall, 'firewall_flock', autospec=True,
+    ) as mock_firewall_flock, mock.patch.object(
+        firewall, 'ensure_shared_chains', autospec=True,
+    ) as mock_ensure_shared_chains, mock.patch.object(
+        firewall.ServiceGroup, 'update_rules', autospec=True,
+    ) as mock_update_rules, mock.patch.object(
+        firewall, 'dispatch_to_service_group', autospec=True,
+    ) as mock_dispatch_to_service_group, mock.patch.object(
+        firewall_update.time, 'time', autospec=True, return_value=1000,
+    ) as mock_time:
+        preparer.attach('myservice', 'myinstance', '02:52:00:00:00:01')
+        preparer.attach('myservice', 'myinstance', '02:52:00:00:00:02')
+
+        # The chains are only built for the first container
+        assert mock_ensure_shared_chains.call_count == 1
+        assert mock_update_rules.mock_calls == [
+            mock.call(firewall.ServiceGroup('myservice', 'myinstance'), 'soa_dir', 'synapse_dir'),
+        ]
+        assert mock_dispatch_to_service_group.mock_calls == [
+            mock.call(firewall.ServiceGroup('myservice', 'myinstance'), '02:52:00:00:00:01'),
+            mock.call(firewall.ServiceGroup('myservice', 'myinstance'), '02:52:00:00:00:02'),
+        ]
+        assert mock_firewall_flock.return_value.__enter__.call_count == 2
+
+        # and rebuilt once they are too old
+        mock_time.return_value = 1061
+        preparer.attach('myservice', 'myinstance', '02:52:00:00:00:03')
+        assert mock_ensure_shared_chains.call_count == 2
+        assert mock_update_rules.call_count == 2
+
+
+@mock.patch.object(firewall.ServiceGroup, 'update_rules', autospec=True)
+@mock.patch.object(firewall, 'ensure_shared_chains', autospec=True)
+@mock.patch.object(firewall, 'firewall_flock', autospec=True)
+@mock.patch.object(firewall, 'active_service_groups', autospec=True)
+def test_service_chain_preparer_prepare_running_service_groups(
+    mock_active_service_groups,
+    mock_firewall_flock,
+    mock_ensure_shared_chains,
+    mock_update_rules,
+):
+    mock_active_service_groups.return_value = {
+        firewall.ServiceGroup('myservice', 'myinstance'): {'02:52:00:00:00:01'},
+    }
+    preparer = firewall_update.ServiceChainPreparer('soa_dir', 'synapse_dir', prepare_secs=60)
+    preparer.service_group_times[firewall.ServiceGroup('gone', 'instance')] = 0
+    preparer.prepare_running_service_groups()
 
-
+    assert mock_ensure_shared_chains.call_count == 1
+    assert mock_update_rules.mock_calls == [
+        mock.call(firewall.ServiceGroup('myservice', 'myinstance'), 'soa_dir', 'synapse_dir'),
+    ]
+    assert set(preparer.service_group_times) == {firewall.ServiceGroup('myservice', 'myinstance')}
+    assert preparer.prepared_time > 0
+
+
+def test_attach_server(mock_daemon_args):
+    preparer = mock.Mock(spec=firewall_update.ServiceChainPreparer)
+    preparer.attach.side_effect = [None, Exception('Oh noes')]
+    server = firewall_update.AttachServer(mock_daemon_args.socket_path, preparer)
+    try:
+        client = threading.Thread(
+            target=firewall_client.attach_container,
+            args=('myservice', 'myinstance', '02:52:00:00:00:01'),
+            kwargs={'socket_path': mock_daemon_args.socket_path},
+        )
+        client.start()
+        server.handle_request()
+        client.join()
+        assert preparer.attach.mock_calls == [mock.call('myservice', 'myinstance', '02:52:00:00:00:01')]
+
+        errors = []
+
+        def attach_failing_container():
+            try:
+                firewall_client.attach_container(
+                    'myservice', 'myinstance', '02:52:00:00:00:02',
+                    socket_path=mock_daemon_args.socket_path,
+                )
+            except firewall_client.FirewallDaemonError as e:
+                errors.append(str(e))
+
+        client = threading.Thread(target=attach_failing_container)
+        client.start()
+        server.handle_request()
+        client.join()
+        assert errors == ['Oh noes']
+    finally:
+        server.server_close()
+
+
+@mock.patch.object(firewall_update, 'garbage_collect_mac_addresses', autospec=True)
 @mock.patch.object(firewall, 'firewall_flock', autospec=True)
 @mock.patch.object(firewall, 'general_update', autospec=True)
-def test_run_cron(mock_general_update, mock_firewall_flock, mock_cron_args):
+def test_run_cron(mock_general_update, mock_firewall_flock, mock_gc, mock_cron_args):
     firewall_update.run_cron(mock_cron_args)
     assert mock_general_update.called is True
     assert mock_firewall_flock.return_value.__enter__.called is True
+    assert mock_gc.called is True
+
+
+@mock.patch.object(firewall, 'services_running_here', autospec=True)
+def test_garbage_collect_mac_addresses(mock_services_running_here, tmpdir):
+    pool_path = str(tmpdir.join('mac-address.pool'))
+    legacy_lock_directory = tmpdir.mkdir('mac-address')
+    legacy_lock_directory.join('02:52:00:00:00:01').write('')
+    firewall_update.garbage_collect_mac_addresses(pool_path, str(legacy_lock_directory))
+    assert mock_services_running_here.call_count == 0
+    assert not legacy_lock_directory.exists()
+
+    with mac_address.MacAddressPool(pool_path, size=64) as pool:
+        running = pool.reserve()
+        pool.reserve()
+    mock_services_running_here.return_value = [('myservice', 'myinstance', running, '1.1.1.1')]
+    with mock.patch.object(mac_address.time, 'time', autospec=True, return_value=time.time() + 24 * 60 * 60):
+        firewall_update.garbage_collect_mac_addresses(pool_path, str(legacy_lock_directory))
+    with mac_address.MacAddressPool(pool_path) as pool:
+        assert pool.reserved_mac_addresses() == {running}
 
 
 @mock.patch.object(firewall, 'firewall_flock', autospec=True, side_effect=TimeoutError('Oh noes'))
@@ -244,6 +371,7 @@ def mock_daemon_args(tmpdir):
         '-d', str(tmpdir.mkdir('yelpsoa')),
         '--synapse-service-dir', str(tmpdir.mkdir('synapse')),
         'daemon',
+        '--socket-path', str(tmpdir.join('firewall.sock')),
     ])
 
 
@@ -11,7 +11,11 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import time
+
 import mock
+import pytest
+from marathon.models.app import MarathonApp
 
 from paasta_tools import list_marathon_service_instances
 from paasta_tools.marathon_tools import MarathonClients
@@ -178,3 +182,123 @@ def test_get_service_instances_that_need_bouncing_at_risk():
             marathon_clients=fake_clients,
             soa_dir='/fake/soa/dir',
         )) == {'fake_service.fake_instance'}
+
+
+def _fake_snapshot_clients():
+    current_client = mock.Mock(servers=['http://marathon1'])
+    previous_client = mock.Mock(servers=['http://marathon2'])
+    return MarathonClients(current=[current_client], previous=[previous_client])
+
+
+def _fake_snapshot(marathon_clients, created=None):
+    current_client, previous_client = marathon_clients.get_all_clients()
+    return list_marathon_service_instances.MarathonSnapshot(
+        created=time.time() if created is None else created,
+        cluster='fake_cluster',
+        soa_dir='/fake/soa/dir',
+        apps_with_clients=[
+            (MarathonApp(id='/fake--service.fake--instance.sha.config', instances=5), current_client),
+            (MarathonApp(id='/fake--service.old--instance.sha.config', instances=1), previous_client),
+        ],
+        service_instances=[('fake_service', 'fake_instance')],
+        desired_configs={'fake--service.fake--instance.sha.config': {'id': 'fake', 'instances': 5}},
+        desired_clients={'fake--service.fake--instance.sha.config': current_client},
+    )
+
+
+@mock.patch('paasta_tools.list_marathon_service_instances.load_system_paasta_config', autospec=True)
+def test_marathon_snapshot_round_trip(mock_load_system_paasta_config, tmpdir):
+    mock_load_system_paasta_config.return_value.get_cluster.return_value = 'fake_cluster'
+    marathon_clients = _fake_snapshot_clients()
+    snapshot = _fake_snapshot(marathon_clients)
+    path = str(tmpdir.join('cache', 'marathon_snapshot.json'))
+
+    list_marathon_service_instances.write_marathon_snapshot(path, snapshot, marathon_clients)
+    actual = list_marathon_service_instances.read_marathon_snapshot(path, marathon_clients, '/fake/soa/dir', ttl=60)
+
+    assert actual.created == snapshot.created
+    assert actual.service_instances == [('fake_service', 'fake_instance')]
+    assert actual.desired_configs == snapshot.desired_configs
+    assert actual.desired_clients == snapshot.desired_clients
+    assert [(app.id, app.instances, client) for app, client in actual.apps_with_clients] == [
+        (app.id, app.instances, client) for app, client in snapshot.apps_with_clients
+    ]
+
+
+def test_write_marathon_snapshot_cleans_up_on_failure(tmpdir):
+    marathon_clients = _fake_snapshot_clients()
+    snapshot = _fake_snapshot(marathon_clients)
+    path = str(tmpdir.join('marathon_snapshot.json'))
+
+    with mock.patch('os.rename', autospec=True, side_effect=OSError('rename failed')):
+        list_marathon_service_instances.write_marathon_snapshot(path, snapshot, marathon_clients)
+    assert tmpdir.listdir() == []
+
+    with mock.patch(
+        'paasta_tools.list_marathon_service_instances.json.dump', autospec=True, side_effect=TypeError('not json'),
+    ), pytest.raises(TypeError):
+        list_marathon_service_instances.write_marathon_snapshot(path, snapshot, marathon_clients)
+    assert tmpdir.listdir() == []
+
+
+@mock.patch('paasta_tools.list_marathon_service_instances.load_system_paasta_config', autospec=True)
+def test_read_marathon_snapshot_ignores_unusable_snapshots(mock_load_system_paasta_config, tmpdir):
+    mock_load_system_paasta_config.return_value.get_cluster.return_value = 'fake_cluster'
+    marathon_clients = _fake_snapshot_clients()
+    path = str(tmpdir.join('marathon_snapshot.json'))
+    read = list_marathon_service_instances.read_marathon_snapshot
+
+    assert read(path, marathon_clients, '/fake/soa/dir', ttl=60) is None
+
+    list_marathon_service_instances.write_marathon_snapshot(
+        path, _fake_snapshot(marathon_clients, created=time.time() - 120), marathon_clients,
+    )
+    assert read(path, marathon_clients, '/fake/soa/dir', ttl=60) is None
+    assert read(path, marathon_clients, '/fake/soa/dir', ttl=600) is not None
+    assert read(path, marathon_clients, '/other/soa/dir', ttl=600) is None
+    other_clients = MarathonClients(current=[mock.Mock(servers=['http://other'])], previous=[])
+    assert read(path, other_clients, '/fake/soa/dir', ttl=600) is None
+    mock_load_system_paasta_config.return_value.get_cluster.return_value = 'other_cluster'
+    assert read(path, marathon_clients, '/fake/soa/dir', ttl=600) is None
+
+
+@mock.patch('paasta_tools.list_marathon_service_instances.write_marathon_snapshot', autospec=True)
+@mock.patch('paasta_tools.list_marathon_service_instances.build_marathon_snapshot', autospec=True)
+@mock.patch('paasta_tools.list_marathon_service_instances.read_marathon_snapshot', autospec=True)
+def test_load_or_build_marathon_snapshot(mock_read, mock_build, mock_write):
+    marathon_clients = _fake_snapshot_clients()
+    mock_read.return_value = None
+    assert list_marathon_service_instances.load_or_build_marathon_snapshot(
+        marathon_clients, '/fake/soa/dir', ttl=30, path='/fake/path',
+    ) == mock_build.return_value
+    mock_build.assert_called_once_with(marathon_clients, '/fake/soa/dir')
+    mock_write.assert_called_once_with('/fake/path', mock_build.return_value, marathon_clients)
+
+    mock_build.reset_mock()
+    mock_write.reset_mock()
+    mock_read.return_value = mock.sentinel.snapshot
+    assert list_marathon_service_instances.load_or_build_marathon_snapshot(
+        marathon_clients, '/fake/soa/dir', ttl=30, path='/fake/path',
+    ) == mock.sentinel.snapshot
+    assert mock_build.call_count == 0
+    assert mock_write.call_count == 0
+
+
+def test_get_service_instances_that_need_bouncing_from_snapshot():
+    marathon_clients = _fake_snapshot_clients()
+    snapshot = _fake_snapshot(marathon_clients)
+    with mock.patch(
+        'paasta_tools.list_marathon_service_instances.get_desired_marathon_configs', autospec=True,
+    ) as mock_get_desired_marathon_configs, mock.patch(
+        'paasta_tools.list_marathon_service_instances.get_num_at_risk_tasks', autospec=True, return_value=0,
+    ), mock.patch(
+        'paasta_tools.list_marathon_service_instances.get_draining_hosts', autospec=True,
+    ):
+        assert set(list_marathon_service_instances.get_service_instances_that_need_bouncing(
+            marathon_clients=marathon_clients,
+            soa_dir='/fake/soa/dir',
+            snapshot=snapshot,
+        )) == {'fake_service.old_instance'}
+    assert mock_get_desired_marathon_configs.call_count == 0
+    for client in marathon_clients.get_all_clients():
+        assert client.list_apps.call_count == 0
@@ -1,10 +1,6 @@
-import contextlib
 import fcntl
-import itertools
 import os
-import signal
 import sys
-import time
 
 import mock
 import pytest
@@ -15,80 +11,140 @@ from paasta_tools import mac_address
 skip_if_osx = pytest.mark.skipif(sys.platform == 'darwin', reason='Flock is not present on OS X')
 
 
-def test_simple(tmpdir):
-    mac, lock_file = mac_address.reserve_unique_mac_address(str(tmpdir))
-    with contextlib.closing(lock_file):
-        assert lock_file is not None
-        assert mac == '02:52:00:00:00:00'
-        assert tmpdir.join(mac).check()
+@pytest.fixture
+def pool_path(tmpdir):
+    return str(tmpdir.join('mac-address.pool'))
+
+
+def test_mac_address_for_slot():
+    assert mac_address.mac_address_for_slot(0) == '02:52:00:00:00:00'
+    assert mac_address.mac_address_for_slot(0x1234abcd) == '02:52:12:34:ab:cd'
+    assert mac_address.slot_for_mac_address('02:52:12:34:AB:CD') == 0x1234abcd
+    assert mac_address.slot_for_mac_address('02:42:ac:11:00:02') is None
+
+
+def test_simple(pool_path):
+    assert mac_address.reserve_mac_address(pool_path) == '02:52:00:00:00:00'
+    assert mac_address.reserve_mac_address(pool_path) == '02:52:00:00:00:01'
+    assert os.path.getsize(pool_path) == (
+        mac_address.MacAddressPool.HEADER.size +
+        mac_address.DEFAULT_MAC_POOL_SIZE // 8 +
+        mac_address.DEFAULT_MAC_POOL_SIZE * mac_address.MacAddressPool.TIME.size
+    )
 
 
 def test_dir_not_exist(tmpdir):
     with pytest.raises(IOError):
-        mac_address.reserve_unique_mac_address(str(tmpdir.join('nonexistent')))
-
-
-def test_file_exists_no_flock(tmpdir):
-    tmpdir.join('02:52:00:00:00:00').ensure()
-    mac, lock_file = mac_address.reserve_unique_mac_address(str(tmpdir))
-    with contextlib.closing(lock_file):
-        assert lock_file is not None
-        assert mac == '02:52:00:00:00:00'
-
-
-def _flock_process(path):
-    # fork a subprocess that holds an flock.
-    r, w = os.pipe()
-    child_pid = os.fork()
-    if child_pid == 0:  # pragma: no cover
-        os.close(r)
-        fd = os.open(path, os.O_CREAT | os.O_RDWR)
-        fcntl.flock(fd, fcntl.LOCK_EX)
-        os.write(w, b'ok')
-        os.close(w)
-        time.sleep(60 * 60 * 24)  # sleep for some approximation of infinity
-        sys.exit(0)  # never returns
+        mac_address.reserve_mac_address(str(tmpdir.join('nonexistent', 'mac-address.pool')))
+
+
+def test_not_a_pool(pool_path):
+    with open(pool_path, 'w') as f:
+        f.write('not a pool' * 10)
+    with pytest.raises(mac_address.MacAddressException):
+        mac_address.MacAddressPool(pool_path)
+
+
+def test_release_and_reuse(pool_path):
+    with mac_address.MacAddressPool(pool_path, size=16) as pool:
+        macs = [pool.reserve() for _ in range(16)]
+        assert len(set(macs)) == 16
+        with pytest.raises(mac_address.MacAddressException):
+            pool.reserve()
+
+        pool.release('02:52:00:00:00:03')
+        assert pool.reserve() == '02:52:00:00:00:03'
+        pool.release('02:52:00:00:00:0e')
+        assert pool.reserve() == '02:52:00:00:00:0e'
+
+
+def test_reservations_resume_at_cursor(pool_path):
+    with mac_address.MacAddressPool(pool_path, size=32) as pool:
+        for _ in range(20):
+            pool.reserve()
+        # A slot freed before the cursor is only reused once the pool wraps around
+        pool.release('02:52:00:00:00:00')
+        assert pool.reserve() == '02:52:00:00:00:14'
 
-    os.close(w)
-    # wait for something to be printed so we know the flock has occurred
-    assert os.read(r, 2) == b'ok'
-    os.close(r)
-    return child_pid
+
+def test_garbage_collect(pool_path):
+    with mac_address.MacAddressPool(pool_path, size=64) as pool:
+        with mock.patch.object(mac_address.time, 'time', autospec=True, return_value=1000):
+            old_in_use, old_gone = pool.reserve(), pool.reserve()
+        with mock.patch.object(mac_address.time, 'time', autospec=True, return_value=5000):
+            recent = pool.reserve()
+            released = pool.garbage_collect({old_in_use}, grace_secs=3600)
+        assert released == [old_gone]
+        assert pool.reserved_mac_addresses() == {old_in_use, recent}
 
 
 @skip_if_osx
-def test_file_exists_flock(tmpdir):
-    # it doesn't count if this process has the flock, so we need to spawn a different one to hold it
-    flock_process = _flock_process(str(tmpdir.join('02:52:00:00:00:00')))
-    try:
-        mac, lock_file = mac_address.reserve_unique_mac_address(str(tmpdir))
-        with contextlib.closing(lock_file):
-            assert lock_file is not None
-            assert mac == '02:52:00:00:00:01'
-    finally:
-        os.kill(flock_process, signal.SIGKILL)
+def test_concurrent_reservations(pool_path):
+    # Every process reserving at the same time gets its own MAC address
+    mac_address.MacAddressPool(pool_path, size=1024).close()
+    children = []
+    for _ in range(8):
+        r, w = os.pipe()
+        child_pid = os.fork()
+        if child_pid == 0:  # pragma: no cover
+            os.close(r)
+            macs = [mac_address.reserve_mac_address(pool_path) for _ in range(50)]
+            os.write(w, ' '.join(macs).encode())
+            os.close(w)
+            os._exit(0)
+        os.close(w)
+        children.append((child_pid, r))
+
+    macs = []
+    for child_pid, r in children:
+        with os.fdopen(r, 'rb') as f:
+            macs.extend(f.read().decode().split())
+        os.waitpid(child_pid, 0)
+    assert len(macs) == 400
+    assert len(set(macs)) == 400
+
+
+def hold_lock(lock_directory, mac):
+    lock_file = open(str(lock_directory.join(mac)), 'w')
+    fcntl.flock(lock_file, fcntl.LOCK_EX)
+    return lock_file
 
 
 @skip_if_osx
-def test_file_exists_exhaustion(tmpdir):
-    flock_processes = []
+def test_pool_starts_with_locked_legacy_mac_addresses(pool_path, tmpdir):
+    lock_directory = tmpdir.mkdir('mac-address')
+    held = hold_lock(lock_directory, '02:52:00:00:00:01')
+    held_out_of_pool = hold_lock(lock_directory, '02:52:12:34:56:78')
+    lock_directory.join('02:52:00:00:00:02').write('')  # its container is gone
     try:
-        for x in range(100):
-            flock_process = _flock_process(str(tmpdir.join('02:52:00:00:00:{:02x}'.format(x))))
-            flock_processes.append(flock_process)
+        with mac_address.MacAddressPool(pool_path, size=16, legacy_lock_directory=str(lock_directory)) as pool:
+            assert pool.reserved_mac_addresses() == {'02:52:00:00:00:01'}
+            assert pool.reserve() == '02:52:00:00:00:00'
+            assert pool.reserve() == '02:52:00:00:00:02'
+    finally:
+        held.close()
+        held_out_of_pool.close()
 
-        with pytest.raises(mac_address.MacAddressException):
-            mac_address.reserve_unique_mac_address(str(tmpdir))
+    # Only a new pool is seeded
+    held = hold_lock(lock_directory, '02:52:00:00:00:03')
+    try:
+        with mac_address.MacAddressPool(pool_path, size=16, legacy_lock_directory=str(lock_directory)) as pool:
+            assert '02:52:00:00:00:03' not in pool.reserved_mac_addresses()
     finally:
-        [os.kill(p, signal.SIGKILL) for p in flock_processes]
+        held.close()
 
 
-@pytest.yield_fixture(autouse=True)
-def mock_randbits():
-    # make getrandbits() reliably return an incrementing counter starting at 0
-    class counter(itertools.count):
-        def __call__(self, _):
-            return next(self)
+@skip_if_osx
+def test_remove_legacy_mac_address_locks(tmpdir):
+    lock_directory = tmpdir.mkdir('mac-address')
+    held = hold_lock(lock_directory, '02:52:00:00:00:01')
+    lock_directory.join('02:52:00:00:00:02').write('')
+    try:
+        mac_address.remove_legacy_mac_address_locks(str(lock_directory))
+        assert [path.basename for path in lock_directory.listdir()] == ['02:52:00:00:00:01']
+    finally:
+        held.close()
 
-    with mock.patch.object(mac_address.random, 'getrandbits', side_effect=counter()):
-        yield
+    mac_address.remove_legacy_mac_address_locks(str(lock_directory))
+    assert not lock_directory.exists()
+    mac_address.remove_legacy_mac_address_locks(str(lock_directory))
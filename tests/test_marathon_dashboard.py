@@ -12,9 +12,15 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import gzip
+import json
+
 import mock
+import pytest
+import service_configuration_lib
 
 from paasta_tools import marathon_dashboard
+from paasta_tools import marathon_tools
 from paasta_tools.utils import SystemPaastaConfig
 
 
@@ -42,3 +48,127 @@ def test_create_marathon_dashboard(mock_load_system_paasta_config):
     expected_output = {'fake_cluster': []}
     mock_load_system_paasta_config.return_value = SystemPaastaConfig({}, 'fake_directory')
     assert(marathon_dashboard.create_marathon_dashboard(cluster=cluster, soa_dir=soa_dir) == expected_output)
+
+
+def test_marathon_dashboard_view_refreshes_changed_services(tmpdir):
+    cluster = 'fake_cluster'
+    soa_dir = tmpdir.mkdir('soa')
+    for service in ('service_a', 'service_b'):
+        soa_dir.mkdir(service).join('marathon-%s.yaml' % cluster).write('main: {}\n')
+    system_paasta_config = SystemPaastaConfig(
+        {
+            'marathon_servers': [{'url': ['http://marathon:8080'], 'user': 'user', 'password': 'pass'}],
+            'dashboard_links': {cluster: {'Marathon RO': 'http://accessible-marathon'}},
+        },
+        'fake_directory',
+    )
+    marathon_clients = marathon_tools.get_marathon_clients(
+        marathon_tools.get_marathon_servers(system_paasta_config),
+        cached=False,
+    )
+    view = marathon_dashboard.MarathonDashboardView(cluster=cluster, soa_dir=str(soa_dir))
+
+    with mock.patch(
+        'paasta_tools.marathon_dashboard.load_marathon_service_config_no_cache',
+        autospec=True,
+        side_effect=marathon_tools.load_marathon_service_config_no_cache,
+    ) as mock_load_config, mock.patch.object(
+        service_configuration_lib, '_use_yaml_cache', False,
+    ):
+        assert view.refresh(marathon_clients, system_paasta_config) is True
+        assert json.loads(view.body.decode('utf-8')) == {cluster: [
+            {'service': 'service_a', 'instance': 'main', 'shard_url': 'http://accessible-marathon'},
+            {'service': 'service_b', 'instance': 'main', 'shard_url': 'http://accessible-marathon'},
+        ]}
+        assert gzip.decompress(view.gzipped_body) == view.body
+        first_etag = view.etag
+        assert mock_load_config.call_count == 2
+
+        # Nothing changed: nothing is loaded again
+        assert view.refresh(marathon_clients, system_paasta_config) is False
+        assert view.etag == first_etag
+        assert mock_load_config.call_count == 2
+
+        # Only the changed service is loaded again
+        soa_dir.join('service_b', 'marathon-%s.yaml' % cluster).write('main: {}\ncanary: {}\n')
+        assert view.refresh(marathon_clients, system_paasta_config) is True
+        assert [item['instance'] for item in json.loads(view.body.decode('utf-8'))[cluster]] == [
+            'main', 'main', 'canary',
+        ]
+        assert view.etag != first_etag
+        assert mock_load_config.call_count == 4
+
+        # Removed services are dropped
+        soa_dir.join('service_b').remove()
+        assert view.refresh(marathon_clients, system_paasta_config) is True
+        assert [item['service'] for item in json.loads(view.body.decode('utf-8'))[cluster]] == ['service_a']
+        assert mock_load_config.call_count == 4
+
+        # A change of the dashboard links recomputes every service
+        system_paasta_config.config_dict['dashboard_links'][cluster]['Marathon RO'] = 'http://other-marathon'
+        assert view.refresh(marathon_clients, system_paasta_config) is True
+        assert json.loads(view.body.decode('utf-8'))[cluster][0]['shard_url'] == 'http://other-marathon'
+        assert mock_load_config.call_count == 5
+
+
+def test_marathon_dashboard_view_system_config_change_and_service_removed(tmpdir):
+    cluster = 'fake_cluster'
+    soa_dir = tmpdir.mkdir('soa')
+    for service in ('service_a', 'service_b'):
+        soa_dir.mkdir(service).join('marathon-%s.yaml' % cluster).write('main: {}\n')
+    system_paasta_config = SystemPaastaConfig(
+        {
+            'marathon_servers': [{'url': ['http://marathon:8080'], 'user': 'user', 'password': 'pass'}],
+            'dashboard_links': {cluster: {'Marathon RO': 'http://accessible-marathon'}},
+        },
+        'fake_directory',
+    )
+    marathon_clients = marathon_tools.get_marathon_clients(
+        marathon_tools.get_marathon_servers(system_paasta_config),
+        cached=False,
+    )
+    view = marathon_dashboard.MarathonDashboardView(cluster=cluster, soa_dir=str(soa_dir))
+
+    with mock.patch.object(service_configuration_lib, '_use_yaml_cache', False):
+        assert view.refresh(marathon_clients, system_paasta_config) is True
+
+        system_paasta_config.config_dict['dashboard_links'][cluster]['Marathon RO'] = 'http://other-marathon'
+        soa_dir.join('service_b').remove()
+        assert view.refresh(marathon_clients, system_paasta_config) is True
+        assert json.loads(view.body.decode('utf-8')) == {cluster: [
+            {'service': 'service_a', 'instance': 'main', 'shard_url': 'http://other-marathon'},
+        ]}
+        assert view.refresh(marathon_clients, system_paasta_config) is False
+
+
+def test_marathon_dashboard_view_refresh_failing_halfway(tmpdir):
+    cluster = 'fake_cluster'
+    soa_dir = tmpdir.mkdir('soa')
+    view = marathon_dashboard.MarathonDashboardView(cluster=cluster, soa_dir=str(soa_dir))
+    system_paasta_config = SystemPaastaConfig({'marathon_servers': []}, 'fake_directory')
+    assert view.refresh(mock.Mock(), system_paasta_config) is True
+    first_etag = view.etag
+
+    soa_dir.mkdir('service_a')
+    soa_dir.mkdir('service_b')
+    failing_services = {'service_b'}
+
+    def get_service_items(self, service, *args):
+        if service in failing_services:
+            raise ValueError(service)
+        return [{'service': service, 'instance': 'main', 'shard_url': 'http://marathon'}]
+
+    with mock.patch.object(
+        marathon_dashboard.MarathonDashboardView, '_get_service_items', autospec=True,
+        side_effect=get_service_items,
+    ):
+        # service_a is updated before service_b fails
+        with pytest.raises(ValueError):
+            view.refresh(mock.Mock(), system_paasta_config)
+        assert view.etag == first_etag
+
+        # Nothing changes since, but service_a still makes it to the body
+        soa_dir.join('service_b').remove()
+        assert view.refresh(mock.Mock(), system_paasta_config) is True
+    assert [item['service'] for item in json.loads(view.body.decode('utf-8'))[cluster]] == ['service_a']
+    assert view.etag != first_etag
@@ -24,6 +24,8 @@ from pytest import raises
 
 from paasta_tools import long_running_service_tools
 from paasta_tools import marathon_tools
+from paasta_tools.config_hash_cache import disable_config_hash_cache
+from paasta_tools.config_hash_cache import enable_config_hash_cache
 from paasta_tools.marathon_serviceinit import desired_state_human
 from paasta_tools.marathon_tools import FormattedMarathonAppDict
 from paasta_tools.marathon_tools import MarathonContainerInfo
@@ -2252,6 +2254,54 @@ def test_format_marathon_app_dict_no_smartstack():
         assert MarathonApp(**actual)
 
 
+def test_format_marathon_app_dict_with_config_hash_cache():
+    fake_marathon_service_config = marathon_tools.MarathonServiceConfig(
+        service='service',
+        cluster='clustername',
+        instance='instance',
+        config_dict={},
+        branch_dict={
+            'docker_image': 'abcdef',
+            'git_sha': 'deadbeef',
+            'force_bounce': None,
+            'desired_state': 'start',
+        },
+        soa_dir='/fake/soa',
+    )
+    fake_system_paasta_config = SystemPaastaConfig(
+        {
+            'volumes': [],
+            'expected_slave_attributes': [{"region": "blah"}],
+        }, '/fake/dir/',
+    )
+
+    with mock.patch(
+        'paasta_tools.marathon_tools.load_service_namespace_config',
+        return_value=long_running_service_tools.ServiceNamespaceConfig(),
+        autospec=True,
+    ), mock.patch(
+        'paasta_tools.utils.get_service_docker_registry', return_value='fake_docker_registry:443', autospec=True,
+    ), mock.patch(
+        'paasta_tools.marathon_tools.load_system_paasta_config',
+        return_value=fake_system_paasta_config, autospec=True,
+    ), mock.patch.object(
+        marathon_tools.MarathonServiceConfig, 'compute_config_hash',
+        wraps=fake_marathon_service_config.compute_config_hash,
+    ) as mock_compute_config_hash:
+        expected = fake_marathon_service_config.format_marathon_app_dict()
+        try:
+            enable_config_hash_cache()
+            assert fake_marathon_service_config.format_marathon_app_dict() == expected
+            assert fake_marathon_service_config.format_marathon_app_dict() == expected
+            assert mock_compute_config_hash.call_count == 2
+
+            fake_marathon_service_config.config_dict['cpus'] = 1
+            assert fake_marathon_service_config.format_marathon_app_dict()['id'] != expected['id']
+            assert mock_compute_config_hash.call_count == 3
+        finally:
+            disable_config_hash_cache()
+
+
 def test_format_marathon_app_dict_with_smartstack():
     service = "service"
     instance = "instance"
@@ -2728,3 +2778,49 @@ def test_rendezvous_hash_roughly_fractional_change():
     num_same = len([1 for x, y in zip(first_results, second_results) if x == y])
     assert num_same > 8900
     assert num_same < 9100
+
+
+def test_get_num_at_risk_tasks():
+    app = mock.Mock(tasks=[mock.Mock(host='host1'), mock.Mock(host='host2'), mock.Mock(host='host1')])
+    assert marathon_tools.get_num_at_risk_tasks(app, ['host1', 'host3']) == 2
+    assert marathon_tools.get_num_at_risk_tasks(app, []) == 0
+
+
+def test_host_task_index():
+    def task(task_id, host, app_id):
+        return mock.Mock(id=task_id, host=host, app_id=app_id)
+
+    apps = [
+        mock.Mock(tasks=[
+            task('t1', 'host1', '/universe.c137.gitsha.configsha'),
+            task('t2', 'host2', '/universe.c137.gitsha.configsha'),
+        ]),
+        mock.Mock(tasks=[
+            task('t3', 'host1', '/universe.c138.gitsha.configsha'),
+            task('t4', 'host1', '/not-a-paasta-app'),
+        ]),
+    ]
+    index = marathon_tools.HostTaskIndex()
+    index.update(apps)
+    assert index.get_tasks_on_hosts(['host1']) == {
+        ('universe', 'c137'): {'t1'},
+        ('universe', 'c138'): {'t3'},
+    }
+    assert index.get_tasks_on_hosts(['host1', 'host2', 'host3']) == {
+        ('universe', 'c137'): {'t1', 't2'},
+        ('universe', 'c138'): {'t3'},
+    }
+
+    apps[0].tasks = [
+        task('t2', 'host2', '/universe.c137.gitsha.configsha'),
+        task('t5', 'host3', '/universe.c137.gitsha.configsha'),
+    ]
+    with mock.patch.object(index, 'add_task', wraps=index.add_task) as mock_add_task:
+        index.update(apps)
+    mock_add_task.assert_called_once_with('t5', 'host3', ('universe', 'c137'))
+    assert index.get_tasks_on_hosts(['host1']) == {('universe', 'c138'): {'t3'}}
+    assert index.get_tasks_on_hosts(['host3']) == {('universe', 'c137'): {'t5'}}
+
+    index.update([])
+    assert index.tasks_by_host == {}
+    assert index.task_locations == {}
@@ -41,6 +41,7 @@ from paasta_tools.mesos_maintenance import get_hosts_past_maintenance_start
 from paasta_tools.mesos_maintenance import get_hosts_with_state
 from paasta_tools.mesos_maintenance import get_machine_ids
 from paasta_tools.mesos_maintenance import get_maintenance_schedule
+from paasta_tools.mesos_maintenance import get_maintenance_state
 from paasta_tools.mesos_maintenance import get_maintenance_status
 from paasta_tools.mesos_maintenance import Hostname
 from paasta_tools.mesos_maintenance import hostnames_to_components
@@ -50,6 +51,7 @@ from paasta_tools.mesos_maintenance import is_host_draining
 from paasta_tools.mesos_maintenance import is_host_past_maintenance_end
 from paasta_tools.mesos_maintenance import is_host_past_maintenance_start
 from paasta_tools.mesos_maintenance import load_credentials
+from paasta_tools.mesos_maintenance import MaintenanceState
 from paasta_tools.mesos_maintenance import parse_datetime
 from paasta_tools.mesos_maintenance import parse_timedelta
 from paasta_tools.mesos_maintenance import raw_status
@@ -61,6 +63,7 @@ from paasta_tools.mesos_maintenance import status
 from paasta_tools.mesos_maintenance import undrain
 from paasta_tools.mesos_maintenance import unreserve
 from paasta_tools.mesos_maintenance import up
+from paasta_tools.mesos_tools import SlaveTaskCount
 
 
 def test_parse_timedelta_none():
@@ -1091,3 +1094,67 @@ def test_are_hosts_forgotten_down(
 
     mock_get_hosts_forgotten_down.return_value = []
     assert not are_hosts_forgotten_down()
+
+
+@mock.patch('paasta_tools.mesos_maintenance.datetime_to_nanoseconds', autospec=True)
+def test_maintenance_state(mock_datetime_to_nanoseconds):
+    mock_datetime_to_nanoseconds.return_value = 10
+    state = MaintenanceState(
+        draining_hosts={'host1', 'host2', 'host3'},
+        maintenance_starts={'host3': 5, 'host4': 15},
+        running_task_counts={'host2': 3},
+    )
+    assert state.is_host_drained('host1')
+    assert not state.is_host_drained('host2')
+    assert not state.is_host_drained('host4')
+    assert state.is_host_past_maintenance_start('host3')
+    assert not state.is_host_past_maintenance_start('host4')
+    assert not state.is_host_past_maintenance_start('host1')
+
+
+@mock.patch('paasta_tools.mesos_maintenance.get_mesos_task_count_by_slave', autospec=True)
+@mock.patch('paasta_tools.mesos_maintenance.get_mesos_master', autospec=True)
+@mock.patch('paasta_tools.mesos_maintenance.get_maintenance_schedule', autospec=True)
+@mock.patch('paasta_tools.mesos_maintenance.get_maintenance_status', autospec=True)
+def test_get_maintenance_state(
+    mock_get_maintenance_status,
+    mock_get_maintenance_schedule,
+    mock_get_mesos_master,
+    mock_get_mesos_task_count_by_slave,
+):
+    mock_get_maintenance_status.return_value.json.return_value = {
+        'get_maintenance_status': {'status': {'draining_machines': [
+            {'id': {'hostname': 'host1', 'ip': '10.0.0.1'}},
+            {'id': {'hostname': 'host2', 'ip': '10.0.0.2'}},
+        ]}},
+    }
+    mock_get_maintenance_schedule.return_value.json.return_value = {
+        'get_maintenance_schedule': {'schedule': {'windows': [
+            {
+                'machine_ids': [{'hostname': 'host1'}, {'hostname': 'host3'}],
+                'unavailability': {'start': {'nanoseconds': 20}},
+            },
+            {'machine_ids': [{'hostname': 'host1'}], 'unavailability': {'start': {'nanoseconds': 10}}},
+        ]}},
+    }
+    mock_get_mesos_task_count_by_slave.return_value = [
+        {'task_counts': SlaveTaskCount(count=0, chronos_count=0, slave={'hostname': 'host1'})},
+        {'task_counts': SlaveTaskCount(count=2, chronos_count=0, slave={'hostname': 'host2'})},
+    ]
+
+    state = get_maintenance_state({'host1', 'host3'})
+    assert state == MaintenanceState(
+        draining_hosts={'host1', 'host2'},
+        maintenance_starts={'host1': 10, 'host3': 20},
+        running_task_counts={'host1': 0, 'host2': 2},
+    )
+    assert mock_get_maintenance_status.call_count == 1
+    assert mock_get_maintenance_schedule.call_count == 1
+    mock_get_mesos_task_count_by_slave.assert_called_once_with(
+        mock_get_mesos_master.return_value.state_summary.return_value,
+    )
+
+    # The tasks are only counted when some of the hosts asked about are draining
+    state = get_maintenance_state({'host3'})
+    assert state.running_task_counts == {}
+    assert mock_get_mesos_task_count_by_slave.call_count == 1
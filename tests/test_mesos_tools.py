@@ -14,6 +14,7 @@
 import datetime
 import random
 import socket
+import threading
 
 import docker
 import mock
@@ -24,6 +25,7 @@ from pytest import raises
 from paasta_tools import mesos
 from paasta_tools import mesos_tools
 from paasta_tools import utils
+from paasta_tools.mesos import master
 from paasta_tools.marathon_tools import format_job_id
 from paasta_tools.utils import PaastaColors
 
@@ -68,7 +70,9 @@ def test_status_mesos_tasks_verbose(test_case):
         'paasta_tools.mesos_tools.format_non_running_mesos_task_row', autospec=True,
     ) as format_non_running_mesos_task_row_patch, mock.patch(
         'paasta_tools.mesos_tools.format_stdstreams_tail_for_task', autospec=True,
-    ) as format_stdstreams_tail_for_task_patch:
+    ) as format_stdstreams_tail_for_task_patch, mock.patch(
+        'paasta_tools.mesos_tools.SandboxTailReader', autospec=True,
+    ) as sandbox_tail_reader_patch:
         get_cached_list_of_running_tasks_from_frameworks_patch.return_value = [{'id': job_id}]
 
         template_task_return = {
@@ -97,6 +101,10 @@ def test_status_mesos_tasks_verbose(test_case):
         format_running_mesos_task_row_patch.assert_called_once_with({'id': job_id}, mock.sentinel.get_short_task_id)
         assert format_non_running_mesos_task_row_patch.call_count == 10  # maximum n of tasks we display
         assert format_stdstreams_tail_for_task_patch.call_count == expected_format_tail_call_count
+        # the tails of all the tasks are read with the same reader
+        assert sandbox_tail_reader_patch.call_count == (1 if tail_lines else 0)
+        for call in format_stdstreams_tail_for_task_patch.call_args_list:
+            assert call[1]['tail_reader'] == sandbox_tail_reader_patch.return_value
 
 
 def test_get_cpu_usage_good():
@@ -536,33 +544,31 @@ def test_format_stdstreams_tail_for_task(
     test_case,
 ):
     def gen_mesos_cli_fobj(file_path, file_lines):
-        """mesos.cli.cluster.files (0.1.5),
-        returns a list of mesos.cli.mesos_file.File
-        `File` is an iterator-like object.
-        """
-        fake_iter = mock.MagicMock()
-        fake_iter.return_value = reversed(file_lines)
         fobj = mock.create_autospec(mesos.mesos_file.File)
         fobj.path = file_path
-        fobj.__reversed__ = fake_iter
+        fobj.exists.return_value = True
+        fobj.tail.side_effect = lambda nlines: file_lines[-nlines:]
         return fobj
 
     def get_short_task_id(task_id):
         return task_id
 
-    def gen_mock_cluster_files(file1, file2, raise_what):
-        def retfunc(*args, **kwargs):
+    def gen_mock_task(task_id, file1, file2, raise_what):
+        def file(path):
             # If we're asked to raise a particular exception we do so.
             # .message is set to the exception class name.
             if raise_what:
                 raise raise_what(raise_what)
-            return [
-                gen_mesos_cli_fobj(file1[0], file1[1]),
-                gen_mesos_cli_fobj(file2[0], file2[1]),
-            ]
-        mock_cluster_files = mock.MagicMock()
-        mock_cluster_files.side_effect = retfunc
-        return mock_cluster_files
+            return fobjs[path]
+        if not raise_what:
+            fobjs = {
+                file1[0]: gen_mesos_cli_fobj(file1[0], file1[1]),
+                file2[0]: gen_mesos_cli_fobj(file2[0], file2[1]),
+            }
+        fake_task = mock.MagicMock()
+        fake_task.__getitem__.side_effect = {'id': task_id}.__getitem__
+        fake_task.file.side_effect = file
+        return fake_task
 
     def gen_output(task_id, file1, file2, nlines, raise_what):
         error_message = PaastaColors.red("      couldn't read stdout/stderr for %s (%s)")
@@ -583,13 +589,57 @@ def test_format_stdstreams_tail_for_task(
 
     task_id, file1, file2, nlines, raise_what = test_case
 
-    mock_cluster_files = gen_mock_cluster_files(file1, file2, raise_what)
-    fake_task = {'id': task_id}
+    fake_task = gen_mock_task(task_id, file1, file2, raise_what)
     expected = gen_output(task_id, file1, file2, nlines, raise_what)
-    with mock.patch('paasta_tools.mesos_tools.get_mesos_config', autospec=True):
-        with mock.patch('paasta_tools.mesos_tools.cluster.get_files_for_tasks', mock_cluster_files, autospec=None):
-            result = mesos_tools.format_stdstreams_tail_for_task(fake_task, get_short_task_id)
-            assert result == expected
+    result = mesos_tools.format_stdstreams_tail_for_task(fake_task, get_short_task_id)
+    assert result == expected
+
+
+def test_format_stdstreams_tail_for_task_without_stdstreams():
+    fake_task = mock.MagicMock()
+    fake_task.__getitem__.return_value = 'a_task'
+    fake_task.file.return_value.exists.return_value = False
+    assert mesos_tools.format_stdstreams_tail_for_task(fake_task, lambda task_id: task_id) == [
+        PaastaColors.blue("      no stdout/stderrr for a_task"),
+    ]
+
+
+def test_sandbox_tail_reader_reads_tasks_concurrently():
+    # Every read waits for the others, so this only finishes if the tails of
+    # all the tasks are read at once
+    barrier = threading.Barrier(6, timeout=5)
+
+    def gen_task(task_id):
+        def file(path):
+            fobj = mock.create_autospec(mesos.mesos_file.File)
+            fobj.path = path
+            fobj.exists.side_effect = lambda: barrier.wait() is not None
+            fobj.tail.side_effect = lambda nlines: ['%s %s' % (task_id, path)] * nlines
+            return fobj
+        fake_task = mock.MagicMock()
+        fake_task.__getitem__.return_value = task_id
+        fake_task.file.side_effect = file
+        return fake_task
+
+    tasks = [gen_task('task%d' % i) for i in range(3)]
+    with mesos_tools.SandboxTailReader(nlines=2, max_workers=6) as tail_reader:
+        tail_reader.submit(tasks)
+        for i, task in enumerate(tasks):
+            assert tail_reader.get_tails(task) == [
+                ('stdout', ['task%d stdout' % i] * 2),
+                ('stderr', ['task%d stderr' % i] * 2),
+            ]
+
+
+def test_sandbox_tail_reader_times_out():
+    event = threading.Event()
+    fake_task = mock.MagicMock()
+    fake_task.__getitem__.return_value = 'a_task'
+    fake_task.file.return_value.exists.side_effect = event.wait
+    with mesos_tools.SandboxTailReader(nlines=2, timeout=0) as tail_reader:
+        with raises(utils.TimeoutError):
+            tail_reader.get_tails(fake_task)
+    event.set()
 
 
 def test_slave_pid_to_ip():
@@ -713,43 +763,77 @@ def _ids(list_of_mocks):
     return {id(mck) for mck in list_of_mocks}
 
 
+def fake_mesos_master_with_tasks(tasks, slaves):
+    mesos_master = master.MesosMaster({})
+    mesos_master.state = {'slaves': slaves}
+    mesos_master._task_list = mock.Mock(return_value=tasks)
+    return mesos_master
+
+
 def test_get_tasks_from_app_id():
+    fake_tasks = [
+        {'id': 'app_id.1', 'state': 'TASK_RUNNING', 'slave_id': 's1'},
+        {'id': 'app_id.2', 'state': 'TASK_RUNNING', 'slave_id': 's2'},
+        {'id': 'app_id.3', 'state': 'TASK_RUNNING', 'slave_id': 's3'},
+        {'id': 'app_id.4', 'state': 'TASK_KILLED', 'slave_id': 's2'},
+        {'id': 'app_id2.1', 'state': 'TASK_RUNNING', 'slave_id': 's2'},
+        {'id': 'other.app_id.1', 'state': 'TASK_RUNNING', 'slave_id': 's2'},
+    ]
+    fake_slaves = [
+        {'id': 's1', 'hostname': 'host1'},
+        {'id': 's2', 'hostname': 'host2'},
+        {'id': 's3', 'hostname': 'host2.domain'},
+    ]
     with mock.patch(
-        'paasta_tools.mesos_tools.get_running_tasks_from_frameworks', autospec=True,
-    ) as mock_get_running_tasks_from_frameworks:
-        mock_task_1 = mock.Mock(slave={'hostname': 'host1'})
-        mock_task_2 = mock.Mock(slave={'hostname': 'host2'})
-        mock_task_3 = mock.Mock(slave={'hostname': 'host2.domain'})
-        mock_get_running_tasks_from_frameworks.return_value = [mock_task_1, mock_task_2, mock_task_3]
-
-        ret = mesos_tools.get_tasks_from_app_id('app_id')
-        mock_get_running_tasks_from_frameworks.assert_called_with('app_id')
-        expected = [mock_task_1, mock_task_2, mock_task_3]
-        assert len(expected) == len(ret) and _ids(ret) == _ids(expected)
+        'paasta_tools.mesos_tools.get_task_lookup_master', autospec=True,
+        return_value=fake_mesos_master_with_tasks(fake_tasks, fake_slaves),
+    ):
+        ret = mesos_tools.get_tasks_from_app_id('app_id.')
+        assert sorted(task['id'] for task in ret) == ['app_id.1', 'app_id.2', 'app_id.3']
 
-        ret = mesos_tools.get_tasks_from_app_id('app_id', slave_hostname='host2')
-        mock_get_running_tasks_from_frameworks.assert_called_with('app_id')
-        expected = [mock_task_2, mock_task_3]
-        assert len(expected) == len(ret) and _ids(ret) == _ids(expected)
+        ret = mesos_tools.get_tasks_from_app_id('app_id.', slave_hostname='host2')
+        assert sorted(task['id'] for task in ret) == ['app_id.2', 'app_id.3']
 
 
 def test_get_task():
+    fake_tasks = [
+        {'id': 'app_id.123', 'state': 'TASK_RUNNING'},
+        {'id': 'app_id.789', 'state': 'TASK_RUNNING'},
+        {'id': 'app_id.789', 'state': 'TASK_RUNNING'},
+        {'id': 'app_id.456', 'state': 'TASK_FINISHED'},
+        {'id': 'other_app.111', 'state': 'TASK_RUNNING'},
+    ]
     with mock.patch(
-        'paasta_tools.mesos_tools.get_running_tasks_from_frameworks', autospec=True,
-    ) as mock_get_running_tasks_from_frameworks:
-        mock_task_1 = {'id': '123'}
-        mock_task_2 = {'id': '789'}
-        mock_task_3 = {'id': '789'}
-        mock_get_running_tasks_from_frameworks.return_value = [mock_task_1, mock_task_2, mock_task_3]
-        ret = mesos_tools.get_task('123', app_id='app_id')
-        mock_get_running_tasks_from_frameworks.assert_called_with('app_id')
-        assert ret == mock_task_1
+        'paasta_tools.mesos_tools.get_task_lookup_master', autospec=True,
+        return_value=fake_mesos_master_with_tasks(fake_tasks, []),
+    ):
+        ret = mesos_tools.get_task('app_id.123', app_id='app_id')
+        assert ret['id'] == 'app_id.123'
+
+        with raises(mesos_tools.TaskNotFound):
+            mesos_tools.get_task('app_id.111', app_id='app_id')
+
+        with raises(mesos_tools.TaskNotFound):
+            mesos_tools.get_task('app_id.456', app_id='app_id')
 
         with raises(mesos_tools.TaskNotFound):
-            mesos_tools.get_task('111', app_id='app_id')
+            mesos_tools.get_task('other_app.111', app_id='app_id')
 
         with raises(mesos_tools.TooManyTasks):
-            mesos_tools.get_task('789', app_id='app_id')
+            mesos_tools.get_task('app_id.789', app_id='app_id')
+
+
+def test_get_task_lookup_master_is_shared():
+    config = {'master': 'master1', 'scheme': 'http', 'response_timeout': 5}
+    with mock.patch(
+        'paasta_tools.mesos_tools.get_mesos_config', autospec=True, side_effect=lambda: dict(config),
+    ), mock.patch('paasta_tools.mesos_tools._task_lookup_master', None, autospec=None):
+        mesos_master = mesos_tools.get_task_lookup_master()
+        assert mesos_master.config == config
+        assert mesos_tools.get_task_lookup_master() is mesos_master
+
+        config['master'] = 'master2'
+        assert mesos_tools.get_task_lookup_master().config == config
 
 
 def test_filter_task_by_hostname():
@@ -833,7 +917,7 @@ def test_get_non_running_tasks_from_frameworks():
 
 
 def test_get_current_tasks():
-    with mock.patch('paasta_tools.mesos_tools.get_mesos_master', autospec=True) as mock_get_mesos_master:
+    with mock.patch('paasta_tools.mesos_tools.get_task_lookup_master', autospec=True) as mock_get_mesos_master:
         mock_task_1 = mock.Mock()
         mock_task_2 = mock.Mock()
         mock_tasks = mock.Mock(return_value=[mock_task_1, mock_task_2])
@@ -86,9 +86,13 @@ def test_are_local_tasks_in_danger_is_false_with_nothing_running(
 @mock.patch('paasta_tools.paasta_maintenance.utils.load_system_paasta_config', autospec=True)
 @mock.patch('paasta_tools.paasta_maintenance.marathon_services_running_here', autospec=True)
 @mock.patch('paasta_tools.paasta_maintenance.get_backends', autospec=True)
+@mock.patch('paasta_tools.paasta_maintenance.gethostbyname', autospec=True)
 @mock.patch('paasta_tools.paasta_maintenance.is_healthy_in_haproxy', autospec=True)
+@mock.patch('paasta_tools.paasta_maintenance.load_smartstack_info_for_services', autospec=True)
 def test_are_local_tasks_in_danger_is_false_with_an_unhealthy_service(
+    mock_load_smartstack_info_for_services,
     mock_is_healthy_in_haproxy,
+    mock_gethostbyname,
     mock_get_backends,
     mock_marathon_services_running_here,
     mock_load_system_paasta_config,
@@ -96,29 +100,85 @@ def test_are_local_tasks_in_danger_is_false_with_an_unhealthy_service(
     mock_is_healthy_in_haproxy.return_value = False
     mock_marathon_services_running_here.return_value = [("service", "instance", 42)]
     assert paasta_maintenance.are_local_tasks_in_danger() is False
-    mock_is_healthy_in_haproxy.assert_called_once_with(42, mock.ANY)
+    mock_is_healthy_in_haproxy.assert_called_once_with(42, mock.ANY, local_ip=mock_gethostbyname.return_value)
+    assert not mock_load_smartstack_info_for_services.called
 
 
 @mock.patch('paasta_tools.paasta_maintenance.utils.load_system_paasta_config', autospec=True)
 @mock.patch('paasta_tools.paasta_maintenance.marathon_services_running_here', autospec=True)
 @mock.patch('paasta_tools.paasta_maintenance.get_backends', autospec=True)
+@mock.patch('paasta_tools.paasta_maintenance.gethostbyname', autospec=True)
 @mock.patch('paasta_tools.paasta_maintenance.is_healthy_in_haproxy', autospec=True)
 @mock.patch('paasta_tools.paasta_maintenance.synapse_replication_is_low', autospec=True)
+@mock.patch('paasta_tools.paasta_maintenance.get_registered_namespace', autospec=True)
+@mock.patch('paasta_tools.paasta_maintenance.load_smartstack_info_for_services', autospec=True)
 def test_are_local_tasks_in_danger_is_true_with_an_healthy_service_in_danger(
+    mock_load_smartstack_info_for_services,
+    mock_get_registered_namespace,
     mock_synapse_replication_is_low,
     mock_is_healthy_in_haproxy,
+    mock_gethostbyname,
     mock_get_backends,
     mock_marathon_services_running_here,
     mock_load_system_paasta_config,
 ):
     mock_is_healthy_in_haproxy.return_value = True
     mock_synapse_replication_is_low.return_value = True
+    mock_get_registered_namespace.return_value = ('service', 'main')
+    mock_load_smartstack_info_for_services.return_value = {('service', 'main'): {'fake_region': {}}}
     mock_marathon_services_running_here.return_value = [("service", "instance", 42)]
     assert paasta_maintenance.are_local_tasks_in_danger() is True
-    mock_is_healthy_in_haproxy.assert_called_once_with(42, mock.ANY)
+    mock_is_healthy_in_haproxy.assert_called_once_with(42, mock.ANY, local_ip=mock_gethostbyname.return_value)
     assert mock_synapse_replication_is_low.call_count == 1
 
 
+@mock.patch('paasta_tools.paasta_maintenance.utils.load_system_paasta_config', autospec=True)
+@mock.patch('paasta_tools.paasta_maintenance.marathon_services_running_here', autospec=True)
+@mock.patch('paasta_tools.paasta_maintenance.get_backends', autospec=True)
+@mock.patch('paasta_tools.paasta_maintenance.gethostbyname', autospec=True)
+@mock.patch('paasta_tools.paasta_maintenance.read_registration_for_service_instance', autospec=True)
+@mock.patch('paasta_tools.paasta_maintenance.get_expected_instance_count_for_namespace', autospec=True)
+@mock.patch('paasta_tools.paasta_maintenance.load_smartstack_info_for_services', autospec=True)
+@mock.patch('paasta_tools.paasta_maintenance.load_smartstack_info_for_service', autospec=True)
+@mock.patch('paasta_tools.paasta_maintenance.get_replication_for_services', autospec=True)
+def test_are_local_tasks_in_danger_checks_all_services_at_once(
+    mock_get_replication_for_services,
+    mock_load_smartstack_info_for_service,
+    mock_load_smartstack_info_for_services,
+    mock_get_expected_instance_count_for_namespace,
+    mock_read_registration_for_service_instance,
+    mock_gethostbyname,
+    mock_get_backends,
+    mock_marathon_services_running_here,
+    mock_load_system_paasta_config,
+):
+    mock_gethostbyname.return_value = '192.0.2.1'
+    mock_get_backends.return_value = [
+        {'pxname': 'a.main', 'svname': '192.0.2.1:1001_hostname', 'status': 'UP'},
+        {'pxname': 'a.main', 'svname': '192.0.2.2:1001_hostname', 'status': 'UP'},
+        {'pxname': 'b.main', 'svname': '192.0.2.1:1002_hostname', 'status': 'UP'},
+        {'pxname': 'b.main', 'svname': '192.0.2.3:1002_hostname', 'status': 'DOWN'},
+    ]
+    mock_marathon_services_running_here.return_value = [('a', 'main', 1001), ('b', 'main', 1002)]
+    mock_read_registration_for_service_instance.side_effect = lambda service, instance: '%s.%s' % (service, instance)
+    mock_get_expected_instance_count_for_namespace.return_value = 4
+    mock_load_smartstack_info_for_services.return_value = {
+        ('a', 'main'): {'region1': {'a.main': 2}, 'region2': {'a.main': 2}},
+        ('b', 'main'): {'region1': {'b.main': 1}, 'region2': {'b.main': 2}},
+    }
+
+    assert paasta_maintenance.are_local_tasks_in_danger() is True
+    assert mock_get_backends.call_count == 1
+    assert mock_gethostbyname.call_count == 1
+    mock_load_smartstack_info_for_services.assert_called_once_with(
+        service_namespaces={('a', 'main'), ('b', 'main')},
+        blacklist=[],
+        system_paasta_config=mock_load_system_paasta_config.return_value,
+    )
+    assert not mock_load_smartstack_info_for_service.called
+    assert not mock_get_replication_for_services.called
+
+
 @mock.patch('paasta_tools.paasta_maintenance.read_registration_for_service_instance', autospec=True)
 @mock.patch('paasta_tools.paasta_maintenance.load_smartstack_info_for_service', autospec=True)
 @mock.patch('paasta_tools.paasta_maintenance.get_expected_instance_count_for_namespace', autospec=True)
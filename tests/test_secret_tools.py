@@ -11,11 +11,14 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from json.decoder import JSONDecodeError
+import json
+import os
 
 import mock
+import pytest
 
 from paasta_tools.secret_tools import get_hmac_for_secret
+from paasta_tools.secret_tools import get_secret_files
 from paasta_tools.secret_tools import get_secret_name_from_ref
 from paasta_tools.secret_tools import get_secret_provider
 from paasta_tools.secret_tools import is_secret_ref
@@ -32,40 +35,62 @@ def test_get_secret_name_from_ref():
     assert get_secret_name_from_ref('SECRET(aaa-bbb-222_111)') == 'aaa-bbb-222_111'
 
 
-def test_get_hmac_for_secret():
-    with mock.patch(
-        'paasta_tools.secret_tools.open', autospec=False,
-    ) as mock_open, mock.patch(
-        'json.load', autospec=True,
-    ) as mock_json_load, mock.patch(
-        'paasta_tools.secret_tools.get_secret_name_from_ref', autospec=True,
-    ) as mock_get_secret_name_from_ref:
-        mock_json_load.return_value = {
-            'environments': {
-                'dev': {'signature': 'notArealHMAC'},
-            },
-        }
-        mock_get_secret_name_from_ref.return_value = 'secretsquirrel'
-
-        ret = get_hmac_for_secret("SECRET(secretsquirrel)", "service-name", "/nail/blah", 'dev')
-        mock_get_secret_name_from_ref.assert_called_with("SECRET(secretsquirrel)")
-        mock_open.assert_called_with("/nail/blah/service-name/secrets/secretsquirrel.json", "r")
-        assert ret == 'notArealHMAC'
-
-        ret = get_hmac_for_secret("SECRET(secretsquirrel)", "service-name", "/nail/blah", 'dev-what')
-        assert ret is None
-
-        mock_open.side_effect = IOError
-        ret = get_hmac_for_secret("SECRET(secretsquirrel)", "service-name", "/nail/blah", 'dev')
-        assert ret is None
-
-        ret = get_hmac_for_secret("SECRET(secretsquirrel)", "service-name", "/nail/blah", 'dev')
-        assert ret is None
-
-        mock_open.side_effect = None
-        mock_json_load.side_effect = JSONDecodeError('', '', 1)
-        ret = get_hmac_for_secret("SECRET(secretsquirrel)", "service-name", "/nail/blah", 'dev')
-        assert ret is None
+@pytest.fixture
+def soa_dir_with_secrets(tmpdir):
+    secrets_dir = tmpdir.mkdir('service-name').mkdir('secrets')
+    secrets_dir.join('secretsquirrel.json').write(json.dumps({
+        'environments': {
+            'dev': {'signature': 'notArealHMAC'},
+        },
+    }))
+    secrets_dir.join('broken.json').write('{not json')
+    return tmpdir
+
+
+def test_get_hmac_for_secret(soa_dir_with_secrets, capsys):
+    soa_dir = str(soa_dir_with_secrets)
+    ret = get_hmac_for_secret("SECRET(secretsquirrel)", "service-name", soa_dir, 'dev')
+    assert ret == 'notArealHMAC'
+
+    ret = get_hmac_for_secret("SECRET(secretsquirrel)", "service-name", soa_dir, 'dev-what')
+    assert ret is None
+
+    ret = get_hmac_for_secret("SECRET(missing)", "service-name", soa_dir, 'dev')
+    assert ret is None
+    assert "Failed to open json secret at {}/service-name/secrets/missing.json".format(soa_dir) in \
+        capsys.readouterr()[0]
+
+    ret = get_hmac_for_secret("SECRET(secretsquirrel)", "other-service", soa_dir, 'dev')
+    assert ret is None
+
+    ret = get_hmac_for_secret("SECRET(broken)", "service-name", soa_dir, 'dev')
+    assert ret is None
+    assert "Failed to deserialise json secret" in capsys.readouterr()[0]
+
+
+def test_get_secret_files_reads_each_file_once(soa_dir_with_secrets):
+    soa_dir = str(soa_dir_with_secrets)
+    secrets_dir = soa_dir_with_secrets.join('service-name', 'secrets')
+    with mock.patch('json.load', autospec=True, side_effect=json.load) as mock_json_load:
+        for _ in range(3):
+            assert get_hmac_for_secret("SECRET(secretsquirrel)", "service-name", soa_dir, 'dev') == 'notArealHMAC'
+        assert mock_json_load.call_count == 2
+
+        # Only the new secret is read
+        secrets_dir.join('new.json').write(json.dumps({'environments': {'dev': {'signature': 'newHMAC'}}}))
+        assert get_hmac_for_secret("SECRET(new)", "service-name", soa_dir, 'dev') == 'newHMAC'
+        assert mock_json_load.call_count == 3
+        assert get_secret_files("service-name", soa_dir)['new'] == {'environments': {'dev': {'signature': 'newHMAC'}}}
+        assert mock_json_load.call_count == 3
+
+        # A secret edited in place, which leaves the mtime of the directory alone
+        dir_mtime = os.stat(str(secrets_dir)).st_mtime_ns
+        new_secret = secrets_dir.join('new.json')
+        new_secret.write(json.dumps({'environments': {'dev': {'signature': 'rotatedHMAC'}}}))
+        os.utime(str(new_secret), ns=(0, os.stat(str(new_secret)).st_mtime_ns + 1))
+        assert os.stat(str(secrets_dir)).st_mtime_ns == dir_mtime
+        assert get_hmac_for_secret("SECRET(new)", "service-name", soa_dir, 'dev') == 'rotatedHMAC'
+        assert mock_json_load.call_count == 4
 
 
 def test_get_secret_provider():
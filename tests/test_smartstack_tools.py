@@ -14,9 +14,11 @@
 import os
 
 import mock
+import pytest
 import requests
 
 from paasta_tools import smartstack_tools
+from paasta_tools.mesos.exceptions import NoSlavesAvailableError
 from paasta_tools.smartstack_tools import backend_is_up
 from paasta_tools.smartstack_tools import get_registered_marathon_tasks
 from paasta_tools.smartstack_tools import get_replication_for_services
@@ -94,6 +96,64 @@ def test_get_smartstack_replication_for_attribute(system_paasta_config):
         )
 
 
+def test_load_smartstack_info_for_services(system_paasta_config):
+    mock_filtered_slaves = [
+        {'hostname': 'hostone', 'attributes': {'region': 'foo', 'habitat': 'foo_a'}},
+        {'hostname': 'hosttwo', 'attributes': {'region': 'foo', 'habitat': 'foo_b'}},
+        {'hostname': 'hostthree', 'attributes': {'region': 'bar', 'habitat': 'bar_a'}},
+    ]
+    discover = {'service1': 'region', 'service2': 'region', 'service3': 'habitat'}
+    replication_by_host = {
+        'hostone': {'service1.main': 1, 'service2.main': 2, 'service3.main': 3},
+        'hosttwo': {'service3.main': 4},
+        'hostthree': {'service1.main': 5},
+    }
+
+    with mock.patch(
+        'paasta_tools.marathon_tools.load_service_namespace_config', autospec=True,
+        side_effect=lambda service, namespace, soa_dir: mock.Mock(get_discover=lambda: discover[service]),
+    ), mock.patch(
+        'paasta_tools.mesos_tools.get_all_slaves_for_blacklist_whitelist',
+        return_value=mock_filtered_slaves, autospec=True,
+    ) as mock_get_all_slaves_for_blacklist_whitelist, mock.patch(
+        'paasta_tools.smartstack_tools.get_replication_for_all_services', autospec=True,
+        side_effect=lambda synapse_host, synapse_port, synapse_haproxy_url_format: replication_by_host[synapse_host],
+    ) as mock_get_replication_for_all_services:
+        actual = smartstack_tools.load_smartstack_info_for_services(
+            service_namespaces=[('service1', 'main'), ('service2', 'main'), ('service3', 'main')],
+            blacklist=[],
+            system_paasta_config=system_paasta_config,
+        )
+
+    assert actual == {
+        ('service1', 'main'): {'foo': {'service1.main': 1}, 'bar': {'service1.main': 5}},
+        ('service2', 'main'): {'foo': {'service2.main': 2}, 'bar': {'service2.main': 0}},
+        ('service3', 'main'): {
+            'foo_a': {'service3.main': 3},
+            'foo_b': {'service3.main': 4},
+            'bar_a': {'service3.main': 0},
+        },
+    }
+    mock_get_all_slaves_for_blacklist_whitelist.assert_called_once_with(blacklist=[], whitelist=None)
+    # every location is only queried once, whatever the number of services
+    assert sorted(
+        call[1]['synapse_host'] for call in mock_get_replication_for_all_services.call_args_list
+    ) == ['hostone', 'hostthree', 'hosttwo']
+
+
+def test_load_smartstack_info_for_services_no_slaves(system_paasta_config):
+    with mock.patch(
+        'paasta_tools.marathon_tools.load_service_namespace_config', autospec=True,
+    ), mock.patch(
+        'paasta_tools.mesos_tools.get_all_slaves_for_blacklist_whitelist', return_value=[], autospec=True,
+    ), pytest.raises(NoSlavesAvailableError):
+        smartstack_tools.load_smartstack_info_for_services(
+            service_namespaces=[('service1', 'main')],
+            blacklist=[],
+            system_paasta_config=system_paasta_config,
+        )
+
+
 def test_get_replication_for_service():
     testdir = os.path.dirname(os.path.realpath(__file__))
     testdata = os.path.join(testdir, 'haproxy_snapshot.txt')